@@ -0,0 +1,67 @@
+"""
+Fixtures compartidas de los benchmarks.
+
+Las escalas 10 y 1000 se ejecutan siempre; la escala de 100k documentos solo
+con CATLUX_BENCH_FULL=1 porque tarda minutos.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from standin import CatluxStandin  # noqa: E402
+
+SCALES = [10, 1000]
+if os.getenv("CATLUX_BENCH_FULL") == "1":
+    SCALES.append(100_000)
+
+
+@pytest.fixture(params=SCALES, ids=lambda n: f"{n}docs")
+def scale(request) -> int:
+    """Número de documentos del escenario."""
+    return request.param
+
+
+@pytest.fixture
+def standin(scale):
+    """Servidor local con `scale` documentos, sin latencia y PDFs pequeños."""
+    server = CatluxStandin(n_docs=scale, page_size=50, pdf_size=4096)
+    server.start()
+    yield server
+    server.stop()
+
+
+# Archivos de estado del repo que las descargas y los listados escriben
+STATE_FILES = {"QUEUE_FILE": "download_queue.db", "CATALOG_FILE": "catlux_catalog.json",
+               "DEDUP_FILE": "catlux_dedup.json", "DETAILS_FILE": "catlux_details.json",
+               "SNAPSHOT_DIR": "snapshots"}
+
+
+@pytest.fixture
+def catlux_env(monkeypatch, tmp_path):
+    """
+    Variables de entorno mínimas para que get_credentials() funcione, y los
+    archivos de estado (cola, catálogo, ...) en tmp_path en vez de en el repo.
+    """
+    import catlux_async
+    import catlux_daemon
+    import catlux_planner
+    import catlux_scrapper
+
+    save_path = tmp_path / "Catlux"
+    save_path.mkdir()
+    monkeypatch.setenv("CATLUX_USERNAME", "bench@example.com")
+    monkeypatch.setenv("CATLUX_PASSWORD", "bench")
+    monkeypatch.setenv("CATLUX_SAVE_PATH", str(save_path))
+    monkeypatch.delenv("CATLUX_CERT_PATH", raising=False)
+    for module in (catlux_scrapper, catlux_async, catlux_daemon, catlux_planner):
+        for name, file_name in STATE_FILES.items():
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, tmp_path / file_name)
+    return save_path
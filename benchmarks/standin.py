@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a CatLux para benchmarks y pruebas offline.
+
+Implementa solo lo que usa catlux_scrapper.py:
+- GET/POST /login: formulario con username, password y REQUEST_TOKEN
+- GET <categoría>?p=N: listados paginados con contenedores "doc item list row"
+- GET /proben/...: páginas de navegación con enlaces a las subcategorías
+- GET/HEAD /probe/<id>?dl=pdf|pdf_solution: PDFs de tamaño configurable
+- GET /probe/<id>: página de detalle con ETag (responde 304 a If-None-Match)
+
+Uso:
+    with CatluxStandin(n_docs=1000, latency=0.005) as server:
+        url = server.category_url()  # http://127.0.0.1:PORT/proben/gymnasium/klasse-7/deutsch/
+"""
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+DOC_TYPES = [
+    "1. Schulaufgabe",
+    "2. Schulaufgabe",
+    "Extemporale",
+    "Kurzarbeit",
+    "Arbeitsblatt",
+    "Grammatik",
+]
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><body>
+<form id="search" action="/suche" method="get"><input name="q"></form>
+<form id="tl_login_42" action="/login" method="post">
+  <input type="hidden" name="FORM_SUBMIT" value="tl_login_42">
+  <input type="hidden" name="REQUEST_TOKEN" value="{token}">
+  <input type="hidden" name="_target_path" value="aHR0cHM6Ly93d3cuY2F0bHV4LmRlLw==">
+  <input type="text" name="username">
+  <input type="password" name="password">
+</form>
+</body></html>"""
+
+DOC_CONTAINER = """<div class="doc item list row">
+  <div class="col-xs-12">
+    <span class="label label-default pull-right">{doc_type}</span>
+    <span class="text-muted">#{ref:04d}</span>
+    <h2><a href="/probe/{doc_id}" data-id="{doc_id}">{title}</a></h2>
+    <p>Probe {ref} für die {doc_type} im Fach Deutsch, Gymnasium Bayern.</p>
+  </div>
+</div>"""
+
+
+class CatluxStandin:
+    """Servidor HTTP local con el comportamiento mínimo de CatLux."""
+
+    def __init__(self, n_docs: int = 10, page_size: int = 20, latency: float = 0.0,
+                 pdf_size: int = 50_000, solution_every: int = 1,
+                 category_path: str = "/proben/gymnasium/klasse-7/deutsch/",
+                 categories: Optional[Dict[str, int]] = None):
+        """
+        Inicializa el servidor (no lo arranca).
+
+        Args:
+            n_docs: Número de documentos del listado
+            page_size: Documentos por página de listado
+            latency: Segundos de espera artificial por petición
+            pdf_size: Tamaño en bytes de cada PDF servido
+            solution_every: Cada cuántos documentos existe solución (1 = todos)
+            category_path: Ruta de la categoría servida
+            categories: Otras categorías servidas {ruta: número de documentos};
+                sus ancestros bajo /proben/ se sirven como páginas de navegación
+        """
+        self.n_docs = n_docs
+        self.page_size = page_size
+        self.latency = latency
+        self.pdf_size = pdf_size
+        self.solution_every = solution_every
+        self.category_path = category_path
+        self.categories = {category_path.rstrip("/"): n_docs}
+        self.categories.update({path.rstrip("/"): n for path, n in (categories or {}).items()})
+        self.token = "standin-token-0123456789"
+        # Cambiarlo invalida los ETag de las páginas de detalle
+        self.detail_version = 1
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._pdf_body = self._make_pdf_body(pdf_size)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Datos servidos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _make_pdf_body(size: int) -> bytes:
+        """Genera un PDF mínimo rellenado hasta el tamaño pedido."""
+        head = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        tail = b"\n%%EOF\n"
+        padding = max(0, size - len(head) - len(tail))
+        return head + b"0" * padding + tail
+
+    def doc_id(self, index: int) -> str:
+        """ID de descarga del documento en la posición index (0-basado)."""
+        return str(100000 + index)
+
+    def has_solution(self, doc_id: str) -> bool:
+        """Indica si el documento tiene solución disponible."""
+        return (int(doc_id) - 100000) % self.solution_every == 0
+
+    def child_links(self, path: str) -> str:
+        """Enlaces de navegación a las subcategorías directas de path."""
+        prefix = path.rstrip("/") + "/"
+        children = sorted({p[len(prefix):].split("/")[0] for p in self.categories if p.startswith(prefix)})
+        links = "".join(f'<li><a href="{prefix}{child}/">{child}</a></li>' for child in children)
+        return f'<ul class="nav">{links}</ul>' if links else ""
+
+    def listing_page(self, page: int, path: Optional[str] = None) -> str:
+        """Renderiza la página de listado número page (1-basado) de path (por defecto, la principal)."""
+        path = (path or self.category_path).rstrip("/")
+        n_docs = self.categories.get(path, 0)
+        start = (page - 1) * self.page_size
+        end = min(n_docs, start + self.page_size)
+        containers = []
+        for i in range(start, end):
+            containers.append(DOC_CONTAINER.format(
+                doc_type=DOC_TYPES[i % len(DOC_TYPES)],
+                ref=i + 1,
+                doc_id=self.doc_id(i),
+                title=f"Probe Nummer {i + 1}: Erörterung und Grammatik",
+            ))
+        n_pages = -(-n_docs // self.page_size)
+        # Paginación con ventana, como la del sitio: primera, vecinas y última
+        shown = sorted({1, n_pages, *range(max(1, page - 2), min(n_pages, page + 2) + 1)})
+        pagination = "".join(f'<li><a href="{path}/?p={p}">{p}</a></li>' for p in shown
+                             ) if n_pages > 1 else ""
+        return ("<!DOCTYPE html><html><body>" + self.child_links(path)
+                + "<div class=\"mod_list\">"
+                + "\n".join(containers)
+                + f'</div><ul class="pagination">{pagination}</ul></body></html>')
+
+    def listing_pages(self) -> List[bytes]:
+        """Todas las páginas de listado (útil para benchmarks de parsing)."""
+        n_pages = max(1, -(-self.n_docs // self.page_size))
+        return [self.listing_page(p).encode("utf-8") for p in range(1, n_pages + 1)]
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def start(self) -> str:
+        """Arranca el servidor en un puerto libre y retorna la URL raíz."""
+        standin = self
+
+        class Handler(_StandinHandler):
+            server_state = standin
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.root_url()
+
+    def stop(self) -> None:
+        """Detiene el servidor."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "CatluxStandin":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def root_url(self) -> str:
+        """URL raíz del servidor (terminada en '/')."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def category_url(self) -> str:
+        """URL de la categoría servida."""
+        return self.root_url().rstrip("/") + self.category_path
+
+    def count(self, key: str) -> None:
+        """Incrementa el contador de peticiones de un tipo."""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; server_state se inyecta en la subclase creada por start()."""
+
+    server_state: CatluxStandin
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    _probe_re = re.compile(r"^/probe/(\d+)$")
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - firma de BaseHTTPRequestHandler
+        """Silencia el log por petición."""
+
+    def _send(self, status: int, body: bytes, content_type: str, head_only: bool = False,
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _handle(self, head_only: bool = False) -> None:
+        state = self.server_state
+        if state.latency:
+            time.sleep(state.latency)
+
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+
+        if parts.path == "/login":
+            state.count("login_page")
+            body = LOGIN_PAGE.format(token=state.token).encode("utf-8")
+            self._send(200, body, "text/html; charset=utf-8", head_only)
+            return
+
+        match = self._probe_re.match(parts.path)
+        if match:
+            doc_id = match.group(1)
+            dl = query.get("dl", [""])[0]
+            index = int(doc_id) - 100000
+            if not 0 <= index < state.n_docs:
+                self._send(404, b"<html>Not found</html>", "text/html", head_only)
+                return
+            if dl == "pdf_solution" and not state.has_solution(doc_id):
+                # CatLux responde con una página HTML cuando no hay solución
+                state.count("missing_solution")
+                self._send(200, b"<html>Keine L\xc3\xb6sung vorhanden</html>",
+                           "text/html; charset=utf-8", head_only)
+                return
+            if dl in ("pdf", "pdf_solution"):
+                state.count("head" if head_only else "pdf")
+                self._send(200, state._pdf_body, "application/pdf", head_only,
+                           {"Content-Disposition": f'attachment; filename="{doc_id}.pdf"'})
+                return
+            etag = f'"detail-{doc_id}-{state.detail_version}"'
+            if self.headers.get("If-None-Match") == etag:
+                state.count("detail_304")
+                self._send(304, b"", "text/html; charset=utf-8", True, {"ETag": etag})
+                return
+            state.count("detail")
+            body = (f"<html><body><h1>Probe {doc_id}</h1>"
+                    f"<dl><dt>Schuljahr</dt><dd>2023/24</dd>"
+                    f"<dt>Seiten</dt><dd>{index % 5 + 1}</dd>"
+                    f"<dt>Autor</dt><dd>Lehrkraft {index % 3}</dd>"
+                    f"<dt>Hochgeladen am</dt><dd>2024-0{index % 9 + 1}-15</dd></dl></body></html>"
+                    ).encode("utf-8")
+            self._send(200, body, "text/html; charset=utf-8", head_only,
+                       {"ETag": etag, "Last-Modified": "Mon, 15 Jan 2024 08:00:00 GMT"})
+            return
+
+        if parts.path.rstrip("/") in state.categories:
+            state.count("listing")
+            page = int(query.get("p", ["1"])[0])
+            body = state.listing_page(page, parts.path).encode("utf-8")
+            self._send(200, body, "text/html; charset=utf-8", head_only)
+            return
+
+        if parts.path.startswith("/proben") and state.child_links(parts.path):
+            state.count("nav")
+            body = f"<html><body>{state.child_links(parts.path)}</body></html>".encode("utf-8")
+            self._send(200, body, "text/html; charset=utf-8", head_only)
+            return
+
+        self._send(404, b"<html>Not found</html>", "text/html", head_only)
+
+    def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por http.server
+        self._handle()
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self._handle(head_only=True)
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        state = self.server_state
+        if state.latency:
+            time.sleep(state.latency)
+        if urlsplit(self.path).path == "/login":
+            state.count("login_post")
+            self._send(200, b"<html>Willkommen</html>", "text/html; charset=utf-8",
+                       headers={"Set-Cookie": "PHPSESSID=standin; Path=/"})
+            return
+        self._send(404, b"<html>Not found</html>", "text/html")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor local que imita a CatLux")
+    parser.add_argument("--docs", type=int, default=100, help="Número de documentos")
+    parser.add_argument("--page-size", type=int, default=20, help="Documentos por página")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia por petición (s)")
+    parser.add_argument("--pdf-size", type=int, default=50_000, help="Tamaño de cada PDF (bytes)")
+    args = parser.parse_args()
+
+    server = CatluxStandin(args.docs, args.page_size, args.latency, args.pdf_size)
+    server.start()
+    print(f"Stand-in escuchando en {server.category_url()} (Ctrl-C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
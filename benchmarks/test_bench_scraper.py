@@ -0,0 +1,222 @@
+"""
+Benchmarks de catlux_scrapper contra el servidor local (benchmarks/standin.py).
+
+Escenarios: listado, parsing, preview, marcado de archivos locales, descarga y
+operaciones del tracker, a 10 / 1k (/100k con CATLUX_BENCH_FULL=1) documentos.
+
+Ejecutar:
+    pip install -r requirements-dev.txt
+    python -m pytest benchmarks/ --benchmark-only
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import requests  # noqa: E402
+
+import catlux_scrapper  # noqa: E402
+from catlux_scrapper import (  # noqa: E402
+    DownloadTracker,
+    PDFManager,
+    download_filtered_pdfs,
+    login_to_catlux,
+    mark_local_files,
+)
+from standin import CatluxStandin  # noqa: E402
+
+
+def _rounds(scale: int) -> int:
+    """Menos rondas en escenarios grandes para acotar el tiempo total."""
+    return 5 if scale <= 10 else 1
+
+
+class _Response:
+    """Respuesta en memoria con la interfaz mínima que usa fetch_pdfs()."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _PageSession:
+    """Sesión que sirve páginas pre-renderizadas: aísla el coste de parsing."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        page = int(url.rsplit("?p=", 1)[1])
+        if page <= len(self.pages):
+            return _Response(self.pages[page - 1])
+        return _Response(b"<html><body></body></html>")
+
+
+def _n_pages(server: CatluxStandin) -> int:
+    return -(-server.n_docs // server.page_size) + 1
+
+
+def test_listing(benchmark, standin, scale):
+    """Login + listado paginado completo por HTTP."""
+    url = standin.category_url()
+
+    def run():
+        session = requests.Session()
+        try:
+            assert login_to_catlux(session, "bench", "bench", None, standin.root_url() + "login")
+            return PDFManager(session).fetch_pdfs(url, _n_pages(standin))
+        finally:
+            session.close()
+
+    pdfs = benchmark.pedantic(run, rounds=_rounds(scale), iterations=1)
+    assert len(pdfs) == 2 * scale
+
+
+def test_parsing(benchmark, scale):
+    """Parsing de páginas de listado ya descargadas (sin red)."""
+    server = CatluxStandin(n_docs=scale, page_size=50)
+    manager = PDFManager(_PageSession(server.listing_pages()))
+    url = "https://www.catlux.de" + server.category_path
+
+    pdfs = benchmark.pedantic(manager.fetch_pdfs, args=(url, _n_pages(server)),
+                              rounds=_rounds(scale), iterations=1)
+    assert len(pdfs) == 2 * scale
+
+
+def test_parsing_pool(benchmark, scale):
+    """Las mismas páginas repartidas en un pool de procesos (--parse-workers)."""
+    from catlux_parsepool import ParsePool
+
+    server = CatluxStandin(n_docs=scale, page_size=50)
+    pages = server.listing_pages()
+    url = "https://www.catlux.de" + server.category_path
+
+    with ParsePool() as pool:
+        list(pool.map_pages(pages[:1], url))  # arrancar los procesos fuera de la medida
+        results = benchmark.pedantic(lambda: list(pool.map_pages(pages, url)),
+                                     rounds=_rounds(scale), iterations=1)
+    assert sum(len(r) for r in results) == 2 * scale
+
+
+def test_preview_render(benchmark, scale, capsys):
+    """Preview interactivo: estadísticas en una pasada y solo las filas visibles."""
+    server = CatluxStandin(n_docs=scale, page_size=50)
+    manager = PDFManager(_PageSession(server.listing_pages()))
+    url = "https://www.catlux.de" + server.category_path
+    pdfs = manager.fetch_pdfs(url, _n_pages(server))
+
+    benchmark.pedantic(manager.print_preview, args=(pdfs, url),
+                       kwargs={'limit': catlux_scrapper.PREVIEW_INLINE_ROWS},
+                       rounds=_rounds(scale), iterations=1)
+    out = capsys.readouterr().out
+    assert out.count(" | Exam ") <= catlux_scrapper.PREVIEW_INLINE_ROWS * _rounds(scale)
+
+
+def test_mark_local_files(benchmark, scale, tmp_path):
+    """Detección de archivos locales: mitad en la carpeta, un cuarto en otra."""
+    server = CatluxStandin(n_docs=scale, page_size=50)
+    pdfs = PDFManager(_PageSession(server.listing_pages())).fetch_pdfs(
+        "https://www.catlux.de" + server.category_path, _n_pages(server))
+
+    root = tmp_path / "Catlux"
+    category = root / "klasse-7" / "deutsch"
+    other = root / "klasse-8" / "deutsch"
+    category.mkdir(parents=True)
+    other.mkdir(parents=True)
+    for i, pdf in enumerate(pdfs):
+        if i % 4 in (0, 1):
+            (category / f"{pdf['name']}.pdf").touch()
+        elif i % 4 == 2:
+            (other / f"{pdf['name']}.pdf").touch()
+
+    benchmark.pedantic(mark_local_files, args=(pdfs, category, root),
+                       rounds=_rounds(scale), iterations=1)
+    assert sum(1 for p in pdfs if p['is_local']) == len(pdfs) - len(pdfs) // 4
+
+
+def test_download(benchmark, standin, scale, catlux_env, tmp_path, monkeypatch):
+    """Descarga de todos los PDFs (examen + solución) de una categoría."""
+    monkeypatch.setattr(catlux_scrapper, "DOWNLOADS_PER_MONTH", 10 ** 9)
+    url = standin.category_url()
+    tracker_file = tmp_path / "tracker.json"
+    target = catlux_env / "klasse-7" / "deutsch"
+
+    def setup():
+        for f in target.glob("*.pdf"):
+            f.unlink()
+        tracker_file.unlink(missing_ok=True)
+        return (url, _n_pages(standin), DownloadTracker(tracker_file)), {}
+
+    count = benchmark.pedantic(download_filtered_pdfs, setup=setup,
+                               rounds=_rounds(scale), iterations=1)
+    assert count == 2 * scale
+    assert len(list(target.glob("*.pdf"))) == 2 * scale
+
+
+def test_listing_async(benchmark, standin, scale, catlux_env):
+    """Login + listado paginado con el motor asíncrono (--engine async)."""
+    catlux_async = pytest.importorskip("catlux_async")
+    pytest.importorskip("httpx")
+
+    pdfs = benchmark.pedantic(catlux_async.fetch_listing,
+                              args=(standin.category_url(), _n_pages(standin), 16),
+                              rounds=_rounds(scale), iterations=1)
+    assert len(pdfs) == 2 * scale
+
+
+def test_download_async(benchmark, standin, scale, catlux_env, tmp_path, monkeypatch):
+    """Descarga completa de una categoría con el motor asíncrono."""
+    catlux_async = pytest.importorskip("catlux_async")
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(catlux_scrapper, "DOWNLOADS_PER_MONTH", 10 ** 9)
+    tracker_file = tmp_path / "tracker.json"
+    target = catlux_env / "klasse-7" / "deutsch"
+
+    def setup():
+        for f in target.glob("*.pdf"):
+            f.unlink()
+        tracker_file.unlink(missing_ok=True)
+        return (standin.category_url(), _n_pages(standin), DownloadTracker(tracker_file)), {}
+
+    count = benchmark.pedantic(catlux_async.download_filtered_pdfs_async, setup=setup,
+                               rounds=_rounds(scale), iterations=1)
+    assert count == 2 * scale
+    assert len(list(target.glob("*.pdf"))) == 2 * scale
+
+
+def test_tracker_record(benchmark, scale, tmp_path):
+    """Registro de `scale` descargas en un tracker vacío."""
+    tracker_file = tmp_path / "tracker.json"
+
+    def setup():
+        tracker_file.unlink(missing_ok=True)
+        return (DownloadTracker(tracker_file),), {}
+
+    def run(tracker):
+        for i in range(scale):
+            tracker.record_download(f"{100000 + i}")
+        return tracker
+
+    tracker = benchmark.pedantic(run, setup=setup, rounds=_rounds(scale), iterations=1)
+    assert tracker.data["total_all_time"] == scale
+
+
+def test_tracker_remaining(benchmark, scale, tmp_path):
+    """Carga de un tracker con `scale` entradas y cálculo del saldo."""
+    tracker_file = tmp_path / "tracker.json"
+    now = datetime.now().isoformat()
+    tracker_file.write_text(json.dumps({
+        "downloads": [{"date": now, "filename": f"{100000 + i}"} for i in range(scale)],
+        "total_all_time": scale,
+    }), encoding="utf-8")
+
+    def run():
+        return DownloadTracker(tracker_file).get_remaining_downloads()
+
+    remaining = benchmark(run)
+    assert remaining == max(0, catlux_scrapper.DOWNLOADS_PER_MONTH - scale)
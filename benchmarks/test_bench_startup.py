@@ -0,0 +1,67 @@
+"""
+Benchmark de arranque del CLI: `catlux_scrapper.py --info`.
+
+Comprueba con `python -X importtime` que los comandos que solo leen el tracker
+no importan la pila HTTP/HTML (requests, bs4, dotenv, urllib3) ni abren el log,
+y registra el tiempo total de importación como métrica de regresión.
+"""
+
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+SCRIPT = Path(__file__).resolve().parent.parent / "catlux_scrapper.py"
+HEAVY_MODULES = ("requests", "bs4", "dotenv", "urllib3")
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+# Presupuesto generoso para máquinas lentas de CI; el valor real ronda 20-40 ms
+IMPORT_BUDGET_US = 150_000
+
+
+def _run_info(workdir: Path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", str(workdir / SCRIPT.name), "--info"],
+        cwd=workdir, capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+
+
+def _parse_importtime(stderr: str):
+    """Retorna (módulos importados, microsegundos acumulados de nivel superior)."""
+    modules = set()
+    total_us = 0
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(name.split(".")[0])
+        if not indent:
+            total_us += cumulative
+    return modules, total_us
+
+
+@pytest.fixture
+def script_copy(tmp_path):
+    """Copia aislada del script: el tracker y el log se crean junto a él."""
+    shutil.copy(SCRIPT, tmp_path / SCRIPT.name)
+    return tmp_path
+
+
+def test_info_startup(benchmark, script_copy):
+    """`--info` no importa la pila HTTP/HTML ni crea el archivo de log."""
+    result = benchmark.pedantic(_run_info, args=(script_copy,), rounds=5, iterations=1)
+
+    modules, total_us = _parse_importtime(result.stderr)
+    benchmark.extra_info["import_time_us"] = total_us
+
+    assert "ESTADO DE DESCARGAS" in result.stdout
+    for heavy in HEAVY_MODULES:
+        assert heavy not in modules, f"--info no debería importar {heavy}"
+    assert not (script_copy / "catlux_scrapper.log").exists()
+    assert total_us < IMPORT_BUDGET_US, f"Importación demasiado lenta: {total_us} us"
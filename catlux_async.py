@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Motor asíncrono (asyncio + httpx) para CatLux.
+
+Alternativa al flujo basado en requests de catlux_scrapper.py: login, listado
+paginado y descargas corren en un único event loop, con un semáforo que limita
+las peticiones en vuelo. El parsing (parse_listing_page, build_login_payload),
+la cola de descargas (build_download_queue), la cola persistente
+(catlux_queue.JobQueue, reanudable con --resume), la escritura atómica
+(write_pdf) y el DownloadTracker son los mismos que usa el motor síncrono.
+
+Se selecciona con:
+    python catlux_scrapper.py --url "..." --engine async --concurrency 32
+
+Requisitos:
+    pip install httpx
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+from catlux_scrapper import (
+    PDF_MAGIC,
+    QUEUE_FILE,
+    TRACKER_FILE,
+    DownloadTracker,
+    NotAPdfError,
+    build_download_queue,
+    build_login_payload,
+    check_pdf_content,
+    extract_category_path,
+    get_credentials,
+    get_download_throttle,
+    get_parse_pool,
+    get_site_root,
+    parse_listing_page,
+    skip_unavailable_job,
+    write_pdf,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 16
+
+
+def _import_httpx():
+    """Importa httpx bajo demanda (dependencia opcional)."""
+    try:
+        import httpx
+    except ImportError:
+        print("Error: El motor asíncrono necesita httpx. Ejecuta:")
+        print("  pip install httpx")
+        sys.exit(1)
+    return httpx
+
+
+class AsyncEngine:
+    """Cliente HTTP asíncrono con concurrencia limitada por semáforo."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY):
+        """
+        Inicializa el motor (debe crearse dentro de un event loop).
+
+        Args:
+            concurrency: Máximo de peticiones en vuelo
+        """
+        httpx = _import_httpx()
+        self.concurrency = max(1, concurrency)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        # verify=False: CatLux usa certificado auto-firmado (igual que el motor síncrono)
+        self.client = httpx.AsyncClient(
+            verify=False,
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency,
+                                max_keepalive_connections=self.concurrency),
+        )
+
+    async def __aenter__(self) -> "AsyncEngine":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.client.aclose()
+
+    async def _get(self, url: str, timeout: float = 30):
+        """GET limitado por el semáforo; lanza excepción si el estado no es 2xx."""
+        async with self.semaphore:
+            response = await self.client.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    async def _fetch_pdf(self, url: str, on_chunk=None):
+        """
+        Descarga un PDF; con --max-rate lo lee en trozos por el token bucket compartido.
+
+        Args:
+            url: URL del PDF
+            on_chunk: Llamada tras cada trozo leído con --max-rate (latido de la cola)
+
+        Returns:
+            Tupla (contenido, Content-Type)
+        """
+        throttle = get_download_throttle()
+        if throttle is None:
+            response = await self._get(url)
+            return response.content, response.headers.get('Content-Type', '')
+
+        parts = []
+        async with self.semaphore:
+            async with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(throttle.chunk_size):
+                    delay = throttle.reserve(len(chunk))
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    parts.append(chunk)
+                    if on_chunk is not None:
+                        on_chunk()
+        return b"".join(parts), response.headers.get('Content-Type', '')
+
+    async def login(self, username: str, password: str, login_url: str) -> bool:
+        """
+        Realiza login en CatLux (mismo payload que login_to_catlux()).
+
+        Args:
+            username: Nombre de usuario/email de CatLux
+            password: Contraseña de CatLux
+            login_url: URL del formulario de login
+
+        Returns:
+            True si el login fue exitoso, False en caso contrario
+        """
+        try:
+            login_page = await self._get(login_url, timeout=10)
+            payload = build_login_payload(login_page.content, username, password)
+            if payload is None:
+                return False
+
+            async with self.semaphore:
+                response = await self.client.post(login_url, data=payload, timeout=10)
+            response.raise_for_status()
+
+            logger.info("✓ Login exitoso")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error en login: {e}")
+            return False
+
+    async def fetch_pdfs(self, base_url: str, max_pages: int = 10) -> List[Dict]:
+        """
+        Obtiene la lista de PDFs pidiendo las páginas en paralelo.
+
+        Las páginas se piden en tandas de `concurrency`; el listado termina en
+        la primera página vacía o con error. El resultado conserva el orden de
+        páginas y elimina duplicados igual que PDFManager.fetch_pdfs().
+
+        Args:
+            base_url: URL base de la clase
+            max_pages: Máximo de páginas a procesar
+
+        Returns:
+            Lista de diccionarios con información de PDFs
+        """
+        pdfs = []
+        found_docs = set()
+
+        async def fetch_page(page_num: int) -> Optional[List[Dict]]:
+            url = f"{base_url}?p={page_num}"
+            logger.debug(f"Buscando en: {url}")
+            try:
+                response = await self._get(url, timeout=10)
+            except Exception as e:
+                logger.error(f"Error descargando página {page_num}: {e}")
+                return None
+            pool = get_parse_pool()
+            if pool is None:
+                return parse_listing_page(response.content, base_url)
+            # Con --parse-workers el parsing no bloquea el event loop ni compite por el GIL
+            return await asyncio.wrap_future(pool.submit_page(response.content, base_url))
+
+        for first in range(1, max_pages + 1, self.concurrency):
+            last = min(max_pages, first + self.concurrency - 1)
+            results = await asyncio.gather(*(fetch_page(p) for p in range(first, last + 1)))
+
+            for page_num, page_pdfs in zip(range(first, last + 1), results):
+                if not page_pdfs:
+                    if page_pdfs is not None:
+                        logger.debug(f"No hay documentos en página {page_num}")
+                    return pdfs
+                for pdf in page_pdfs:
+                    if pdf['name'] in found_docs:
+                        continue
+                    found_docs.add(pdf['name'])
+                    pdfs.append(pdf)
+
+        return pdfs
+
+    async def download(self, queue_file: Path, tracker: DownloadTracker, batch: Optional[str] = None,
+                       site: Optional[str] = None) -> int:
+        """
+        Vacía en paralelo la cola persistente de descargas (catlux_queue.JobQueue).
+
+        Equivalente a run_download_jobs() con `concurrency` trabajos a la vez:
+        cada uno reserva su hueco en el tracker (y en el ledger compartido, si
+        lo hay) antes de reclamar el trabajo, de modo que las descargas en vuelo
+        nunca superan el límite mensual. Los fallos se reintentan hasta
+        MAX_ATTEMPTS, los PDFs inexistentes quedan en el catálogo y, si se
+        cancela, el trabajo en curso vuelve a pending para --resume.
+
+        Cola y tracker bloquean (BEGIN IMMEDIATE de SQLite, file_lock del
+        ledger): todas sus llamadas pasan por un único hilo auxiliar, que es
+        además el único que usa la conexión SQLite, y el event loop sigue
+        atendiendo las transferencias en curso mientras esperan.
+
+        Args:
+            queue_file: Archivo de la cola (normalmente QUEUE_FILE)
+            tracker: Rastreador de descargas
+            batch: Limitar a un lote (None = todos los pendientes)
+            site: Limitar a los trabajos de un sitio
+
+        Returns:
+            Número de PDFs descargados
+        """
+        from catlux_queue import DONE_RETENTION_SECONDS, HEARTBEAT_SECONDS, JobQueue, current_owner
+
+        owner = current_owner()
+        downloaded_count = 0
+        loop = asyncio.get_running_loop()
+        state = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catlux-async-state")
+
+        def call(fn, *args):
+            return loop.run_in_executor(state, fn, *args)
+
+        job_queue = await call(JobQueue, queue_file)
+
+        def downloaded(pdf: Dict, reservation: Optional[str], job_id: int) -> None:
+            tracker.record_download(pdf['name'], reservation)
+            job_queue.complete(job_id)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"⬇ {pdf['name']}.pdf - descargado ({tracker.get_remaining_downloads()} restantes)")
+
+        async def worker() -> None:
+            nonlocal downloaded_count
+            while True:
+                reservation = await call(tracker.reserve_slot)
+                if reservation is None:
+                    logger.warning("Límite alcanzado, deteniendo descargas")
+                    return
+                job = await call(job_queue.claim, owner, batch, site)
+                if job is None:
+                    await call(tracker.release_slot, reservation)
+                    return
+
+                pdf, dest = job['pdf'], job['dest']
+                last_beat = [time.monotonic()]
+
+                def heartbeat(job_id=job['id']) -> None:
+                    if time.monotonic() - last_beat[0] >= HEARTBEAT_SECONDS:
+                        last_beat[0] = time.monotonic()
+                        state.submit(job_queue.touch, job_id)
+
+                try:
+                    content, content_type = await self._fetch_pdf(pdf['full_url'], heartbeat)
+                    check_pdf_content(pdf['name'], content[:len(PDF_MAGIC)], content_type)
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    await asyncio.to_thread(write_pdf, dest, (content,))
+                except asyncio.CancelledError:
+                    # Sin await: la tarea ya está cancelada; el hilo lo ejecuta antes de cerrar la cola
+                    state.submit(job_queue.release, job['id'])
+                    state.submit(tracker.release_slot, reservation)
+                    raise
+                except NotAPdfError as e:
+                    await call(tracker.release_slot, reservation)
+                    await call(skip_unavailable_job, job_queue, job, e)
+                    continue
+                except Exception as e:
+                    await call(tracker.release_slot, reservation)
+                    retry = await call(job_queue.fail, job['id'], str(e))
+                    logger.error(f"Error descargando {pdf['name']}: {e}" + (" (se reintentará)" if retry else ""))
+                    continue
+
+                await call(downloaded, pdf, reservation, job['id'])
+                downloaded_count += 1
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            purged = await call(job_queue.purge_done, DONE_RETENTION_SECONDS)
+            if purged:
+                logger.debug(f"{purged} trabajos terminados hace más de una semana borrados de la cola")
+        finally:
+            state.submit(job_queue.close)
+            state.shutdown(wait=False)
+        return downloaded_count
+
+
+def _enqueue(base_url: str, save_path: Path, queue: List[Dict]) -> str:
+    from catlux_queue import JobQueue
+    with JobQueue(QUEUE_FILE) as job_queue:
+        return job_queue.enqueue(base_url, save_path, queue)
+
+
+def _login_url(base_url: str) -> str:
+    return urljoin(get_site_root(base_url), "login")
+
+
+def fetch_listing(base_url: str, max_pages: int = 10,
+                  concurrency: int = DEFAULT_CONCURRENCY) -> Optional[List[Dict]]:
+    """
+    Login + listado completo con el motor asíncrono (para preview_pdfs()).
+
+    Args:
+        base_url: URL base de la clase
+        max_pages: Máximo de páginas a procesar
+        concurrency: Máximo de peticiones en vuelo
+
+    Returns:
+        Lista de PDFs, o None si faltan credenciales o falla el login
+    """
+    username, password, _, save_base_path = get_credentials()
+    if not all([username, password, save_base_path]):
+        return None
+
+    async def run() -> Optional[List[Dict]]:
+        async with AsyncEngine(concurrency) as engine:
+            if not await engine.login(username, password, _login_url(base_url)):
+                return None
+            return await engine.fetch_pdfs(base_url, max_pages)
+
+    return asyncio.run(run())
+
+
+def download_filtered_pdfs_async(base_url: str, max_pages: int = 10,
+                                 tracker: Optional[DownloadTracker] = None,
+                                 pdfs: Optional[List[Dict]] = None,
+                                 selected_indices: Optional[List[int]] = None,
+                                 concurrency: int = DEFAULT_CONCURRENCY) -> int:
+    """
+    Equivalente asíncrono de download_filtered_pdfs().
+
+    Args:
+        base_url: URL base de la clase
+        max_pages: Máximo de páginas (solo usado si pdfs es None)
+        tracker: Rastreador de descargas
+        pdfs: Lista pre-obtenida de PDFs (si es None, se obtiene)
+        selected_indices: Índices de PDFs a descargar (0-basado)
+        concurrency: Máximo de peticiones en vuelo
+
+    Returns:
+        Número de PDFs descargados
+    """
+    if tracker is None:
+        tracker = DownloadTracker(TRACKER_FILE)
+
+    username, password, _, save_base_path = get_credentials()
+    if not all([username, password, save_base_path]):
+        return 0
+
+    full_save_path = extract_category_path(base_url, save_base_path)
+    if not full_save_path:
+        return 0
+
+    full_save_path.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Carpeta de destino: {full_save_path}")
+
+    if tracker.get_remaining_downloads() == 0:
+        logger.error("Límite de descargas alcanzado para este mes")
+        tracker.print_status()
+        return 0
+
+    async def run() -> int:
+        nonlocal pdfs, selected_indices
+        async with AsyncEngine(concurrency) as engine:
+            if not await engine.login(username, password, _login_url(base_url)):
+                logger.error("No se pudo completar el login")
+                return 0
+
+            if pdfs is None:
+                pdfs = await engine.fetch_pdfs(base_url, max_pages)
+                if selected_indices is None:
+                    selected_indices = list(range(len(pdfs)))
+
+            print("\n🔄 Iniciando descargas...\n")
+            queue = build_download_queue(pdfs, selected_indices, full_save_path, Path(save_base_path))
+            remaining = tracker.get_remaining_downloads()
+            if len(queue) > remaining:
+                from catlux_planner import plan_downloads, print_plan
+                plan = plan_downloads(queue, remaining)
+                print_plan(plan, dry_run=False)
+                queue = plan.pdfs
+
+            # Misma cola persistente que el motor síncrono: --resume continúa aquí
+            batch = await asyncio.to_thread(_enqueue, base_url, full_save_path, queue)
+            return await engine.download(QUEUE_FILE, tracker, batch)
+
+    downloaded_count = 0
+    try:
+        downloaded_count = asyncio.run(run())
+        logger.info(f"Descarga completada: {downloaded_count} nuevos PDFs")
+    except Exception as e:
+        logger.error(f"Error en descarga: {e}")
+
+    tracker.print_status()
+    return downloaded_count
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Caché en memoria de listados con caducidad y una sola carga en vuelo por clave.
+
+La usan el servicio HTTP (catlux_server.py, --serve) y la precarga de
+listados vecinos (catlux_lookahead.py, --select-category). Vive en su propio
+módulo para que la precarga no importe http.server ni el servicio.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+LISTING_TTL_SECONDS = 10 * 60
+
+
+class ListingCache:
+    """Caché en memoria con caducidad y una sola carga en vuelo por clave."""
+
+    def __init__(self, loader: Callable[[Hashable], object], ttl: float = LISTING_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, max_entries: Optional[int] = None):
+        """
+        Args:
+            loader: Función clave -> valor (None = no se cachea)
+            ttl: Segundos que vale un valor cargado
+            clock: Reloj monótono (inyectable en pruebas)
+            max_entries: Máximo de valores guardados; al pasarlo se olvida el
+                usado hace más tiempo (None = sin límite)
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+        self.max_entries = max_entries
+        self.loads = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, refresh: bool = False):
+        """
+        Valor de la clave: el cacheado si sigue vigente; si no, se carga.
+
+        Si otra petición ya está cargando la misma clave, se espera a su
+        resultado en vez de repetir la carga.
+        """
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None and not refresh:
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.loads += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = self.loader(key)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if value is not None:
+                self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def peek(self, key: Hashable):
+        """
+        Valor de la clave sin cargarlo: el cacheado si sigue vigente, el de la
+        carga en vuelo (se espera a que termine) o None.
+        """
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry[1]
+            future = self._inflight.get(key)
+        return future.result() if future is not None else None
+
+    def put(self, key: Hashable, value) -> None:
+        """Guarda un valor obtenido por otra vía."""
+        with self._lock:
+            self._store(key, value)
+
+    def _fresh(self, key: Hashable) -> Optional[Tuple[float, object]]:
+        # Llamar con el lock tomado
+        entry = self._entries.get(key)
+        if entry is None or self.clock() - entry[0] >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Hashable, value) -> None:
+        # Llamar con el lock tomado
+        self._entries[key] = (self.clock(), value)
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Olvida una clave (o todas)."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._inflight or self._fresh(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Catálogo de disponibilidad de PDFs (sondeo previo a la descarga).
+
+parse_listing_page() genera para cada documento un registro de examen
+(?dl=pdf) y otro de solución (?dl=pdf_solution), pero no todos los documentos
+tienen solución: CatLux responde entonces con una página HTML. Antes de gastar
+cuota, probe_listing() sondea los PDFs nuevos con peticiones HEAD concurrentes
+y comprueba estado, content-type y tamaño. Solo un error HTTP o un text/html
+explícito cuentan como no disponible; con otro content-type (octet-stream,
+force-download, ninguno) o sin HEAD se confirma con un GET con Range de 1 KB
+y los bytes mágicos %PDF, igual que check_pdf_content() al descargar.
+
+Los resultados se guardan en CATALOG_FILE por categoría y por PDF (nombre y
+URL, probe_key()): una subida nueva o un listado parcial (el incremental del
+daemon) solo sondean los PDFs que el catálogo no conoce. Cada sondeo vale
+PROBE_TTL_SECONDS (una solución puede publicarse más tarde) y al guardar se
+retiran los caducados, así que el archivo no crece sin límite.
+
+Formato:
+    {"listings": {base_url: {"probes": {"name|url": {"ok": bool, "content_type": str,
+                                                      "size": int, "checked": iso}}}}}
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from catlux_scrapper import PDF_MAGIC, file_lock
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+PROBE_WORKERS = 8
+PROBE_RANGE_BYTES = 1024
+# Un sondeo se repite (y se retira del catálogo) pasado este tiempo
+PROBE_TTL_SECONDS = 30 * 24 * 3600
+
+
+def probe_key(pdf: Dict) -> str:
+    """Clave del sondeo de un PDF en el catálogo."""
+    return f"{pdf['name']}|{pdf.get('full_url', '')}"
+
+
+def probe_pdf(session: "requests.Session", pdf: Dict) -> Optional[Dict]:
+    """
+    Comprueba si la URL de un PDF devuelve realmente un PDF.
+
+    Args:
+        session: Sesión autenticada
+        pdf: Diccionario del PDF (usa 'full_url')
+
+    Returns:
+        Diccionario con ok, content_type y size, o None si la red falló
+        (resultado desconocido: no se cachea)
+    """
+    url = pdf['full_url']
+    try:
+        r = session.head(url, verify=False, timeout=10, allow_redirects=True)
+        content_type = r.headers.get('Content-Type', '')
+        mime = content_type.split(';')[0].strip().lower()
+        if r.status_code not in (405, 501) and (not r.ok or mime in ('text/html', 'application/pdf')):
+            size = int(r.headers.get('Content-Length') or 0)
+            ok = r.ok and mime == 'application/pdf'
+        else:
+            # Sin HEAD o content-type genérico: leer solo el principio del archivo
+            with session.get(url, verify=False, timeout=10, stream=True,
+                             headers={'Range': f"bytes=0-{PROBE_RANGE_BYTES - 1}"}) as r:
+                content_type = r.headers.get('Content-Type', '')
+                first = next(r.iter_content(PROBE_RANGE_BYTES), b"")
+                total = r.headers.get('Content-Range', '').rpartition('/')[2]
+                size = int(total) if total.isdigit() else int(r.headers.get('Content-Length') or 0)
+                ok = r.ok and first.startswith(PDF_MAGIC)
+    except Exception as e:
+        logger.debug(f"Sondeo fallido de {pdf['name']}: {e}")
+        return None
+
+    return {
+        'ok': ok,
+        'content_type': content_type.split(';')[0].strip(),
+        'size': size,
+        'checked': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def _oldest_valid() -> str:
+    """Fecha ISO del sondeo más antiguo que sigue vigente."""
+    return (datetime.now() - timedelta(seconds=PROBE_TTL_SECONDS)).isoformat(timespec='seconds')
+
+
+class Catalog:
+    """Resultados de sondeo por categoría, persistidos en JSON."""
+
+    def __init__(self, catalog_file: Path):
+        """
+        Args:
+            catalog_file: Archivo JSON del catálogo (normalmente CATALOG_FILE)
+        """
+        self.catalog_file = Path(catalog_file)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error cargando catálogo: {e}. Creando nuevo.")
+            data = {}
+        listings = data.setdefault("listings", {})
+        for base_url, entry in listings.items():
+            if "fingerprint" in entry:
+                # Formato anterior (clave = nombre, válido para una huella del listado)
+                listings[base_url] = {"probes": {}}
+        return data
+
+    def _write(self, data: Dict) -> None:
+        self.catalog_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.catalog_file.with_name(f"{self.catalog_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, self.catalog_file)
+
+    def probes_for(self, base_url: str, pdfs: List[Dict]) -> Dict[str, Dict]:
+        """
+        Sondeos vigentes (de menos de PROBE_TTL_SECONDS) de los PDFs dados.
+
+        Returns:
+            {probe_key(pdf): sondeo}
+        """
+        with file_lock(self.catalog_file):
+            entry = self._read()["listings"].get(base_url)
+        if not entry:
+            return {}
+        stored = entry.get("probes", {})
+        oldest = _oldest_valid()
+        known = {}
+        for key in map(probe_key, pdfs):
+            probe = stored.get(key)
+            if probe is not None and probe.get('checked', '') >= oldest:
+                known[key] = probe
+        return known
+
+    @staticmethod
+    def _prune(data: Dict) -> None:
+        """Retira los sondeos caducados y las categorías que se quedan sin ninguno."""
+        oldest = _oldest_valid()
+        listings = data["listings"]
+        for base_url in list(listings):
+            probes = listings[base_url].get("probes", {})
+            for key in [k for k, probe in probes.items() if probe.get('checked', '') < oldest]:
+                del probes[key]
+            if not probes:
+                del listings[base_url]
+
+    def store(self, base_url: str, probes: Dict[str, Dict]) -> None:
+        """Guarda sondeos nuevos ({probe_key(pdf): sondeo}) sin tocar los demás."""
+        with file_lock(self.catalog_file):
+            data = self._read()
+            entry = data["listings"].setdefault(base_url, {"probes": {}})
+            entry["probes"].update(probes)
+            self._prune(data)
+            self._write(data)
+
+    def mark_unavailable(self, base_url: str, pdf: Dict, content_type: str = "") -> None:
+        """Registra un PDF que al descargarlo resultó no serlo."""
+        with file_lock(self.catalog_file):
+            data = self._read()
+            entry = data["listings"].setdefault(base_url, {"probes": {}})
+            entry["probes"][probe_key(pdf)] = {
+                'ok': False,
+                'content_type': content_type,
+                'size': 0,
+                'checked': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._prune(data)
+            self._write(data)
+
+
+def probe_listing(session: "requests.Session", base_url: str, pdfs: List[Dict],
+                  catalog: Catalog, workers: int = PROBE_WORKERS) -> List[Dict]:
+    """
+    Sondea los PDFs nuevos de un listado y retira los que no están disponibles.
+
+    Solo se sondean los PDFs no locales (ver mark_local_files()) que el catálogo
+    no conoce. A los disponibles se les añade 'size' (bytes) cuando el
+    servidor lo indica.
+
+    Args:
+        session: Sesión autenticada
+        base_url: URL de la categoría
+        pdfs: PDFs del listado
+        catalog: Catálogo donde se cachean los resultados
+        workers: Sondeos simultáneos
+
+    Returns:
+        Lista de PDFs sin los no disponibles, en el mismo orden
+    """
+    remote = [pdf for pdf in pdfs if not pdf.get('is_local', False)]
+    cached = catalog.probes_for(base_url, remote)
+    pending = [pdf for pdf in remote if probe_key(pdf) not in cached]
+
+    probes: Dict[str, Dict] = {}
+    if pending:
+        logger.info(f"Sondeando disponibilidad de {len(pending)} PDFs...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catlux-probe") as pool:
+            for pdf, probe in zip(pending, pool.map(lambda p: probe_pdf(session, p), pending)):
+                if probe is not None:
+                    probes[probe_key(pdf)] = probe
+        if probes:
+            catalog.store(base_url, probes)
+
+    known = {**cached, **probes}
+    available = []
+    for pdf in pdfs:
+        probe = known.get(probe_key(pdf))
+        if probe and not pdf.get('is_local', False):
+            if not probe['ok']:
+                continue
+            if probe.get('size'):
+                pdf['size'] = probe['size']
+        available.append(pdf)
+
+    dropped = len(pdfs) - len(available)
+    if dropped:
+        logger.info(f"{dropped} PDFs no disponibles (p.ej. documentos sin solución), se omiten")
+    return available
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Modo daemon: vacía el backlog de descargas cada vez que se renueva la cuota.
+
+El backlog son los trabajos pendientes de la cola persistente (catlux_queue.py):
+lo que se quería descargar pero no cupo en el saldo del mes. El daemon es un
+único proceso residente que:
+
+1. Cada --check-interval horas revisa los listados vigilados (--watch) de forma
+   incremental y añade al backlog los documentos nuevos, ordenados por el
+   planificador (catlux_planner.py)
+2. Mientras quede saldo, vacía el backlog con varios hilos en paralelo
+3. Sin saldo, duerme hasta el cambio de mes que usa
+   DownloadTracker.get_current_month_downloads() (medianoche del día 1, hora local)
+
+La sesión autenticada se mantiene entre ciclos; solo se repite el login cuando
+tiene más de SESSION_MAX_AGE_SECONDS (las cookies de CatLux caducan). Un
+ciclo que falla (red caída, disco lleno, ...) no detiene el daemon: se registra
+y se reintenta tras una espera creciente (ERROR_BACKOFF_SECONDS).
+
+Uso:
+    python catlux_scrapper.py --daemon --watch URL1 URL2 ... [--check-interval 6] [--skip-duplicates]
+"""
+
+import logging
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from catlux_catalog import Catalog, probe_listing
+from catlux_dedup import check_duplicates
+from catlux_scrapper import (
+    CATALOG_FILE,
+    DEDUP_FILE,
+    QUEUE_FILE,
+    DownloadTracker,
+    PDFManager,
+    extract_category_path,
+    get_credentials,
+    get_site_root,
+    login_to_catlux,
+    mark_local_files,
+    new_session,
+    run_download_jobs,
+)
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = 6 * 3600
+DRAIN_WORKERS = 4
+SESSION_MAX_AGE_SECONDS = 6 * 3600
+# Dormir a tramos para notar cambios de hora o suspensiones del equipo
+MAX_SLEEP_SECONDS = 3600
+# Espera tras un ciclo fallido (se duplica en cada fallo seguido, hasta el máximo)
+ERROR_BACKOFF_SECONDS = 60
+MAX_ERROR_BACKOFF_SECONDS = 3600
+
+
+def next_month_start(now: datetime) -> datetime:
+    """Medianoche del día 1 del mes siguiente (hora local)."""
+    if now.month == 12:
+        return datetime(now.year + 1, 1, 1)
+    return datetime(now.year, now.month + 1, 1)
+
+
+class CatluxDaemon:
+    """Proceso residente que vacía el backlog en cada renovación de cuota."""
+
+    def __init__(self, urls: List[str], tracker: DownloadTracker, max_pages: int = 10,
+                 check_interval: float = CHECK_INTERVAL_SECONDS,
+                 workers: int = DRAIN_WORKERS, skip_duplicates: bool = False):
+        """
+        Inicializa el daemon (no hace nada hasta run()).
+
+        Args:
+            urls: Categorías vigiladas (puede estar vacía: solo vaciar el backlog)
+            tracker: Rastreador de descargas
+            max_pages: Máximo de páginas por listado
+            check_interval: Segundos entre revisiones de los listados
+            workers: Descargas simultáneas al vaciar el backlog
+            skip_duplicates: No encolar posibles duplicados de documentos locales
+        """
+        self.urls = urls
+        self.tracker = tracker
+        self.max_pages = max_pages
+        self.check_interval = check_interval
+        self.workers = max(1, workers)
+        self.skip_duplicates = skip_duplicates
+        self.stop_event = threading.Event()
+        # raíz del sitio → (sesión, momento del login)
+        self._sessions: Dict[str, Tuple["requests.Session", float]] = {}
+        self._session_lock = threading.Lock()
+        # Documentos ya vistos por categoría (para el listado incremental)
+        self._known: Dict[str, Set[str]] = {}
+        self._credentials = get_credentials()
+        self.catalog = Catalog(CATALOG_FILE)
+        self.queue_file = QUEUE_FILE
+        # Llamada con cada trabajo descargado por drain() (--serve invalida su listado)
+        self.on_complete: Optional[Callable[[Dict], None]] = None
+
+    def session_for(self, site_root: str) -> Optional["requests.Session"]:
+        """
+        Sesión autenticada del sitio; repite el login solo si caducó.
+
+        Args:
+            site_root: Raíz del sitio terminada en '/'
+
+        Returns:
+            Sesión, o None si el login falla
+        """
+        username, password, cert_path, _ = self._credentials
+        # Un solo login a la vez aunque la pidan varios hilos (drain, --serve)
+        with self._session_lock:
+            session, logged_at = self._sessions.get(site_root, (None, 0.0))
+            if session is not None and time.time() - logged_at < SESSION_MAX_AGE_SECONDS:
+                return session
+
+            if session is None:
+                session = new_session()
+            if not login_to_catlux(session, username, password, cert_path, urljoin(site_root, "login")):
+                logger.error("No se pudo completar el login")
+                session.close()
+                self._sessions.pop(site_root, None)
+                return None
+            self._sessions[site_root] = (session, time.time())
+            return session
+
+    def check_listings(self, job_queue) -> int:
+        """
+        Revisa los listados vigilados y añade los documentos nuevos al backlog.
+
+        Args:
+            job_queue: Cola de trabajos abierta
+
+        Returns:
+            Número de PDFs añadidos
+        """
+        from catlux_planner import plan_downloads
+
+        _, _, cert_path, save_base_path = self._credentials
+        added = 0
+        for url in self.urls:
+            save_path = extract_category_path(url, save_base_path)
+            session = self.session_for(get_site_root(url))
+            if not save_path or session is None:
+                continue
+
+            known = self._known.get(url)
+            pdfs = PDFManager(session, cert_path).fetch_pdfs(url, self.max_pages, known)
+            mark_local_files(pdfs, save_path, Path(save_base_path))
+            self._known.setdefault(url, set()).update(pdf['name'] for pdf in pdfs)
+            pdfs = probe_listing(session, url, pdfs, self.catalog)
+            check_duplicates(pdfs, save_path.relative_to(save_base_path).as_posix(), DEDUP_FILE)
+
+            new = [pdf for pdf in pdfs if not pdf.get('is_local', False)
+                   and (known is None or pdf['name'] not in known)]
+            if not new:
+                continue
+
+            # Encolar en el orden del planificador (pares juntos, tipo, REF)
+            save_path.mkdir(parents=True, exist_ok=True)
+            batch = uuid.uuid4().hex
+            for unit in plan_downloads(new, len(new), skip_duplicates=self.skip_duplicates).selected:
+                job_queue.enqueue(url, save_path, unit['pdfs'], batch)
+                added += len(unit['pdfs'])
+
+        if added:
+            logger.info(f"Backlog: {added} PDFs nuevos añadidos")
+        return added
+
+    def drain(self, job_queue) -> int:
+        """
+        Vacía el backlog en paralelo mientras quede saldo.
+
+        Cada hilo abre su propia conexión a la cola y reclama trabajos de forma
+        atómica; el tracker reparte el saldo entre ellos.
+
+        Args:
+            job_queue: Cola de trabajos abierta (solo para ver qué sitios quedan)
+
+        Returns:
+            Número de PDFs descargados
+        """
+        from catlux_queue import JobQueue
+
+        def worker(session, site_root) -> int:
+            with JobQueue(self.queue_file) as own_queue:
+                return run_download_jobs(own_queue, session, self.tracker, site=site_root,
+                                         on_complete=self.on_complete)
+
+        downloaded_count = 0
+        for site_root in dict.fromkeys(get_site_root(url) for url in job_queue.pending_base_urls()):
+            session = self.session_for(site_root)
+            if session is None:
+                continue
+            with ThreadPoolExecutor(max_workers=self.workers,
+                                    thread_name_prefix="catlux-drain") as pool:
+                futures = [pool.submit(worker, session, site_root) for _ in range(self.workers)]
+                downloaded_count += sum(f.result() for f in futures)
+
+        if downloaded_count:
+            logger.info(f"Backlog: {downloaded_count} PDFs descargados "
+                        f"({self.tracker.get_remaining_downloads()} restantes este mes)")
+        return downloaded_count
+
+    @staticmethod
+    def _backlog(job_queue) -> int:
+        counts = job_queue.counts()
+        return counts.get('pending', 0) + counts.get('in_progress', 0)
+
+    def _sleep_until(self, wake_at: float) -> None:
+        while not self.stop_event.is_set():
+            left = wake_at - time.time()
+            if left <= 0:
+                return
+            self.stop_event.wait(min(left, MAX_SLEEP_SECONDS))
+
+    def run(self) -> int:
+        """
+        Bucle principal; termina con Ctrl-C o SIGTERM.
+
+        Returns:
+            Código de salida
+        """
+        from catlux_queue import JobQueue
+
+        username, password, _, save_base_path = self._credentials
+        if not all([username, password, save_base_path]):
+            return 1
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop_event.set())
+
+        logger.info(f"Daemon iniciado: {len(self.urls)} categorías vigiladas, "
+                    f"revisión cada {self.check_interval / 3600:g} h")
+        next_check = 0.0
+        failures = 0
+        try:
+            with JobQueue(self.queue_file) as job_queue:
+                while not self.stop_event.is_set():
+                    try:
+                        if time.time() >= next_check:
+                            self.check_listings(job_queue)
+                            next_check = time.time() + self.check_interval
+
+                        if self._backlog(job_queue) and self.tracker.get_remaining_downloads() > 0:
+                            self.drain(job_queue)
+                        backlog = self._backlog(job_queue)
+                        remaining = self.tracker.get_remaining_downloads()
+                    except Exception:
+                        failures += 1
+                        delay = min(ERROR_BACKOFF_SECONDS * 2 ** (failures - 1), MAX_ERROR_BACKOFF_SECONDS)
+                        logger.exception(f"Error en el ciclo del daemon (fallo {failures}); "
+                                         f"se reintenta en {delay:g} s")
+                        self._sleep_until(time.time() + delay)
+                        continue
+                    failures = 0
+
+                    wake_at = next_check
+                    if backlog and remaining == 0:
+                        reset = next_month_start(datetime.now()).timestamp()
+                        logger.info(f"Cuota agotada con {backlog} PDFs en el backlog; "
+                                    f"se reanuda el {datetime.fromtimestamp(reset):%Y-%m-%d %H:%M}")
+                        wake_at = min(wake_at, reset)
+                    self._sleep_until(wake_at)
+        finally:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+        logger.info("Daemon detenido")
+        return 0
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Detección de documentos casi duplicados para no gastar cuota en ellos.
+
+CatLux a veces vuelve a publicar el mismo examen con otro ID (otra REF, un
+título retocado). mark_local_files() solo reconoce el mismo nombre de archivo,
+así que el duplicado aparece como nuevo y cuesta una descarga más.
+
+Cada documento se resume en una firma MinHash de SIGNATURE_BINS valores:
+- Metadatos del listado (doc_type, doc_title y el texto del contenedor, sin la
+  REF): n-gramas de SHINGLE_CHARS caracteres
+- Texto del PDF (solo archivos descargados, si pypdf o PyPDF2 están
+  instalados): n-gramas de SHINGLE_WORDS palabras
+
+Se usa MinHash de una sola permutación (un hash por n-grama, repartido en
+cubetas) con densificación por rotación para las cubetas vacías: con textos
+cortos como un título es tan preciso como K permutaciones y K veces más barato
+en Python puro. Las firmas se indexan por bandas (LSH, LSH_BANDS x LSH_ROWS),
+así que buscar los parecidos a un documento solo compara con los que comparten
+alguna banda, no con las decenas de miles del índice.
+
+El índice (DEDUP_FILE) guarda la firma de cada documento con algún archivo
+local. El preview marca con "≈" los PDFs nuevos cuyo documento se parece a uno
+local de la misma categoría (similitud estimada >= DUPLICATE_THRESHOLD, con
+los mismos números en el título: "Probe Nummer 1" y "Probe Nummer 2" son
+exámenes distintos aunque casi todo el texto coincida), y --plan / --daemon
+con --skip-duplicates no los descargan.
+
+Uso:
+    python catlux_scrapper.py --url "..." --select new,nodup
+    python catlux_scrapper.py --plan URL1 URL2 --skip-duplicates
+    python catlux_scrapper.py --duplicates [--url "..."] [--format csv]
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catlux_scrapper import file_lock
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BINS = 64
+LSH_BANDS = 8
+LSH_ROWS = SIGNATURE_BINS // LSH_BANDS
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_CHARS = 5
+SHINGLE_WORDS = 3
+TEXT_MAX_PAGES = 3
+DUPLICATE_FIELDS = ('group', 'path', 'doc_id', 'similarity', 'basis')
+
+# Desplazamiento de la densificación (impar y grande: no se confunde con un valor real)
+_ROTATION_OFFSET = 0x9E3779B9
+_MASK32 = 0xFFFFFFFF
+_WORD_RE = re.compile(r"\w+")
+
+Signature = Tuple[int, ...]
+
+
+# ============================================================================
+# FIRMAS
+# ============================================================================
+
+def normalize(text: str) -> str:
+    """Minúsculas, Unicode NFKC y solo palabras separadas por un espacio."""
+    return " ".join(_WORD_RE.findall(unicodedata.normalize("NFKC", text or "").lower()))
+
+
+def char_shingles(text: str, k: int = SHINGLE_CHARS) -> Set[str]:
+    """n-gramas de k caracteres del texto normalizado (el texto entero si es más corto)."""
+    text = normalize(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def word_shingles(text: str, k: int = SHINGLE_WORDS) -> Set[str]:
+    """n-gramas de k palabras del texto normalizado."""
+    words = normalize(text).split()
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(shingles: Iterable[str], bins: int = SIGNATURE_BINS) -> Optional[Signature]:
+    """
+    Firma MinHash de una sola permutación con densificación por rotación.
+
+    Cada n-grama se hashea una vez: los bits bajos eligen la cubeta y los
+    altos son el valor; cada cubeta guarda el mínimo. Una cubeta vacía toma el
+    valor de la siguiente no vacía (circular) más un desplazamiento por cada
+    salto, de modo que dos conjuntos parecidos rellenan igual sus huecos.
+
+    Args:
+        shingles: n-gramas del documento
+        bins: Número de valores de la firma
+
+    Returns:
+        Tupla de bins enteros de 32 bits, o None si no hay n-gramas
+    """
+    slots: List[Optional[int]] = [None] * bins
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        slot, value = h % bins, h >> 32
+        current = slots[slot]
+        if current is None or value < current:
+            slots[slot] = value
+    if all(value is None for value in slots):
+        return None
+
+    signature = []
+    for j in range(bins):
+        step = 0
+        while slots[(j + step) % bins] is None:
+            step += 1
+        signature.append((slots[(j + step) % bins] + step * _ROTATION_OFFSET) & _MASK32)
+    return tuple(signature)
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Similitud de Jaccard estimada: fracción de valores iguales."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def meta_signature(pdf: Dict) -> Optional[Signature]:
+    """Firma de los metadatos del listado (sin la REF, que cambia siempre)."""
+    text = pdf.get('text', '')
+    doc_number = pdf.get('doc_number', '')
+    if doc_number:
+        text = text.replace(doc_number, " ")
+    return minhash(char_shingles(" ".join((pdf.get('doc_type', ''), pdf.get('doc_title', ''), text))))
+
+
+def extract_pdf_text(path: Path, max_pages: int = TEXT_MAX_PAGES) -> Optional[str]:
+    """
+    Texto de las primeras páginas de un PDF (pypdf o PyPDF2, opcionales).
+
+    Returns:
+        Texto extraído, o None si no hay biblioteca o el PDF no se puede leer
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        try:
+            from PyPDF2 import PdfReader
+        except ImportError:
+            return None
+    try:
+        reader = PdfReader(str(path))
+        return "\n".join(page.extract_text() or "" for page in reader.pages[:max_pages])
+    except Exception as e:
+        logger.debug(f"No se pudo extraer texto de {path}: {e}")
+        return None
+
+
+def text_signature(path: Path) -> Optional[Signature]:
+    """Firma del texto de un PDF descargado (None sin biblioteca o sin texto)."""
+    text = extract_pdf_text(path)
+    return minhash(word_shingles(text)) if text else None
+
+
+def title_numbers(pdf: Dict) -> List[str]:
+    """Números del título (Nr., Teil, Kapitel...), que un duplicado conserva."""
+    return sorted(word for word in normalize(pdf.get('doc_title', '')).split() if word.isdigit())
+
+
+def _pack(signature: Signature) -> str:
+    return base64.b64encode(struct.pack(f">{len(signature)}I", *signature)).decode("ascii")
+
+
+def _unpack(packed: str) -> Signature:
+    raw = base64.b64decode(packed)
+    return struct.unpack(f">{len(raw) // 4}I", raw)
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+class LshIndex:
+    """Firmas en memoria indexadas por bandas."""
+
+    def __init__(self, bands: int = LSH_BANDS, rows: int = LSH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self.signatures: Dict[str, Signature] = {}
+        self._buckets: Dict[Tuple[int, Signature], List[str]] = {}
+
+    def add(self, key: str, signature: Signature) -> None:
+        """Añade (o reemplaza) la firma de key."""
+        old = self.signatures.get(key)
+        if old == signature:
+            return
+        if old is not None:
+            for band_key in self._band_keys(old):
+                self._buckets[band_key].remove(key)
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def _band_keys(self, signature: Signature) -> Iterable[Tuple[int, Signature]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def query(self, signature: Signature, threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[str, float]]:
+        """
+        Claves cuya firma se parece a signature.
+
+        Returns:
+            Lista de (clave, similitud estimada) >= threshold, más parecidas primero
+        """
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        matches = [(key, similarity(signature, self.signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= threshold), key=lambda m: -m[1])
+
+
+class DuplicateIndex:
+    """Firmas de los documentos locales y de sus PDFs, persistidas en JSON."""
+
+    def __init__(self, index_file: Path):
+        """
+        Args:
+            index_file: Archivo JSON del índice (normalmente DEDUP_FILE)
+        """
+        self.index_file = Path(index_file)
+        self.docs, self.files = self._read()
+        self.changed = False
+        self._lsh: Optional[LshIndex] = None
+        self._lock = threading.Lock()
+
+    def _read(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("docs", {}), data.get("files", {})
+        except FileNotFoundError:
+            return {}, {}
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.warning(f"Error cargando índice de duplicados: {e}. Creando nuevo.")
+            return {}, {}
+
+    def save(self) -> None:
+        """Guarda el índice si cambió (escritura atómica; fusiona con otros procesos)."""
+        if not self.changed:
+            return
+        with file_lock(self.index_file):
+            docs, files = self._read()
+            docs.update(self.docs)
+            files.update(self.files)
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"docs": docs, "files": files}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.index_file)
+        self.docs, self.files = docs, files
+        self.changed = False
+
+    @property
+    def lsh(self) -> LshIndex:
+        """Índice LSH de los documentos (se construye al primer uso)."""
+        if self._lsh is None:
+            self._lsh = LshIndex()
+            for doc_id, entry in self.docs.items():
+                self._lsh.add(doc_id, _unpack(entry['sig']))
+        return self._lsh
+
+    def add_document(self, pdfs: List[Dict], category: str, signature: Signature) -> None:
+        """
+        Registra un documento con algún archivo local (examen y/o solución).
+
+        Args:
+            pdfs: PDFs del documento (mismo doc_id)
+            category: Carpeta relativa (klasse-X/asignatura)
+            signature: Firma de sus metadatos
+        """
+        doc_id = pdfs[0]['doc_id']
+        old = self.docs.get(doc_id, {})
+        local = set(old.get('local', [])) | {pdf['name'] for pdf in pdfs if pdf.get('is_local', False)}
+        entry = {
+            'sig': _pack(signature),
+            'category': category,
+            'doc_number': pdfs[0].get('doc_number', f"#{doc_id}"),
+            'doc_title': pdfs[0].get('doc_title', ''),
+            'numbers': title_numbers(pdfs[0]),
+            'local': sorted(local),
+        }
+        if entry != old:
+            self.docs[doc_id] = entry
+            self.changed = True
+            self.lsh.add(doc_id, signature)
+
+    def similar_documents(self, pdf: Dict, signature: Signature, category: str,
+                          threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[str, float]]:
+        """Otros documentos locales de la categoría parecidos al de pdf y con sus mismos números."""
+        numbers = title_numbers(pdf)
+        return [(doc_id, score) for doc_id, score in self.lsh.query(signature, threshold)
+                if doc_id != pdf['doc_id'] and self.docs[doc_id]['category'] == category
+                and self.docs[doc_id].get('numbers', []) == numbers]
+
+    def file_signature(self, path: Path) -> Optional[Signature]:
+        """
+        Firma del texto de un PDF local, cacheada por (inodo, tamaño, mtime).
+
+        Returns:
+            Firma, o None si no se pudo extraer texto
+        """
+        stat = os.stat(path)
+        key = f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+        entry = self.files.get(key)
+        if entry is None:
+            signature = text_signature(path)
+            entry = {'path': str(path), 'sig': _pack(signature) if signature else None}
+            with self._lock:
+                self.files[key] = entry
+                self.changed = True
+        return _unpack(entry['sig']) if entry['sig'] else None
+
+
+# ============================================================================
+# PREVIEW, PLANIFICADOR Y DAEMON
+# ============================================================================
+
+def check_duplicates(pdfs: List[Dict], category: str, index_file: Path,
+                     threshold: float = DUPLICATE_THRESHOLD) -> int:
+    """
+    Indexa los documentos locales del listado y marca los nuevos que los duplican.
+
+    Un PDF no local recibe duplicate_of (nombre del archivo local equivalente:
+    examen con examen, solución con solución) y similarity cuando su documento
+    se parece a otro documento local de la misma categoría.
+
+    Args:
+        pdfs: PDFs del listado, ya pasados por mark_local_files()
+        category: Carpeta relativa de la categoría (klasse-X/asignatura)
+        index_file: Archivo del índice (normalmente DEDUP_FILE)
+        threshold: Similitud mínima
+
+    Returns:
+        Número de PDFs marcados como posibles duplicados
+    """
+    documents: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    for pdf in pdfs:
+        documents.setdefault(pdf['doc_id'], []).append(pdf)
+
+    index = DuplicateIndex(index_file)
+    signatures = {}
+    for doc_id, group in documents.items():
+        signature = signatures[doc_id] = meta_signature(group[0])
+        if signature is not None and any(pdf.get('is_local', False) for pdf in group):
+            index.add_document(group, category, signature)
+
+    flagged = 0
+    for doc_id, group in documents.items():
+        new = [pdf for pdf in group if not pdf.get('is_local', False)]
+        if not new or signatures[doc_id] is None:
+            continue
+        for match, score in index.similar_documents(group[0], signatures[doc_id], category, threshold):
+            local = set(index.docs[match]['local'])
+            for pdf in new:
+                counterpart = f"{match}_solution" if pdf['is_solution'] else match
+                if counterpart in local and 'duplicate_of' not in pdf:
+                    pdf['duplicate_of'] = counterpart
+                    pdf['similarity'] = round(score, 2)
+                    flagged += 1
+
+    try:
+        index.save()
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el índice de duplicados: {e}")
+    if flagged:
+        logger.info(f"Posibles duplicados de documentos locales: {flagged} PDFs")
+    return flagged
+
+
+# ============================================================================
+# INFORME DE DUPLICADOS LOCALES (--duplicates)
+# ============================================================================
+
+def find_local_duplicates(root: Path, index: DuplicateIndex,
+                          threshold: float = DUPLICATE_THRESHOLD) -> List[List[Dict]]:
+    """
+    Agrupa los PDFs locales casi iguales.
+
+    Se compara el texto de cada PDF; si no se puede extraer (sin pypdf/PyPDF2
+    o PDF escaneado) se usa la firma de metadatos de su documento, si el
+    preview ya lo indexó. Examen y solución del mismo documento no se agrupan.
+
+    Args:
+        root: Carpeta a revisar (sin carpetas ocultas)
+        index: Índice de duplicados
+        threshold: Similitud mínima
+
+    Returns:
+        Grupos (2 o más archivos) de registros path, doc_id, similarity y basis
+    """
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        paths.extend(Path(dirpath) / name for name in sorted(filenames) if name.endswith('.pdf'))
+
+    lsh = {'texto': LshIndex(), 'metadatos': LshIndex()}
+    records = {}
+    for path in paths:
+        doc_id = path.stem.replace('_solution', '')
+        signature, basis = index.file_signature(path), 'texto'
+        if signature is None and doc_id in index.docs:
+            signature, basis = _unpack(index.docs[doc_id]['sig']), 'metadatos'
+        if signature is None:
+            continue
+        key = str(path)
+        lsh[basis].add(key, signature)
+        records[key] = {'path': key, 'doc_id': doc_id, 'basis': basis,
+                        'is_solution': path.stem.endswith('_solution')}
+
+    # Unión de pares parecidos (union-find) para formar grupos
+    parent = {key: key for key in records}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    best: Dict[str, float] = {}
+    for key, record in records.items():
+        table = lsh[record['basis']]
+        for other, score in table.query(table.signatures[key], threshold):
+            peer = records[other]
+            if other == key or peer['doc_id'] == record['doc_id'] or peer['is_solution'] != record['is_solution']:
+                continue
+            parent[find(other)] = find(key)
+            best[key] = max(best.get(key, 0.0), score)
+
+    groups: Dict[str, List[Dict]] = {}
+    for key, record in records.items():
+        if key in best:
+            groups.setdefault(find(key), []).append(dict(record, similarity=round(best[key], 2)))
+    return [sorted(group, key=lambda r: r['path']) for group in groups.values()]
+
+
+def run_duplicates_report(root: Path, index_file: Path, fmt: str = "text") -> int:
+    """
+    Informe de PDFs locales casi duplicados (--duplicates).
+
+    Args:
+        root: Carpeta a revisar
+        index_file: Archivo del índice (normalmente DEDUP_FILE)
+        fmt: "text" o json/jsonl/csv
+
+    Returns:
+        Código de salida (0=éxito, 1=error)
+    """
+    if not root or not Path(root).is_dir():
+        print(f"❌ La carpeta no existe: {root}")
+        return 1
+
+    index = DuplicateIndex(index_file)
+    groups = find_local_duplicates(Path(root), index)
+    try:
+        index.save()
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el índice de duplicados: {e}")
+
+    if fmt != "text":
+        import catlux_output
+        with catlux_output.RecordWriter(fmt, DUPLICATE_FIELDS) as writer:
+            for n, group in enumerate(groups, 1):
+                for record in group:
+                    writer.write(dict(record, group=n))
+        return 0
+
+    print("\n" + "=" * 100)
+    print(f"🔁 POSIBLES DUPLICADOS EN {root}")
+    print("=" * 100)
+    for n, group in enumerate(groups, 1):
+        print(f"\nGrupo {n} ({group[0]['basis']}):")
+        for record in group:
+            print(f"  {record['similarity']:4.0%}  {Path(record['path']).relative_to(root)}")
+    print(f"\nTotal: {len(groups)} grupos, {sum(len(g) for g in groups)} archivos")
+    print("=" * 100 + "\n")
+    return 0
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Metadatos de la página de detalle de cada documento (--details).
+
+La tarjeta del listado solo trae tipo, REF, título y un trozo de texto. La
+página de detalle (probe/<id>) añade curso escolar, número de páginas, autor
+y fecha de subida, pero es una petición por documento. enrich_details():
+
+1. Toma de DETAILS_FILE los documentos revisados hace menos de
+   DETAILS_TTL_SECONDS, sin ninguna petición
+2. Pide el resto en paralelo (DETAILS_WORKERS hilos) sin pasar de
+   DETAILS_RATE peticiones por segundo entre todos (token bucket de
+   catlux_throttle.py)
+3. Los que ya estaban en caché se revalidan con If-None-Match /
+   If-Modified-Since: un 304 no vuelve a transferir ni a parsear la página
+4. Añade los campos a los registros del listado (examen y solución)
+
+Con los campos en los registros, --select puede filtrar por ellos (year=,
+author=, pages<=) y --format los incluye en la salida.
+
+Formato:
+    {"docs": {doc_id: {"etag": str, "last_modified": str, "checked": iso,
+                       "fields": {"school_year": ..., "pages": ..., ...}}}}
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from catlux_scrapper import file_lock, parse_html
+from catlux_throttle import Throttle
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+DETAILS_WORKERS = 8
+DETAILS_RATE = 5
+DETAILS_TTL_SECONDS = 30 * 24 * 3600
+DETAIL_FIELDS = ('school_year', 'pages', 'author', 'uploaded')
+
+# Etiqueta de la página (subcadena, sin mayúsculas) → campo del registro
+DETAIL_LABELS = (
+    ("schuljahr", 'school_year'),
+    ("seiten", 'pages'),
+    ("autor", 'author'),
+    ("erstellt von", 'author'),
+    ("hochgeladen", 'uploaded'),
+    ("veröffentlicht", 'uploaded'),
+    ("datum", 'uploaded'),
+)
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def detail_url(site_root: str, doc_id: str) -> str:
+    """URL de la página de detalle de un documento."""
+    return urljoin(site_root, f"probe/{doc_id}")
+
+
+def parse_detail_page(content: bytes) -> Dict:
+    """
+    Extrae los metadatos de una página de detalle.
+
+    Se leen los pares etiqueta/valor de listas de definición (dt/dd) y de
+    tablas (th/td o td/td); solo se conservan las etiquetas de DETAIL_LABELS.
+
+    Args:
+        content: HTML de la página de detalle
+
+    Returns:
+        Diccionario con los campos encontrados (pages como entero)
+    """
+    soup = parse_html(content)
+    pairs: List[Tuple[str, str]] = []
+    for dt in soup.find_all('dt'):
+        dd = dt.find_next_sibling('dd')
+        if dd is not None:
+            pairs.append((dt.get_text(" ", strip=True), dd.get_text(" ", strip=True)))
+    for row in soup.find_all('tr'):
+        cells = row.find_all(['th', 'td'])
+        if len(cells) >= 2:
+            pairs.append((cells[0].get_text(" ", strip=True), cells[1].get_text(" ", strip=True)))
+
+    fields: Dict = {}
+    for label, value in pairs:
+        label = label.lower().rstrip(':')
+        for needle, field in DETAIL_LABELS:
+            if needle in label and field not in fields and value:
+                if field == 'pages':
+                    number = _NUMBER_RE.search(value)
+                    if not number:
+                        break
+                    value = int(number.group())
+                fields[field] = value
+                break
+    return fields
+
+
+class DetailCache:
+    """Metadatos de páginas de detalle por doc_id, persistidos en JSON."""
+
+    def __init__(self, cache_file: Path):
+        """
+        Args:
+            cache_file: Archivo JSON de la caché (normalmente DETAILS_FILE)
+        """
+        self.cache_file = Path(cache_file)
+        self.entries: Dict[str, Dict] = self._read()
+        self._changed = set()
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("docs", {})
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.warning(f"Error cargando caché de detalles: {e}. Creando nueva.")
+            return {}
+
+    def is_fresh(self, entry: Dict, ttl: float = DETAILS_TTL_SECONDS) -> bool:
+        """Indica si una entrada se revisó hace menos de ttl segundos."""
+        try:
+            return datetime.now() - datetime.fromisoformat(entry['checked']) < timedelta(seconds=ttl)
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def put(self, doc_id: str, entry: Dict) -> None:
+        """Guarda (en memoria) la entrada de un documento."""
+        with self._lock:
+            self.entries[doc_id] = entry
+            self._changed.add(doc_id)
+
+    def save(self) -> None:
+        """Guarda las entradas nuevas (escritura atómica; fusiona con otros procesos)."""
+        if not self._changed:
+            return
+        with file_lock(self.cache_file):
+            merged = self._read()
+            merged.update({doc_id: self.entries[doc_id] for doc_id in self._changed})
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"docs": merged}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+        self.entries = merged
+        self._changed.clear()
+
+
+def fetch_detail(session: "requests.Session", url: str, cached: Optional[Dict] = None
+                 ) -> Optional[Tuple[Dict, bool]]:
+    """
+    Pide la página de detalle, condicionada a la versión en caché si la hay.
+
+    Args:
+        session: Sesión HTTP
+        url: URL de la página de detalle
+        cached: Entrada anterior de la caché (etag, last_modified, fields)
+
+    Returns:
+        Tupla (entrada nueva, si la página cambió), o None si la red falló
+    """
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        r = session.get(url, headers=headers, verify=False, timeout=15)
+    except Exception as e:
+        logger.debug(f"Detalle no disponible {url}: {e}")
+        return None
+
+    checked = datetime.now().isoformat(timespec='seconds')
+    if r.status_code == 304 and cached:
+        return dict(cached, checked=checked), False
+    if not r.ok:
+        logger.debug(f"Detalle {url}: HTTP {r.status_code}")
+        return None
+    return {
+        'etag': r.headers.get('ETag', ''),
+        'last_modified': r.headers.get('Last-Modified', ''),
+        'checked': checked,
+        'fields': parse_detail_page(r.content),
+    }, True
+
+
+def enrich_details(session: "requests.Session", site_root: str, pdfs: Iterable[Dict],
+                   cache: DetailCache, workers: int = DETAILS_WORKERS,
+                   rate: float = DETAILS_RATE, ttl: float = DETAILS_TTL_SECONDS,
+                   throttle: Optional[Throttle] = None) -> Dict[str, int]:
+    """
+    Añade a los PDFs los campos de la página de detalle de su documento.
+
+    Args:
+        session: Sesión HTTP (la del listado)
+        site_root: Raíz del sitio terminada en '/'
+        pdfs: PDFs del listado (se modifican)
+        cache: Caché de detalles
+        workers: Peticiones simultáneas
+        rate: Peticiones por segundo entre todos los hilos (0 = sin límite)
+        ttl: Segundos durante los que una entrada se usa sin revalidar
+        throttle: Limitador ya creado (por defecto uno de rate peticiones/s)
+
+    Returns:
+        Contadores cached (sin petición), revalidated (304), fetched (200) y failed
+    """
+    documents: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    for pdf in pdfs:
+        documents.setdefault(pdf['doc_id'], []).append(pdf)
+
+    stats = {'cached': 0, 'revalidated': 0, 'fetched': 0, 'failed': 0}
+    pending = []
+    for doc_id in documents:
+        entry = cache.entries.get(doc_id)
+        if entry is not None and cache.is_fresh(entry, ttl):
+            stats['cached'] += 1
+        else:
+            pending.append(doc_id)
+
+    if pending:
+        throttle = throttle or Throttle(int(rate))
+
+        def fetch(doc_id: str) -> Optional[Tuple[Dict, bool]]:
+            throttle.consume(1)
+            return fetch_detail(session, detail_url(site_root, doc_id), cache.entries.get(doc_id))
+
+        logger.info(f"Consultando la página de detalle de {len(pending)} documentos...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catlux-detail") as pool:
+            for doc_id, result in zip(pending, pool.map(fetch, pending)):
+                if result is None:
+                    stats['failed'] += 1
+                    continue
+                entry, changed = result
+                cache.put(doc_id, entry)
+                stats['fetched' if changed else 'revalidated'] += 1
+        try:
+            cache.save()
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la caché de detalles: {e}")
+
+    for doc_id, group in documents.items():
+        fields = cache.entries.get(doc_id, {}).get('fields', {})
+        for pdf in group:
+            pdf.update(fields)
+
+    logger.info(f"Detalles: {stats['cached']} de caché, {stats['revalidated']} sin cambios, "
+                f"{stats['fetched']} descargados, {stats['failed']} fallidos")
+    return stats
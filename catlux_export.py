@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Exportación de PDFs descargados a paquetes ZIP o TAR (--export).
+
+Sirve para preparar lotes (p.ej. uno por alumno) a partir de lo que ya hay en
+CATLUX_SAVE_PATH sin copiar archivos a mano:
+
+    python catlux_scrapper.py --export alumno1.zip --url ".../klasse-7/deutsch/"
+    python catlux_scrapper.py --export lote.tar --since 2025-10 --select exam
+
+Los PDFs ya están comprimidos, así que los paquetes se escriben sin compresión
+(ZIP "stored" o TAR) y los datos se copian de archivo a archivo dentro del
+kernel (os.copy_file_range, o os.sendfile si no está disponible) sin pasar
+por buffers de Python. Para ZIP el CRC-32 se calcula sobre un mmap del archivo
+en hilos aparte, adelantándose a la copia. Con paquetes de varios GB el
+escritor usa ZIP64 cuando hace falta.
+
+Cada paquete lleva un MANIFEST.json con la lista de archivos (ruta, ID de
+documento, tamaño, CRC y fecha de descarga según el tracker). El paquete se
+escribe en DEST.part y se renombra al terminar.
+"""
+
+import errno
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tarfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from catlux_scrapper import DownloadTracker, extract_category_path
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('zip', 'tar')
+MANIFEST_NAME = "MANIFEST.json"
+CRC_WORKERS = 2
+CRC_CHUNK_SIZE = 8 * 1024 * 1024
+FALLBACK_CHUNK_SIZE = 1024 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_MAX_ENTRIES = 0xFFFF
+
+# Llamadas de copia en el kernel que siguen disponibles (se desactivan al fallar).
+# sendfile a un archivo normal solo funciona en Linux (macOS exige un socket)
+_FAST_COPY = {
+    'copy_file_range': hasattr(os, 'copy_file_range'),
+    'sendfile': hasattr(os, 'sendfile') and sys.platform.startswith('linux'),
+}
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF,
+                       getattr(errno, 'ENOTSOCK', errno.EINVAL),
+                       getattr(errno, 'EOPNOTSUPP', errno.EINVAL),
+                       getattr(errno, 'ENOTSUP', errno.EINVAL)}
+
+
+# ----------------------------------------------------------------------
+# Selección
+# ----------------------------------------------------------------------
+
+def scan_local_pdfs(root: Path) -> List[Dict]:
+    """
+    Índice de los PDFs bajo root en una sola pasada (sin carpetas ocultas).
+
+    Returns:
+        Registros con name, doc_id, is_solution, is_local, path, arcname, size y mtime
+    """
+    root = Path(root)
+    pdfs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if not filename.endswith('.pdf'):
+                continue
+            path = Path(dirpath) / filename
+            stat = path.stat()
+            name = filename[:-len('.pdf')]
+            pdfs.append({
+                'name': name,
+                'doc_id': name[:-len('_solution')] if name.endswith('_solution') else name,
+                'is_solution': name.endswith('_solution'),
+                'is_local': True,
+                'path': path,
+                'arcname': path.relative_to(root).as_posix(),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+            })
+    return pdfs
+
+
+def download_dates(tracker: DownloadTracker) -> Dict[str, str]:
+    """Última fecha de descarga (ISO) de cada nombre según el historial del tracker."""
+    dates: Dict[str, str] = {}
+    for download in tracker.data.get("downloads", []):
+        name = download.get("filename")
+        if name and download.get("date", "") > dates.get(name, ""):
+            dates[name] = download["date"]
+    return dates
+
+
+def select_for_export(pdfs: List[Dict], dates: Optional[Dict[str, str]] = None,
+                      since: Optional[str] = None, select: Optional[str] = None) -> List[Dict]:
+    """
+    Filtra el índice local.
+
+    Args:
+        pdfs: Registros de scan_local_pdfs()
+        dates: Fechas de download_dates() (necesarias con since)
+        since: Solo lo descargado desde esta fecha (prefijo ISO: 2025-10 o 2025-10-03)
+        select: Expresión de --select (id=..., exam, solution; ver catlux_output.py)
+
+    Raises:
+        ValueError: Si la expresión de select no es válida
+    """
+    selected = pdfs
+    if since:
+        dates = dates or {}
+        selected = [p for p in selected if dates.get(p['name'], "") >= since]
+    if select:
+        import catlux_output
+        predicate = catlux_output.parse_select(select)
+        selected = [p for p in selected if predicate(p)]
+    return selected
+
+
+# ----------------------------------------------------------------------
+# Copia sin pasar por Python
+# ----------------------------------------------------------------------
+
+def copy_range(src_fd: int, dst_fd: int, count: int) -> None:
+    """
+    Copia los primeros count bytes de src_fd en la posición actual de dst_fd.
+
+    Prueba copy_file_range (sin copia a espacio de usuario, y con reflink en
+    sistemas de archivos que lo soportan), luego sendfile (solo Linux) y por
+    último lectura/escritura por bloques, que funciona en cualquier sistema.
+    Un método que falla en su primera llamada, o con un error de "no
+    soportado", se desactiva para el resto del proceso y se sigue con el
+    siguiente.
+
+    Raises:
+        OSError: Si el origen se acorta durante la copia o falla la escritura
+    """
+    copied = 0
+    if _FAST_COPY['copy_file_range']:
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, dst_fd, count - copied, copied)
+                if n == 0:
+                    break
+                copied += n
+        except OSError as e:
+            if copied and e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            logger.debug(f"copy_file_range no disponible ({e}); se usa sendfile")
+            _FAST_COPY['copy_file_range'] = False
+
+    if copied < count and _FAST_COPY['sendfile']:
+        start = copied
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, copied, count - copied)
+                if n == 0:
+                    break
+                copied += n
+        except OSError as e:
+            if copied > start and e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            logger.debug(f"sendfile no disponible ({e}); se copia por bloques")
+            _FAST_COPY['sendfile'] = False
+
+    # Portable (os.pread no existe en Windows)
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    while copied < count:
+        data = os.read(src_fd, min(FALLBACK_CHUNK_SIZE, count - copied))
+        if not data:
+            raise OSError(errno.EIO, "El archivo se acortó durante la exportación")
+        view = memoryview(data)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        copied += len(data)
+
+
+def file_crc32(path: Path) -> int:
+    """CRC-32 del archivo leído por mmap (zlib libera el GIL en bloques grandes)."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            crc = 0
+            view = memoryview(mm)
+            try:
+                for start in range(0, size, CRC_CHUNK_SIZE):
+                    crc = zlib.crc32(view[start:start + CRC_CHUNK_SIZE], crc)
+            finally:
+                view.release()
+            return crc
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+# ----------------------------------------------------------------------
+# Escritores
+# ----------------------------------------------------------------------
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(max(timestamp, 315532800))  # ZIP no admite fechas anteriores a 1980
+    dos_date = (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_time, dos_date
+
+
+class StoredZipWriter:
+    """ZIP sin compresión escrito directamente sobre un descriptor, con ZIP64."""
+
+    FLAG_UTF8 = 0x0800
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.offset = 0
+        self.central: List[bytes] = []
+        self.zip64 = False
+
+    def _write(self, data: bytes) -> None:
+        _write_all(self.fd, data)
+        self.offset += len(data)
+
+    def add(self, arcname: str, size: int, mtime: float, crc: int,
+            src_fd: Optional[int] = None, data: Optional[bytes] = None) -> None:
+        """Añade una entrada: los datos salen de src_fd (copia en el kernel) o de data."""
+        name = arcname.encode('utf-8')
+        dos_time, dos_date = _dos_datetime(mtime)
+        header_offset = self.offset
+        large = size >= ZIP64_LIMIT
+        version = 45 if large or header_offset >= ZIP64_LIMIT else 20
+
+        local_extra = struct.pack('<HHQQ', 0x0001, 16, size, size) if large else b""
+        stored_size = 0xFFFFFFFF if large else size
+        self._write(struct.pack('<IHHHHHIIIHH', 0x04034b50, version, self.FLAG_UTF8, 0,
+                                dos_time, dos_date, crc, stored_size, stored_size,
+                                len(name), len(local_extra)) + name + local_extra)
+        if src_fd is not None:
+            copy_range(src_fd, self.fd, size)
+            self.offset += size
+        else:
+            self._write(data)
+
+        # En el directorio central el extra ZIP64 solo lleva los campos desbordados
+        zip64_fields = [size, size] if large else []
+        if header_offset >= ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+        central_extra = (struct.pack('<HH', 0x0001, 8 * len(zip64_fields))
+                         + struct.pack(f'<{len(zip64_fields)}Q', *zip64_fields)) if zip64_fields else b""
+        self.zip64 = self.zip64 or bool(zip64_fields)
+        self.central.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, 3 << 8 | version, version, self.FLAG_UTF8, 0,
+            dos_time, dos_date, crc, stored_size, stored_size, len(name), len(central_extra), 0,
+            0, 0, 0o100644 << 16, min(header_offset, 0xFFFFFFFF)) + name + central_extra)
+
+    def close(self) -> None:
+        """Escribe el directorio central y el registro final (ZIP64 si hace falta)."""
+        cd_offset = self.offset
+        for entry in self.central:
+            self._write(entry)
+        cd_size = self.offset - cd_offset
+        count = len(self.central)
+
+        if self.zip64 or count >= ZIP_MAX_ENTRIES or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            eocd64_offset = self.offset
+            self._write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 3 << 8 | 45, 45, 0, 0,
+                                    count, count, cd_size, cd_offset))
+            self._write(struct.pack('<IIQI', 0x07064b50, 0, eocd64_offset, 1))
+        self._write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF),
+                                min(count, 0xFFFF), min(cd_size, 0xFFFFFFFF),
+                                min(cd_offset, 0xFFFFFFFF), 0))
+
+
+class StreamTarWriter:
+    """TAR (PAX) escrito directamente sobre un descriptor."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.offset = 0
+
+    def _write(self, data: bytes) -> None:
+        _write_all(self.fd, data)
+        self.offset += len(data)
+
+    def add(self, arcname: str, size: int, mtime: float, crc: int = 0,
+            src_fd: Optional[int] = None, data: Optional[bytes] = None) -> None:
+        """Añade un archivo regular (crc se ignora; se acepta por simetría con ZIP)."""
+        info = tarfile.TarInfo(arcname)
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o644
+        self._write(info.tobuf(format=tarfile.PAX_FORMAT, encoding='utf-8', errors='surrogateescape'))
+        if src_fd is not None:
+            copy_range(src_fd, self.fd, size)
+            self.offset += size
+        else:
+            self._write(data)
+        padding = -size % tarfile.BLOCKSIZE
+        if padding:
+            self._write(b"\0" * padding)
+
+    def close(self) -> None:
+        """Dos bloques vacíos de fin y relleno hasta el tamaño de registro."""
+        self._write(b"\0" * (2 * tarfile.BLOCKSIZE))
+        padding = -self.offset % tarfile.RECORDSIZE
+        if padding:
+            self._write(b"\0" * padding)
+
+
+def export_format(dest: Path) -> str:
+    """Formato según la extensión del destino (.zip o .tar)."""
+    fmt = Path(dest).suffix.lower().lstrip('.')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: '{Path(dest).name}' (usa .zip o .tar)")
+    return fmt
+
+
+def export_bundle(dest: Path, pdfs: List[Dict], dates: Optional[Dict[str, str]] = None,
+                  source: str = "") -> Dict:
+    """
+    Escribe el paquete con los PDFs y el manifiesto.
+
+    Args:
+        dest: Archivo de destino (.zip o .tar)
+        pdfs: Registros de scan_local_pdfs() a incluir, en orden
+        dates: Fechas de descarga para el manifiesto
+        source: Carpeta de origen (solo informativo, va al manifiesto)
+
+    Returns:
+        Manifiesto escrito (con 'files', 'total_bytes', ...)
+    """
+    dest = Path(dest)
+    fmt = export_format(dest)
+    dates = dates or {}
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".part")
+
+    manifest = {'created': datetime.now().isoformat(timespec='seconds'), 'source': source,
+                'format': fmt, 'files': [], 'total_bytes': 0}
+
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        writer = StoredZipWriter(fd) if fmt == 'zip' else StreamTarWriter(fd)
+        with ThreadPoolExecutor(max_workers=CRC_WORKERS) as pool:
+            # Los CRC se calculan por delante de la copia; el TAR no los necesita
+            crcs: Iterable[int] = (pool.map(file_crc32, [p['path'] for p in pdfs]) if fmt == 'zip'
+                                   else (0 for _ in pdfs))
+            for pdf, crc in zip(pdfs, crcs):
+                with open(pdf['path'], 'rb') as src:
+                    size = os.fstat(src.fileno()).st_size
+                    writer.add(pdf['arcname'], size, pdf['mtime'], crc, src_fd=src.fileno())
+                entry = {'path': pdf['arcname'], 'doc_id': pdf['doc_id'],
+                         'is_solution': pdf['is_solution'], 'size': size,
+                         'downloaded': dates.get(pdf['name'])}
+                if fmt == 'zip':
+                    entry['crc32'] = f"{crc:08x}"
+                manifest['files'].append(entry)
+                manifest['total_bytes'] += size
+
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+        writer.add(MANIFEST_NAME, len(data), time.time(), zlib.crc32(data), data=data)
+        writer.close()
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, dest)
+    return manifest
+
+
+def run_export(dest: str, url: Optional[str] = None, select: Optional[str] = None,
+               since: Optional[str] = None, tracker: Optional[DownloadTracker] = None) -> int:
+    """
+    Punto de entrada de --export.
+
+    Args:
+        dest: Paquete de destino (.zip o .tar)
+        url: Categoría a exportar (None = todo CATLUX_SAVE_PATH)
+        select: Expresión de --select sobre el índice local
+        since: Prefijo de fecha ISO (según el historial del tracker)
+        tracker: Rastreador de descargas
+
+    Returns:
+        Código de salida
+    """
+    save_base_path = os.getenv("CATLUX_SAVE_PATH")
+    if not save_base_path:
+        print("❌ CATLUX_SAVE_PATH no configurado en .env")
+        return 1
+    try:
+        export_format(Path(dest))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    root = extract_category_path(url, save_base_path) if url else Path(save_base_path)
+    if root is None or not root.is_dir():
+        print(f"❌ No existe la carpeta {root}")
+        return 1
+
+    dates = download_dates(tracker) if tracker else {}
+    pdfs = select_for_export(scan_local_pdfs(root), dates, since, select)
+    if not pdfs:
+        print("⚠️  Ningún PDF coincide con la selección; no se crea el paquete")
+        return 1
+
+    started = time.monotonic()
+    manifest = export_bundle(Path(dest), pdfs, dates, str(root))
+    elapsed = max(time.monotonic() - started, 1e-6)
+    mb = manifest['total_bytes'] / (1024 * 1024)
+    print(f"✓ {len(pdfs)} PDFs exportados a {dest} ({mb:.1f} MB, {mb / elapsed:.0f} MB/s)")
+    logger.info(f"Exportación {dest}: {len(pdfs)} PDFs, {manifest['total_bytes']} bytes en {elapsed:.1f} s")
+    return 0
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Organización de las carpetas de cada categoría (--layout, --migrate-layout).
+
+Por defecto todos los PDFs de una categoría van a la misma carpeta
+(CATLUX_SAVE_PATH/klasse-7/deutsch/). Con miles de archivos, en un recurso
+SMB/NFS cada listado del directorio y cada exists() se vuelven lentos. Hay
+tres organizaciones:
+
+- flat: klasse-7/deutsch/119215.pdf (la de siempre)
+- id-prefix: klasse-7/deutsch/1192/119215.pdf (100 documentos por carpeta)
+- type-year: klasse-7/deutsch/1-schulaufgabe/2024/119215.pdf (tipo y año del
+  curso escolar, o de subida; el año solo se conoce con --details)
+
+La organización solo decide dónde se guardan las descargas nuevas
+(pdf_path() en catlux_scrapper.py). La detección de lo local recorre el árbol
+de la categoría una vez (index_local_pdfs()), así que encuentra los PDFs en
+cualquier organización, también a mitad de una migración.
+
+--migrate-layout mueve el árbol existente con renombrados en paralelo (sin
+copiar datos) y deja la organización elegida en LAYOUT_FILE_NAME, en la raíz,
+para las siguientes ejecuciones. Es reanudable: si se interrumpe, basta con
+repetir el comando; lo que ya está en su sitio no se toca.
+
+Orden de preferencia: --layout, CATLUX_LAYOUT, la registrada por la migración,
+flat.
+
+Uso:
+    python catlux_scrapper.py --migrate-layout id-prefix --dry-run
+    python catlux_scrapper.py --migrate-layout id-prefix
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from catlux_scrapper import file_lock, iter_local_pdfs
+
+logger = logging.getLogger(__name__)
+
+LAYOUTS = ('flat', 'id-prefix', 'type-year')
+DEFAULT_LAYOUT = 'flat'
+LAYOUT_FILE_NAME = ".catlux_layout.json"
+# Dígitos finales del doc_id que comparten carpeta en id-prefix (100 documentos)
+ID_SHARD_DIGITS = 2
+MIGRATE_WORKERS = 8
+UNKNOWN_TYPE = "sonstige"
+UNKNOWN_YEAR = "ohne-jahr"
+
+_SLUG_RE = re.compile(r"[^0-9a-zäöüß]+")
+_YEAR_RE = re.compile(r"(?:19|20)\d\d")
+
+
+def _slug(text: str) -> str:
+    return _SLUG_RE.sub("-", text.lower()).strip("-")
+
+
+def _year(pdf: Dict) -> Optional[str]:
+    for field in ('school_year', 'uploaded'):
+        match = _YEAR_RE.search(str(pdf.get(field) or ""))
+        if match:
+            return match.group()
+    return None
+
+
+class Layout:
+    """Ruta de cada PDF dentro de la carpeta de su categoría."""
+
+    def __init__(self, name: str = DEFAULT_LAYOUT):
+        """
+        Args:
+            name: Una de LAYOUTS
+
+        Raises:
+            ValueError: Si la organización no existe
+        """
+        if name not in LAYOUTS:
+            raise ValueError(f"Organización desconocida '{name}' (usa {', '.join(LAYOUTS)})")
+        self.name = name
+
+    def relative_path(self, pdf: Dict) -> PurePosixPath:
+        """Ruta relativa a la carpeta de la categoría."""
+        filename = pdf['name'] + ".pdf"
+        if self.name == 'id-prefix':
+            doc_id = str(pdf.get('doc_id') or pdf['name'].replace('_solution', ''))
+            return PurePosixPath(doc_id[:-ID_SHARD_DIGITS] or "0", filename)
+        if self.name == 'type-year':
+            doc_type = _slug(pdf.get('doc_type') or "") or UNKNOWN_TYPE
+            return PurePosixPath(doc_type, _year(pdf) or UNKNOWN_YEAR, filename)
+        return PurePosixPath(filename)
+
+    def path_for(self, save_path: Path, pdf: Dict) -> Path:
+        """Ruta completa del PDF en la carpeta de la categoría."""
+        return Path(save_path, self.relative_path(pdf))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Layout) and other.name == self.name
+
+    def __repr__(self) -> str:
+        return f"Layout({self.name!r})"
+
+
+# ----------------------------------------------------------------------
+# Organización registrada en la raíz
+# ----------------------------------------------------------------------
+
+def read_layout_record(root: Path) -> Dict:
+    """Contenido de LAYOUT_FILE_NAME en root ({} si no hay)."""
+    try:
+        with open(Path(root) / LAYOUT_FILE_NAME, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"No se pudo leer {LAYOUT_FILE_NAME}: {e}")
+        return {}
+
+
+def write_layout_record(root: Path, record: Dict) -> None:
+    """Guarda LAYOUT_FILE_NAME en root (escritura atómica)."""
+    path = Path(root) / LAYOUT_FILE_NAME
+    with file_lock(path):
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, path)
+
+
+def resolve_layout(root: Optional[Path], requested: Optional[str] = None) -> Layout:
+    """
+    Organización para las descargas nuevas.
+
+    Args:
+        root: CATLUX_SAVE_PATH (None = no mirar la registrada)
+        requested: Valor de --layout
+
+    Raises:
+        ValueError: Si la organización pedida no existe
+    """
+    record = read_layout_record(root) if root else {}
+    if record.get('migrating_to'):
+        logger.warning(f"Migración a '{record['migrating_to']}' sin terminar; "
+                       f"repite --migrate-layout {record['migrating_to']}")
+    name = (requested or os.getenv("CATLUX_LAYOUT", "").strip()
+            or record.get('migrating_to') or record.get('layout') or DEFAULT_LAYOUT)
+    return Layout(name)
+
+
+# ----------------------------------------------------------------------
+# Migración
+# ----------------------------------------------------------------------
+
+def known_metadata(snapshot_dir: Optional[Path] = None,
+                   details_file: Optional[Path] = None) -> Dict[str, Dict]:
+    """
+    Metadatos por doc_id que ya están en disco (para type-year).
+
+    Los snapshots del preview dan el tipo de documento (y, si el preview se
+    hizo con --details, el curso escolar y la fecha de subida); la caché de
+    --details completa el resto. No se hace ninguna petición.
+    """
+    from catlux_details import DETAIL_FIELDS, DetailCache
+
+    metadata: Dict[str, Dict] = {}
+    if snapshot_dir and Path(snapshot_dir).is_dir():
+        for path in sorted(Path(snapshot_dir).glob("*.json"), key=lambda p: p.stat().st_mtime):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                fields = data['fields']
+                for row in data['rows']:
+                    record = dict(zip(fields, row))
+                    if record.get('doc_id'):
+                        entry = metadata.setdefault(str(record['doc_id']), {})
+                        entry['doc_type'] = record.get('doc_type')
+                        entry.update({k: record[k] for k in DETAIL_FIELDS if record.get(k) is not None})
+            except (json.JSONDecodeError, IOError, KeyError, TypeError) as e:
+                logger.debug(f"Snapshot {path.name} ignorado: {e}")
+
+    if details_file:
+        for doc_id, entry in DetailCache(details_file).entries.items():
+            metadata.setdefault(doc_id, {}).update(entry.get('fields', {}))
+    return metadata
+
+
+def plan_migration(root: Path, layout: Layout,
+                   metadata: Optional[Dict[str, Dict]] = None) -> Tuple[List[Tuple[Path, Path]], Dict[str, int]]:
+    """
+    Movimientos necesarios para pasar el árbol de root a layout.
+
+    La categoría de cada PDF son las dos primeras carpetas bajo root
+    (klasse-7/deutsch); los PDFs fuera de una categoría se dejan donde están.
+
+    Returns:
+        Tupla (lista de (origen, destino), contadores in_place/ignored/conflicts)
+    """
+    root = Path(root)
+    metadata = metadata or {}
+    moves: List[Tuple[Path, Path]] = []
+    targets = set()
+    stats = {'in_place': 0, 'ignored': 0, 'conflicts': 0}
+
+    for name, path in iter_local_pdfs(root):
+        parts = path.relative_to(root).parts
+        if len(parts) < 3:
+            stats['ignored'] += 1
+            continue
+        doc_id = name.replace('_solution', '')
+        pdf = dict(metadata.get(doc_id, {}), name=name, doc_id=doc_id)
+        target = layout.path_for(root / parts[0] / parts[1], pdf)
+        if target == path:
+            stats['in_place'] += 1
+        elif target in targets:
+            # Dos copias del mismo PDF en la categoría: se mueve solo la primera
+            stats['conflicts'] += 1
+        else:
+            targets.add(target)
+            moves.append((path, target))
+    moves.sort()
+    return moves, stats
+
+
+def _move(source: Path, target: Path) -> str:
+    if target.exists():
+        return 'conflicts'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.rename(source, target)
+    return 'moved'
+
+
+def _remove_empty_dirs(root: Path) -> int:
+    """Borra las carpetas vacías bajo cada categoría (no las de categoría)."""
+    removed = 0
+    for dirpath, _, filenames in os.walk(root, topdown=False):
+        path = Path(dirpath)
+        if len(path.relative_to(root).parts) <= 2 or filenames:
+            continue
+        try:
+            path.rmdir()  # falla si aún tiene subcarpetas
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def migrate_layout(root: Path, layout: Layout, metadata: Optional[Dict[str, Dict]] = None,
+                   workers: int = MIGRATE_WORKERS) -> Dict[str, int]:
+    """
+    Mueve los PDFs de root a la organización layout y la registra.
+
+    Cada PDF se renombra (os.rename: atómico y sin copiar datos dentro del
+    mismo sistema de archivos) desde workers hilos; en un recurso de red el
+    coste es la latencia de cada operación, que así se solapa. Si destino ya
+    existe, el PDF se deja donde está y se cuenta como conflicto.
+
+    Returns:
+        Contadores moved, in_place, conflicts, failed, ignored y dirs_removed
+    """
+    root = Path(root)
+    previous = read_layout_record(root).get('layout', DEFAULT_LAYOUT)
+    write_layout_record(root, {'layout': previous, 'migrating_to': layout.name,
+                               'started': datetime.now().isoformat(timespec='seconds')})
+
+    moves, stats = plan_migration(root, layout, metadata)
+    stats.update(moved=0, failed=0)
+
+    def move(item: Tuple[Path, Path]) -> str:
+        try:
+            return _move(*item)
+        except OSError as e:
+            logger.error(f"No se pudo mover {item[0].relative_to(root)}: {e}")
+            return 'failed'
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="catlux-migrate") as pool:
+        for result in pool.map(move, moves):
+            stats[result] += 1
+    stats['dirs_removed'] = _remove_empty_dirs(root)
+
+    if stats['failed']:
+        logger.warning(f"Migración incompleta: {stats['failed']} PDFs sin mover")
+    else:
+        write_layout_record(root, {'layout': layout.name,
+                                   'migrated': datetime.now().isoformat(timespec='seconds')})
+    return stats
+
+
+def run_migrate_layout(name: str, root: Path, snapshot_dir: Optional[Path] = None,
+                       details_file: Optional[Path] = None, dry_run: bool = False) -> int:
+    """
+    Punto de entrada de --migrate-layout.
+
+    Returns:
+        Código de salida
+    """
+    try:
+        layout = Layout(name)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    root = Path(root)
+    if not root.is_dir():
+        print(f"❌ No existe la carpeta {root}")
+        return 1
+
+    metadata = known_metadata(snapshot_dir, details_file) if layout.name == 'type-year' else {}
+    if dry_run:
+        moves, stats = plan_migration(root, layout, metadata)
+        print(f"🔍 Migración a '{layout.name}' (simulación): {len(moves)} PDFs a mover, "
+              f"{stats['in_place']} ya en su sitio, {stats['conflicts']} conflictos, "
+              f"{stats['ignored']} fuera de una categoría")
+        for source, target in moves[:20]:
+            print(f"   {source.relative_to(root)} → {target.relative_to(root)}")
+        if len(moves) > 20:
+            print(f"   ... y {len(moves) - 20} más")
+        return 0
+
+    started = time.monotonic()
+    stats = migrate_layout(root, layout, metadata)
+    elapsed = time.monotonic() - started
+    print(f"✓ Migración a '{layout.name}': {stats['moved']} PDFs movidos, {stats['in_place']} ya en su "
+          f"sitio, {stats['conflicts']} conflictos, {stats['failed']} fallidos ({elapsed:.1f} s)")
+    logger.info(f"Migración a {layout.name}: {stats}")
+    if stats['failed']:
+        print("⚠️  Repite el comando para reintentar lo que falló")
+        return 1
+    return 0
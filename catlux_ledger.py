@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Ledger de cuota mensual compartido entre procesos y equipos.
+
+Varios equipos que descargan contra el mismo CATLUX_SAVE_PATH (NAS) comparten
+un único archivo JSON de cuota. Cada descarga sigue el ciclo:
+
+    reserve()  →  commit()   (descarga correcta)
+               →  release()  (fallo o interrupción)
+
+Todas las operaciones leen-modifican-escriben el archivo bajo file_lock()
+(fcntl.lockf / msvcrt.locking, respetados por NFS y SMB), así que la suma de
+descargas y reservas vivas nunca supera DOWNLOADS_PER_MONTH. Las reservas
+caducan a los RESERVATION_TTL_SECONDS para que un equipo caído no bloquee saldo;
+mientras el proceso vive, un hilo las renueva cada tercio de ese tiempo, así
+que una descarga lenta (--max-rate) no pierde su hueco.
+
+Al activar --shared-ledger a mitad de mes, las descargas del mes que ya
+registró download_tracker.json se importan al ledger (import_history()).
+
+Se usa SQLite en catlux_queue.py, pero no aquí: el modo WAL de SQLite necesita
+memoria compartida y no funciona sobre sistemas de archivos de red.
+
+Uso:
+    python catlux_scrapper.py --shared-ledger --select-category
+    # Ubicación por defecto: CATLUX_SAVE_PATH/.catlux_quota.json
+    # (CATLUX_LEDGER_PATH la cambia)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from catlux_scrapper import file_lock
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILE_NAME = ".catlux_quota.json"
+RESERVATION_TTL_SECONDS = 900
+
+
+def default_ledger_path(save_base_path: str) -> Path:
+    """Ruta del ledger: CATLUX_LEDGER_PATH o CATLUX_SAVE_PATH/.catlux_quota.json."""
+    override = os.getenv("CATLUX_LEDGER_PATH")
+    if override:
+        return Path(override)
+    return Path(save_base_path) / LEDGER_FILE_NAME
+
+
+def _current_month() -> str:
+    today = date.today()
+    return f"{today.year}-{today.month:02d}"
+
+
+class QuotaLedger:
+    """Cuota mensual compartida con reservas atómicas."""
+
+    def __init__(self, ledger_file: Path, owner: Optional[str] = None):
+        """
+        Inicializa el ledger (el archivo se crea en la primera escritura).
+
+        Args:
+            ledger_file: Archivo JSON compartido
+            owner: Identificador de este proceso (por defecto host:pid)
+        """
+        from catlux_queue import current_owner
+
+        self.ledger_file = Path(ledger_file)
+        self.owner = owner or current_owner()
+        # Reservas de este proceso aún en curso (las renueva _renew_loop)
+        self._live: Set[str] = set()
+        self._live_lock = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+
+    def _read(self) -> Dict:
+        """Lee el ledger (llamar con el bloqueo tomado)."""
+        try:
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error cargando ledger de cuota: {e}. Creando nuevo.")
+            data = {}
+        data.setdefault("downloads", [])
+        data.setdefault("reservations", {})
+        return data
+
+    def _write(self, data: Dict) -> None:
+        """Escribe el ledger de forma atómica (llamar con el bloqueo tomado)."""
+        self.ledger_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.ledger_file.with_name(f"{self.ledger_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.ledger_file)
+
+    @staticmethod
+    def _prune(data: Dict, now: float) -> None:
+        """Elimina las reservas caducadas."""
+        data["reservations"] = {
+            rid: r for rid, r in data["reservations"].items() if r.get("expires", 0) > now
+        }
+
+    @staticmethod
+    def _used(data: Dict) -> int:
+        """Descargas del mes actual más reservas vivas."""
+        month = _current_month()
+        committed = sum(1 for d in data["downloads"] if d.get("date", "").startswith(month))
+        return committed + len(data["reservations"])
+
+    def used_this_month(self) -> int:
+        """Descargas del mes (de todos los equipos) más reservas en curso."""
+        with file_lock(self.ledger_file):
+            data = self._read()
+        self._prune(data, time.time())
+        return self._used(data)
+
+    def reserve(self, limit: int) -> Optional[str]:
+        """
+        Reserva un hueco si el mes no ha llegado al límite.
+
+        Args:
+            limit: Descargas permitidas por mes
+
+        Returns:
+            Identificador de la reserva, o None si no queda saldo
+        """
+        now = time.time()
+        with file_lock(self.ledger_file):
+            data = self._read()
+            self._prune(data, now)
+            if self._used(data) >= limit:
+                return None
+            reservation = uuid.uuid4().hex
+            data["reservations"][reservation] = {
+                "owner": self.owner,
+                "expires": now + RESERVATION_TTL_SECONDS,
+            }
+            self._write(data)
+        self._track(reservation)
+        return reservation
+
+    def commit(self, reservation: Optional[str], filename: str, when: Optional[str] = None) -> None:
+        """
+        Convierte una reserva en descarga (o registra una descarga sin reserva).
+
+        Args:
+            reservation: Identificador devuelto por reserve()
+            filename: Nombre del PDF descargado
+            when: Fecha ISO de la descarga (por defecto, ahora); la misma que
+                en download_tracker.json para que import_history() no la duplique
+        """
+        self._untrack(reservation)
+        with file_lock(self.ledger_file):
+            data = self._read()
+            data["reservations"].pop(reservation or "", None)
+            data["downloads"].append({
+                "date": when or datetime.now().isoformat(),
+                "filename": filename,
+                "owner": self.owner,
+            })
+            self._write(data)
+
+    def release(self, reservation: str) -> None:
+        """Libera una reserva sin contarla como descarga."""
+        self._untrack(reservation)
+        with file_lock(self.ledger_file):
+            data = self._read()
+            if data["reservations"].pop(reservation, None) is not None:
+                self._write(data)
+
+    def import_history(self, downloads: Iterable[Dict]) -> int:
+        """
+        Añade las descargas del mes de un historial local que el ledger no tenga.
+
+        Las entradas se identifican por fecha y nombre de archivo, así que
+        importar el mismo historial varias veces no duplica nada.
+
+        Args:
+            downloads: Entradas "downloads" de download_tracker.json
+
+        Returns:
+            Número de descargas añadidas
+        """
+        month = _current_month()
+        recent = [d for d in downloads if d.get("date", "").startswith(month)]
+        if not recent:
+            return 0
+        with file_lock(self.ledger_file):
+            data = self._read()
+            known = {(d.get("date"), d.get("filename")) for d in data["downloads"]}
+            new: List[Dict] = [
+                {"date": d["date"], "filename": d.get("filename", ""), "owner": self.owner,
+                 "imported": True}
+                for d in recent if (d["date"], d.get("filename")) not in known
+            ]
+            if new:
+                data["downloads"].extend(new)
+                self._write(data)
+        return len(new)
+
+    def renew(self, reservations: Iterable[str]) -> Set[str]:
+        """
+        Alarga RESERVATION_TTL_SECONDS desde ahora las reservas que sigan vivas.
+
+        Returns:
+            Reservas que ya no existían (caducadas: no se pueden recuperar)
+        """
+        now = time.time()
+        lost = set()
+        with file_lock(self.ledger_file):
+            data = self._read()
+            self._prune(data, now)
+            for reservation in reservations:
+                entry = data["reservations"].get(reservation)
+                if entry is None:
+                    lost.add(reservation)
+                else:
+                    entry["expires"] = now + RESERVATION_TTL_SECONDS
+            if data["reservations"]:
+                self._write(data)
+        return lost
+
+    def _track(self, reservation: str) -> None:
+        with self._live_lock:
+            self._live.add(reservation)
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew_loop, name="catlux-ledger-renew",
+                                                 daemon=True)
+                self._renewer.start()
+
+    def _untrack(self, reservation: Optional[str]) -> None:
+        with self._live_lock:
+            self._live.discard(reservation or "")
+
+    def _renew_loop(self) -> None:
+        # Termina en cuanto no quedan reservas propias; reserve() lo vuelve a lanzar
+        while True:
+            time.sleep(max(0.01, RESERVATION_TTL_SECONDS / 3))
+            with self._live_lock:
+                live = set(self._live)
+                if not live:
+                    self._renewer = None
+                    return
+            try:
+                lost = self.renew(live)
+                if lost:
+                    logger.warning(f"{len(lost)} reservas de cuota caducaron antes de renovarse")
+                    with self._live_lock:
+                        self._live -= lost
+            except OSError as e:
+                logger.warning(f"No se pudieron renovar las reservas de cuota: {e}")
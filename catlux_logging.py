@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Logging no bloqueante con rotación (ver setup_logging() en catlux_scrapper.py).
+
+Los hilos de descarga solo encolan el registro (QueueHandler); un único hilo
+(QueueListener) lo formatea y lo escribe en el archivo y en la consola, así
+que la E/S del log y los bloqueos de los handlers quedan fuera del camino de
+las descargas.
+
+El archivo rota por tamaño (LOG_MAX_BYTES) y además al cambiar de día; se
+conservan LOG_BACKUP_COUNT copias numeradas (catlux_scrapper.log.1, .2, ...).
+
+Niveles:
+    por defecto    INFO en archivo y consola (resúmenes, avisos y errores)
+    -v             DEBUG: además cada página, cada PDF descargado, "ya existe"...
+    -q             solo avisos y errores en consola (el archivo sigue en INFO)
+    --log-json     archivo en JSON compacto, un objeto por línea
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class DailySizeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler que además rota a medianoche."""
+
+    def __init__(self, filename, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 now=datetime.now):
+        """
+        Args:
+            filename: Archivo de log
+            max_bytes: Tamaño a partir del cual se rota
+            backup_count: Copias numeradas que se conservan
+            now: Hora actual (inyectable en pruebas)
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.now = now
+        self.rollover_at = self._next_midnight(self._opened_at())
+
+    def _opened_at(self) -> datetime:
+        # Un log existente que es de otro día rota con el primer registro
+        try:
+            return datetime.fromtimestamp(Path(self.baseFilename).stat().st_mtime)
+        except OSError:
+            return self.now()
+
+    @staticmethod
+    def _next_midnight(moment: datetime) -> datetime:
+        return datetime.combine(moment.date() + timedelta(days=1), datetime.min.time())
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:  # noqa: N802 - API de logging
+        if self.now() >= self.rollover_at:
+            if Path(self.baseFilename).exists():
+                return True
+            self.rollover_at = self._next_midnight(self.now())
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:  # noqa: N802 - API de logging
+        super().doRollover()
+        self.rollover_at = self._next_midnight(self.now())
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON compacto por registro."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+def configure(log_file: Path, verbosity: int = 0, json_format: bool = False,
+              max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT
+              ) -> logging.handlers.QueueListener:
+    """
+    Instala el QueueHandler en el logger raíz y arranca el QueueListener.
+
+    Args:
+        log_file: Archivo de log
+        verbosity: 1 o más = DEBUG, 0 = INFO, negativo = consola solo WARNING
+        json_format: Archivo en JSON por líneas en vez de texto
+        max_bytes: Tamaño de rotación
+        backup_count: Copias que se conservan
+
+    Returns:
+        Listener en marcha (se detiene solo al salir del proceso)
+    """
+    file_level = logging.DEBUG if verbosity > 0 else logging.INFO
+    console_level = logging.DEBUG if verbosity > 0 else logging.INFO if verbosity == 0 else logging.WARNING
+
+    file_handler = DailySizeRotatingFileHandler(log_file, max_bytes, backup_count)
+    file_handler.setLevel(file_level)
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(min(file_level, console_level))
+
+    listener.start()
+    atexit.register(_stop, listener)
+    return listener
+
+
+def _stop(listener: Optional[logging.handlers.QueueListener]) -> None:
+    """Vacía la cola y cierra los handlers (registrado con atexit)."""
+    if listener is None or listener._thread is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Precarga de los listados que probablemente se abran a continuación (--select-category).
+
+En el bucle interactivo cada categoría elegida espera a que se pagine todo su
+listado y a que se sondeen sus PDFs nuevos. Mientras el usuario mira un
+preview, ListingLookahead lista en segundo plano las categorías vecinas de la
+actual (likely_next()):
+
+- La misma asignatura en las klassen contiguas (klasse-6 y klasse-8 desde klasse-7)
+- Las otras asignaturas de la misma klasse
+
+Van primero las que el usuario ya colecciona (su carpeta existe en
+CATLUX_SAVE_PATH) y las que ya abrió en esta sesión; las que el mapa del
+sitio sabe vacías no se piden. Solo se precargan LOOKAHEAD_CATEGORIES por
+preview y, al cambiar de categoría, las pendientes que aún no empezaron se
+cancelan.
+
+Los listados se guardan en memoria (LRU de LOOKAHEAD_ENTRIES listados, con la
+caducidad de ListingCache) y la precarga deja también los sondeos en el
+catálogo: al elegir una de esas categorías el preview no vuelve a paginar ni a
+sondear. Volver a una categoría ya vista tampoco.
+
+Solo con el motor sync.
+"""
+
+import logging
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from catlux_cache import ListingCache
+from catlux_catalog import probe_listing
+from catlux_daemon import CatluxDaemon
+from catlux_scrapper import (
+    GYMNASIUM_SUBJECTS,
+    DownloadTracker,
+    PDFManager,
+    extract_category_path,
+    get_site_root,
+    mark_local_files,
+)
+
+logger = logging.getLogger(__name__)
+
+# Listados guardados en memoria
+LOOKAHEAD_ENTRIES = 8
+# Categorías precargadas por preview
+LOOKAHEAD_CATEGORIES = 3
+LOOKAHEAD_WORKERS = 2
+# Klassen de proben/gymnasium si el mapa del sitio no dice otra cosa
+KLASSE_RANGE = range(5, 13)
+
+_CATEGORY_RE = re.compile(r"^(?P<prefix>.*/)klasse-(?P<klasse>\d+)/(?P<subject>[^/]+)(?P<rest>.*)$")
+
+
+def likely_next(url: str, sitemap=None, save_base_path: Optional[str] = None,
+                visited: Iterable[str] = ()) -> List[str]:
+    """
+    Categorías vecinas de url, de la más a la menos probable.
+
+    Puntuación: +2 misma asignatura en una klasse contigua, +1 otra asignatura
+    de la misma klasse, +2 si su carpeta local existe, +1 si ya se abrió en la
+    sesión. Se conserva el resto de la URL (p.ej. el filtro de tipo).
+
+    Args:
+        url: Categoría actual (.../klasse-X/asignatura[/tipo])
+        sitemap: Mapa del sitio (catlux_sitemap.SiteMap) o None
+        save_base_path: Raíz CATLUX_SAVE_PATH (para ver qué se colecciona)
+        visited: URLs abiertas en la sesión
+
+    Returns:
+        Lista de URLs (vacía si url no es de una klasse)
+    """
+    parts = urlsplit(url)
+    match = _CATEGORY_RE.match(parts.path)
+    if not match:
+        return []
+    prefix, subject, rest = match['prefix'], match['subject'], match['rest']
+    klasse = int(match['klasse'])
+
+    def category_url(k: int, s: str) -> str:
+        return urlunsplit((parts.scheme, parts.netloc, f"{prefix}klasse-{k}/{s}{rest}", "", ""))
+
+    subjects = list(GYMNASIUM_SUBJECTS)
+    if sitemap is not None:
+        known = [path.rstrip("/").rsplit("/", 1)[-1]
+                 for path, _ in sitemap.children(f"{prefix}klasse-{klasse}/", include_empty=True)]
+        subjects = known or subjects
+
+    candidates = [(category_url(k, subject), 2, k) for k in (klasse + 1, klasse - 1)]
+    candidates += [(category_url(klasse, s), 1, klasse) for s in subjects if s != subject]
+
+    visited = set(visited)
+    scored = []
+    for candidate, score, k in candidates:
+        node = sitemap.node(candidate) if sitemap is not None else None
+        if node is not None and not node.get('count'):
+            continue
+        if node is None and k not in KLASSE_RANGE:
+            continue
+        if save_base_path:
+            folder = extract_category_path(candidate, save_base_path)
+            if folder is not None and folder.is_dir():
+                score += 2
+        if candidate in visited:
+            score += 1
+        scored.append((candidate, score))
+
+    # sorted es estable: a igual puntuación, klasse superior, inferior y asignaturas en orden
+    return [candidate for candidate, _ in sorted(scored, key=lambda item: -item[1])]
+
+
+class ListingLookahead:
+    """Listados en memoria y precarga en segundo plano de las categorías vecinas."""
+
+    def __init__(self, tracker: DownloadTracker, max_pages: int = 10, sitemap=None,
+                 categories: int = LOOKAHEAD_CATEGORIES, max_entries: int = LOOKAHEAD_ENTRIES,
+                 workers: int = LOOKAHEAD_WORKERS):
+        """
+        Inicializa la precarga (no pide nada hasta prefetch_around()).
+
+        Args:
+            tracker: Rastreador de descargas (no se descarga nada; lo pide el daemon)
+            max_pages: Máximo de páginas por listado (el mismo que el preview)
+            sitemap: Mapa del sitio para descartar categorías vacías (opcional)
+            categories: Categorías precargadas por preview
+            max_entries: Listados guardados en memoria
+            workers: Listados precargados a la vez
+        """
+        self.max_pages = max_pages
+        self.sitemap = sitemap
+        self.categories = categories
+        # Sesión con renovación y catálogo de sondeos: los del daemon
+        self.daemon = CatluxDaemon([], tracker, max_pages)
+        self.listings = ListingCache(self._load_listing, max_entries=max_entries)
+        self.visited: List[str] = []
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catlux-lookahead")
+        self._pending: List[Future] = []
+
+    def _load_listing(self, url: str) -> Optional[List[Dict]]:
+        _, _, cert_path, save_base_path = self.daemon._credentials
+        session = self.daemon.session_for(get_site_root(url))
+        if session is None:
+            return None
+        pdfs = PDFManager(session, cert_path).fetch_pdfs(url, self.max_pages)
+        if not pdfs:
+            # Vacío o error de red: que el preview lo intente por su cuenta
+            return None
+
+        # Sondear ya los nuevos; se hace sobre copias porque el preview repite
+        # marcado y sondeo con el listado original (y entonces sale del catálogo)
+        save_path = extract_category_path(url, save_base_path)
+        if save_path:
+            probed = [dict(pdf) for pdf in pdfs]
+            mark_local_files(probed, save_path, Path(save_base_path))
+            probe_listing(session, url, probed, self.daemon.catalog)
+        logger.info(f"Listado precargado: {url} ({len(pdfs)} PDFs)")
+        return pdfs
+
+    def take(self, url: str) -> Optional[List[Dict]]:
+        """
+        Copia del listado de url si está en memoria o precargándose (se espera
+        a que termine); None si no lo está o la precarga falló.
+        """
+        try:
+            pdfs = self.listings.peek(url)
+        except Exception as e:
+            logger.debug(f"Precarga fallida de {url}: {e}")
+            return None
+        return [dict(pdf) for pdf in pdfs] if pdfs is not None else None
+
+    def remember(self, url: str, pdfs: List[Dict]) -> None:
+        """Guarda el listado que obtuvo el preview (volver a la categoría es inmediato)."""
+        if pdfs:
+            self.listings.put(url, [dict(pdf) for pdf in pdfs])
+
+    def prefetch_around(self, url: str) -> List[str]:
+        """
+        Precarga las categorías más probables tras url.
+
+        Las precargas de la categoría anterior que aún no empezaron se cancelan.
+
+        Returns:
+            URLs encoladas para precarga
+        """
+        for future in self._pending:
+            future.cancel()
+        if url in self.visited:
+            self.visited.remove(url)
+        self.visited.append(url)
+
+        candidates = likely_next(url, self.sitemap, self.daemon._credentials[3], self.visited)
+        scheduled = [candidate for candidate in candidates[:self.categories]
+                     if candidate != url and candidate not in self.listings]
+        self._pending = [self._executor.submit(self.listings.get, candidate) for candidate in scheduled]
+        if scheduled:
+            logger.info(f"Precargando {len(scheduled)} listados vecinos de {url}")
+        return scheduled
+
+    def close(self) -> None:
+        """Cancela las precargas pendientes y cierra las sesiones."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for session, _ in list(self.daemon._sessions.values()):
+            session.close()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Copia espejo incremental de CATLUX_SAVE_PATH en otro volumen (--mirror DEST).
+
+Las herramientas genéricas hacen un stat de cada archivo en cada pasada; con
+decenas de miles de PDFs en un NAS eso son minutos aunque no haya cambiado
+nada. run_mirror() guarda en DEST un manifiesto (MANIFEST_NAME) con cada
+carpeta (mtime, subcarpetas) y cada PDF (tamaño, mtime, sha256):
+
+- Una carpeta cuyo mtime no cambió no ha ganado, perdido ni renombrado
+  entradas (las descargas se escriben en .part y se renombran, así que un PDF
+  nuevo o reescrito siempre cambia el mtime de su carpeta): se reutiliza su
+  entrada sin listarla ni hacer stat de sus archivos
+- Las carpetas modificadas hace menos de RACY_SECONDS no se dan por buenas
+  (granularidad del mtime en SMB/FAT): se vuelven a listar la vez siguiente
+- El historial del tracker sirve de control: si hay descargas posteriores a la
+  última pasada que el recorrido rápido no encontró, se repite completo
+- Un PDF modificado en el sitio (sin .part: p.ej. anotado con un editor)
+  cambia su mtime pero no el de su carpeta, y el recorrido rápido no lo ve.
+  Por eso cada FULL_SCAN_DAYS días (o con --full) se listan todas las carpetas
+- De los PDFs nuevos o cambiados se calcula el sha256; si coincide con el del
+  manifiesto (solo cambió la fecha) no se copian
+- La copia usa copy_range() de catlux_export.py (sin pasar los datos por
+  Python) en MIRROR_WORKERS hilos, a un .part en destino que se renombra
+
+Con --prune se borran en DEST los PDFs que desaparecieron del origen (solo los
+que copió el espejo; nunca archivos ajenos). Sin --prune se conservan, y el
+manifiesto los recuerda para un --prune posterior: DEST sigue siendo una copia
+de seguridad.
+
+Uso:
+    python catlux_scrapper.py --mirror /mnt/backup/Catlux
+    python catlux_scrapper.py --mirror /mnt/backup/Catlux --prune
+    python catlux_scrapper.py --mirror /mnt/backup/Catlux --full
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from catlux_export import copy_range
+from catlux_scrapper import DownloadTracker, file_lock
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".catlux_mirror.json"
+MANIFEST_VERSION = 1
+MIRROR_WORKERS = 4
+RACY_SECONDS = 2
+# Cada cuántos días se listan todas las carpetas aunque su mtime no cambiara
+FULL_SCAN_DAYS = 7
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """sha256 del archivo leído por mmap (hashlib libera el GIL en bloques grandes)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for start in range(0, size, HASH_CHUNK_SIZE):
+                        digest.update(view[start:start + HASH_CHUNK_SIZE])
+                finally:
+                    view.release()
+    return digest.hexdigest()
+
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+class MirrorManifest:
+    """Estado del espejo guardado en DEST (carpetas y PDFs copiados)."""
+
+    def __init__(self, dest: Path):
+        """
+        Args:
+            dest: Carpeta de destino del espejo
+        """
+        self.path = Path(dest) / MANIFEST_NAME
+        data = self._read()
+        self.source: Optional[str] = data.get('source')
+        self.updated: Optional[str] = data.get('updated')
+        # Último recorrido completo (sin reutilizar carpetas)
+        self.last_full: Optional[str] = data.get('last_full')
+        # ruta relativa de la carpeta → {"mtime_ns": int|None, "subdirs": [...],
+        #                                "files": {nombre: [tamaño, mtime_ns, sha256]}}
+        self.dirs: Dict[str, Dict] = data.get('dirs', {})
+        # PDFs copiados que desaparecieron del origen y siguen en DEST (para --prune)
+        self.orphans: List[str] = data.get('orphans', [])
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Manifiesto del espejo ilegible ({e}); se revisará todo el origen")
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data
+
+    def save(self) -> None:
+        """Guarda el manifiesto (escritura atómica)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path):
+            tmp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'source': self.source, 'updated': self.updated,
+                           'last_full': self.last_full, 'dirs': self.dirs, 'orphans': self.orphans}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.path)
+
+
+def scan_source(root: Path, old_dirs: Dict[str, Dict], trust_dirs: bool = True
+                ) -> Tuple[Dict[str, Dict], List[Tuple[str, str]], Dict[str, int]]:
+    """
+    Recorre el origen reutilizando las carpetas que no cambiaron.
+
+    Args:
+        root: CATLUX_SAVE_PATH
+        old_dirs: Carpetas del manifiesto anterior
+        trust_dirs: Reutilizar las carpetas con el mismo mtime (False = listar todas)
+
+    Returns:
+        Tupla (carpetas nuevas, PDFs nuevos o cambiados como (carpeta, nombre),
+        contadores listed/reused de carpetas)
+    """
+    root = Path(root)
+    dirs: Dict[str, Dict] = {}
+    candidates: List[Tuple[str, str]] = []
+    stats = {'listed': 0, 'reused': 0}
+    now_ns = time.time_ns()
+    stack = [""]
+
+    while stack:
+        rel = stack.pop()
+        path = root / rel if rel else root
+        try:
+            # stat antes de listar: un cambio durante el listado deja otro mtime
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            logger.debug(f"Carpeta no disponible {path}: {e}")
+            continue
+
+        old = old_dirs.get(rel)
+        if trust_dirs and old is not None and old.get('mtime_ns') == mtime_ns:
+            dirs[rel] = old
+            stack.extend(_join(rel, name) for name in old['subdirs'])
+            stats['reused'] += 1
+            continue
+
+        old_files = old['files'] if old else {}
+        files: Dict[str, list] = {}
+        subdirs: List[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.name.endswith('.pdf') and entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        previous = old_files.get(entry.name)
+                        if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+                            files[entry.name] = previous
+                        else:
+                            files[entry.name] = [st.st_size, st.st_mtime_ns, previous[2] if previous else None]
+                            candidates.append((rel, entry.name))
+        except OSError as e:
+            logger.warning(f"No se pudo listar {path}: {e}")
+            continue
+
+        racy = now_ns - mtime_ns < RACY_SECONDS * 1_000_000_000
+        dirs[rel] = {'mtime_ns': None if racy else mtime_ns, 'subdirs': sorted(subdirs), 'files': files}
+        stack.extend(_join(rel, name) for name in subdirs)
+        stats['listed'] += 1
+
+    return dirs, candidates, stats
+
+
+def downloaded_since(tracker: Optional[DownloadTracker], since: Optional[str]) -> Set[str]:
+    """Nombres de PDF descargados después de since (ISO) según el historial."""
+    if tracker is None or not since:
+        return set()
+    return {d['filename'] for d in tracker.data.get("downloads", [])
+            if d.get('filename') and d.get('date', "") > since}
+
+
+def copy_file(source: Path, dest: Path, mtime_ns: int) -> None:
+    """Copia source en dest (vía .part y renombrado) conservando la fecha."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".part")
+    with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+        copy_range(src.fileno(), dst.fileno(), os.fstat(src.fileno()).st_size)
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, dest)
+
+
+def mirror(root: Path, dest: Path, tracker: Optional[DownloadTracker] = None,
+           prune: bool = False, workers: int = MIRROR_WORKERS, full: bool = False) -> Dict[str, int]:
+    """
+    Actualiza la copia espejo de root en dest.
+
+    Args:
+        root: Carpeta de origen (CATLUX_SAVE_PATH)
+        dest: Carpeta de destino
+        tracker: Rastreador de descargas (control del recorrido rápido)
+        prune: Borrar en dest los PDFs que ya no están en el origen
+        workers: Copias simultáneas
+        full: Listar todas las carpetas (también se hace cada FULL_SCAN_DAYS días)
+
+    Returns:
+        Contadores copied, bytes, unchanged, failed, removed, dirs_listed, dirs_reused
+    """
+    root, dest = Path(root).resolve(), Path(dest).resolve()
+    manifest = MirrorManifest(dest)
+    if manifest.source and manifest.source != str(root):
+        logger.warning(f"El espejo era de {manifest.source}; se revisa todo el origen")
+        manifest.dirs = {}
+    started_at = datetime.now().isoformat()
+
+    due = (datetime.now() - timedelta(days=FULL_SCAN_DAYS)).isoformat()
+    full_scan = full or manifest.last_full is None or manifest.last_full < due
+    if full_scan and manifest.dirs:
+        logger.info("Recorrido completo del origen" + ("" if full else f" (cada {FULL_SCAN_DAYS} días)"))
+    dirs, candidates, scan_stats = scan_source(root, manifest.dirs, trust_dirs=not full_scan)
+    recent = downloaded_since(tracker, manifest.updated)
+    if recent and not full_scan and scan_stats['reused']:
+        seen = {name[:-len('.pdf')] for entry in dirs.values() for name in entry['files']}
+        missing = recent - seen
+        if missing:
+            logger.info(f"{len(missing)} descargas recientes no aparecen en el recorrido rápido; "
+                        "se revisa todo el origen")
+            dirs, candidates, scan_stats = scan_source(root, manifest.dirs, trust_dirs=False)
+            full_scan = True
+
+    stats = {'copied': 0, 'bytes': 0, 'unchanged': 0, 'failed': 0, 'removed': 0,
+             'dirs_listed': scan_stats['listed'], 'dirs_reused': scan_stats['reused']}
+
+    def sync(item: Tuple[str, str]) -> str:
+        rel, name = item
+        entry = dirs[rel]['files'][name]
+        source, target = root / rel / name, dest / rel / name
+        try:
+            digest = file_sha256(source)
+            if digest == entry[2] and target.exists():
+                return 'unchanged'
+            copy_file(source, target, entry[1])
+        except OSError as e:
+            logger.error(f"No se pudo copiar {_join(rel, name)}: {e}")
+            entry[2] = None
+            return 'failed'
+        entry[2] = digest
+        return 'copied'
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="catlux-mirror") as pool:
+        for (rel, name), result in zip(candidates, pool.map(sync, candidates)):
+            stats[result] += 1
+            if result == 'copied':
+                stats['bytes'] += dirs[rel]['files'][name][0]
+            elif result == 'failed':
+                # Que la siguiente pasada lo vuelva a intentar: se conserva la
+                # entrada anterior sin sha256 (no cuenta como desaparecido)
+                dirs[rel]['mtime_ns'] = None
+                previous = manifest.dirs.get(rel, {}).get('files', {}).get(name)
+                if previous is None:
+                    dirs[rel]['files'].pop(name)
+                else:
+                    dirs[rel]['files'][name] = [previous[0], previous[1], None]
+
+    gone = [_join(rel, name) for rel, old in manifest.dirs.items()
+            for name in old['files'].keys() - dirs.get(rel, {}).get('files', {}).keys()]
+    # Un PDF que vuelve a estar en el origen ya no es huérfano
+    present = {_join(rel, name) for rel, entry in dirs.items() for name in entry['files']}
+    orphans = sorted(set(manifest.orphans).union(gone) - present)
+    if prune:
+        kept = []
+        for rel_path in orphans:
+            if (root / rel_path).exists():
+                # Está en el origen aunque el recorrido no lo registrara: nunca se borra
+                continue
+            try:
+                (dest / rel_path).unlink()
+                stats['removed'] += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo borrar {rel_path} del espejo: {e}")
+                kept.append(rel_path)
+        orphans = kept
+
+    # Tras un recorrido completo se avanza la fecha aunque nada cambiara: las
+    # descargas ya borradas del origen no deben forzar otro en cada pasada
+    if (full_scan or candidates or dirs != manifest.dirs or orphans != manifest.orphans
+            or manifest.source != str(root)):
+        manifest.dirs = dirs
+        manifest.orphans = orphans
+        manifest.source = str(root)
+        manifest.updated = started_at
+        if full_scan:
+            manifest.last_full = started_at
+        manifest.save()
+    return stats
+
+
+def run_mirror(dest: str, tracker: Optional[DownloadTracker] = None, prune: bool = False,
+               full: bool = False) -> int:
+    """
+    Punto de entrada de --mirror.
+
+    Returns:
+        Código de salida
+    """
+    save_base_path = os.getenv("CATLUX_SAVE_PATH")
+    if not save_base_path:
+        print("❌ CATLUX_SAVE_PATH no configurado en .env")
+        return 1
+    root, target = Path(save_base_path).resolve(), Path(dest).resolve()
+    if not root.is_dir():
+        print(f"❌ No existe la carpeta {root}")
+        return 1
+    if target == root or root in target.parents or target in root.parents:
+        print("❌ El destino del espejo no puede estar dentro del origen (ni al revés)")
+        return 1
+
+    started = time.monotonic()
+    stats = mirror(root, target, tracker, prune, full=full)
+    elapsed = time.monotonic() - started
+    mb = stats['bytes'] / (1024 * 1024)
+    print(f"✓ Espejo en {target}: {stats['copied']} PDFs copiados ({mb:.1f} MB), "
+          f"{stats['unchanged']} sin cambios de contenido, {stats['removed']} borrados, "
+          f"{stats['failed']} fallidos ({elapsed:.2f} s)")
+    print(f"   Carpetas: {stats['dirs_listed']} revisadas, {stats['dirs_reused']} sin cambios")
+    logger.info(f"Espejo {target}: {stats} en {elapsed:.2f} s")
+    return 1 if stats['failed'] else 0
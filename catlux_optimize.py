@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Reducción del tamaño de los PDFs descargados (--optimize).
+
+Muchos exámenes son escaneos con flujos mal comprimidos, y el archivo crece
+gigas por curso: copias de seguridad (--mirror), uniones de PDFs y la
+navegación por el NAS se vuelven lentas. optimize_file() reescribe cada PDF:
+
+- Recomprime los flujos Flate al nivel máximo y comprime los que no lo estaban
+- Agrupa los objetos en object streams (PDF 1.5) y quita recursos sin usar
+- Linealiza el resultado (vista rápida en visores web)
+
+Se hace con pikepdf (opcional) o, si no está, con el comando qpdf. Cada
+archivo se procesa en un proceso del pool (es trabajo de CPU) y solo se
+sustituye, de forma atómica, si el resultado sigue siendo un PDF con las
+mismas páginas y ahorra al menos MIN_SAVING; si no, se deja como estaba.
+
+Cada PDF revisado (también los dañados) se anota en OPTIMIZE_FILE con
+clave (inodo, tamaño, mtime) del archivo resultante: en la siguiente pasada
+los ya revisados no se vuelven a abrir, hasta que cambien.
+
+Formato:
+    {"files": {clave: {"path": str, "status": "optimized"|"kept"|"failed", "before": int,
+                       "after": int, "backend": str, "checked": iso}}}
+
+Uso:
+    python catlux_scrapper.py --optimize                 # todo CATLUX_SAVE_PATH
+    python catlux_scrapper.py --optimize --url "..." --dry-run
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catlux_pdfinfo import PdfInfoError, read_pdf_info, stat_key
+from catlux_scrapper import PDF_MAGIC, file_lock, iter_local_pdfs
+
+logger = logging.getLogger(__name__)
+
+# Ahorro mínimo (fracción del tamaño) para sustituir el archivo
+MIN_SAVING = 0.02
+# Cada cuántos archivos se guarda el registro (una interrupción no pierde lo hecho)
+SAVE_EVERY = 50
+QPDF_TIMEOUT_SECONDS = 300
+
+
+class OptimizeError(Exception):
+    """El PDF no se pudo reescribir o el resultado no es válido."""
+
+
+def available_backend() -> Optional[str]:
+    """'pikepdf', 'qpdf' o None si no hay ninguno instalado."""
+    try:
+        import pikepdf  # noqa: F401
+        return "pikepdf"
+    except ImportError:
+        pass
+    return "qpdf" if shutil.which("qpdf") else None
+
+
+def _rewrite_pikepdf(source: Path, dest: Path) -> None:
+    import pikepdf
+
+    try:
+        with pikepdf.open(source) as pdf:
+            pdf.remove_unreferenced_resources()
+            pdf.save(dest, compress_streams=True, recompress_flate=True,
+                     stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                     linearize=True)
+    except pikepdf.PdfError as e:
+        raise OptimizeError(str(e))
+
+
+def _rewrite_qpdf(source: Path, dest: Path) -> None:
+    command = ["qpdf", "--recompress-flate", "--compression-level=9",
+               "--compress-streams=y", "--decode-level=generalized",
+               "--object-streams=generate", "--remove-unreferenced-resources=yes",
+               "--linearize", str(source), str(dest)]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=QPDF_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired as e:
+        raise OptimizeError(str(e))
+    # 3 = terminó con avisos (PDF algo dañado pero reescrito)
+    if result.returncode not in (0, 3):
+        raise OptimizeError(result.stderr.strip() or f"qpdf terminó con código {result.returncode}")
+
+
+_BACKENDS = {"pikepdf": _rewrite_pikepdf, "qpdf": _rewrite_qpdf}
+
+
+def optimize_file(path: str, backend: str, min_saving: float = MIN_SAVING) -> Dict:
+    """
+    Reescribe un PDF y lo sustituye si ahorra espacio (tarea del pool).
+
+    El resultado se escribe junto al original en un .part; solo se renombra
+    sobre el original si empieza por %PDF, tiene las mismas páginas (cuando
+    read_pdf_info() puede leer el original) y es al menos min_saving más pequeño. Se conserva la fecha del original.
+
+    Args:
+        path: Ruta del PDF
+        backend: 'pikepdf' o 'qpdf'
+        min_saving: Ahorro mínimo para sustituir
+
+    Returns:
+        Registro con path, status (optimized, kept o failed), before, after,
+        seconds, error y retry (el fallo no es del PDF: reintentar en otra pasada)
+    """
+    source = Path(path)
+    tmp_path = source.with_name(source.name + ".opt.part")
+    started = time.monotonic()
+    record = {'path': path, 'status': 'failed', 'before': None, 'after': None, 'error': None,
+              'retry': False}
+    try:
+        stat = os.stat(source)
+        record['before'] = record['after'] = stat.st_size
+        _BACKENDS[backend](source, tmp_path)
+
+        with open(tmp_path, 'rb') as f:
+            if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+                raise OptimizeError("el resultado no es un PDF")
+        # Solo se compara si el lector ligero entiende el original; si lo
+        # entiende, el resultado tiene que poder leerse también
+        try:
+            pages_before = read_pdf_info(source)['pages']
+        except PdfInfoError:
+            pages_before = None
+        if pages_before is not None:
+            try:
+                pages_after = read_pdf_info(tmp_path)['pages']
+            except PdfInfoError as e:
+                raise OptimizeError(f"el resultado no se puede leer: {e}")
+            if pages_before != pages_after:
+                raise OptimizeError(f"el resultado tiene {pages_after} páginas en vez de {pages_before}")
+
+        new_size = os.path.getsize(tmp_path)
+        if new_size <= stat.st_size * (1 - min_saving):
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_path, source)
+            record.update(status='optimized', after=new_size)
+        else:
+            record['status'] = 'kept'
+    except OptimizeError as e:
+        record['error'] = str(e)
+    except OSError as e:
+        # Problema del entorno (disco, permisos, qpdf ausente), no del PDF
+        record.update(error=str(e), retry=True)
+    finally:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+    record['seconds'] = time.monotonic() - started
+    return record
+
+
+class OptimizeRecord:
+    """PDFs ya revisados por --optimize, indexados por (inodo, tamaño, mtime)."""
+
+    def __init__(self, record_file: Path):
+        """
+        Args:
+            record_file: Archivo JSON del registro (normalmente OPTIMIZE_FILE)
+        """
+        self.record_file = Path(record_file)
+        self.entries: Dict[str, Dict] = self._read()
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.record_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.warning(f"Error cargando el registro de --optimize: {e}. Creando nuevo.")
+            return {}
+
+    def done(self, path: Path, stat: os.stat_result) -> bool:
+        """Indica si el archivo (tal como está) ya se revisó."""
+        return stat_key(stat, path) in self.entries
+
+    def add(self, result: Dict, backend: str) -> None:
+        """Anota un archivo revisado (con la clave del archivo resultante)."""
+        path = Path(result['path'])
+        stat = os.stat(path)
+        with self._lock:
+            self.entries[stat_key(stat, path)] = {
+                'path': str(path), 'status': result['status'], 'before': result['before'],
+                'after': result['after'], 'backend': backend,
+                'checked': datetime.now().isoformat(timespec='seconds'),
+            }
+            self._changed = True
+
+    def save(self) -> None:
+        """Guarda el registro (escritura atómica; fusiona con otros procesos)."""
+        if not self._changed:
+            return
+        with file_lock(self.record_file):
+            merged = self._read()
+            merged.update(self.entries)
+            self.record_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.record_file.with_name(f"{self.record_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"files": merged}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.record_file)
+        self.entries = merged
+        self._changed = False
+
+
+def pending_files(root: Path, record: OptimizeRecord) -> Tuple[List[Tuple[Path, int]], int]:
+    """
+    PDFs bajo root que aún no se han revisado.
+
+    Returns:
+        Tupla (lista de (ruta, tamaño), número de ya revisados)
+    """
+    pending = []
+    skipped = 0
+    for _, path in sorted(iter_local_pdfs(root), key=lambda item: str(item[1])):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if record.done(path, stat):
+            skipped += 1
+        else:
+            pending.append((path, stat.st_size))
+    return pending, skipped
+
+
+def optimize_tree(root: Path, record: OptimizeRecord, backend: str, workers: int = 0,
+                  pool=None) -> Dict:
+    """
+    Optimiza en un pool de procesos los PDFs pendientes bajo root.
+
+    Args:
+        root: Carpeta a revisar
+        record: Registro de archivos ya revisados
+        backend: 'pikepdf' o 'qpdf'
+        workers: Procesos del pool (0 = uno por núcleo)
+        pool: Pool ya creado (con submit(func, *args)); por defecto un ParsePool
+
+    Returns:
+        Resumen con files, skipped, optimized, kept, failed, before, after,
+        seconds y errors (lista de (ruta, error))
+    """
+    pending, skipped = pending_files(root, record)
+    summary = {'files': len(pending) + skipped, 'skipped': skipped, 'optimized': 0, 'kept': 0,
+               'failed': 0, 'before': 0, 'after': 0, 'seconds': 0.0, 'errors': []}
+    if not pending:
+        return summary
+
+    own_pool = pool is None
+    if own_pool:
+        from catlux_parsepool import ParsePool
+        pool = ParsePool(workers)
+
+    started = time.monotonic()
+    try:
+        futures = [pool.submit(optimize_file, str(path), backend) for path, _ in pending]
+        for n, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            summary[result['status']] += 1
+            if result['status'] == 'failed':
+                summary['errors'].append((result['path'], result['error']))
+                logger.warning(f"No se pudo optimizar {result['path']}: {result['error']}")
+            else:
+                summary['before'] += result['before']
+                summary['after'] += result['after']
+            # También los PDFs dañados: no se reintentan hasta que cambien
+            if not result['retry']:
+                try:
+                    record.add(result, backend)
+                except OSError:
+                    pass
+            if n % SAVE_EVERY == 0:
+                record.save()
+    finally:
+        record.save()
+        if own_pool:
+            pool.shutdown()
+    summary['seconds'] = time.monotonic() - started
+    return summary
+
+
+def run_optimize(root: Path, record_file: Path, dry_run: bool = False) -> int:
+    """
+    Punto de entrada de --optimize.
+
+    Returns:
+        Código de salida
+    """
+    root = Path(root)
+    if not root.is_dir():
+        print(f"❌ No existe la carpeta {root}")
+        return 1
+    record = OptimizeRecord(record_file)
+
+    if dry_run:
+        pending, skipped = pending_files(root, record)
+        mb = sum(size for _, size in pending) / (1024 * 1024)
+        print(f"🔍 {len(pending)} PDFs por revisar ({mb:.1f} MB), {skipped} ya revisados")
+        return 0
+
+    backend = available_backend()
+    if backend is None:
+        print("❌ --optimize necesita pikepdf (pip install pikepdf) o el comando qpdf")
+        return 1
+
+    summary = optimize_tree(root, record, backend)
+    saved = summary['before'] - summary['after']
+    mb_saved = saved / (1024 * 1024)
+    percent = 100 * saved / summary['before'] if summary['before'] else 0.0
+    print(f"\n🗜️  {root} ({backend})")
+    print(f"   PDFs: {summary['files']} · ya revisados: {summary['skipped']} · "
+          f"reducidos: {summary['optimized']} · sin mejora: {summary['kept']} · "
+          f"fallidos: {summary['failed']}")
+    print(f"   Ahorro: {mb_saved:.1f} MB ({percent:.0f}%) en {summary['seconds']:.1f} s")
+    for path, error in summary['errors'][:10]:
+        print(f"   ⚠️  {path}: {error}")
+    logger.info(f"--optimize {root}: {summary['optimized']} reducidos, {saved} bytes ahorrados "
+                f"en {summary['seconds']:.1f} s")
+    return 1 if summary['failed'] else 0
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Salida legible por máquina (--format) y selección no interactiva (--select).
+
+Preview, estado (--info) e historial (--latest) pueden emitirse como json,
+jsonl o csv en stdout; los mensajes para humanos van a stderr (logging) para
+no mezclarse con los datos. Las filas se escriben una a una a medida que se
+generan, sin construir el documento completo en memoria.
+
+--select elige sin preguntar qué descargar del mismo listado del preview, de
+modo que un pipeline hace preview + descarga con una sola petición de listado.
+Los términos se separan por comas y se combinan con Y lógico:
+
+    new | local | all          estado local
+    nodup                      sin posibles duplicados de documentos locales (≈)
+    exam | solution            tipo de archivo
+    type=Schulaufgabe          tipo de documento (subcadena, sin mayúsculas)
+    id=119215                  ID del documento
+    ref>=3400 (>, <, <=, =)    número de referencia
+    year=2023 | author=Meier   curso escolar / autor (con --details, subcadena)
+    pages<=4 (>, <, >=, =)     número de páginas (con --details)
+
+Uso:
+    python catlux_scrapper.py --url "..." --format jsonl                 # solo preview
+    python catlux_scrapper.py --url "..." --format csv --select new      # preview + descarga
+    python catlux_scrapper.py --url "..." --select "type=Schulaufgabe,ref>=3400"
+    python catlux_scrapper.py --info --format json
+"""
+
+import csv
+import json
+import operator
+import re
+import sys
+from datetime import date
+from typing import IO, Callable, Dict, Iterable, List, Optional, Sequence
+
+from catlux_scrapper import DOWNLOADS_PER_MONTH, DownloadTracker, extract_ref_number
+
+FORMATS = ("json", "jsonl", "csv")
+
+PREVIEW_FIELDS = ('index', 'name', 'doc_id', 'doc_number', 'ref', 'doc_type', 'doc_title',
+                  'is_solution', 'is_local', 'local_path', 'duplicate_of', 'similarity', 'size',
+                  'school_year', 'pages', 'author', 'uploaded', 'selected', 'full_url')
+STATUS_FIELDS = ('month', 'downloads_this_month', 'limit', 'remaining', 'total_all_time')
+HISTORY_FIELDS = ('date', 'filename')
+
+_REF_RE = re.compile(r"^ref\s*(>=|<=|>|<|=)\s*#?(\d+)$")
+_PAGES_RE = re.compile(r"^pages\s*(>=|<=|>|<|=)\s*(\d+)$")
+_REF_OPS = {'>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt, '=': operator.eq}
+
+
+class RecordWriter:
+    """Escribe registros en json, jsonl o csv según llegan."""
+
+    def __init__(self, fmt: str, fields: Sequence[str], stream: Optional[IO[str]] = None):
+        """
+        Args:
+            fmt: "json", "jsonl" o "csv"
+            fields: Campos de cada registro (orden de las columnas en csv)
+            stream: Destino (por defecto sys.stdout)
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt}")
+        self.fmt = fmt
+        self.fields = fields
+        self.stream = stream or sys.stdout
+        self.count = 0
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self.stream, fieldnames=list(fields), extrasaction='ignore')
+            self._csv.writeheader()
+        elif fmt == "json":
+            self.stream.write("[")
+
+    def write(self, record: Dict) -> None:
+        """Escribe un registro."""
+        if self._csv is not None:
+            self._csv.writerow({k: "" if record.get(k) is None else record.get(k) for k in self.fields})
+        else:
+            line = json.dumps({k: record.get(k) for k in self.fields}, ensure_ascii=False, default=str)
+            if self.fmt == "json":
+                self.stream.write(("," if self.count else "") + "\n  " + line)
+            else:
+                self.stream.write(line + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        """Cierra el documento (json) y vacía el buffer."""
+        if self.fmt == "json":
+            self.stream.write("\n]\n" if self.count else "]\n")
+        self.stream.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def parse_select(expr: str) -> Callable[[Dict], bool]:
+    """
+    Convierte una expresión de --select en un predicado sobre PDFs.
+
+    Args:
+        expr: Términos separados por comas (ver docstring del módulo)
+
+    Returns:
+        Función pdf -> bool
+
+    Raises:
+        ValueError: Si algún término no es válido
+    """
+    checks: List[Callable[[Dict], bool]] = []
+    for term in (t.strip() for t in expr.split(",")):
+        lowered = term.lower()
+        if not term or lowered == "all":
+            continue
+        if lowered == "new":
+            checks.append(lambda p: not p.get('is_local', False))
+        elif lowered == "local":
+            checks.append(lambda p: p.get('is_local', False))
+        elif lowered == "nodup":
+            checks.append(lambda p: not p.get('duplicate_of'))
+        elif lowered == "exam":
+            checks.append(lambda p: not p['is_solution'])
+        elif lowered == "solution":
+            checks.append(lambda p: p['is_solution'])
+        elif lowered.startswith("type="):
+            wanted = lowered[len("type="):].strip()
+            checks.append(lambda p, w=wanted: w in p.get('doc_type', '').lower())
+        elif lowered.startswith("year="):
+            wanted = lowered[len("year="):].strip()
+            checks.append(lambda p, w=wanted: w in str(p.get('school_year') or '').lower())
+        elif lowered.startswith("author="):
+            wanted = lowered[len("author="):].strip()
+            checks.append(lambda p, w=wanted: w in str(p.get('author') or '').lower())
+        elif lowered.startswith("id="):
+            wanted = term[len("id="):].strip()
+            checks.append(lambda p, w=wanted: p['doc_id'] == w)
+        else:
+            match = _REF_RE.match(lowered) or _PAGES_RE.match(lowered)
+            if not match:
+                raise ValueError(f"Término de --select no válido: '{term}'")
+            op, value = _REF_OPS[match.group(1)], int(match.group(2))
+            if match.re is _PAGES_RE:
+                checks.append(lambda p, op=op, v=value: p.get('pages') is not None and op(p['pages'], v))
+            else:
+                checks.append(lambda p, op=op, v=value: op(extract_ref_number(p), v))
+    return lambda pdf: all(check(pdf) for check in checks)
+
+
+def select_indices(pdfs: List[Dict], expr: str) -> List[int]:
+    """Índices (0-basado) de los PDFs que cumplen la expresión de --select."""
+    predicate = parse_select(expr)
+    return [i for i, pdf in enumerate(pdfs) if predicate(pdf)]
+
+
+def preview_records(pdfs: Iterable[Dict], selected: Iterable[int] = ()) -> Iterable[Dict]:
+    """Registros del preview (índice 1-basado, como en la tabla de texto)."""
+    selected = set(selected)
+    for i, pdf in enumerate(pdfs):
+        ref = extract_ref_number(pdf)
+        yield dict(pdf, index=i + 1, ref=None if ref == 999999 else ref,
+                   is_local=pdf.get('is_local', False), selected=i in selected)
+
+
+def write_preview(pdfs: List[Dict], fmt: str, selected: Iterable[int] = (),
+                  stream: Optional[IO[str]] = None) -> None:
+    """Emite el preview (ya ordenado) en formato máquina."""
+    with RecordWriter(fmt, PREVIEW_FIELDS, stream) as writer:
+        for record in preview_records(pdfs, selected):
+            writer.write(record)
+
+
+def status_record(tracker: DownloadTracker) -> Dict:
+    """Estado del tracker (equivalente a print_status) como un registro."""
+    today = date.today()
+    return {
+        'month': f"{today.year}-{today.month:02d}",
+        'downloads_this_month': tracker.get_current_month_downloads(),
+        'limit': DOWNLOADS_PER_MONTH,
+        'remaining': tracker.get_remaining_downloads(),
+        'total_all_time': tracker.data.get("total_all_time", 0),
+    }
+
+
+def write_status(tracker: DownloadTracker, fmt: str, stream: Optional[IO[str]] = None) -> None:
+    """Emite el estado del tracker como un registro."""
+    with RecordWriter(fmt, STATUS_FIELDS, stream) as writer:
+        writer.write(status_record(tracker))
+
+
+def write_history(tracker: DownloadTracker, fmt: str, stream: Optional[IO[str]] = None) -> None:
+    """Emite el historial completo de descargas, más recientes primero."""
+    with RecordWriter(fmt, HISTORY_FIELDS, stream) as writer:
+        for download in reversed(tracker.data.get("downloads", [])):
+            writer.write(download)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Parsing de páginas de listado en otros procesos (--parse-workers).
+
+Con los listados pedidos en paralelo (motor async, mapa del sitio, --plan con
+varias categorías) la red deja de ser el cuello de botella y lo pasa a ser
+BeautifulSoup: todo el parsing corre en un solo núcleo por el GIL.
+parse_listing_page() ya es una función pura (HTML en bytes → registros), así
+que ParsePool la ejecuta en un ProcessPoolExecutor (o en un
+InterpreterPoolExecutor, Python 3.14+, con kind="interpreter"):
+
+- Cada página se envía al pool en cuanto llega; quien la pidió espera solo su
+  resultado (un hilo de descarga bloqueado en el futuro no retiene el GIL)
+- map_pages() devuelve los registros en el orden de las páginas aunque
+  terminen en otro orden
+
+El pool se activa para todo el proceso con set_parse_pool() (ver
+parse_listing() en catlux_scrapper.py); sin él se parsea en el propio hilo,
+que para un único listado pequeño sigue siendo lo más rápido.
+
+Uso:
+    python catlux_scrapper.py --plan URL1 URL2 URL3 --parse-workers 4
+    python catlux_scrapper.py --url "..." --engine async --parse-workers 0   # auto: un proceso por núcleo
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Páginas por envío en map_pages(): menos viajes entre procesos
+MAP_CHUNKSIZE = 4
+
+
+def _parse_page(content: bytes, base_url: str) -> List[Dict]:
+    """Tarea del pool (importa catlux_scrapper en el proceso hijo)."""
+    from catlux_scrapper import parse_listing_page
+    return parse_listing_page(content, base_url)
+
+
+def _new_executor(workers: int, kind: str) -> Executor:
+    if kind == "interpreter":
+        try:
+            from concurrent.futures import InterpreterPoolExecutor
+            return InterpreterPoolExecutor(max_workers=workers)
+        except ImportError:
+            logger.warning("InterpreterPoolExecutor necesita Python 3.14; se usan procesos")
+    # forkserver: no hereda los hilos del padre (logging, prefetch) a mitad de un bloqueo
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+class ParsePool:
+    """Pool de procesos (o intérpretes) para parsear listados."""
+
+    def __init__(self, workers: int = 0, kind: str = "process"):
+        """
+        Args:
+            workers: Procesos del pool (0 = uno por núcleo)
+            kind: "process" o "interpreter"
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.kind = kind
+        self.executor = _new_executor(self.workers, kind)
+
+    def submit(self, func: Callable, *args) -> Future:
+        """Envía una tarea (func debe ser una función de módulo, serializable)."""
+        return self.executor.submit(func, *args)
+
+    def submit_page(self, content: bytes, base_url: str) -> Future:
+        """Envía una página de listado; el futuro da sus registros."""
+        return self.executor.submit(_parse_page, content, base_url)
+
+    def parse(self, content: bytes, base_url: str) -> List[Dict]:
+        """parse_listing_page() en el pool; bloquea solo al hilo que llama."""
+        return self.submit_page(content, base_url).result()
+
+    def map_pages(self, pages: Iterable[bytes], base_url: str) -> Iterator[List[Dict]]:
+        """Registros de cada página, en el orden de las páginas."""
+        return self.executor.map(_parse_page, pages, repeat(base_url), chunksize=MAP_CHUNKSIZE)
+
+    def shutdown(self) -> None:
+        """Detiene los procesos del pool."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+def start_parse_pool(workers: int = 0, kind: str = "process") -> Optional[ParsePool]:
+    """
+    Crea el pool y lo activa para todo el proceso (se detiene al salir).
+
+    Returns:
+        Pool activo, o None si no se pudo crear (se parsea en el propio hilo)
+    """
+    import atexit
+
+    from catlux_scrapper import set_parse_pool
+
+    try:
+        pool = ParsePool(workers, kind)
+    except (OSError, ValueError, NotImplementedError) as e:
+        logger.warning(f"No se pudo crear el pool de parsing ({e}); se parsea en el propio proceso")
+        return None
+    set_parse_pool(pool)
+    atexit.register(pool.shutdown)
+    logger.debug(f"Pool de parsing: {pool.workers} {pool.kind}")
+    return pool
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Número de páginas y metadatos de PDFs locales sin parsearlos enteros (--pdf-info).
+
+Para saber cuántas páginas en blanco hacen falta al unir PDFs (ver
+add_blank_page_if_needed en MergePDFs.ipynb) o cuántas hojas ocupa un lote no
+hace falta cargar cada PDF con PyPDF2: basta con leer la tabla xref desde el
+final del archivo, el trailer, el catálogo (/Root), la raíz del árbol de
+páginas (/Pages /Count) y el diccionario /Info (título y productor).
+
+El archivo se abre con mmap y solo se tocan esas pocas zonas. Se soportan:
+- tablas xref clásicas y actualizaciones incrementales (cadena /Prev)
+- xref streams (PDF 1.5+, con predictores PNG) y archivos híbridos (/XRefStm)
+- objetos dentro de object streams (/ObjStm)
+
+Si la xref está dañada se busca la raíz de páginas por expresión regular.
+
+Los resultados se guardan en PDFINFO_CACHE_FILE con clave (inodo, tamaño,
+mtime): un archivo que no ha cambiado no se vuelve a abrir, así que repasar
+decenas de miles de PDFs ya vistos lleva segundos.
+
+Uso:
+    python catlux_scrapper.py --pdf-info                      # todo CATLUX_SAVE_PATH
+    python catlux_scrapper.py --pdf-info --url "..." --format csv
+"""
+
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from catlux_scrapper import file_lock
+
+logger = logging.getLogger(__name__)
+
+PDFINFO_FIELDS = ('path', 'pages', 'title', 'producer', 'size', 'error')
+PDFINFO_WORKERS = 8
+STARTXREF_WINDOW = 4096
+
+_WHITESPACE = b" \t\r\n\x0c\x00"
+_DELIMITERS = b"()<>[]{}/%"
+_REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R(?![^\s()<>\[\]{}/%])")
+_NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_OBJ_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_XREF_ENTRY_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+([nf])")
+_SUBSECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_PAGES_COUNT_RE = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+
+
+class PdfInfoError(Exception):
+    """El archivo no es un PDF legible."""
+
+
+class Ref(NamedTuple):
+    """Referencia indirecta 'num gen R'."""
+    num: int
+    gen: int
+
+
+class Name(str):
+    """Nombre PDF (/Type -> Name('Type'))."""
+
+
+# ----------------------------------------------------------------------
+# Parser mínimo de objetos PDF
+# ----------------------------------------------------------------------
+
+def _skip_ws(buf, pos: int) -> int:
+    size = len(buf)
+    while pos < size:
+        c = buf[pos:pos + 1]
+        if c == b"%":
+            while pos < size and buf[pos:pos + 1] not in (b"\r", b"\n"):
+                pos += 1
+        elif c in _WHITESPACE:
+            pos += 1
+        else:
+            break
+    return pos
+
+
+def _read_name(buf, pos: int) -> Tuple[Name, int]:
+    end = pos + 1
+    while end < len(buf) and buf[end:end + 1] not in _WHITESPACE and buf[end:end + 1] not in _DELIMITERS:
+        end += 1
+    raw = bytes(buf[pos + 1:end])
+    if b"#" in raw:
+        raw = re.sub(rb"#([0-9A-Fa-f]{2})", lambda m: bytes([int(m.group(1), 16)]), raw)
+    return Name(raw.decode('latin-1')), end
+
+
+_ESCAPES = {ord('n'): b"\n", ord('r'): b"\r", ord('t'): b"\t", ord('b'): b"\b", ord('f'): b"\f",
+            ord('('): b"(", ord(')'): b")", ord('\\'): b"\\"}
+
+
+def _read_literal_string(buf, pos: int) -> Tuple[bytes, int]:
+    out = bytearray()
+    depth = 1
+    pos += 1
+    while pos < len(buf):
+        c = buf[pos]
+        if c == 0x5C:  # barra invertida
+            pos += 1
+            e = buf[pos]
+            if e in _ESCAPES:
+                out += _ESCAPES[e]
+            elif 0x30 <= e <= 0x37:
+                digits = bytes(buf[pos:pos + 3])
+                n = len(digits) - len(digits.lstrip(b"01234567"))
+                out.append(int(digits[:n], 8) & 0xFF)
+                pos += n - 1
+            elif e == 0x0D:
+                if buf[pos + 1:pos + 2] == b"\n":
+                    pos += 1
+            elif e != 0x0A:
+                out.append(e)
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return bytes(out), pos + 1
+            out.append(c)
+        else:
+            out.append(c)
+        pos += 1
+    raise PdfInfoError("Cadena sin cerrar")
+
+
+def parse_value(buf, pos: int):
+    """
+    Lee un objeto PDF directo empezando en pos.
+
+    Returns:
+        Tupla (valor, posición siguiente). Diccionarios -> dict con claves str,
+        arrays -> list, nombres -> Name, cadenas -> bytes, referencias -> Ref
+    """
+    pos = _skip_ws(buf, pos)
+    head = bytes(buf[pos:pos + 2])
+    if head == b"<<":
+        result = {}
+        pos += 2
+        while True:
+            pos = _skip_ws(buf, pos)
+            if buf[pos:pos + 2] == b">>":
+                return result, pos + 2
+            if buf[pos:pos + 1] != b"/":
+                raise PdfInfoError(f"Clave de diccionario no válida en {pos}")
+            key, pos = _read_name(buf, pos)
+            result[str(key)], pos = parse_value(buf, pos)
+    c = head[:1]
+    if c == b"[":
+        items = []
+        pos += 1
+        while True:
+            pos = _skip_ws(buf, pos)
+            if buf[pos:pos + 1] == b"]":
+                return items, pos + 1
+            item, pos = parse_value(buf, pos)
+            items.append(item)
+    if c == b"/":
+        return _read_name(buf, pos)
+    if c == b"(":
+        return _read_literal_string(buf, pos)
+    if c == b"<":
+        end = buf.find(b">", pos)
+        digits = re.sub(rb"\s", b"", bytes(buf[pos + 1:end]))
+        return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode('ascii')), end + 1
+    match = _REF_RE.match(buf, pos)
+    if match:
+        return Ref(int(match.group(1)), int(match.group(2))), match.end()
+    match = _NUMBER_RE.match(buf, pos)
+    if match:
+        text = match.group(0)
+        return (float(text) if b"." in text else int(text)), match.end()
+    for keyword, value in ((b"true", True), (b"false", False), (b"null", None)):
+        if buf[pos:pos + len(keyword)] == keyword:
+            return value, pos + len(keyword)
+    raise PdfInfoError(f"Token no válido en {pos}")
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """Deshace los predictores PNG (Predictor >= 10) fila a fila."""
+    row_size = columns + 1
+    out = bytearray()
+    prev = bytearray(columns)
+    for start in range(0, len(data) - columns, row_size):
+        kind, row = data[start], bytearray(data[start + 1:start + row_size])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + prev[i]) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + prev[i]) // 2) & 0xFF
+            elif kind == 4:
+                up_left = prev[i - 1] if i else 0
+                p = left + prev[i] - up_left
+                pa, pb, pc = abs(p - left), abs(p - prev[i]), abs(p - up_left)
+                row[i] = (row[i] + (left if pa <= pb and pa <= pc else prev[i] if pb <= pc else up_left)) & 0xFF
+        out += row
+        prev = row
+    return bytes(out)
+
+
+class _PdfReader:
+    """Acceso perezoso a los objetos de un PDF a través de su xref."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.offsets: Dict[int, Tuple] = {}
+        self.trailer: Dict = {}
+        self._objstm: Dict[int, Tuple[bytes, List[int], int]] = {}
+        self._load_xref()
+
+    # xref ------------------------------------------------------------
+
+    def _load_xref(self) -> None:
+        window = max(0, len(self.buf) - STARTXREF_WINDOW)
+        pos = self.buf.rfind(b"startxref", window)
+        match = _STARTXREF_RE.match(self.buf, pos) if pos >= 0 else None
+        if not match:
+            raise PdfInfoError("Sin startxref")
+
+        pending, seen = [int(match.group(1))], set()
+        while pending:
+            offset = pending.pop(0)
+            if offset in seen or not 0 <= offset < len(self.buf):
+                continue
+            seen.add(offset)
+            start = _skip_ws(self.buf, offset)
+            if self.buf[start:start + 4] == b"xref":
+                trailer = self._read_xref_table(start + 4)
+            else:
+                trailer = self._read_xref_stream(start)
+            # La sección más reciente manda: solo se completan huecos
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            if isinstance(trailer.get('XRefStm'), int):
+                pending.insert(0, trailer['XRefStm'])
+            if isinstance(trailer.get('Prev'), int):
+                pending.append(trailer['Prev'])
+
+    def _read_xref_table(self, pos: int) -> Dict:
+        buf = self.buf
+        while True:
+            pos = _skip_ws(buf, pos)
+            if buf[pos:pos + 7] == b"trailer":
+                trailer, _ = parse_value(buf, pos + 7)
+                return trailer
+            match = _SUBSECTION_RE.match(buf, pos)
+            if not match:
+                raise PdfInfoError("Tabla xref no válida")
+            first, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            for num in range(first, first + count):
+                entry = _XREF_ENTRY_RE.match(buf, pos)
+                if not entry:
+                    raise PdfInfoError("Entrada xref no válida")
+                pos = entry.end()
+                if entry.group(3) == b"n":
+                    self.offsets.setdefault(num, ('o', int(entry.group(1))))
+
+    def _read_xref_stream(self, pos: int) -> Dict:
+        info, data = self._read_indirect(pos, want_stream=True)
+        if not isinstance(info, dict) or info.get('Type') != 'XRef':
+            raise PdfInfoError("startxref no apunta a una xref")
+        widths = info['W']
+        index = info.get('Index', [0, info['Size']])
+        pos = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for num in range(first, first + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[pos:pos + width], 'big'))
+                    pos += width
+                kind = fields[0] if widths[0] else 1
+                if kind == 1:
+                    self.offsets.setdefault(num, ('o', fields[1]))
+                elif kind == 2:
+                    self.offsets.setdefault(num, ('s', fields[1], fields[2]))
+        if pos > len(data):
+            raise PdfInfoError("xref stream truncada")
+        return info
+
+    # objetos ---------------------------------------------------------
+
+    def _read_indirect(self, offset: int, want_stream: bool = False):
+        match = _OBJ_RE.match(self.buf, offset)
+        if not match:
+            raise PdfInfoError(f"No hay objeto en {offset}")
+        value, pos = parse_value(self.buf, match.end())
+        if not want_stream:
+            return value, None
+        pos = _skip_ws(self.buf, pos)
+        if self.buf[pos:pos + 6] != b"stream":
+            raise PdfInfoError("Se esperaba un stream")
+        pos += 6
+        if self.buf[pos:pos + 2] == b"\r\n":
+            pos += 2
+        elif self.buf[pos:pos + 1] in (b"\n", b"\r"):
+            pos += 1
+        length = self.resolve(value.get('Length'))
+        if not isinstance(length, int) or self.buf[pos + length:pos + length + 20].find(b"endstream") < 0:
+            length = self.buf.find(b"endstream", pos) - pos
+        return value, self._decode(value, bytes(self.buf[pos:pos + length]))
+
+    def _decode(self, info: Dict, data: bytes) -> bytes:
+        filters = info.get('Filter') or []
+        params = info.get('DecodeParms') or {}
+        if not isinstance(filters, list):
+            filters, params = [filters], [params]
+        elif not isinstance(params, list):
+            params = [params]
+        for i, name in enumerate(filters):
+            if name != 'FlateDecode':
+                raise PdfInfoError(f"Filtro no soportado: {name}")
+            data = zlib.decompress(data)
+            parms = self.resolve(params[i]) if i < len(params) and params[i] else {}
+            if parms.get('Predictor', 1) >= 10:
+                data = _png_unpredict(data, parms.get('Columns', 1))
+        return data
+
+    def get_object(self, num: int):
+        entry = self.offsets.get(num)
+        if entry is None:
+            return None
+        if entry[0] == 'o':
+            return self._read_indirect(entry[1])[0]
+
+        stream_num, index = entry[1], entry[2]
+        if stream_num not in self._objstm:
+            info, data = self._read_indirect(self.offsets[stream_num][1], want_stream=True)
+            header = [int(n) for n in data[:info['First']].split()]
+            self._objstm[stream_num] = (data, header, info['First'])
+        data, header, first = self._objstm[stream_num]
+        return parse_value(data, first + header[2 * index + 1])[0]
+
+    def resolve(self, value, depth: int = 0):
+        while isinstance(value, Ref) and depth < 32:
+            value = self.get_object(value.num)
+            depth += 1
+        return value
+
+
+def _decode_text(value) -> Optional[str]:
+    """Cadena de texto PDF -> str (UTF-16 con BOM, UTF-8 con BOM o PDFDocEncoding aprox.)."""
+    if not isinstance(value, bytes):
+        return None
+    if value.startswith(b"\xfe\xff"):
+        text = value[2:].decode('utf-16-be', errors='replace')
+    elif value.startswith(b"\xef\xbb\xbf"):
+        text = value[3:].decode('utf-8', errors='replace')
+    else:
+        text = value.decode('latin-1')
+    return text.strip("\x00 ") or None
+
+
+def read_pdf_info(path: Path) -> Dict:
+    """
+    Páginas, título y productor de un PDF.
+
+    Returns:
+        Diccionario con 'pages', 'title' y 'producer' (los dos últimos pueden ser None)
+
+    Raises:
+        PdfInfoError: Si el archivo no es un PDF o no se encuentra el árbol de páginas
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise PdfInfoError("Archivo vacío")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf.find(b"%PDF", 0, 1024) < 0:
+                raise PdfInfoError("No es un PDF")
+            try:
+                reader = _PdfReader(buf)
+                root = reader.resolve(reader.trailer['Root'])
+                pages = reader.resolve(reader.resolve(root['Pages'])['Count'])
+                info = reader.resolve(reader.trailer.get('Info')) or {}
+                return {
+                    'pages': int(pages),
+                    'title': _decode_text(reader.resolve(info.get('Title'))),
+                    'producer': _decode_text(reader.resolve(info.get('Producer'))),
+                }
+            except (PdfInfoError, KeyError, IndexError, TypeError, ValueError, AttributeError, zlib.error) as e:
+                logger.debug(f"xref ilegible en {path} ({e}); se busca /Pages directamente")
+                counts = [int(a or b) for a, b in _PAGES_COUNT_RE.findall(buf)]
+                if not counts:
+                    raise PdfInfoError(f"No se encontró el árbol de páginas ({e})")
+                return {'pages': max(counts), 'title': None, 'producer': None}
+
+
+# ----------------------------------------------------------------------
+# Caché persistente
+# ----------------------------------------------------------------------
+
+def stat_key(stat: os.stat_result, path: Path) -> str:
+    """Identidad de un archivo tal como está: (inodo, tamaño, mtime)."""
+    # Sin inodo fiable (algunos SMB/Windows devuelven 0) se usa la ruta
+    identity = stat.st_ino or str(path)
+    return f"{identity}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class PdfInfoCache:
+    """Metadatos de PDFs indexados por (inodo, tamaño, mtime), persistidos en JSON."""
+
+    def __init__(self, cache_file: Path):
+        """
+        Args:
+            cache_file: Archivo JSON de la caché (normalmente PDFINFO_CACHE_FILE)
+        """
+        self.cache_file = Path(cache_file)
+        self.entries: Dict[str, Dict] = self._read()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("files", {})
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.warning(f"Error cargando caché de metadatos: {e}. Creando nueva.")
+            return {}
+
+    def save(self, removed: Iterable[str] = ()) -> None:
+        """
+        Guarda la caché (escritura atómica; fusiona con lo que guardaron otros procesos).
+
+        Args:
+            removed: Claves a retirar también del archivo
+        """
+        with file_lock(self.cache_file):
+            merged = self._read()
+            merged.update(self.entries)
+            for key in removed:
+                merged.pop(key, None)
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"files": merged}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+        self.entries = merged
+
+    def info(self, path: Path, stat: Optional[os.stat_result] = None) -> Dict:
+        """
+        Metadatos de un PDF (de la caché si no ha cambiado).
+
+        Returns:
+            Registro con path, pages, title, producer, size y error (None si se leyó bien)
+        """
+        stat = stat or os.stat(path)
+        key = stat_key(stat, path)
+        entry = self.entries.get(key)
+        if entry is None:
+            try:
+                entry = dict(read_pdf_info(path), error=None)
+            except (PdfInfoError, OSError) as e:
+                entry = {'pages': None, 'title': None, 'producer': None, 'error': str(e)}
+            with self._lock:
+                self.misses += 1
+                self.entries[key] = entry
+        else:
+            with self._lock:
+                self.hits += 1
+        return dict(entry, path=str(path), size=stat.st_size)
+
+    def scan(self, root: Path, workers: int = PDFINFO_WORKERS) -> List[Dict]:
+        """
+        Metadatos de todos los PDFs bajo root (sin carpetas ocultas), ordenados por ruta.
+
+        Los archivos que no están en la caché se leen en paralelo. Al terminar
+        se retiran de la caché las entradas de archivos bajo root que ya no
+        existen o cambiaron, y se guarda.
+        """
+        root = Path(root)
+        found = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.endswith('.pdf'):
+                    path = Path(dirpath) / filename
+                    found.append((path, path.stat()))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            records = list(pool.map(lambda item: self.info(*item), found))
+
+        # is_relative_to y no startswith: klasse-1 no debe retirar las entradas de klasse-10
+        live = {stat_key(stat, path) for path, stat in found}
+        stale = [key for key, entry in self.entries.items()
+                 if key not in live and Path(entry.get('path', '')).is_relative_to(root)]
+        for key in stale:
+            del self.entries[key]
+        for (path, stat), record in zip(found, records):
+            self.entries[stat_key(stat, path)]['path'] = str(path)
+
+        if self.misses or stale:
+            self.save(stale)
+        return records
+
+
+def booklet_summary(records: List[Dict]) -> Dict[str, int]:
+    """
+    Totales para imprimir a doble cara: cada PDF se rellena hasta un número par
+    de páginas (como add_blank_page_if_needed).
+    """
+    readable = [r for r in records if r.get('pages')]
+    pages = sum(r['pages'] for r in readable)
+    odd = sum(1 for r in readable if r['pages'] % 2)
+    return {
+        'files': len(records),
+        'unreadable': len(records) - len(readable),
+        'pages': pages,
+        'odd': odd,
+        'padded_pages': pages + odd,
+        'sheets': math.ceil((pages + odd) / 2),
+    }
+
+
+def run_pdf_info(root: Path, cache_file: Path, fmt: str = "text") -> int:
+    """
+    Punto de entrada de --pdf-info.
+
+    Args:
+        root: Carpeta a revisar
+        cache_file: Archivo de la caché
+        fmt: "text" (resumen) o json/jsonl/csv (un registro por PDF en stdout)
+
+    Returns:
+        Código de salida
+    """
+    import time
+
+    if not Path(root).is_dir():
+        print(f"❌ No existe la carpeta {root}")
+        return 1
+
+    started = time.monotonic()
+    cache = PdfInfoCache(cache_file)
+    records = cache.scan(root)
+    elapsed = time.monotonic() - started
+    logger.info(f"--pdf-info {root}: {len(records)} PDFs en {elapsed:.1f} s "
+                f"({cache.hits} de caché, {cache.misses} leídos)")
+
+    if fmt != "text":
+        import catlux_output
+        with catlux_output.RecordWriter(fmt, PDFINFO_FIELDS) as writer:
+            for record in records:
+                writer.write(record)
+        return 0
+
+    summary = booklet_summary(records)
+    print(f"\n📄 {root}")
+    print(f"   PDFs: {summary['files']} · páginas: {summary['pages']} · "
+          f"con páginas impares: {summary['odd']}")
+    print(f"   Impresión a doble cara: {summary['padded_pages']} páginas ({summary['sheets']} hojas)")
+    if summary['unreadable']:
+        print(f"   ⚠️  {summary['unreadable']} archivos ilegibles:")
+        for record in (r for r in records if r['error']):
+            print(f"      {record['path']}: {record['error']}")
+    print(f"   ({cache.hits} de caché, {cache.misses} leídos en {elapsed:.1f} s)")
+    return 0
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Planificador de descargas según el saldo mensual.
+
+En vez de gastar la cuota por orden de REF y cortar en seco con "Límite
+alcanzado" (a veces dejando un examen sin su solución), el planificador decide
+ANTES de descargar nada qué documentos caben, con estas reglas por orden:
+
+1. Pares completos: examen y solución se planifican juntos o no se planifican
+2. Tipo de documento preferido (Schulaufgabe > Extemporale > Kurzarbeit > ...)
+3. Más nuevos primero (REF más alta)
+4. Reparto justo entre asignaturas (turnos dentro de cada tipo)
+
+Uso:
+    python catlux_scrapper.py --plan URL1 URL2 ... --dry-run   # solo mostrar el plan
+    python catlux_scrapper.py --plan URL1 URL2 ...             # ejecutar el plan
+    python catlux_scrapper.py --plan URL1 URL2 ... --skip-duplicates
+
+Con --skip-duplicates los posibles duplicados de documentos ya locales
+(catlux_dedup.py) se omiten antes de repartir el saldo.
+"""
+
+import logging
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+from urllib.parse import urljoin
+
+from catlux_catalog import Catalog, probe_listing
+from catlux_dedup import check_duplicates
+from catlux_details import DetailCache, enrich_details
+from catlux_scrapper import (
+    CATALOG_FILE,
+    DEDUP_FILE,
+    DETAILS_FILE,
+    QUEUE_FILE,
+    SITEMAP_FILE,
+    TRACKER_FILE,
+    DownloadTracker,
+    PDFManager,
+    extract_category_path,
+    extract_ref_number,
+    get_credentials,
+    get_site_root,
+    login_to_catlux,
+    mark_local_files,
+    new_session,
+    run_download_jobs,
+)
+from catlux_sitemap import check_category, load_sitemap
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# Categorías listadas a la vez en run_plan()
+LISTING_WORKERS = 4
+
+# Orden de preferencia de tipos (coincidencia por subcadena, sin mayúsculas)
+DOC_TYPE_PRIORITY = (
+    "schulaufgabe",
+    "extemporale",
+    "kurzarbeit",
+    "test",
+    "aufsatz",
+    "arbeitsblatt",
+    "grammatik",
+)
+
+
+def doc_type_rank(doc_type: str, priority: Sequence[str] = DOC_TYPE_PRIORITY) -> int:
+    """Posición del tipo en la lista de preferencia (los desconocidos van al final)."""
+    doc_type = (doc_type or "").lower()
+    for rank, name in enumerate(priority):
+        if name in doc_type:
+            return rank
+    return len(priority)
+
+
+def category_of(pdf: Dict) -> str:
+    """Categoría (klasse/asignatura) de un PDF, usada para el reparto justo."""
+    return pdf.get('category') or "-"
+
+
+class DownloadPlan:
+    """Resultado del planificador: documentos elegidos y omitidos."""
+
+    def __init__(self, remaining: int):
+        self.remaining = remaining
+        self.selected: List[Dict] = []
+        self.skipped: List[Dict] = []
+
+    @property
+    def cost(self) -> int:
+        """Descargas que consumirá el plan."""
+        return sum(unit['cost'] for unit in self.selected)
+
+    @property
+    def pdfs(self) -> List[Dict]:
+        """PDFs a descargar, en el orden del plan (examen seguido de su solución)."""
+        return [pdf for unit in self.selected for pdf in unit['pdfs']]
+
+    @property
+    def pages(self) -> int:
+        """Páginas a imprimir del plan (solo las conocidas, ver --details)."""
+        return sum(pdf.get('pages') or 0 for pdf in self.pdfs)
+
+
+def group_units(candidates: List[Dict]) -> List[Dict]:
+    """
+    Agrupa los PDFs candidatos en unidades (examen + solución del mismo doc_id).
+
+    Args:
+        candidates: PDFs no locales que se quieren descargar
+
+    Returns:
+        Lista de unidades con doc_id, category, pdfs, cost, ref y type_rank
+    """
+    units: "OrderedDict[tuple, Dict]" = OrderedDict()
+    for pdf in candidates:
+        key = (category_of(pdf), pdf['doc_id'])
+        unit = units.get(key)
+        if unit is None:
+            ref = extract_ref_number(pdf)
+            unit = units[key] = {
+                'doc_id': pdf['doc_id'],
+                'category': category_of(pdf),
+                'doc_number': pdf.get('doc_number', f"#{pdf['doc_id']}"),
+                'doc_type': pdf.get('doc_type', ''),
+                'doc_title': pdf.get('doc_title', ''),
+                'ref': -1 if ref == 999999 else ref,
+                'type_rank': doc_type_rank(pdf.get('doc_type', '')),
+                'pdfs': [],
+            }
+        unit['pdfs'].append(pdf)
+
+    for unit in units.values():
+        # Examen siempre antes que su solución
+        unit['pdfs'].sort(key=lambda p: p['is_solution'])
+        unit['cost'] = len(unit['pdfs'])
+    return list(units.values())
+
+
+def plan_downloads(candidates: List[Dict], remaining: int,
+                   priority: Optional[Sequence[str]] = None,
+                   skip_duplicates: bool = False) -> DownloadPlan:
+    """
+    Construye el plan de descargas que mejor aprovecha el saldo.
+
+    Dentro de cada tipo de documento las asignaturas van por turnos (la más
+    nueva de cada una, luego la segunda más nueva, ...). Una unidad que no
+    cabe se omite y se sigue buscando otra más barata (p.ej. un examen cuya
+    solución ya es local), así que el saldo se aprovecha sin partir pares.
+
+    Args:
+        candidates: PDFs no locales que se quieren descargar
+        remaining: Descargas disponibles este mes
+        priority: Orden de preferencia de tipos (por defecto DOC_TYPE_PRIORITY)
+        skip_duplicates: Omitir los PDFs marcados con duplicate_of (catlux_dedup.py)
+
+    Returns:
+        DownloadPlan con las unidades elegidas y las omitidas
+    """
+    priority = priority or DOC_TYPE_PRIORITY
+    duplicates = []
+    if skip_duplicates:
+        duplicates = [pdf for pdf in candidates if pdf.get('duplicate_of')]
+        candidates = [pdf for pdf in candidates if not pdf.get('duplicate_of')]
+    units = group_units(candidates)
+    for unit in units:
+        unit['type_rank'] = doc_type_rank(unit['doc_type'], priority)
+
+    # tipo → categoría → unidades (más nuevas primero)
+    tiers: Dict[int, "OrderedDict[str, List[Dict]]"] = {}
+    for unit in sorted(units, key=lambda u: (u['type_rank'], -u['ref'])):
+        tiers.setdefault(unit['type_rank'], OrderedDict()).setdefault(unit['category'], []).append(unit)
+
+    ordered: List[Dict] = []
+    for rank in sorted(tiers):
+        queues = list(tiers[rank].values())
+        depth = max(len(q) for q in queues)
+        for i in range(depth):
+            ordered.extend(q[i] for q in queues if i < len(q))
+
+    plan = DownloadPlan(remaining)
+    for unit in group_units(duplicates):
+        first = unit['pdfs'][0]
+        unit['reason'] = f"posible duplicado de {first['duplicate_of']} ({first['similarity']:.0%})"
+        plan.skipped.append(unit)
+
+    budget = remaining
+    for unit in ordered:
+        if unit['cost'] <= budget:
+            plan.selected.append(unit)
+            budget -= unit['cost']
+        else:
+            unit['reason'] = "sin saldo para el par completo" if budget else "sin saldo"
+            plan.skipped.append(unit)
+    return plan
+
+
+def print_plan(plan: DownloadPlan, dry_run: bool = True) -> None:
+    """
+    Imprime el plan de descargas.
+
+    Args:
+        plan: Plan calculado por plan_downloads()
+        dry_run: Indica en la cabecera que no se descargará nada
+    """
+    print("\n" + "=" * 110)
+    print("🗓️  PLAN DE DESCARGAS" + (" (dry-run: no se descarga nada)" if dry_run else ""))
+    print("=" * 110)
+    print(f"Saldo disponible: {plan.remaining} | Planificados: {plan.cost} PDFs "
+          f"({len(plan.selected)} documentos) | Omitidos: {len(plan.skipped)} documentos")
+    if plan.pages:
+        print(f"Páginas (según la página de detalle): {plan.pages}")
+    print()
+
+    print(f"{'#':3} | {'Categoría':22} | {'REF':8} | {'Tipo':20} | {'ID':7} | {'PDFs':5} | {'Título':30}")
+    print("-" * 110)
+    for i, unit in enumerate(plan.selected, 1):
+        print(f"{i:3} | {unit['category'][:22]:22} | {unit['doc_number'][:8]:8} | "
+              f"{unit['doc_type'][:20]:20} | {unit['doc_id']:7} | {unit['cost']:5} | "
+              f"{unit['doc_title'][:30]:30}")
+
+    if plan.skipped:
+        print("-" * 110)
+        print(f"Omitidos ({len(plan.skipped)}):")
+        for unit in plan.skipped[:20]:
+            print(f"  - {unit['category']} {unit['doc_number']} {unit['doc_type']} "
+                  f"({unit['cost']} PDFs): {unit.get('reason', '')}")
+        if len(plan.skipped) > 20:
+            print(f"  ... y {len(plan.skipped) - 20} más")
+    print("=" * 110 + "\n")
+
+
+def run_plan(urls: List[str], max_pages: int = 10,
+             tracker: Optional[DownloadTracker] = None, dry_run: bool = True,
+             skip_duplicates: bool = False, details: bool = False) -> int:
+    """
+    Planifica (y opcionalmente ejecuta) las descargas de varias categorías (--plan).
+
+    Hace un login por sitio, obtiene los listados de las categorías en paralelo
+    (LISTING_WORKERS) y marca los PDFs locales; el plan se calcula y se imprime antes de descargar nada. Sin
+    dry_run el plan se guarda en la cola persistente y se descarga en su orden.
+
+    Args:
+        urls: URLs de las categorías candidatas
+        max_pages: Máximo de páginas por categoría
+        tracker: Rastreador de descargas
+        dry_run: Solo mostrar el plan
+        skip_duplicates: No planificar posibles duplicados de documentos locales
+        details: Añadir los campos de la página de detalle (curso, páginas, autor...)
+
+    Returns:
+        Número de PDFs descargados
+    """
+    if tracker is None:
+        tracker = DownloadTracker(TRACKER_FILE)
+
+    username, password, cert_path, save_base_path = get_credentials()
+    if not all([username, password, save_base_path]):
+        return 0
+
+    catalog = Catalog(CATALOG_FILE)
+    details_cache = DetailCache(DETAILS_FILE) if details else None
+    sitemap = load_sitemap(SITEMAP_FILE, crawl=False)
+    sessions: Dict[str, "requests.Session"] = {}
+    downloaded_count = 0
+    try:
+        candidates = []
+        seen = set()
+        targets = {}
+        jobs = []
+        for url in urls:
+            save_path = extract_category_path(url, save_base_path)
+            if not save_path or not check_category(sitemap, url, max_pages):
+                continue
+
+            site_root = get_site_root(url)
+            session = sessions.get(site_root)
+            if session is None:
+                session = sessions[site_root] = new_session()
+                if not login_to_catlux(session, username, password, cert_path,
+                                       urljoin(site_root, "login")):
+                    logger.error("No se pudo completar el login")
+                    return 0
+            jobs.append((url, save_path, site_root, session))
+
+        # Listados de todas las categorías a la vez (con --parse-workers el
+        # parsing se reparte entre núcleos); el resultado sigue el orden de urls
+        with ThreadPoolExecutor(max_workers=LISTING_WORKERS, thread_name_prefix="catlux-plan") as pool:
+            listings = list(pool.map(lambda job: PDFManager(job[3], cert_path).fetch_pdfs(job[0], max_pages),
+                                     jobs))
+
+        for (url, save_path, site_root, session), pdfs in zip(jobs, listings):
+            mark_local_files(pdfs, save_path, Path(save_base_path))
+            pdfs = probe_listing(session, url, pdfs, catalog)
+            if details:
+                enrich_details(session, site_root, pdfs, details_cache)
+
+            category = save_path.relative_to(save_base_path).as_posix()
+            check_duplicates(pdfs, category, DEDUP_FILE)
+            targets[category] = (url, save_path)
+            for pdf in pdfs:
+                if pdf.get('is_local', False) or pdf['name'] in seen:
+                    continue
+                seen.add(pdf['name'])
+                candidates.append(dict(pdf, category=category))
+
+        plan = plan_downloads(candidates, tracker.get_remaining_downloads(),
+                              skip_duplicates=skip_duplicates)
+        print_plan(plan, dry_run)
+        if dry_run or not plan.selected:
+            return 0
+
+        # Un lote por sitio (cada uno se vacía con su propia sesión), en el orden del plan
+        from catlux_queue import JobQueue
+        with JobQueue(QUEUE_FILE) as job_queue:
+            batches = {}
+            for unit in plan.selected:
+                url, save_path = targets[unit['category']]
+                save_path.mkdir(parents=True, exist_ok=True)
+                batch = batches.setdefault(get_site_root(url), uuid.uuid4().hex)
+                job_queue.enqueue(url, save_path, unit['pdfs'], batch)
+
+            print("\n🔄 Iniciando descargas...\n")
+            for site_root, batch in batches.items():
+                downloaded_count += run_download_jobs(job_queue, sessions[site_root], tracker, batch)
+
+        logger.info(f"Plan completado: {downloaded_count} nuevos PDFs")
+
+    except Exception as e:
+        logger.error(f"Error ejecutando el plan: {e}")
+
+    finally:
+        for session in sessions.values():
+            session.close()
+
+    tracker.print_status()
+    return downloaded_count
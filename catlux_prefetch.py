@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Prefetch especulativo durante la selección interactiva.
+
+Mientras ask_download_selection() espera la respuesta del usuario, el
+Prefetcher descarga en segundo plano los PDFs nuevos (is_local == False) a un
+área de staging dentro de CATLUX_SAVE_PATH (un subdirectorio propio por
+proceso, para no pisar la precarga de otra ejecución simultánea). Después:
+
+- Los PDFs seleccionados se promueven con os.replace() (instantáneo, mismo
+  sistema de archivos) y solo entonces se registran en el DownloadTracker.
+- Los no seleccionados se borran sin registrarse.
+
+Contabilidad de cuota: el número de descargas especulativas nunca supera el
+saldo del tracker al empezar, de modo que aunque el usuario elija todo lo que
+se precargó, el mes no se pasa del límite. Solo cuenta como descarga lo que se
+promueve.
+
+Uso:
+    python catlux_scrapper.py --url "..." --prefetch
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from catlux_scrapper import DownloadTracker, fetch_pdf
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR_NAME = ".catlux_staging"
+PREFETCH_WORKERS = 4
+
+
+class Prefetcher:
+    """Descarga especulativa a staging con promoción o descarte posterior."""
+
+    def __init__(self, tracker: DownloadTracker, save_base_path: Path,
+                 workers: int = PREFETCH_WORKERS):
+        """
+        Inicializa el prefetcher (no descarga nada hasta start()).
+
+        Args:
+            tracker: Rastreador de descargas (solo se lee el saldo)
+            save_base_path: Raíz CATLUX_SAVE_PATH (el staging vive dentro)
+            workers: Descargas especulativas simultáneas
+        """
+        self.tracker = tracker
+        self.staging_root = Path(save_base_path) / STAGING_DIR_NAME
+        # Se crea en start(): .catlux_staging/<pid>-xxxx/
+        self.staging_dir: Optional[Path] = None
+        self.workers = workers
+        self.session: Optional["requests.Session"] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._cancelled = threading.Event()
+        self.promoted = 0
+
+    def _staged_path(self, pdf: Dict) -> Path:
+        # Sufijo distinto de .pdf para que mark_local_files() no lo detecte
+        return self.staging_dir / (pdf['name'] + ".pdf.staged")
+
+    def start(self, session: "requests.Session", pdfs: List[Dict]) -> int:
+        """
+        Empieza a precargar los PDFs nuevos, en el orden mostrado.
+
+        El prefetcher pasa a ser dueño de la sesión (ya autenticada) y la cierra
+        en close(); download_filtered_pdfs() la reutiliza sin repetir el login.
+
+        Args:
+            session: Sesión autenticada
+            pdfs: PDFs en el orden del preview
+
+        Returns:
+            Número de PDFs puestos en cola de precarga
+        """
+        self.session = session
+        budget = self.tracker.get_remaining_downloads()
+        candidates = [p for p in pdfs if not p.get('is_local', False)][:budget]
+        if not candidates:
+            return 0
+
+        self.staging_root.mkdir(parents=True, exist_ok=True)
+        self.staging_dir = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=self.staging_root))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="catlux-prefetch")
+        for pdf in candidates:
+            self._futures[pdf['name']] = self._executor.submit(self._fetch, pdf)
+
+        logger.info(f"Precargando {len(candidates)} PDFs nuevos mientras eliges...")
+        return len(candidates)
+
+    def _fetch(self, pdf: Dict) -> Path:
+        """Descarga un PDF al staging (se ejecuta en un hilo del pool)."""
+        if self._cancelled.is_set():
+            raise RuntimeError("prefetch cancelado")
+        staged = self._staged_path(pdf)
+        # Misma descarga que la normal: comprobación de PDF, .part y límite de ancho de banda
+        fetch_pdf(self.session, pdf, staged)
+        logger.debug(f"Precargado {pdf['name']}.pdf")
+        return staged
+
+    def promote(self, pdf: Dict, dest: Path) -> bool:
+        """
+        Mueve un PDF precargado a su destino definitivo.
+
+        Si la precarga todavía no empezó se cancela y se retorna False para que
+        el llamador lo descargue normalmente; si está en curso se espera.
+        El llamador es quien registra la descarga en el tracker.
+
+        Args:
+            pdf: PDF seleccionado
+            dest: Ruta final del archivo
+
+        Returns:
+            True si el archivo quedó en dest
+        """
+        future = self._futures.pop(pdf['name'], None)
+        if future is None or future.cancel():
+            return False
+        try:
+            staged = future.result()
+        except Exception as e:
+            logger.debug(f"Precarga fallida de {pdf['name']}: {e}")
+            return False
+        os.replace(staged, dest)
+        self.promoted += 1
+        return True
+
+    def close(self) -> None:
+        """Descarta todo lo no promovido, borra su staging y cierra la sesión."""
+        self._cancelled.set()
+        discarded = len(self._futures)
+        for future in self._futures.values():
+            future.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._futures.clear()
+        if self.staging_dir is not None:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir = None
+            # .catlux_staging solo se quita si no queda la precarga de otro proceso
+            try:
+                self.staging_root.rmdir()
+            except OSError:
+                pass
+
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+        if self.promoted or discarded:
+            logger.info(f"Prefetch: {self.promoted} promovidos, {discarded} descartados (no cuentan)")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Cola persistente de descargas (SQLite) con recuperación tras caídas.
+
+download_filtered_pdfs() guarda la selección como trabajos en la cola antes de
+descargar nada y los va marcando (pending → in_progress → done/failed). Si el
+proceso muere o se interrumpe con Ctrl-C, la siguiente ejecución con --resume
+continúa exactamente donde se quedó, sin repetir preview, login ni selección.
+
+Varios procesos pueden vaciar la misma cola a la vez: cada trabajo se reclama
+dentro de una transacción BEGIN IMMEDIATE, así que nunca lo descargan dos.
+
+Uso:
+    python catlux_scrapper.py --resume
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# Trabajos in_progress sin actualizar en este tiempo se consideran huérfanos
+STALE_AFTER_SECONDS = 600
+# Cada cuánto renueva updated_at una descarga en curso (touch())
+HEARTBEAT_SECONDS = 60
+# Los trabajos hechos se conservan este tiempo (estado de lotes en --serve)
+DONE_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Campos del PDF que se guardan en el trabajo (local_path no es serializable)
+JOB_PDF_FIELDS = ('name', 'url', 'full_url', 'is_solution', 'doc_id',
+                  'doc_number', 'doc_type', 'doc_title')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    pdf TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    owner TEXT,
+    claimed_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (dest)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, attempts, id);
+"""
+
+
+def current_owner() -> str:
+    """Identificador de este proceso: host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_is_dead(owner: Optional[str]) -> bool:
+    """True si el dueño es un proceso de este host que ya no existe (solo POSIX)."""
+    if not owner or os.name != "posix":
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class JobQueue:
+    """Cola de trabajos de descarga en SQLite."""
+
+    def __init__(self, db_path: Path):
+        """
+        Abre (o crea) la cola.
+
+        Args:
+            db_path: Ruta del archivo SQLite (normalmente QUEUE_FILE)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: las transacciones se controlan a mano (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Cierra la conexión."""
+        self.conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def enqueue(self, base_url: str, save_path: Path, pdfs: List[Dict],
+                batch: Optional[str] = None) -> str:
+        """
+        Añade PDFs a la cola como trabajos pendientes.
+
+        Un PDF cuyo destino ya está en la cola no se duplica: vuelve a pending
+        (y a este lote) salvo que otro proceso lo esté descargando ahora.
+
+        Args:
+            base_url: URL de la categoría (para volver a hacer login al reanudar)
+            save_path: Carpeta de destino
+            pdfs: PDFs a descargar, en orden
+            batch: Identificador del lote (se genera si es None)
+
+        Returns:
+            Identificador del lote
+        """
+        from catlux_scrapper import pdf_path
+
+        batch = batch or uuid.uuid4().hex
+        now = time.time()
+        rows = []
+        for pdf in pdfs:
+            fields = {k: pdf.get(k) for k in JOB_PDF_FIELDS}
+            dest = str(pdf_path(Path(save_path), pdf))
+            rows.append((batch, base_url, pdf['name'], dest, json.dumps(fields), now, now))
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT INTO jobs (batch, base_url, name, dest, pdf, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dest) DO UPDATE SET "
+                "  batch = excluded.batch, status = 'pending', attempts = 0, "
+                "  last_error = NULL, updated_at = excluded.updated_at "
+                "WHERE jobs.status != 'in_progress'",
+                rows,
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return batch
+
+    def claim(self, owner: Optional[str] = None, batch: Optional[str] = None,
+              site: Optional[str] = None) -> Optional[Dict]:
+        """
+        Reclama atómicamente el siguiente trabajo pendiente.
+
+        Antes de reclamar devuelve a pending los trabajos huérfanos (dueño
+        muerto en este host o sin actualizar en STALE_AFTER_SECONDS).
+
+        Args:
+            owner: Dueño del trabajo (por defecto host:pid)
+            batch: Limitar a un lote concreto (None = cualquiera)
+            site: Limitar a las categorías de un sitio (raíz terminada en '/')
+
+        Returns:
+            Diccionario con id, base_url, dest, attempts y pdf, o None si no hay
+        """
+        owner = owner or current_owner()
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover_stale(now)
+            query = "SELECT * FROM jobs WHERE status = 'pending'"
+            params: list = []
+            if batch is not None:
+                query += " AND batch = ?"
+                params.append(batch)
+            if site is not None:
+                query += " AND substr(base_url, 1, ?) = ?"
+                params.extend([len(site), site])
+            query += " ORDER BY attempts, id LIMIT 1"
+            row = self.conn.execute(query, params).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'in_progress', owner = ?, claimed_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (owner, now, now, row['id']),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return {
+            'id': row['id'],
+            'base_url': row['base_url'],
+            'dest': Path(row['dest']),
+            'attempts': row['attempts'],
+            'pdf': json.loads(row['pdf']),
+        }
+
+    def _recover_stale(self, now: float) -> None:
+        """Devuelve a pending los trabajos in_progress huérfanos (dentro de una transacción)."""
+        rows = self.conn.execute(
+            "SELECT id, owner, updated_at FROM jobs WHERE status = 'in_progress'"
+        ).fetchall()
+        for row in rows:
+            if now - row['updated_at'] > STALE_AFTER_SECONDS or _owner_is_dead(row['owner']):
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'pending', owner = NULL, updated_at = ? WHERE id = ?",
+                    (now, row['id']),
+                )
+                logger.info(f"Trabajo huérfano recuperado (dueño {row['owner']})")
+
+    def _set(self, job_id: int, sql: str, params: tuple) -> None:
+        self.conn.execute(f"UPDATE jobs SET {sql}, updated_at = ? WHERE id = ?",
+                          params + (time.time(), job_id))
+
+    def complete(self, job_id: int) -> None:
+        """Marca un trabajo como hecho."""
+        self._set(job_id, "status = 'done', owner = NULL, last_error = NULL", ())
+
+    def fail(self, job_id: int, error: str, max_attempts: int = MAX_ATTEMPTS) -> bool:
+        """
+        Registra un fallo; el trabajo vuelve a pending hasta agotar reintentos.
+
+        Returns:
+            True si se reintentará, False si quedó como failed
+        """
+        row = self.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        attempts = (row['attempts'] if row else 0) + 1
+        status = 'pending' if attempts < max_attempts else 'failed'
+        self._set(job_id, "status = ?, attempts = ?, last_error = ?, owner = NULL",
+                  (status, attempts, error[:500]))
+        return status == 'pending'
+
+    def touch(self, job_id: int) -> None:
+        """Renueva updated_at de un trabajo en curso (una descarga lenta no es huérfana)."""
+        self.conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'in_progress'",
+                          (time.time(), job_id))
+
+    def release(self, job_id: int) -> None:
+        """Devuelve un trabajo a pending sin contar intento (Ctrl-C, límite mensual)."""
+        self._set(job_id, "status = 'pending', owner = NULL", ())
+
+    def counts(self, batch: Optional[str] = None) -> Dict[str, int]:
+        """Número de trabajos por estado."""
+        query = "SELECT status, COUNT(*) AS n FROM jobs"
+        params: tuple = ()
+        if batch is not None:
+            query += " WHERE batch = ?"
+            params = (batch,)
+        query += " GROUP BY status"
+        return {row['status']: row['n'] for row in self.conn.execute(query, params)}
+
+    def pending_base_urls(self) -> List[str]:
+        """Categorías con trabajos pendientes o en curso (para reanudar)."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT base_url FROM jobs WHERE status IN ('pending', 'in_progress') ORDER BY id"
+        ).fetchall()
+        return [row['base_url'] for row in rows]
+
+    def purge_done(self, older_than: float = 0) -> int:
+        """
+        Borra los trabajos terminados hace más de older_than segundos.
+
+        Returns:
+            Número de trabajos borrados
+        """
+        cursor = self.conn.execute("DELETE FROM jobs WHERE status = 'done' AND updated_at < ?",
+                                   (time.time() - older_than,))
+        return cursor.rowcount
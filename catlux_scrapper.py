@@ -35,47 +35,144 @@ import sys
 import logging
 from pathlib import Path
 from datetime import datetime, date
-from urllib.parse import urljoin
-from typing import Dict, Tuple, Optional, List
+from urllib.parse import urljoin, urlsplit
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Tuple, Optional, List, Set
 import argparse
 from collections import defaultdict
+from contextlib import contextmanager, redirect_stdout
+import itertools
 import re
+import threading
+import time
 
-try:
+# requests, bs4, dotenv y urllib3 se importan bajo demanda (ver new_session(),
+# parse_html() y load_environment()): --info y --latest solo leen el tracker y
+# no deben pagar el coste de importar la pila HTTP/HTML.
+if TYPE_CHECKING:
     import requests
-    from bs4 import BeautifulSoup
-    from dotenv import load_dotenv
-    # Desactivar advertencias de SSL (CatLux usa certificado auto-firmado)
-    import urllib3
-    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-except ImportError:
-    print("Error: Dependencias faltantes. Ejecuta:")
-    print("  pip install requests beautifulsoup4 python-dotenv urllib3")
-    sys.exit(1)
 
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
 
-load_dotenv()
-
 DOWNLOADS_PER_MONTH = 100
 TRACKER_FILE = Path(__file__).parent / "download_tracker.json"
+QUEUE_FILE = Path(__file__).parent / "download_queue.db"
+CATALOG_FILE = Path(__file__).parent / "catlux_catalog.json"
+SNAPSHOT_DIR = Path(__file__).parent / ".catlux_snapshots"
+PDFINFO_CACHE_FILE = Path(__file__).parent / "catlux_pdfinfo.json"
+SITEMAP_FILE = Path(__file__).parent / "catlux_sitemap.json"
+DEDUP_FILE = Path(__file__).parent / "catlux_dedup.json"
+DETAILS_FILE = Path(__file__).parent / "catlux_details.json"
+OPTIMIZE_FILE = Path(__file__).parent / "catlux_optimize.json"
+# Filas que el preview interactivo imprime antes de remitir al visor paginado
+PREVIEW_INLINE_ROWS = 60
+# Asignaturas de proben/gymnasium (selección sin mapa del sitio y precarga de listados)
+GYMNASIUM_SUBJECTS = ('deutsch', 'englisch', 'mathematik', 'latein', 'franzoesisch', 'geschichte',
+                      'erdkunde-geographie', 'biologie', 'chemie', 'physik', 'natur-und-technik',
+                      'sonstiges')
 LOG_FILE = Path(__file__).parent / "catlux_scrapper.log"
 LOGIN_URL = "https://www.catlux.de/login"
+# Todo PDF empieza así; las páginas de error de CatLux (HTML) no
+PDF_MAGIC = b"%PDF"
 PROFILE_URL = "https://www.catlux.de/mein-profil"
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+MISSING_DEPS_MESSAGE = (
+    "Error: Dependencias faltantes. Ejecuta:\n"
+    "  pip install requests beautifulsoup4 python-dotenv urllib3"
 )
+
 logger = logging.getLogger(__name__)
 
 
+class NotAPdfError(Exception):
+    """El servidor respondió con algo que no es un PDF (p.ej. documento sin solución)."""
+
+    def __init__(self, name: str, content_type: str):
+        super().__init__(f"{name}: la respuesta no es un PDF ({content_type or 'sin content-type'})")
+        self.content_type = content_type
+
+
+def check_pdf_content(name: str, first_bytes: bytes, content_type: str = "") -> None:
+    """
+    Comprueba que el principio de una respuesta es un PDF.
+
+    Args:
+        name: Nombre del PDF (para el mensaje de error)
+        first_bytes: Primeros bytes del cuerpo
+        content_type: Content-Type de la respuesta
+
+    Raises:
+        NotAPdfError: Si el cuerpo no empieza por %PDF
+    """
+    if not first_bytes.startswith(PDF_MAGIC):
+        raise NotAPdfError(name, content_type.split(';')[0].strip())
+
+
+def setup_logging(verbosity: int = 0, json_format: bool = False) -> None:
+    """
+    Configura el logging a archivo (LOG_FILE, con rotación) y consola.
+
+    Los registros pasan por una cola y los escribe un hilo aparte, de modo que
+    las descargas en paralelo no esperan a la E/S del log (ver catlux_logging.py).
+    Se llama desde main() solo para los comandos que lo necesitan; importar el
+    módulo no abre ningún archivo.
+
+    Args:
+        verbosity: 1 = DEBUG (cada página y cada PDF), 0 = INFO, -1 = consola solo avisos
+        json_format: Escribir el archivo de log en JSON por líneas
+    """
+    import catlux_logging
+    catlux_logging.configure(LOG_FILE, verbosity, json_format)
+
+
+def load_environment() -> None:
+    """Carga las variables del archivo .env (si existe) en el entorno."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        print(MISSING_DEPS_MESSAGE)
+        sys.exit(1)
+    load_dotenv()
+
+
+def new_session() -> "requests.Session":
+    """
+    Crea una sesión HTTP importando requests bajo demanda.
+
+    También desactiva las advertencias de SSL (CatLux usa certificado auto-firmado).
+
+    Returns:
+        Nueva sesión de requests
+    """
+    try:
+        import requests
+        import urllib3
+    except ImportError:
+        print(MISSING_DEPS_MESSAGE)
+        sys.exit(1)
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    return requests.Session()
+
+
+def parse_html(content: bytes):
+    """
+    Parsea HTML con BeautifulSoup (importado bajo demanda).
+
+    Args:
+        content: Contenido HTML en bytes
+
+    Returns:
+        Objeto BeautifulSoup
+    """
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        print(MISSING_DEPS_MESSAGE)
+        sys.exit(1)
+    return BeautifulSoup(content, "html.parser")
+
+
 # ============================================================================
 # FUNCIONES UTILIDAD
 # ============================================================================
@@ -100,6 +197,23 @@ def extract_ref_number(pdf: Dict) -> int:
     return 999999
 
 
+def get_site_root(base_url: str) -> str:
+    """
+    Obtiene la raíz del sitio a partir de una URL de categoría.
+
+    Desde https://www.catlux.de/proben/gymnasium/klasse-7/deutsch/ retorna
+    https://www.catlux.de/. Permite apuntar el script a otro host (por ejemplo
+    el servidor local de benchmarks) sin tocar las constantes de URL.
+
+    Args:
+        base_url: URL base completa de la categoría
+
+    Returns:
+        URL raíz terminada en '/'
+    """
+    return urljoin(base_url, "/")
+
+
 def extract_category_path(base_url: str, save_base_path: str) -> Optional[Path]:
     """
     Extrae clase y asignatura de la URL y construye la ruta de guardado.
@@ -117,15 +231,266 @@ def extract_category_path(base_url: str, save_base_path: str) -> Optional[Path]:
         Ruta construida (/home/user/Catlux/klasse-7/deutsch/) o None si hay error
     """
     try:
-        url_parts = base_url.rstrip('/').split('/')
+        url_parts = urlsplit(base_url).path.rstrip('/').split('/')
         subject_folder = url_parts[-1]
         class_folder = url_parts[-2]
+        # Nunca fuera de save_base_path: sin '.', '..', vacíos ni separadores
+        for part in (class_folder, subject_folder):
+            if part in ('', '.', '..') or '\\' in part or ':' in part:
+                raise ValueError(f"componente no válido '{part}' en {base_url}")
         return Path(save_base_path) / class_folder / subject_folder
     except (IndexError, ValueError) as e:
         logger.error(f"Error parseando URL: {e}")
         return None
 
 
+# Organización de las carpetas de cada categoría (catlux_layout.py); None = plana
+_layout = None
+
+
+def set_layout(layout) -> None:
+    """
+    Activa (o con None vuelve a la plana) una organización de carpetas.
+
+    Args:
+        layout: catlux_layout.Layout usado por descargas, cola y detección local
+    """
+    global _layout
+    _layout = layout
+
+
+def get_layout():
+    """Organización activa, o None (plana)."""
+    return _layout
+
+
+def pdf_path(save_path: Path, pdf: Dict) -> Path:
+    """
+    Ruta de destino de un PDF dentro de la carpeta de su categoría.
+
+    Args:
+        save_path: Carpeta de la categoría (ver extract_category_path())
+        pdf: Diccionario del PDF
+
+    Returns:
+        save_path/<nombre>.pdf, o la ruta de la organización activa (set_layout())
+    """
+    layout = _layout
+    if layout is None:
+        return save_path / (pdf['name'] + ".pdf")
+    return layout.path_for(save_path, pdf)
+
+
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Bloqueo exclusivo entre hilos, procesos y equipos sobre `path`.lock.
+
+    Usa fcntl.lockf en POSIX (bloqueos de registro, respetados por NFS con
+    lockd) y msvcrt.locking en Windows (respetado por SMB).
+
+    Args:
+        path: Archivo a proteger (el bloqueo se toma sobre un .lock hermano)
+    """
+    lock_path = path.with_name(path.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with _process_lock, open(lock_path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK se rinde tras 10 s; seguir esperando
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.lockf(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(f, fcntl.LOCK_UN)
+
+
+# ============================================================================
+# FUNCIONES DE PARSING
+# ============================================================================
+# Compartidas por el motor síncrono (requests) y el asíncrono (catlux_async.py).
+
+def parse_listing_page(content: bytes, base_url: str) -> List[Dict]:
+    """
+    Extrae los PDFs (examen y solución) de una página de listado.
+
+    Estrategia: Extraer data-id de cada contenedor doc item list row
+    y construir directamente los URLs de descarga.
+
+    Args:
+        content: HTML de la página de listado
+        base_url: URL de la categoría (para construir los URLs de descarga)
+
+    Returns:
+        Lista de diccionarios con información de PDFs (vacía si no hay documentos)
+    """
+    soup = parse_html(content)
+    site_root = get_site_root(base_url)
+    pdfs = []
+
+    # Buscar contenedores de documentos (div con clase "doc item list row")
+    doc_containers = soup.find_all('div', class_=lambda x: x and 'doc' in str(x) and 'item' in str(x))
+
+    for container in doc_containers:
+        try:
+            # Extraer información del contenedor
+            first_link = container.find('a', {'data-id': True})
+            if not first_link:
+                logger.warning(f"No se encontró data-id en contenedor")
+                continue
+
+            doc_id = first_link.get('data-id')
+            if not doc_id:
+                continue
+
+            # Extraer metadatos del contenedor
+            # Tipo/Categoría: buscar el label con clase "label label-default pull-right"
+            label_elem = container.find('span', class_=lambda x: x and 'label' in str(x) and 'label-default' in str(x))
+            doc_type = label_elem.get_text(strip=True) if label_elem else "Documento"
+
+            # ID real del documento (el número con #)
+            id_elem = container.find('span', class_=lambda x: x and 'text-muted' in str(x))
+            doc_number = id_elem.get_text(strip=True) if id_elem else f"#{doc_id}"
+
+            # Título del documento
+            title_elem = container.find('h2')
+            doc_title = title_elem.get_text(strip=True) if title_elem else ""
+
+            text = container.get_text(strip=True)[:100]
+
+            # Crear PDFs para examen y solución
+            pdf_types = [
+                {'name': doc_id, 'is_solution': False, 'dl_param': 'pdf'},
+                {'name': f"{doc_id}_solution", 'is_solution': True, 'dl_param': 'pdf_solution'}
+            ]
+
+            for pdf_info in pdf_types:
+                # Construir URL de descarga
+                href = f"probe/{doc_id}?dl={pdf_info['dl_param']}"
+
+                pdfs.append({
+                    'name': pdf_info['name'],
+                    'url': href,
+                    'full_url': urljoin(site_root, href),
+                    'is_solution': pdf_info['is_solution'],
+                    'doc_id': doc_id,
+                    'doc_number': doc_number,
+                    'doc_type': doc_type,
+                    'doc_title': doc_title,
+                    'text': text
+                })
+
+        except Exception as e:
+            logger.warning(f"Error procesando contenedor: {e}")
+            continue
+
+    return pdfs
+
+
+_parse_pool = None
+
+
+def set_parse_pool(pool) -> None:
+    """
+    Activa (o con None desactiva) el parsing de listados en otros procesos.
+
+    Args:
+        pool: catlux_parsepool.ParsePool compartido por todos los listados
+    """
+    global _parse_pool
+    _parse_pool = pool
+
+
+def get_parse_pool():
+    """Pool de parsing activo, o None."""
+    return _parse_pool
+
+
+def parse_listing(content: bytes, base_url: str) -> List[Dict]:
+    """parse_listing_page() en el pool de parsing si está activo (--parse-workers)."""
+    pool = _parse_pool
+    if pool is None:
+        return parse_listing_page(content, base_url)
+    return pool.parse(content, base_url)
+
+
+def build_login_payload(content: bytes, username: str, password: str) -> Optional[Dict[str, str]]:
+    """
+    Construye el payload del login a partir de la página de login.
+
+    Extrae dinámicamente el formulario de login, REQUEST_TOKEN y otros parámetros
+    para manejar cambios en la estructura de CatLux.
+
+    Args:
+        content: HTML de la página de login
+        username: Nombre de usuario/email de CatLux
+        password: Contraseña de CatLux
+
+    Returns:
+        Payload para el POST de login, o None si no se encontró el formulario/token
+    """
+    soup_login = parse_html(content)
+
+    # Buscar el formulario de login (el que tiene username y password)
+    login_form = None
+    for form in soup_login.find_all('form'):
+        if form.find('input', {'name': 'username'}) and form.find('input', {'name': 'password'}):
+            login_form = form
+            break
+
+    if not login_form:
+        logger.error("No se encontró formulario de login")
+        return None
+
+    # Obtener el ID del formulario (es el FORM_SUBMIT value)
+    form_submit_value = login_form.get('id', 'tl_login')
+
+    # Obtener el REQUEST_TOKEN del formulario
+    token_input = login_form.find('input', {'name': 'REQUEST_TOKEN'})
+    if not token_input:
+        logger.error("No se encontró REQUEST_TOKEN")
+        return None
+
+    request_token = token_input.get('value', '')
+
+    # Obtener otros campos ocultos
+    target_path = ''
+    target_path_input = login_form.find('input', {'name': '_target_path'})
+    if target_path_input:
+        target_path = target_path_input.get('value', '')
+
+    # Construir payload
+    payload = {
+        'FORM_SUBMIT': form_submit_value,
+        'REQUEST_TOKEN': request_token,
+        'username': username,
+        'password': password
+    }
+
+    if target_path:
+        payload['_target_path'] = target_path
+        payload['_always_use_target_path'] = '0'
+
+    logger.debug(f"Login: usando FORM_SUBMIT={form_submit_value}")
+    return payload
+
+
 # ============================================================================
 # CLASES DE TRACKING Y GESTIÓN
 # ============================================================================
@@ -133,10 +498,27 @@ def extract_category_path(base_url: str, save_base_path: str) -> Optional[Path]:
 class DownloadTracker:
     """Gestiona el seguimiento de descargas mensuales."""
 
-    def __init__(self, tracker_file: Path):
-        """Inicializa el tracker de descargas."""
+    def __init__(self, tracker_file: Path, ledger=None):
+        """
+        Inicializa el tracker de descargas.
+
+        Args:
+            tracker_file: Archivo JSON con el historial de este equipo
+            ledger: QuotaLedger compartido (catlux_ledger.py) opcional; si se
+                pasa, el saldo mensual se calcula sobre él y cada descarga se
+                reserva antes de empezar
+        """
         self.tracker_file = tracker_file
+        self.ledger = ledger
         self.data = self._load_tracker()
+        if ledger is not None:
+            # Lo descargado este mes antes de activar el ledger también cuenta
+            imported = ledger.import_history(self.data.get("downloads", []))
+            if imported:
+                logger.info(f"{imported} descargas de este mes importadas al ledger compartido")
+        # Reservas locales en curso (descargas en paralelo sin ledger)
+        self._reserved = 0
+        self._reserve_lock = threading.Lock()
 
     def _load_tracker(self) -> Dict:
         """Carga el archivo de tracking o crea uno nuevo."""
@@ -150,13 +532,17 @@ class DownloadTracker:
         return {"downloads": [], "total_all_time": 0}
 
     def _save_tracker(self) -> None:
-        """Guarda el estado actual del tracker."""
+        """Guarda el estado actual del tracker (escritura atómica)."""
         self.tracker_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.tracker_file, 'w', encoding='utf-8') as f:
+        tmp_file = self.tracker_file.with_name(self.tracker_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.tracker_file)
 
     def get_current_month_downloads(self) -> int:
         """Retorna el número de descargas en el mes actual."""
+        if self.ledger is not None:
+            return self.ledger.used_this_month()
         today = date.today()
         current_month = f"{today.year}-{today.month:02d}"
         return sum(
@@ -169,14 +555,60 @@ class DownloadTracker:
         current = self.get_current_month_downloads()
         return max(0, DOWNLOADS_PER_MONTH - current)
 
-    def record_download(self, filename: str) -> None:
-        """Registra una descarga nueva."""
-        self.data["downloads"].append({
-            "date": datetime.now().isoformat(),
-            "filename": filename
-        })
-        self.data["total_all_time"] = self.data.get("total_all_time", 0) + 1
-        self._save_tracker()
+    def reserve_slot(self) -> Optional[str]:
+        """
+        Reserva una descarga del saldo mensual antes de empezarla.
+
+        Con ledger compartido la reserva es atómica entre procesos y equipos;
+        sin él se descuentan del saldo local las reservas de otros hilos que
+        aún no terminaron, para que las descargas en paralelo no lo superen.
+
+        Returns:
+            Identificador de la reserva, o None si no queda saldo
+        """
+        if self.ledger is not None:
+            return self.ledger.reserve(DOWNLOADS_PER_MONTH)
+        with self._reserve_lock:
+            if self.get_remaining_downloads() - self._reserved <= 0:
+                return None
+            self._reserved += 1
+        return "local"
+
+    def _drop_local_reservation(self, reservation: Optional[str]) -> None:
+        if reservation == "local":
+            with self._reserve_lock:
+                self._reserved = max(0, self._reserved - 1)
+
+    def release_slot(self, reservation: Optional[str]) -> None:
+        """Libera una reserva que no terminó en descarga."""
+        if self.ledger is not None and reservation:
+            self.ledger.release(reservation)
+        self._drop_local_reservation(reservation)
+
+    def record_download(self, filename: str, reservation: Optional[str] = None) -> None:
+        """
+        Registra una descarga nueva.
+
+        El archivo se relee bajo bloqueo antes de añadir la entrada, de modo que
+        dos procesos que comparten tracker no se pisan el historial.
+
+        Args:
+            filename: Nombre del PDF descargado
+            reservation: Reserva obtenida con reserve_slot() (si la hay)
+        """
+        when = datetime.now().isoformat()
+        with file_lock(self.tracker_file):
+            self.data = self._load_tracker()
+            self.data.setdefault("downloads", []).append({
+                "date": when,
+                "filename": filename
+            })
+            self.data["total_all_time"] = self.data.get("total_all_time", 0) + 1
+            self._save_tracker()
+        self._drop_local_reservation(reservation)
+
+        if self.ledger is not None:
+            self.ledger.commit(reservation, filename, when)
 
     def print_status(self) -> None:
         """Imprime el estado actual del tracker."""
@@ -205,7 +637,7 @@ class DownloadTracker:
 class PDFManager:
     """Gestiona la búsqueda y listado de PDFs."""
 
-    def __init__(self, session: requests.Session, cert_path: Optional[str] = None):
+    def __init__(self, session: "requests.Session", cert_path: Optional[str] = None):
         """
         Inicializa el gestor de PDFs.
 
@@ -217,7 +649,8 @@ class PDFManager:
         self.cert_path = cert_path
         self.kwargs = {"verify": cert_path} if cert_path else {}
 
-    def fetch_pdfs(self, base_url: str, max_pages: int = 10) -> List[Dict]:
+    def fetch_pdfs(self, base_url: str, max_pages: int = 10,
+                   known: Optional[Set[str]] = None) -> List[Dict]:
         """
         Obtiene la lista de PDFs de una URL.
 
@@ -231,6 +664,8 @@ class PDFManager:
         Args:
             base_url: URL base de la clase
             max_pages: Máximo de páginas a procesar
+            known: Nombres ya vistos; si se pasa, la paginación se detiene tras
+                la primera página sin documentos nuevos (listado incremental)
 
         Returns:
             Lista de diccionarios con información de PDFs
@@ -240,7 +675,7 @@ class PDFManager:
 
         for page_num in range(1, max_pages + 1):
             url = f"{base_url}?p={page_num}"
-            logger.info(f"Buscando en: {url}")
+            logger.debug(f"Buscando en: {url}")
 
             try:
                 # Desactivar verificación SSL para CatLux
@@ -250,74 +685,22 @@ class PDFManager:
                 logger.error(f"Error descargando página {page_num}: {e}")
                 break
 
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # Buscar contenedores de documentos (div con clase "doc item list row")
-            doc_containers = soup.find_all('div', class_=lambda x: x and 'doc' in str(x) and 'item' in str(x))
+            page_pdfs = parse_listing(response.content, base_url)
 
-            if not doc_containers:
-                logger.info(f"No hay documentos en página {page_num}")
+            if not page_pdfs:
+                logger.debug(f"No hay documentos en página {page_num}")
                 break
 
-            for container in doc_containers:
-                try:
-                    # Extraer información del contenedor
-                    first_link = container.find('a', {'data-id': True})
-                    if not first_link:
-                        logger.warning(f"No se encontró data-id en contenedor")
-                        continue
-
-                    doc_id = first_link.get('data-id')
-                    if not doc_id:
-                        continue
-
-                    # Extraer metadatos del contenedor
-                    # Tipo/Categoría: buscar el label con clase "label label-default pull-right"
-                    label_elem = container.find('span', class_=lambda x: x and 'label' in str(x) and 'label-default' in str(x))
-                    doc_type = label_elem.get_text(strip=True) if label_elem else "Documento"
-
-                    # ID real del documento (el número con #)
-                    id_elem = container.find('span', class_=lambda x: x and 'text-muted' in str(x))
-                    doc_number = id_elem.get_text(strip=True) if id_elem else f"#{doc_id}"
-
-                    # Título del documento
-                    title_elem = container.find('h2')
-                    doc_title = title_elem.get_text(strip=True) if title_elem else ""
-
-                    # Crear PDFs para examen y solución
-                    pdf_types = [
-                        {'name': doc_id, 'is_solution': False, 'dl_param': 'pdf'},
-                        {'name': f"{doc_id}_solution", 'is_solution': True, 'dl_param': 'pdf_solution'}
-                    ]
-
-                    for pdf_info in pdf_types:
-                        pdf_name = pdf_info['name']
-
-                        # Evitar duplicados
-                        if pdf_name in found_docs:
-                            continue
-
-                        found_docs.add(pdf_name)
-
-                        # Construir URL de descarga
-                        href = f"probe/{doc_id}?dl={pdf_info['dl_param']}"
-                        full_url = urljoin("https://www.catlux.de/", href)
-
-                        pdfs.append({
-                            'name': pdf_name,
-                            'url': href,
-                            'full_url': full_url,
-                            'is_solution': pdf_info['is_solution'],
-                            'doc_id': doc_id,
-                            'doc_number': doc_number,
-                            'doc_type': doc_type,
-                            'doc_title': doc_title,
-                            'text': container.get_text(strip=True)[:100]
-                        })
-
-                except Exception as e:
-                    logger.warning(f"Error procesando contenedor: {e}")
+            for pdf in page_pdfs:
+                # Evitar duplicados
+                if pdf['name'] in found_docs:
                     continue
+                found_docs.add(pdf['name'])
+                pdfs.append(pdf)
+
+            if known is not None and all(pdf['name'] in known for pdf in page_pdfs):
+                logger.debug(f"Página {page_num} sin documentos nuevos, fin del listado incremental")
+                break
 
         return pdfs
 
@@ -344,15 +727,18 @@ class PDFManager:
 
         return dict(grouped)
 
-    def print_preview(self, pdfs: List[Dict], base_url: str, save_path: Optional[Path] = None) -> None:
+    def print_preview(self, pdfs: List[Dict], base_url: str, save_path: Optional[Path] = None,
+                      limit: Optional[int] = None) -> None:
         """
         Imprime preview de PDFs encontrados con títulos, categorías y estado local.
-        Muestra cada PDF (examen y solución) como documentos independientes, ordenados por REF.
+        Muestra cada PDF (examen y solución) como documentos independientes.
 
         Args:
-            pdfs: Lista de PDFs
+            pdfs: Lista de PDFs en el orden a mostrar (preview_pdfs() ya la ordena por REF)
             base_url: URL base para contexto
             save_path: Ruta donde se guardarían los PDFs (para mostrar estado local)
+            limit: Máximo de filas a imprimir (None = todas); el resto se ve con
+                el visor paginado (catlux_viewer.py)
         """
         print("\n" + "=" * 165)
         print("📋 PREVIEW DE PDFS ENCONTRADOS")
@@ -364,81 +750,239 @@ class PDFManager:
         print(f"\n📚 Clase: {klasse.replace('klasse-', '').upper()}")
         print(f"📖 Asignatura: {subject.upper()}\n")
 
-        # Contar estado
-        downloaded = sum(1 for p in pdfs if p.get('is_local', False))
-        new = sum(1 for p in pdfs if not p.get('is_local', False))
+        # Contar estado (una sola pasada)
+        stats = preview_stats(pdfs)
 
-        print(f"✓ {len(pdfs)} PDFs encontrados")
-        print(f"  - Exámenes: {sum(1 for p in pdfs if not p['is_solution'])}")
-        print(f"  - Soluciones: {sum(1 for p in pdfs if p['is_solution'])}")
-        print(f"  - Ya descargados: {downloaded}")
-        print(f"  - Nuevos: {new}\n")
-
-        # Ordenar PDFs por REF (número de referencia) de menor a mayor
-        sorted_pdfs = sorted(pdfs, key=extract_ref_number)
+        print(f"✓ {stats['total']} PDFs encontrados")
+        print(f"  - Exámenes: {stats['exams']}")
+        print(f"  - Soluciones: {stats['solutions']}")
+        print(f"  - Ya descargados: {stats['local']}")
+        print(f"  - Nuevos: {stats['new']}")
+        duplicates = sum(1 for pdf in pdfs if pdf.get('duplicate_of'))
+        if duplicates:
+            print(f"  - Posibles duplicados de locales (≈): {duplicates}")
+        print()
 
         print("-" * 165)
-        print(f"{'#':3} | {'LOC':3} | {'TIPO':8} | {'ID':7} | {'REF':8} | {'Categoría':35} | {'Título':75}")
+        print(PREVIEW_HEADER)
         print("-" * 165)
 
-        for i, pdf in enumerate(sorted_pdfs, 1):
-            local_status = "✓" if pdf.get('is_local', False) else " "
-            doc_type = "Solution" if pdf['is_solution'] else "Exam"
-
-            # Truncar datos para que quepan en columnas
-            doc_category = pdf.get('doc_type', 'Documento')[:33]
-            doc_title_display = pdf.get('doc_title', 'Sin título')[:73]
-            doc_number = pdf.get('doc_number', f"#{pdf['doc_id']}")
-            pdf_id = pdf['name'].replace('_solution', '')
-
-            print(f"{i:3} | {local_status:3} | {doc_type:8} | {pdf_id:7} | {doc_number:8} | {doc_category:35} | {doc_title_display:75}")
+        shown = pdfs if limit is None else pdfs[:limit]
+        for i, pdf in enumerate(shown, 1):
+            print(format_preview_row(i, pdf))
 
         print("-" * 165)
-        print(f"Total: {len(pdfs)} PDFs ({sum(1 for p in pdfs if not p['is_solution'])} exámenes + {sum(1 for p in pdfs if p['is_solution'])} soluciones)")
-        print("Leyenda: LOC=Local (✓=descargado, -=nuevo), TIPO=Exam/Solution, ID=ID descarga, REF=Referencia CatLux")
+        if len(shown) < stats['total']:
+            print(f"... {stats['total'] - len(shown)} filas más: elige la opción 3 (visor paginado) "
+                  f"para verlas, filtrarlas y ordenarlas")
+        print(f"Total: {stats['total']} PDFs ({stats['exams']} exámenes + {stats['solutions']} soluciones)")
+        print("Leyenda: LOC=Local (✓=descargado, ≈=posible duplicado de uno local, -=nuevo), TIPO=Exam/Solution, ID=ID descarga, REF=Referencia CatLux")
         print("=" * 165 + "\n")
 
 
+PREVIEW_HEADER = (f"{'#':3} | {'LOC':3} | {'TIPO':8} | {'ID':7} | {'REF':8} | "
+                  f"{'Categoría':35} | {'Título':75}")
+
+
+def preview_stats(pdfs: List[Dict]) -> Dict[str, int]:
+    """
+    Cuenta exámenes, soluciones, locales y nuevos en una sola pasada.
+
+    Args:
+        pdfs: Lista de PDFs
+
+    Returns:
+        Diccionario con total, exams, solutions, local y new
+    """
+    stats = {'total': 0, 'exams': 0, 'solutions': 0, 'local': 0, 'new': 0}
+    for pdf in pdfs:
+        stats['total'] += 1
+        stats['solutions' if pdf['is_solution'] else 'exams'] += 1
+        stats['local' if pdf.get('is_local', False) else 'new'] += 1
+    return stats
+
+
+def format_preview_row(i: int, pdf: Dict) -> str:
+    """
+    Formatea una fila de la tabla del preview.
+
+    Args:
+        i: Número de fila (1-basado)
+        pdf: Diccionario del PDF
+
+    Returns:
+        Línea de la tabla (165 columnas)
+    """
+    local_status = "✓" if pdf.get('is_local', False) else "≈" if pdf.get('duplicate_of') else " "
+    doc_type = "Solution" if pdf['is_solution'] else "Exam"
+
+    # Truncar datos para que quepan en columnas
+    doc_category = pdf.get('doc_type', 'Documento')[:33]
+    doc_title_display = pdf.get('doc_title', 'Sin título')[:73]
+    doc_number = pdf.get('doc_number', f"#{pdf['doc_id']}")
+    pdf_id = pdf['name'].replace('_solution', '')
+
+    return (f"{i:3} | {local_status:3} | {doc_type:8} | {pdf_id:7} | {doc_number:8} | "
+            f"{doc_category:35} | {doc_title_display:75}")
+
+
 # ============================================================================
 # FUNCIONES DE UTILIDAD
 # ============================================================================
 
+def iter_local_pdfs(root: Path, skip: Optional[Path] = None) -> Iterator[Tuple[str, Path]]:
+    """
+    Recorre root una sola vez y da (nombre sin .pdf, ruta) de cada PDF.
+
+    Usa os.scandir: el tipo de cada entrada viene del propio listado del
+    directorio, sin un stat por archivo (lo que más cuesta en SMB/NFS). Las
+    carpetas ocultas (staging del prefetch, etc.) no se recorren.
+
+    Args:
+        root: Carpeta raíz
+        skip: Subcarpeta que no se recorre (ya indexada aparte)
+    """
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        path = Path(entry.path)
+                        if path != skip:
+                            stack.append(path)
+                    elif entry.name.endswith('.pdf'):
+                        yield entry.name[:-len('.pdf')], Path(entry.path)
+        except OSError as e:
+            logger.debug(f"No se pudo leer {directory}: {e}")
+
+
+def index_local_pdfs(root: Path, skip: Optional[Path] = None) -> Dict[str, Path]:
+    """Índice nombre → ruta de los PDFs bajo root (el primero encontrado si hay varios)."""
+    index: Dict[str, Path] = {}
+    for name, path in iter_local_pdfs(root, skip):
+        index.setdefault(name, path)
+    return index
+
+
 def mark_local_files(pdfs: List[Dict], save_path: Path, search_root_path: Optional[Path] = None) -> None:
     """
     Marca cuáles PDFs ya existen localmente.
 
     Busca en:
-    - La carpeta específica (save_path)
-    - Si search_root_path se proporciona, busca recursivamente en TODAS las subcarpetas
+    - La carpeta específica (save_path), con sus subcarpetas
+    - Si search_root_path se proporciona, en TODAS las subcarpetas de la raíz
 
-    Esto permite detectar PDFs descargados en otro lugar o manualmente.
+    Cada árbol se recorre una sola vez (index_local_pdfs()), en vez de una
+    búsqueda recursiva por PDF, y la búsqueda no depende de la organización de
+    carpetas: un PDF se detecta tanto en la carpeta plana como en cualquier
+    subcarpeta (catlux_layout.py), también a mitad de una migración.
 
     Args:
         pdfs: Lista de PDFs a marcar
         save_path: Ruta donde buscar los archivos (punto de partida)
         search_root_path: Ruta raíz para buscar recursivamente (ej: CATLUX_SAVE_PATH)
     """
+    local = index_local_pdfs(save_path)
+    elsewhere: Optional[Dict[str, Path]] = None
+
     for pdf in pdfs:
-        # Por defecto, marcar como no local
         pdf['is_local'] = False
-        pdf['local_path'] = None
-
-        pdf_file = save_path / (pdf['name'] + '.pdf')
-
-        # Primero buscar en la carpeta específica
-        if pdf_file.exists():
+        pdf['local_path'] = local.get(pdf['name'])
+        if pdf['local_path'] is not None:
             pdf['is_local'] = True
-            pdf['local_path'] = pdf_file  # Guardar ruta completa
             continue
 
-        # Si no encontró y search_root_path existe, buscar recursivamente en TODAS las subcarpetas
+        # Si no está en la categoría, buscar en el resto de la raíz (un solo recorrido)
         if search_root_path and search_root_path.exists():
-            # Buscar recursivamente bajo la raíz (CATLUX_SAVE_PATH)
-            for found_file in search_root_path.rglob(f"{pdf['name']}.pdf"):
+            if elsewhere is None:
+                elsewhere = index_local_pdfs(search_root_path, skip=save_path)
+            found_file = elsewhere.get(pdf['name'])
+            if found_file is not None:
                 pdf['is_local'] = True
-                pdf['local_path'] = found_file  # Guardar ruta completa
-                logger.info(f"Detectado en otra carpeta: {found_file.relative_to(search_root_path)}")
-                break
+                pdf['local_path'] = found_file
+                logger.debug(f"Detectado en otra carpeta: {found_file.relative_to(search_root_path)}")
+
+
+def build_download_queue(pdfs: List[Dict], selected_indices: List[int], save_path: Path,
+                         save_base_path: Optional[Path] = None) -> List[Dict]:
+    """
+    Construye la lista ordenada de PDFs a descargar a partir de la selección.
+
+    - Salta los PDFs que ya existen localmente (marcados en mark_local_files())
+    - Para cada examen añade automáticamente su solución justo después, si la
+      solución no existe ya en save_path
+    - Cada PDF aparece una sola vez aunque examen y solución estén seleccionados
+      (antes la solución se descargaba y contaba dos veces)
+
+    Compartida por el motor síncrono y el asíncrono.
+
+    Args:
+        pdfs: Lista completa de PDFs (para encontrar soluciones)
+        selected_indices: Índices (0-basado) seleccionados en pdfs
+        save_path: Carpeta de destino de la categoría
+        save_base_path: Raíz CATLUX_SAVE_PATH (solo para los mensajes de log)
+
+    Returns:
+        Lista de PDFs a descargar, en orden
+    """
+    by_name = {pdf['name']: pdf for pdf in pdfs}
+    queue = []
+    queued = set()
+
+    for i in selected_indices:
+        if i >= len(pdfs):
+            continue
+        pdf = pdfs[i]
+        pdf_name = pdf['name']
+
+        # Si ya existe localmente (marcado en mark_local_files()), saltarlo
+        if pdf.get('is_local', False):
+            local_path = pdf.get('local_path') or pdf_path(save_path, pdf)
+            shown = local_path.relative_to(save_base_path) if save_base_path else local_path
+            logger.debug(f"✓ {pdf_name}.pdf - ya existe en {shown}")
+            continue
+
+        if pdf_name not in queued:
+            queued.add(pdf_name)
+            queue.append(pdf)
+
+        # Para cada examen, añadir automáticamente su solución
+        if not pdf['is_solution']:
+            solution_name = f"{pdf_name}_solution"
+            solution = by_name.get(solution_name)
+            if solution and solution_name not in queued:
+                if solution.get('is_local', False) or pdf_path(save_path, solution).exists():
+                    # La solución ya existe localmente, no descargar
+                    logger.debug(f"✓ {solution_name}.pdf - ya existe")
+                else:
+                    queued.add(solution_name)
+                    queue.append(solution)
+
+    return queue
+
+
+def select_by_ids(pdfs: List[Dict], tokens: List[str]) -> Tuple[List[int], List[str]]:
+    """
+    Traduce IDs de documento a índices de pdfs.
+
+    Un ID (p.ej. 119215) selecciona el examen y su solución; un nombre
+    (119215_solution) selecciona solo ese PDF.
+
+    Args:
+        pdfs: Lista de PDFs
+        tokens: IDs o nombres
+
+    Returns:
+        Tupla (índices 0-basados ordenados, tokens que no coinciden con nada)
+    """
+    wanted = {t.strip().lstrip('#') for t in tokens if t.strip()}
+    indices = [i for i, pdf in enumerate(pdfs) if pdf['doc_id'] in wanted or pdf['name'] in wanted]
+    found = {pdfs[i]['doc_id'] for i in indices} | {pdfs[i]['name'] for i in indices}
+    return indices, sorted(wanted - found)
 
 
 def ask_download_selection(pdfs: List[Dict]) -> Optional[List[int]]:
@@ -457,7 +1001,8 @@ def ask_download_selection(pdfs: List[Dict]) -> Optional[List[int]]:
     print("\nOpciones de descarga:")
     print("  0. Descargar TODOS (incluyendo archivos ya descargados)")
     print("  1. Descargar solo NUEVOS (archivos que no existen aún)")
-    print("  2. Seleccionar números específicos (ej: 1,3,5)")
+    print("  2. Seleccionar IDs de documento (ej: 119215,118065)")
+    print("  3. Visor paginado (filtrar, ordenar y marcar)")
     print("\nOpciones de navegación:")
     print("  8. NO descargar nada (salir)")
     print("  9. Volver atrás (seleccionar otras categorías)")
@@ -477,15 +1022,24 @@ def ask_download_selection(pdfs: List[Dict]) -> Optional[List[int]]:
                 return new_indices
 
             elif user_input == '2':
-                # Seleccionar números específicos
-                numbers_input = input("Escribe números (ej: 1,3,5): ").strip()
-                indices = [int(x.strip()) - 1 for x in numbers_input.split(',')]
-                if all(0 <= i < len(pdfs) for i in indices):
-                    return sorted(list(set(indices)))
+                # Seleccionar por ID de documento (no depende del orden de la tabla)
+                ids_input = input("Escribe IDs (ej: 119215,118065): ").strip()
+                indices, unknown = select_by_ids(pdfs, ids_input.split(','))
+                if indices and not unknown:
+                    return indices
                 else:
-                    print(f"❌ Números inválidos. Rango válido: 1-{len(pdfs)}")
+                    print(f"❌ IDs no encontrados: {', '.join(unknown) or ids_input}")
                     continue
 
+            elif user_input == '3':
+                # Visor paginado: solo se pinta la página visible
+                from catlux_viewer import PreviewViewer
+                indices = PreviewViewer(pdfs).run()
+                if indices is not None:
+                    return indices
+                print("\nOpciones: 0=todos, 1=nuevos, 2=IDs, 3=visor, 8=nada, 9=volver")
+                continue
+
             elif user_input == '8':
                 # No descargar nada (salir)
                 return []
@@ -495,7 +1049,7 @@ def ask_download_selection(pdfs: List[Dict]) -> Optional[List[int]]:
                 return None  # Señal para volver atrás
 
             else:
-                print("❌ Opción inválida. Usa 0, 1, 2, 8, o 9")
+                print("❌ Opción inválida. Usa 0, 1, 2, 3, 8, o 9")
                 continue
 
         except (ValueError, IndexError):
@@ -537,19 +1091,19 @@ def get_credentials() -> Tuple[Optional[str], Optional[str], Optional[str], Opti
     return username, password, cert_path if cert_path else None, save_path
 
 
-def login_to_catlux(session: requests.Session, username: str, password: str,
-                    cert_path: Optional[str]) -> bool:
+def login_to_catlux(session: "requests.Session", username: str, password: str,
+                    cert_path: Optional[str], login_url: str = LOGIN_URL) -> bool:
     """
     Realiza login en CatLux con credenciales proporcionadas.
 
-    Extrae dinámicamente el formulario de login, REQUEST_TOKEN y otros parámetros
-    para manejar cambios en la estructura de CatLux.
+    El formulario y el REQUEST_TOKEN se extraen con build_login_payload().
 
     Args:
         session: Sesión de requests para realizar la autenticación
         username: Nombre de usuario/email de CatLux
         password: Contraseña de CatLux
         cert_path: Ruta al certificado SSL (opcional, puede ser None)
+        login_url: URL del formulario de login (por defecto LOGIN_URL)
 
     Returns:
         True si el login fue exitoso, False en caso contrario
@@ -559,54 +1113,14 @@ def login_to_catlux(session: requests.Session, username: str, password: str,
         # (CatLux usa certificado auto-firmado)
         kwargs = {"verify": False, "timeout": 10}
 
-        login_page_req = session.get(LOGIN_URL, **kwargs)
+        login_page_req = session.get(login_url, **kwargs)
         login_page_req.raise_for_status()
 
-        soup_login = BeautifulSoup(login_page_req.content, 'html.parser')
-
-        # Buscar el formulario de login (el que tiene username y password)
-        login_form = None
-        for form in soup_login.find_all('form'):
-            if form.find('input', {'name': 'username'}) and form.find('input', {'name': 'password'}):
-                login_form = form
-                break
-
-        if not login_form:
-            logger.error("No se encontró formulario de login")
-            return False
-
-        # Obtener el ID del formulario (es el FORM_SUBMIT value)
-        form_submit_value = login_form.get('id', 'tl_login')
-
-        # Obtener el REQUEST_TOKEN del formulario
-        token_input = login_form.find('input', {'name': 'REQUEST_TOKEN'})
-        if not token_input:
-            logger.error("No se encontró REQUEST_TOKEN")
+        payload = build_login_payload(login_page_req.content, username, password)
+        if payload is None:
             return False
 
-        request_token = token_input.get('value', '')
-
-        # Obtener otros campos ocultos
-        target_path = ''
-        target_path_input = login_form.find('input', {'name': '_target_path'})
-        if target_path_input:
-            target_path = target_path_input.get('value', '')
-
-        # Construir payload
-        payload = {
-            'FORM_SUBMIT': form_submit_value,
-            'REQUEST_TOKEN': request_token,
-            'username': username,
-            'password': password
-        }
-
-        if target_path:
-            payload['_target_path'] = target_path
-            payload['_always_use_target_path'] = '0'
-
-        logger.info(f"Login: usando FORM_SUBMIT={form_submit_value}")
-
-        login_req = session.post(LOGIN_URL, data=payload, **kwargs)
+        login_req = session.post(login_url, data=payload, **kwargs)
         login_req.raise_for_status()
 
         logger.info("✓ Login exitoso")
@@ -624,40 +1138,57 @@ def login_to_catlux(session: requests.Session, username: str, password: str,
 def select_category_interactive() -> Optional[str]:
     """
     Permite al usuario seleccionar la categoría interactivamente.
-    Construye la URL: https://www.catlux.de/proben/gymnasium/klasse-X/asignatura/tipo
+
+    Usa el mapa del sitio (catlux_sitemap.py, recorrido de nuevo si caducó)
+    para ofrecer solo las categorías que existen, con su número de documentos.
+    Sin mapa (sin credenciales o sin red) se ofrecen las listas conocidas de
+    proben/gymnasium.
 
     Returns:
         URL construida o None si el usuario cancela
     """
-    base_url = "https://www.catlux.de/proben/gymnasium"
+    from catlux_sitemap import load_sitemap, select_from_sitemap
 
-    # Klassen disponibles
-    klassen = {
-        '5': 'klasse-5',
-        '6': 'klasse-6',
-        '7': 'klasse-7',
-        '8': 'klasse-8',
-        '9': 'klasse-9',
-        '10': 'klasse-10',
-        '11': 'klasse-11',
-        '12': 'klasse-12',
+    sitemap = load_sitemap(SITEMAP_FILE)
+
+    print("\n" + "=" * 80)
+    print("📚 SELECCIONAR CATEGORÍA")
+    print("=" * 80)
+
+    url = select_from_sitemap(sitemap) if sitemap is not None else None
+    if url is None:
+        if sitemap is not None:
+            print("⚠️  El mapa del sitio no tiene categorías; se muestran las conocidas")
+        url = _select_category_static()
+
+    print("\n" + "=" * 80)
+    print(f"📌 URL: {url}")
+    print("=" * 80 + "\n")
+
+    return url
+
+
+def _select_category_static() -> str:
+    """
+    Selección con las listas fijas de proben/gymnasium (sin mapa del sitio).
+    Construye la URL: https://www.catlux.de/proben/gymnasium/klasse-X/asignatura/tipo
+    """
+    base_url = "https://www.catlux.de/proben/gymnasium"
+
+    # Klassen disponibles
+    klassen = {
+        '5': 'klasse-5',
+        '6': 'klasse-6',
+        '7': 'klasse-7',
+        '8': 'klasse-8',
+        '9': 'klasse-9',
+        '10': 'klasse-10',
+        '11': 'klasse-11',
+        '12': 'klasse-12',
     }
 
     # Asignaturas disponibles
-    subjects = {
-        '1': 'deutsch',
-        '2': 'englisch',
-        '3': 'mathematik',
-        '4': 'latein',
-        '5': 'franzoesisch',
-        '6': 'geschichte',
-        '7': 'erdkunde-geographie',
-        '8': 'biologie',
-        '9': 'chemie',
-        '10': 'physik',
-        '11': 'natur-und-technik',
-        '12': 'sonstiges',
-    }
+    subjects = {str(n): subject for n, subject in enumerate(GYMNASIUM_SUBJECTS, 1)}
 
     # Tipos de documentos
     doc_types = {
@@ -669,10 +1200,6 @@ def select_category_interactive() -> Optional[str]:
         '6': 'grammatik',
     }
 
-    print("\n" + "=" * 80)
-    print("📚 SELECCIONAR CATEGORÍA")
-    print("=" * 80)
-
     # Seleccionar Klasse
     print("\n📍 Selecciona Klasse:")
     for key, value in klassen.items():
@@ -719,20 +1246,34 @@ def select_category_interactive() -> Optional[str]:
         else:
             print("❌ Opción inválida")
 
-    print("\n" + "=" * 80)
-    print(f"📌 URL: {url}")
-    print("=" * 80 + "\n")
-
     return url
 
 
-def preview_pdfs(base_url: str, max_pages: int = 10) -> Tuple[List[Dict], List[int]]:
+def preview_pdfs(base_url: str, max_pages: int = 10, engine: str = "sync",
+                 concurrency: int = 16, prefetcher=None, output_format: str = "text",
+                 select: Optional[str] = None, preview_only: bool = False,
+                 details: bool = False, listings=None) -> Tuple[List[Dict], List[int]]:
     """
     Muestra preview de PDFs y pregunta cuáles descargar.
 
     Args:
         base_url: URL base de la clase
         max_pages: Máximo de páginas a procesar
+        engine: Motor de red para el listado ("sync" o "async")
+        concurrency: Peticiones en vuelo del motor asíncrono
+        prefetcher: Prefetcher (catlux_prefetch.py) opcional; si se pasa, los PDFs
+            nuevos se precargan mientras el usuario elige y la sesión
+            autenticada pasa a ser suya
+        output_format: "text" (tabla) o json/jsonl/csv (catlux_output.py)
+        select: Expresión de --select; si se pasa (o el formato no es text)
+            no se pregunta nada
+        preview_only: Solo mostrar (y guardar el snapshot), sin preguntar ni
+            seleccionar nada (--preview)
+        details: Añadir los campos de la página de detalle de cada documento
+            (--details, catlux_details.py; solo motor sync)
+        listings: ListingLookahead (catlux_lookahead.py) opcional; si ya tiene
+            el listado no se vuelve a paginar, y mientras el usuario elige se
+            precargan las categorías vecinas (solo motor sync)
 
     Returns:
         Tupla de (lista de PDFs, índices a descargar)
@@ -746,25 +1287,72 @@ def preview_pdfs(base_url: str, max_pages: int = 10) -> Tuple[List[Dict], List[i
     if not full_save_path:
         return [], []
 
-    session = requests.Session()
+    session = new_session()
 
     try:
-        if not login_to_catlux(session, username, password, cert_path):
-            return [], []
-
         manager = PDFManager(session, cert_path)
-        pdfs = manager.fetch_pdfs(base_url, max_pages)
+
+        if engine == "async":
+            import catlux_async
+            pdfs = catlux_async.fetch_listing(base_url, max_pages, concurrency)
+            if pdfs is None:
+                return [], []
+        else:
+            if not login_to_catlux(session, username, password, cert_path,
+                                   urljoin(get_site_root(base_url), "login")):
+                return [], []
+            pdfs = listings.take(base_url) if listings is not None else None
+            if pdfs is None:
+                pdfs = manager.fetch_pdfs(base_url, max_pages)
+                if listings is not None:
+                    listings.remember(base_url, pdfs)
 
         # Marcar archivos locales (buscar recursivamente en CATLUX_SAVE_PATH)
         mark_local_files(pdfs, full_save_path, Path(save_base_path))
 
-        # Mostrar preview
-        manager.print_preview(pdfs, base_url, full_save_path)
+        # Retirar los PDFs que no existen (p.ej. soluciones) antes de gastar cuota
+        if engine == "sync":
+            from catlux_catalog import Catalog, probe_listing
+            pdfs = probe_listing(session, base_url, pdfs, Catalog(CATALOG_FILE))
+
+            if details:
+                from catlux_details import DetailCache, enrich_details
+                enrich_details(session, get_site_root(base_url), pdfs, DetailCache(DETAILS_FILE))
 
-        # IMPORTANTE: Reordenar la lista igual que en print_preview()
+        # Marcar los nuevos que parecen duplicados de documentos ya descargados
+        from catlux_dedup import check_duplicates
+        check_duplicates(pdfs, full_save_path.relative_to(save_base_path).as_posix(), DEDUP_FILE)
+
+        # IMPORTANTE: Ordenar la lista igual que en print_preview()
         # para que los índices seleccionados correspondan a lo que el usuario vio
         pdfs = sorted(pdfs, key=extract_ref_number)
 
+        # Guardar el listado para un --download --from-snapshot posterior
+        try:
+            from catlux_snapshot import save_snapshot
+            save_snapshot(SNAPSHOT_DIR, base_url, pdfs, max_pages)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el snapshot del listado: {e}")
+
+        if output_format != "text" or select is not None or preview_only:
+            # Modo no interactivo: selección por expresión y salida para máquinas
+            import catlux_output
+            selected_indices = catlux_output.select_indices(pdfs, select) if select else []
+            if output_format == "text":
+                manager.print_preview(pdfs, base_url, full_save_path)
+            else:
+                catlux_output.write_preview(pdfs, output_format, selected_indices)
+            return pdfs, [] if preview_only else selected_indices
+
+        # Mostrar preview (las listas largas se recorren con el visor paginado)
+        manager.print_preview(pdfs, base_url, full_save_path, limit=PREVIEW_INLINE_ROWS)
+
+        # Precargar los nuevos mientras el usuario decide (solo motor sync)
+        if prefetcher is not None and engine == "sync":
+            prefetcher.start(session, pdfs)
+        if listings is not None and engine == "sync":
+            listings.prefetch_around(base_url)
+
         # Pedir selección
         selected_indices = ask_download_selection(pdfs)
 
@@ -775,13 +1363,16 @@ def preview_pdfs(base_url: str, max_pages: int = 10) -> Tuple[List[Dict], List[i
         return [], []
 
     finally:
-        session.close()
+        # Si el prefetcher tomó la sesión, la cerrará él
+        if prefetcher is None or prefetcher.session is not session:
+            session.close()
 
 
 def download_filtered_pdfs(base_url: str, max_pages: int = 10,
                           tracker: Optional[DownloadTracker] = None,
                           pdfs: Optional[List[Dict]] = None,
-                          selected_indices: Optional[List[int]] = None) -> int:
+                          selected_indices: Optional[List[int]] = None,
+                          prefetcher=None) -> int:
     """
     Descarga PDFs de una clase desde CatLux.
 
@@ -791,6 +1382,8 @@ def download_filtered_pdfs(base_url: str, max_pages: int = 10,
         tracker: Rastreador de descargas
         pdfs: Lista pre-obtenida de PDFs (si es None, se obtiene)
         selected_indices: Índices de PDFs a descargar (0-basado)
+        prefetcher: Prefetcher con PDFs ya precargados y sesión autenticada
+            (opcional); el llamador debe cerrarlo después
 
     Returns:
         Número de PDFs descargados
@@ -817,10 +1410,13 @@ def download_filtered_pdfs(base_url: str, max_pages: int = 10,
         return 0
 
     downloaded_count = 0
-    session = requests.Session()
+    # Reutilizar la sesión ya autenticada del prefetch (evita un segundo login)
+    warm = prefetcher is not None and prefetcher.session is not None
+    session = prefetcher.session if warm else new_session()
 
     try:
-        if not login_to_catlux(session, username, password, cert_path):
+        if not warm and not login_to_catlux(session, username, password, cert_path,
+                                            urljoin(get_site_root(base_url), "login")):
             logger.error("No se pudo completar el login")
             return 0
 
@@ -829,82 +1425,33 @@ def download_filtered_pdfs(base_url: str, max_pages: int = 10,
 
         # Si no se pasaron PDFs, obtenerlos ahora
         if pdfs is None:
+            from catlux_catalog import Catalog, probe_listing
             pdfs = manager.fetch_pdfs(base_url, max_pages)
+            mark_local_files(pdfs, full_save_path, Path(save_base_path))
+            pdfs = probe_listing(session, base_url, pdfs, Catalog(CATALOG_FILE))
             # Si no se especificaron índices, descargar todos
             if selected_indices is None:
                 selected_indices = list(range(len(pdfs)))
 
         print("\n🔄 Iniciando descargas...\n")
 
-        # Descargar solo los PDFs seleccionados
-        pdfs_to_download = [pdfs[i] for i in selected_indices if i < len(pdfs)]
+        # Solo los PDFs seleccionados, con su solución automática y sin duplicados
+        queue = build_download_queue(pdfs, selected_indices, full_save_path, Path(save_base_path))
 
-        # Crear conjunto de IDs ya procesados para evitar descargar dos veces
-        processed_ids = set()
+        # Si la selección no cabe en el saldo, decidir qué entra sin partir pares
+        if len(queue) > remaining:
+            from catlux_planner import plan_downloads, print_plan
+            plan = plan_downloads(queue, remaining)
+            print_plan(plan, dry_run=False)
+            queue = plan.pdfs
 
-        for pdf in pdfs_to_download:
-            if tracker.get_remaining_downloads() == 0:
-                logger.warning("Límite alcanzado, deteniendo descargas")
-                break
-
-            pdf_name = pdf['name']
-            pdf_save_path = full_save_path / (pdf_name + ".pdf")
-
-            # Si ya existe localmente (marcado en mark_local_files()), saltarlo
-            if pdf.get('is_local', False):
-                local_path = pdf.get('local_path', pdf_save_path)
-                logger.info(f"✓ {pdf_name}.pdf - ya existe en {local_path.relative_to(Path(save_base_path))}")
-                continue
-
-            # Descargar
-            try:
-                r = session.get(pdf['full_url'], verify=False, timeout=30)
-                r.raise_for_status()
-
-                with open(pdf_save_path, 'wb') as f:
-                    f.write(r.content)
-
-                tracker.record_download(pdf_name)
-                downloaded_count += 1
-                logger.info(f"⬇ {pdf_name}.pdf - descargado ({tracker.get_remaining_downloads()} restantes)")
-
-                # Para cada examen descargado, intentar descargar automáticamente su solución
-                # (Esto previene descargas duplicadas si la solución aparece por separado en la lista)
-                if not pdf['is_solution']:
-                    base_id = pdf['name']
-                    # Verificar si ya procesamos este ID de examen
-                    if base_id not in processed_ids:
-                        processed_ids.add(base_id)  # Marcar como procesado para evitar duplicados
-
-                        # Buscar la solución correspondiente en la lista de PDFs
-                        solution_name = f"{base_id}_solution"
-                        solution = next((p for p in pdfs if p['name'] == solution_name), None)
-
-                        if solution:
-                            solution_path = full_save_path / (solution_name + ".pdf")
-
-                            # Solo descargar si el archivo de solución no existe localmente
-                            if not solution_path.exists():
-                                try:
-                                    # Descargar el PDF de solución
-                                    r_sol = session.get(solution['full_url'], verify=False, timeout=30)
-                                    r_sol.raise_for_status()
-
-                                    with open(solution_path, 'wb') as f:
-                                        f.write(r_sol.content)
-
-                                    tracker.record_download(solution_name)
-                                    downloaded_count += 1
-                                    logger.info(f"⬇ {solution_name}.pdf - descargado ({tracker.get_remaining_downloads()} restantes)")
-
-                                except Exception as e:
-                                    logger.error(f"Error descargando solución {solution_name}: {e}")
-                            else:
-                                # La solución ya existe localmente, no descargar
-                                logger.info(f"✓ {solution_name}.pdf - ya existe")
-
-            except Exception as e:
-                logger.error(f"Error descargando {pdf_name}: {e}")
+        # Guardar la selección en la cola persistente antes de descargar nada:
+        # si el proceso muere, --resume continúa desde aquí
+        from catlux_queue import JobQueue
+        with JobQueue(QUEUE_FILE) as job_queue:
+            batch = job_queue.enqueue(base_url, full_save_path, queue)
+            downloaded_count = run_download_jobs(job_queue, session, tracker, batch,
+                                                 prefetcher if warm else None)
 
         logger.info(f"Descarga completada: {downloaded_count} nuevos PDFs")
 
@@ -912,7 +1459,300 @@ def download_filtered_pdfs(base_url: str, max_pages: int = 10,
         logger.error(f"Error en descarga: {e}")
 
     finally:
-        session.close()
+        if not warm:
+            session.close()
+
+    tracker.print_status()
+    return downloaded_count
+
+
+def download_from_snapshot(base_url: Optional[str], tracker: Optional[DownloadTracker] = None,
+                           select: Optional[str] = None, engine: str = "sync",
+                           concurrency: int = 16) -> int:
+    """
+    Descarga desde el snapshot del último preview (--download --from-snapshot).
+
+    No vuelve a listar la categoría: los PDFs salen del snapshot y solo se
+    refresca el estado local (puede haber cambiado desde el preview).
+
+    Args:
+        base_url: URL de la categoría (None = snapshot más reciente)
+        tracker: Rastreador de descargas
+        select: Expresión de --select (por defecto "new")
+        engine: Motor de red ("sync" o "async")
+        concurrency: Peticiones en vuelo del motor asíncrono
+
+    Returns:
+        Número de PDFs descargados
+    """
+    import catlux_output
+    from catlux_snapshot import SnapshotError, load_snapshot
+
+    try:
+        base_url, pdfs = load_snapshot(SNAPSHOT_DIR, base_url)
+    except SnapshotError as e:
+        logger.error(f"❌ {e}")
+        return 0
+
+    username, password, _, save_base_path = get_credentials()
+    if not all([username, password, save_base_path]):
+        return 0
+    full_save_path = extract_category_path(base_url, save_base_path)
+    if not full_save_path:
+        return 0
+
+    was_local = {pdf['name'] for pdf in pdfs if pdf.get('is_local')}
+    mark_local_files(pdfs, full_save_path, Path(save_base_path))
+    changed = sum(1 for pdf in pdfs if pdf['is_local'] != (pdf['name'] in was_local))
+    if changed:
+        logger.info(f"{changed} PDFs cambiaron de estado local desde el preview")
+
+    selected_indices = catlux_output.select_indices(pdfs, select or "new")
+    logger.info(f"Snapshot de {base_url}: {len(selected_indices)} de {len(pdfs)} PDFs seleccionados")
+    if not selected_indices:
+        return 0
+
+    if engine == "async":
+        from catlux_async import download_filtered_pdfs_async
+        return download_filtered_pdfs_async(base_url, tracker=tracker, pdfs=pdfs,
+                                            selected_indices=selected_indices,
+                                            concurrency=concurrency)
+    return download_filtered_pdfs(base_url, tracker=tracker, pdfs=pdfs,
+                                  selected_indices=selected_indices)
+
+
+# Limitador de ancho de banda compartido por todas las descargas (catlux_throttle.py)
+_download_throttle = None
+
+
+def set_download_throttle(throttle) -> None:
+    """
+    Activa (o con None desactiva) la limitación de ancho de banda.
+
+    Args:
+        throttle: catlux_throttle.Throttle compartido por todas las descargas
+    """
+    global _download_throttle
+    _download_throttle = throttle
+
+
+def get_download_throttle():
+    """Limitador activo, o None."""
+    return _download_throttle
+
+
+def write_pdf(dest: Path, chunks: Iterable[bytes],
+              on_chunk: Optional[Callable[[], None]] = None) -> None:
+    """
+    Escribe un PDF en dest.part y lo renombra a dest al terminar.
+
+    Una caída a mitad de escritura deja solo el .part, que nunca se toma por
+    local (ver mark_local_files()).
+
+    Args:
+        dest: Ruta final del archivo
+        chunks: Contenido del PDF (ya comprobado con check_pdf_content())
+        on_chunk: Llamada tras escribir cada trozo (latido de la cola)
+    """
+    tmp_path = dest.with_name(dest.name + ".part")
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            if on_chunk is not None:
+                on_chunk()
+    os.replace(tmp_path, dest)
+
+
+def skip_unavailable_job(job_queue, job: Dict, error: NotAPdfError) -> None:
+    """
+    Da por terminado un trabajo cuyo PDF no existe (NotAPdfError).
+
+    No se reintenta y queda en el catálogo de sondeos, para que el próximo
+    preview no lo vuelva a ofrecer.
+
+    Args:
+        job_queue: Cola de trabajos abierta
+        job: Trabajo reclamado (ver JobQueue.claim())
+        error: Error de la descarga
+    """
+    from catlux_catalog import Catalog
+
+    job_queue.fail(job['id'], str(error), max_attempts=1)
+    Catalog(CATALOG_FILE).mark_unavailable(job['base_url'], job['pdf'], error.content_type)
+    logger.warning(f"✗ {job['pdf']['name']}.pdf - no disponible "
+                   f"({error.content_type or 'sin PDF'}), se omite")
+
+
+def fetch_pdf(session: "requests.Session", pdf: Dict, dest: Path,
+              on_chunk: Optional[Callable[[], None]] = None) -> None:
+    """
+    Descarga un PDF a dest de forma atómica (ver write_pdf()).
+
+    Si la respuesta no es un PDF (p.ej. la página HTML de "sin solución") no se
+    escribe nada. Con limitación de ancho de banda activa (set_download_throttle)
+    cada trozo leído pasa por el token bucket compartido.
+
+    Args:
+        session: Sesión autenticada
+        pdf: Diccionario del PDF (usa 'full_url')
+        dest: Ruta final del archivo
+        on_chunk: Llamada tras escribir cada trozo (latido de la cola)
+
+    Raises:
+        NotAPdfError: Si la respuesta no es un PDF
+    """
+    throttle = _download_throttle
+    chunk_size = throttle.chunk_size if throttle else 64 * 1024
+
+    with session.get(pdf['full_url'], verify=False, timeout=30, stream=True) as r:
+        r.raise_for_status()
+        chunks = r.iter_content(chunk_size)
+        first = next(chunks, b"")
+        check_pdf_content(pdf['name'], first, r.headers.get('Content-Type', ''))
+
+        def throttled() -> Iterator[bytes]:
+            for chunk in itertools.chain((first,), chunks):
+                if throttle:
+                    throttle.consume(len(chunk))
+                yield chunk
+
+        write_pdf(dest, throttled(), on_chunk)
+
+
+def run_download_jobs(job_queue, session: "requests.Session", tracker: DownloadTracker,
+                      batch: Optional[str] = None, prefetcher=None,
+                      site: Optional[str] = None,
+                      on_complete: Optional[Callable[[Dict], None]] = None) -> int:
+    """
+    Vacía la cola persistente de descargas (catlux_queue.JobQueue).
+
+    Cada trabajo se reclama de forma atómica, se descarga (o se promueve desde
+    el prefetch), se registra en el tracker y se marca como hecho. Los fallos
+    se reintentan hasta MAX_ATTEMPTS; con Ctrl-C el trabajo en curso vuelve a
+    pending antes de propagar la interrupción.
+
+    Args:
+        job_queue: Cola de trabajos abierta
+        session: Sesión autenticada
+        tracker: Rastreador de descargas
+        batch: Limitar a un lote (None = todos los pendientes)
+        prefetcher: Prefetcher con la sesión activa (opcional)
+        site: Limitar a los trabajos de un sitio (el de la sesión)
+        on_complete: Llamada con cada trabajo descargado (p.ej. para invalidar su listado)
+
+    Returns:
+        Número de PDFs descargados
+    """
+    from catlux_queue import DONE_RETENTION_SECONDS, HEARTBEAT_SECONDS, current_owner
+
+    owner = current_owner()
+    downloaded_count = 0
+
+    while True:
+        # Reservar el hueco antes de reclamar: con ledger compartido otros
+        # procesos/equipos no pueden gastar el mismo saldo
+        reservation = tracker.reserve_slot()
+        if reservation is None:
+            logger.warning("Límite alcanzado, deteniendo descargas")
+            break
+
+        job = job_queue.claim(owner, batch, site)
+        if job is None:
+            tracker.release_slot(reservation)
+            break
+
+        pdf, pdf_save_path = job['pdf'], job['dest']
+        pdf_name = pdf['name']
+
+        # Latido: con --max-rate una descarga puede durar más que STALE_AFTER_SECONDS
+        # y otro proceso la daría por huérfana
+        last_beat = [time.monotonic()]
+
+        def heartbeat(job_id=job['id']) -> None:
+            if time.monotonic() - last_beat[0] >= HEARTBEAT_SECONDS:
+                last_beat[0] = time.monotonic()
+                job_queue.touch(job_id)
+
+        # Descargar (o promover la copia precargada)
+        try:
+            pdf_save_path.parent.mkdir(parents=True, exist_ok=True)
+            if not (prefetcher and prefetcher.promote(pdf, pdf_save_path)):
+                fetch_pdf(session, pdf, pdf_save_path, heartbeat)
+        except KeyboardInterrupt:
+            job_queue.release(job['id'])
+            tracker.release_slot(reservation)
+            raise
+        except NotAPdfError as e:
+            # No disponible: no cuenta
+            tracker.release_slot(reservation)
+            skip_unavailable_job(job_queue, job, e)
+            continue
+        except Exception as e:
+            tracker.release_slot(reservation)
+            retry = job_queue.fail(job['id'], str(e))
+            logger.error(f"Error descargando {pdf_name}: {e}" + (" (se reintentará)" if retry else ""))
+            continue
+
+        tracker.record_download(pdf_name, reservation)
+        job_queue.complete(job['id'])
+        downloaded_count += 1
+        if on_complete is not None:
+            on_complete(job)
+        if logger.isEnabledFor(logging.DEBUG):
+            # El saldo cuesta una lectura del ledger compartido: solo con -v
+            logger.debug(f"⬇ {pdf_name}.pdf - descargado ({tracker.get_remaining_downloads()} restantes)")
+
+    # Sin esto los trabajos hechos se acumulan para siempre en download_queue.db
+    purged = job_queue.purge_done(DONE_RETENTION_SECONDS)
+    if purged:
+        logger.debug(f"{purged} trabajos terminados hace más de una semana borrados de la cola")
+    return downloaded_count
+
+
+def resume_downloads(tracker: Optional[DownloadTracker] = None) -> int:
+    """
+    Reanuda los trabajos pendientes de la cola persistente (--resume).
+
+    Hace un login por sitio y descarga todos los trabajos pendientes, incluidos
+    los que quedaron en curso cuando el proceso anterior murió.
+
+    Args:
+        tracker: Rastreador de descargas
+
+    Returns:
+        Número de PDFs descargados
+    """
+    from catlux_queue import JobQueue
+
+    if tracker is None:
+        tracker = DownloadTracker(TRACKER_FILE)
+
+    username, password, cert_path, save_base_path = get_credentials()
+    if not all([username, password, save_base_path]):
+        return 0
+
+    downloaded_count = 0
+    with JobQueue(QUEUE_FILE) as job_queue:
+        pending = job_queue.counts().get('pending', 0) + job_queue.counts().get('in_progress', 0)
+        if not pending:
+            print("\n✓ No hay descargas pendientes\n")
+            return 0
+        logger.info(f"Reanudando {pending} descargas pendientes...")
+
+        for site_root in dict.fromkeys(get_site_root(url) for url in job_queue.pending_base_urls()):
+            session = new_session()
+            try:
+                if not login_to_catlux(session, username, password, cert_path,
+                                       urljoin(site_root, "login")):
+                    logger.error("No se pudo completar el login")
+                    continue
+                downloaded_count += run_download_jobs(job_queue, session, tracker, site=site_root)
+            finally:
+                session.close()
+
+        counts = job_queue.counts()
+        logger.info(f"Reanudación completada: {downloaded_count} nuevos PDFs "
+                    f"({counts.get('pending', 0)} pendientes, {counts.get('failed', 0)} fallidos)")
 
     tracker.print_status()
     return downloaded_count
@@ -985,7 +1825,7 @@ def main() -> int:
     parser.add_argument(
         "--preview",
         action="store_true",
-        help="Mostrar preview de PDFs SIN descargar"
+        help="Mostrar preview de PDFs SIN descargar (guarda el snapshot para --from-snapshot)"
     )
     parser.add_argument(
         "--download",
@@ -1012,18 +1852,253 @@ def main() -> int:
         action="store_true",
         help="Seleccionar categoría interactivamente (Klasse, Asignatura, Tipo)"
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reanudar las descargas pendientes de una ejecución interrumpida"
+    )
+    parser.add_argument(
+        "--shared-ledger",
+        action="store_true",
+        help="Compartir el límite mensual con otros procesos/equipos "
+             "(CATLUX_SAVE_PATH/.catlux_quota.json o CATLUX_LEDGER_PATH)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default="sync",
+        help="Motor de red: sync (requests) o async (asyncio + httpx) (default: sync)"
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Precargar los PDFs nuevos mientras eliges (solo cuentan los que selecciones)"
+    )
+    parser.add_argument(
+        "--plan",
+        nargs="+",
+        metavar="URL",
+        help="Planificar las descargas de varias categorías según el saldo mensual "
+             "(pares completos, tipo preferido, más nuevos, reparto por asignatura)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Con --plan: solo mostrar el plan, sin descargar nada"
+    )
+    parser.add_argument(
+        "--from-snapshot",
+        action="store_true",
+        help="Con --download: usar el listado guardado por el último --preview "
+             "(sin volver a listar; selección con --select, por defecto 'new')"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "json", "jsonl", "csv"],
+        default="text",
+        help="Formato de salida de preview, --info y --latest (default: text). "
+             "Con json/jsonl/csv no se pregunta nada y los mensajes van a stderr"
+    )
+    parser.add_argument(
+        "--select",
+        metavar="EXPR",
+        help="Selección no interactiva tras el preview, p.ej. 'new', "
+             "'type=Schulaufgabe,ref>=3400' (ver catlux_output.py)"
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Proceso residente: vacía el backlog de descargas en cada renovación mensual"
+    )
+    parser.add_argument(
+        "--watch",
+        nargs="+",
+        metavar="URL",
+        default=[],
+        help="Con --daemon: categorías a revisar periódicamente en busca de documentos nuevos"
+    )
+    parser.add_argument(
+        "--check-interval",
+        type=float,
+        default=6,
+        help="Con --daemon: horas entre revisiones de los listados (default: 6)"
+    )
+    parser.add_argument(
+        "--layout",
+        choices=("flat", "id-prefix", "type-year"),
+        help="Organización de las carpetas para las descargas nuevas (por defecto CATLUX_LAYOUT, "
+             "la registrada por --migrate-layout o flat; ver catlux_layout.py)"
+    )
+    parser.add_argument(
+        "--migrate-layout",
+        choices=("flat", "id-prefix", "type-year"),
+        metavar="LAYOUT",
+        help="Mover los PDFs ya descargados a otra organización (flat, id-prefix, type-year) "
+             "y registrarla; reanudable, admite --dry-run"
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="Servicio HTTP/JSON local (preview, encolar, saldo, historial) con sesión y "
+             "listados en memoria; por defecto solo en 127.0.0.1 (ver catlux_server.py)"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="DEST",
+        help="Empaquetar PDFs ya descargados en DEST (.zip o .tar, sin compresión, con "
+             "MANIFEST.json); se limita con --url, --select y --since"
+    )
+    parser.add_argument(
+        "--mirror",
+        metavar="DEST",
+        help="Copia espejo incremental de CATLUX_SAVE_PATH en DEST (solo PDFs nuevos o "
+             "cambiados, según un manifiesto en DEST)"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Con --mirror: borrar en DEST los PDFs que ya no están en el origen"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Con --mirror: listar todas las carpetas aunque su fecha no cambiara (detecta PDFs "
+             "modificados en el sitio; se hace solo cada 7 días)"
+    )
+    parser.add_argument(
+        "--since",
+        metavar="FECHA",
+        help="Con --export: solo lo descargado desde FECHA según el historial (2025-10, 2025-10-03)"
+    )
+    parser.add_argument(
+        "--pdf-info",
+        action="store_true",
+        help="Páginas y metadatos de los PDFs descargados (de --url o todo CATLUX_SAVE_PATH), "
+             "con totales para imprimir a doble cara; admite --format"
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Reducir el tamaño de los PDFs descargados (de --url o todo CATLUX_SAVE_PATH) con "
+             "pikepdf o qpdf en un pool de procesos; admite --dry-run"
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Agrupar los PDFs descargados casi iguales (de --url o todo CATLUX_SAVE_PATH); "
+             "admite --format"
+    )
+    parser.add_argument(
+        "--skip-duplicates",
+        action="store_true",
+        help="Con --plan y --daemon: no descargar posibles duplicados de documentos ya locales"
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="Consultar la página de detalle de cada documento (curso, páginas, autor, fecha; "
+             "en caché 30 días) para filtrar con --select year=/author=/pages<= (motor sync)"
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="Mostrar el árbol de categorías del sitio con su número de documentos "
+             "(se recorre si el guardado tiene más de 7 días; admite --format)"
+    )
+    parser.add_argument(
+        "--refresh-sitemap",
+        action="store_true",
+        help="Recorrer de nuevo el mapa del sitio aunque el guardado siga vigente"
+    )
+    parser.add_argument(
+        "--max-rate",
+        metavar="RATE",
+        help="Límite de ancho de banda total de las descargas en bytes/s "
+             "(acepta k y M, p.ej. 200k; 0 = sin límite)"
+    )
+    parser.add_argument(
+        "--rate-profile",
+        metavar="PROFILE",
+        help="Tasas por franja horaria, p.ej. '08:00-18:00=100k,20:00-07:00=0' "
+             "(fuera de las franjas se aplica --max-rate)"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        metavar="N",
+        help="Parsear los listados en N procesos (0 = uno por núcleo); útil con --engine async, "
+             "--plan con varias categorías y --sitemap"
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="Registrar también cada página y cada PDF (nivel DEBUG)"
+    )
+    parser.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="En consola, solo avisos y errores (el archivo de log no cambia)"
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Escribir catlux_scrapper.log en JSON compacto (un objeto por línea)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Peticiones simultáneas del motor async (default: 16)"
+    )
 
     args = parser.parse_args()
-    tracker = DownloadTracker(TRACKER_FILE)
+
+    ledger = None
+    if args.shared_ledger:
+        load_environment()
+        save_base_path = os.getenv("CATLUX_SAVE_PATH")
+        if not save_base_path and not os.getenv("CATLUX_LEDGER_PATH"):
+            print("❌ --shared-ledger necesita CATLUX_SAVE_PATH o CATLUX_LEDGER_PATH en .env")
+            return 1
+        from catlux_ledger import QuotaLedger, default_ledger_path
+        ledger = QuotaLedger(default_ledger_path(save_base_path or "."))
+
+    tracker = DownloadTracker(TRACKER_FILE, ledger)
+
+    if args.max_rate or args.rate_profile:
+        from catlux_throttle import Throttle, parse_profile, parse_rate
+        try:
+            throttle = Throttle(parse_rate(args.max_rate or "0"),
+                                parse_profile(args.rate_profile or ""))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        set_download_throttle(throttle)
+
+    if args.select is not None:
+        import catlux_output
+        try:
+            catlux_output.parse_select(args.select)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
 
     # Mostrar estado
     if args.info:
-        tracker.print_status()
+        if args.format != "text":
+            import catlux_output
+            catlux_output.write_status(tracker, args.format)
+        else:
+            tracker.print_status()
         return 0
 
     # Mostrar últimas descargas
     if args.latest:
-        show_latest_downloads(tracker)
+        if args.format != "text":
+            import catlux_output
+            catlux_output.write_history(tracker, args.format)
+        else:
+            show_latest_downloads(tracker)
         return 0
 
     # Reset tracker
@@ -1035,6 +2110,126 @@ def main() -> int:
             print("✓ Historial borrado")
         return 0
 
+    # Exportar lo ya descargado a un paquete (no necesita red)
+    if args.export:
+        load_environment()
+        from catlux_export import run_export
+        return run_export(args.export, args.url, args.select, args.since, tracker)
+
+    # Copia espejo de lo ya descargado (no necesita red)
+    if args.mirror:
+        load_environment()
+        from catlux_mirror import run_mirror
+        return run_mirror(args.mirror, tracker, args.prune, args.full)
+
+    # Páginas y metadatos de lo ya descargado (no necesita red)
+    if args.pdf_info:
+        load_environment()
+        save_base_path = os.getenv("CATLUX_SAVE_PATH")
+        if not save_base_path:
+            print("❌ CATLUX_SAVE_PATH no configurado en .env")
+            return 1
+        from catlux_pdfinfo import run_pdf_info
+        root = extract_category_path(args.url, save_base_path) if args.url else Path(save_base_path)
+        return run_pdf_info(root, PDFINFO_CACHE_FILE, args.format)
+
+    # Reducir el tamaño de lo ya descargado (no necesita red)
+    if args.optimize:
+        load_environment()
+        setup_logging(1 if args.verbose else -1 if args.quiet else 0, args.log_json)
+        save_base_path = os.getenv("CATLUX_SAVE_PATH")
+        if not save_base_path:
+            print("❌ CATLUX_SAVE_PATH no configurado en .env")
+            return 1
+        from catlux_optimize import run_optimize
+        root = extract_category_path(args.url, save_base_path) if args.url else Path(save_base_path)
+        return run_optimize(root, OPTIMIZE_FILE, args.dry_run)
+
+    # Duplicados entre lo ya descargado (no necesita red)
+    if args.duplicates:
+        load_environment()
+        save_base_path = os.getenv("CATLUX_SAVE_PATH")
+        if not save_base_path:
+            print("❌ CATLUX_SAVE_PATH no configurado en .env")
+            return 1
+        from catlux_dedup import run_duplicates_report
+        root = extract_category_path(args.url, save_base_path) if args.url else Path(save_base_path)
+        return run_duplicates_report(root, DEDUP_FILE, args.format)
+
+    # Reorganizar las carpetas de lo ya descargado (no necesita red)
+    if args.migrate_layout:
+        load_environment()
+        setup_logging(1 if args.verbose else -1 if args.quiet else 0, args.log_json)
+        save_base_path = os.getenv("CATLUX_SAVE_PATH")
+        if not save_base_path:
+            print("❌ CATLUX_SAVE_PATH no configurado en .env")
+            return 1
+        from catlux_layout import run_migrate_layout
+        return run_migrate_layout(args.migrate_layout, Path(save_base_path), SNAPSHOT_DIR,
+                                  DETAILS_FILE, args.dry_run)
+
+    # A partir de aquí se necesita red: cargar .env y abrir el log
+    load_environment()
+    setup_logging(1 if args.verbose else -1 if args.quiet else 0, args.log_json)
+
+    save_base_path = os.getenv("CATLUX_SAVE_PATH")
+    if args.layout or os.getenv("CATLUX_LAYOUT") or save_base_path:
+        from catlux_layout import resolve_layout
+        try:
+            set_layout(resolve_layout(Path(save_base_path) if save_base_path else None, args.layout))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+
+    if args.parse_workers is not None:
+        from catlux_parsepool import start_parse_pool
+        start_parse_pool(args.parse_workers)
+
+    # Mapa de categorías del sitio
+    if args.sitemap or args.refresh_sitemap:
+        from catlux_sitemap import SITEMAP_FIELDS, load_sitemap, print_sitemap
+        sitemap = load_sitemap(SITEMAP_FILE, refresh=args.refresh_sitemap)
+        if sitemap is None:
+            print("❌ No se pudo obtener el mapa del sitio (revisa credenciales y conexión)")
+            return 1
+        if args.format != "text":
+            import catlux_output
+            with catlux_output.RecordWriter(args.format, SITEMAP_FIELDS) as writer:
+                for record in sitemap.records():
+                    writer.write(record)
+        else:
+            print_sitemap(sitemap)
+        return 0
+
+    # Reanudar descargas interrumpidas
+    if args.resume:
+        resume_downloads(tracker)
+        return 0
+
+    # Daemon: backlog persistente vaciado en cada cambio de mes
+    if args.daemon:
+        from catlux_daemon import CatluxDaemon
+        return CatluxDaemon(args.watch, tracker, args.pages, args.check_interval * 3600,
+                            skip_duplicates=args.skip_duplicates).run()
+
+    # Servicio HTTP para varios usuarios
+    if args.serve:
+        from catlux_server import run_server
+        return run_server(args.serve, tracker, args.pages)
+
+    # Plan de descargas para varias categorías
+    if args.plan:
+        from catlux_planner import run_plan
+        run_plan(args.plan, args.pages, tracker, args.dry_run, args.skip_duplicates, args.details)
+        return 0
+
+    # Descargar desde el snapshot del preview (sin volver a listar)
+    if args.from_snapshot:
+        url = args.url or os.getenv("CATLUX_DEFAULT_URL", "").strip() or None
+        with redirect_stdout(sys.stderr if args.format != "text" else sys.stdout):
+            download_from_snapshot(url, tracker, args.select, args.engine, args.concurrency)
+        return 0
+
     # Obtener URL
     url = args.url
     if not url:
@@ -1050,51 +2245,107 @@ def main() -> int:
         print("      python catlux_scrapper.py --info")
         return 1
 
-    # Bucle principal: permite volver a seleccionar categorías
-    while True:
-        # Preview (siempre interactivo - pregunta qué descargar)
-        logger.info(f"Iniciando preview desde: {url}")
-        pdfs, selected_indices = preview_pdfs(url, args.pages)
-
-        if not pdfs:
-            logger.error("No se encontraron PDFs")
-            # Si no hay PDFs pero era selección interactiva, permitir volver atrás
-            if args.select_category:
-                print("\n⚠️  No se encontraron PDFs en esta categoría")
-                url = select_category_interactive()
-                continue
-            else:
-                return 1
+    if args.prefetch and args.engine != "sync":
+        logger.warning("--prefetch solo está disponible con --engine sync; se ignora")
+        args.prefetch = False
 
-        # Si selected_indices es None, el usuario quiere volver a seleccionar categorías
-        if selected_indices is None:
-            if args.select_category:
-                print("\n📚 Volviendo a seleccionar categoría...")
-                url = select_category_interactive()
-                continue
-            else:
-                print("\n✓ Cancelado")
-                return 0
+    if args.details and args.engine != "sync":
+        logger.warning("--details solo está disponible con --engine sync; se ignora")
+        args.details = False
 
-        # Si se seleccionaron PDFs para descargar, ejecutar descarga
-        if selected_indices:
-            logger.info(f"Descargando {len(selected_indices)} PDFs seleccionados...")
-            download_filtered_pdfs(url, args.pages, tracker, pdfs, selected_indices)
-        else:
-            print("\n✓ No se descargará nada (seleccionaste 'none')")
+    # Con --preview, --select o --format json/jsonl/csv no se pregunta nada
+    interactive = args.format == "text" and args.select is None and not args.preview
 
-        # Preguntar si volver a seleccionar categorías o salir
-        if args.select_category:
-            print("\n¿Qué deseas hacer?")
-            print("  1. Seleccionar otras categorías")
-            print("  2. Salir")
-            choice = input("Opción: ").strip()
-            if choice == '1':
-                url = select_category_interactive()
-                continue
+    # El mapa del sitio guardado (si está vigente) evita listar categorías que no existen
+    from catlux_sitemap import check_category, load_sitemap
+    sitemap = load_sitemap(SITEMAP_FILE, crawl=False)
 
-        return 0
+    # Listados en memoria y precarga de las categorías vecinas (catlux_lookahead.py)
+    listings = None
+    if args.select_category and interactive and args.engine == "sync":
+        from catlux_lookahead import ListingLookahead
+        listings = ListingLookahead(tracker, args.pages, sitemap)
+
+    try:
+        # Bucle principal: permite volver a seleccionar categorías
+        while True:
+            # Prefetch especulativo (una instancia por categoría; siempre se cierra)
+            prefetcher = None
+            if args.prefetch:
+                from catlux_prefetch import Prefetcher
+                prefetcher = Prefetcher(tracker, Path(os.getenv("CATLUX_SAVE_PATH", ".")))
+
+            try:
+                if not check_category(sitemap, url, args.pages) and not args.select_category:
+                    return 1
+
+                # Preview (siempre interactivo - pregunta qué descargar)
+                logger.info(f"Iniciando preview desde: {url}")
+                pdfs, selected_indices = preview_pdfs(url, args.pages, args.engine, args.concurrency,
+                                                      prefetcher, args.format, args.select, args.preview,
+                                                      args.details, listings)
+
+                if not pdfs:
+                    logger.error("No se encontraron PDFs")
+                    # Si no hay PDFs pero era selección interactiva, permitir volver atrás
+                    if args.select_category:
+                        print("\n⚠️  No se encontraron PDFs en esta categoría")
+                        url = select_category_interactive()
+                        continue
+                    else:
+                        return 1
+
+                # Si selected_indices es None, el usuario quiere volver a seleccionar categorías
+                if selected_indices is None:
+                    if args.select_category:
+                        print("\n📚 Volviendo a seleccionar categoría...")
+                        url = select_category_interactive()
+                        continue
+                    else:
+                        print("\n✓ Cancelado")
+                        return 0
+
+                # Si se seleccionaron PDFs para descargar, ejecutar descarga
+                if selected_indices:
+                    logger.info(f"Descargando {len(selected_indices)} PDFs seleccionados...")
+                    # En formato máquina stdout es solo para los datos del preview
+                    with redirect_stdout(sys.stderr if args.format != "text" else sys.stdout):
+                        if args.engine == "async":
+                            from catlux_async import download_filtered_pdfs_async
+                            download_filtered_pdfs_async(url, args.pages, tracker, pdfs, selected_indices,
+                                                         args.concurrency)
+                        else:
+                            download_filtered_pdfs(url, args.pages, tracker, pdfs, selected_indices,
+                                                   prefetcher)
+                elif interactive:
+                    print("\n✓ No se descargará nada (seleccionaste 'none')")
+
+                # Preguntar si volver a seleccionar categorías o salir
+                if args.select_category and interactive:
+                    print("\n¿Qué deseas hacer?")
+                    print("  1. Seleccionar otras categorías")
+                    print("  2. Salir")
+                    choice = input("Opción: ").strip()
+                    if choice == '1':
+                        url = select_category_interactive()
+                        continue
+
+                return 0
+
+            finally:
+                if prefetcher is not None:
+                    prefetcher.close()
+    finally:
+        if listings is not None:
+            listings.close()
 
 
 if __name__ == '__main__':
-    sys.exit(main())
+    # Ejecutar main() desde el módulo importado (y no desde __main__) para que
+    # los módulos auxiliares que hacen `import catlux_scrapper` compartan estado.
+    import catlux_scrapper
+    try:
+        sys.exit(catlux_scrapper.main())
+    except KeyboardInterrupt:
+        print("\n\n❌ Interrumpido. Las descargas pendientes se reanudan con --resume")
+        sys.exit(130)
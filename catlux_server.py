@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP/JSON local (--serve): un único proceso para varios usuarios.
+
+Cada ejecución de la CLI paga su login, su listado y su búsqueda de archivos
+locales, y lleva su propio download_tracker.json. En modo servicio un solo
+proceso mantiene en memoria:
+
+- La sesión autenticada de cada sitio (se repite el login solo cuando caduca,
+  como en el daemon)
+- Los listados ya preparados (locales marcados, sondeados y con duplicados
+  señalados) durante LISTING_TTL_SECONDS; varias peticiones simultáneas de la
+  misma categoría esperan a una única petición al sitio (ListingCache)
+- Un único DownloadTracker y la cola persistente, que un hilo vacía en segundo
+  plano con el saldo del mes
+
+API (JSON; si CATLUX_SERVE_TOKEN está definido, cabecera
+"Authorization: Bearer <token>"):
+
+    GET  /status                          saldo del mes y estado de la cola
+    GET  /history?limit=50                últimas descargas
+    GET  /preview?url=URL[&select=EXPR][&refresh=1]
+    POST /enqueue  {"url": URL, "select": "new"}   o   {"url": URL, "ids": ["119215"]}
+    GET  /queue?batch=ID                  estado de un lote
+
+Uso:
+    python catlux_scrapper.py --serve 8765
+    python catlux_scrapper.py --serve 0.0.0.0:8765     # accesible desde la red local
+    curl "http://127.0.0.1:8765/preview?url=https://www.catlux.de/proben/gymnasium/klasse-7/deutsch/&select=new"
+"""
+
+import hmac
+import json
+import logging
+import os
+import re
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import catlux_output
+from catlux_cache import LISTING_TTL_SECONDS, ListingCache
+from catlux_catalog import probe_listing
+from catlux_daemon import CatluxDaemon
+from catlux_dedup import check_duplicates
+from catlux_scrapper import (
+    DEDUP_FILE,
+    LOGIN_URL,
+    DownloadTracker,
+    PDFManager,
+    build_download_queue,
+    extract_category_path,
+    extract_ref_number,
+    get_site_root,
+    mark_local_files,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# Cada cuánto se reintenta vaciar la cola aunque nadie encole nada
+DRAIN_POLL_SECONDS = 15 * 60
+MAX_BODY_BYTES = 64 * 1024
+# Ruta de categoría aceptada: .../klasse-N/asignatura/
+CATEGORY_PATH_RE = re.compile(r"^/(?:[a-z0-9-]+/)*klasse-\d+/[a-z0-9][a-z0-9-]*/?$")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class ApiError(Exception):
+    """Error con código HTTP para la respuesta."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class CatluxService:
+    """Estado compartido del servicio: sesiones, listados, tracker y cola."""
+
+    def __init__(self, tracker: DownloadTracker, max_pages: int = 10,
+                 listing_ttl: float = LISTING_TTL_SECONDS, sites: Optional[List[str]] = None):
+        """
+        Args:
+            tracker: Rastreador de descargas compartido por todos los usuarios
+            max_pages: Máximo de páginas por listado
+            listing_ttl: Segundos que se reutiliza un listado
+            sites: Raíces de sitio admitidas en las URLs (por defecto la de
+                LOGIN_URL y la de CATLUX_DEFAULT_URL); a ningún otro host se le
+                envían las credenciales
+        """
+        self.tracker = tracker
+        self.max_pages = max_pages
+        if sites is None:
+            sites = [get_site_root(LOGIN_URL)]
+            default_url = os.getenv("CATLUX_DEFAULT_URL", "").strip()
+            if default_url:
+                sites.append(get_site_root(default_url))
+        self.sites = {site.lower() for site in sites}
+        # Sesiones con renovación, catálogo de sondeos y vaciado de la cola: los del daemon
+        self.daemon = CatluxDaemon([], tracker, max_pages)
+        self.listings = ListingCache(self._load_listing, listing_ttl)
+        # Cada PDF descargado deja viejo el listado de su categoría
+        self.daemon.on_complete = lambda job: self.listings.invalidate(job['base_url'])
+        self.wake = threading.Event()
+        self._drainer: Optional[threading.Thread] = None
+
+    @property
+    def configured(self) -> bool:
+        """Indica si hay credenciales y CATLUX_SAVE_PATH."""
+        return all(self.daemon._credentials[i] for i in (0, 1, 3))
+
+    def category(self, url: str) -> Tuple[str, Path]:
+        """
+        Valida una URL de categoría recibida por la API.
+
+        Returns:
+            Tupla (URL normalizada con '/' final, carpeta de destino)
+
+        Raises:
+            ApiError: 400 si el sitio no está admitido, la ruta no es
+                .../klasse-N/asignatura/ o la carpeta queda fuera de CATLUX_SAVE_PATH
+        """
+        parts = urlsplit(url)
+        if get_site_root(url).lower() not in self.sites or parts.query or parts.fragment:
+            raise ApiError(400, f"Sitio no admitido: {url}")
+        if not CATEGORY_PATH_RE.match(parts.path):
+            raise ApiError(400, f"URL de categoría no válida: {url}")
+        save_base_path = Path(self.daemon._credentials[3])
+        save_path = extract_category_path(url, str(save_base_path))
+        if save_path is None or not save_path.resolve().is_relative_to(save_base_path.resolve()):
+            raise ApiError(400, f"URL de categoría no válida: {url}")
+        return url.rstrip('/') + '/', save_path
+
+    def _load_listing(self, url: str) -> Optional[List[Dict]]:
+        _, _, cert_path, save_base_path = self.daemon._credentials
+        _, save_path = self.category(url)
+        session = self.daemon.session_for(get_site_root(url))
+        if session is None:
+            return None
+
+        pdfs = PDFManager(session, cert_path).fetch_pdfs(url, self.max_pages)
+        mark_local_files(pdfs, save_path, Path(save_base_path))
+        pdfs = probe_listing(session, url, pdfs, self.daemon.catalog)
+        check_duplicates(pdfs, save_path.relative_to(save_base_path).as_posix(), DEDUP_FILE)
+        logger.info(f"Listado cargado: {url} ({len(pdfs)} PDFs)")
+        return sorted(pdfs, key=extract_ref_number)
+
+    def listing(self, url: str, refresh: bool = False) -> List[Dict]:
+        """Listado preparado de una categoría (compartido entre peticiones)."""
+        url, _ = self.category(url)
+        pdfs = self.listings.get(url, refresh)
+        if pdfs is None:
+            raise ApiError(502, "No se pudo obtener el listado (login o conexión)")
+        return pdfs
+
+    # ------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------
+
+    def status(self) -> Dict:
+        from catlux_queue import JobQueue
+        with JobQueue(self.daemon.queue_file) as job_queue:
+            queue = job_queue.counts()
+        return dict(catlux_output.status_record(self.tracker), queue=queue,
+                    listings_cached=len(self.listings))
+
+    def history(self, limit: int = 50) -> Dict:
+        downloads = self.tracker.data.get("downloads", [])
+        return {'downloads': list(reversed(downloads[-limit:])) if limit > 0 else []}
+
+    def preview(self, url: str, select: Optional[str] = None, refresh: bool = False) -> Dict:
+        pdfs = self.listing(url, refresh)
+        selected = catlux_output.select_indices(pdfs, select) if select else []
+        records = [{k: record.get(k) for k in catlux_output.PREVIEW_FIELDS}
+                   for record in catlux_output.preview_records(pdfs, selected)]
+        return {'url': url, 'count': len(records), 'pdfs': records}
+
+    def enqueue(self, url: str, select: Optional[str] = None, ids: Optional[List[str]] = None) -> Dict:
+        from catlux_queue import JobQueue
+
+        url, save_path = self.category(url)
+        _, _, _, save_base_path = self.daemon._credentials
+        # El listado en memoria puede ser de antes de la última descarga: se
+        # vuelve a mirar qué es local (sobre copias) para no encolar un PDF
+        # ya descargado, que JobQueue.enqueue() devolvería a pending
+        pdfs = [dict(pdf) for pdf in self.listing(url)]
+        mark_local_files(pdfs, save_path, Path(save_base_path))
+        if ids is not None:
+            wanted = {str(i) for i in ids}
+            indices = [i for i, pdf in enumerate(pdfs) if pdf['doc_id'] in wanted or pdf['name'] in wanted]
+        else:
+            indices = catlux_output.select_indices(pdfs, select or "new")
+
+        queue = build_download_queue(pdfs, indices, save_path, Path(save_base_path))
+        if not queue:
+            return {'batch': None, 'queued': 0}
+
+        save_path.mkdir(parents=True, exist_ok=True)
+        with JobQueue(self.daemon.queue_file) as job_queue:
+            batch = job_queue.enqueue(url, save_path, queue)
+        logger.info(f"Encolados {len(queue)} PDFs de {url} (lote {batch[:8]})")
+        self.wake.set()
+        return {'batch': batch, 'queued': len(queue), 'remaining': self.tracker.get_remaining_downloads()}
+
+    def batch_status(self, batch: str) -> Dict:
+        from catlux_queue import JobQueue
+        with JobQueue(self.daemon.queue_file) as job_queue:
+            return {'batch': batch, 'jobs': job_queue.counts(batch)}
+
+    # ------------------------------------------------------------------
+    # Vaciado de la cola en segundo plano
+    # ------------------------------------------------------------------
+
+    def start_drainer(self) -> None:
+        """Arranca el hilo que vacía la cola al encolar (y cada DRAIN_POLL_SECONDS)."""
+        self._drainer = threading.Thread(target=self._drain_loop, name="catlux-serve-drain", daemon=True)
+        self._drainer.start()
+
+    def _drain_loop(self) -> None:
+        from catlux_queue import JobQueue
+
+        while not self.daemon.stop_event.is_set():
+            self.wake.wait(DRAIN_POLL_SECONDS)
+            self.wake.clear()
+            if self.daemon.stop_event.is_set():
+                return
+            try:
+                with JobQueue(self.daemon.queue_file) as job_queue:
+                    if self.tracker.get_remaining_downloads() > 0 and job_queue.pending_base_urls():
+                        downloaded = self.daemon.drain(job_queue)
+                        if downloaded:
+                            # Lo descargado ya es local: los listados en memoria quedan viejos
+                            self.listings.invalidate()
+            except Exception as e:
+                logger.error(f"Error vaciando la cola: {e}")
+
+    def stop(self) -> None:
+        """Detiene el hilo de vaciado y cierra las sesiones."""
+        self.daemon.stop_event.set()
+        self.wake.set()
+        if self._drainer is not None:
+            self._drainer.join(timeout=30)
+        for session, _ in self.daemon._sessions.values():
+            session.close()
+        self.daemon._sessions.clear()
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    """Handler HTTP; service y token se inyectan en la subclase creada por make_server()."""
+
+    service: CatluxService
+    token: Optional[str] = None
+    # Valores admitidos de la cabecera Host (None = cualquiera: escucha en todas las interfaces)
+    allowed_hosts: Optional[Set[str]] = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - firma de BaseHTTPRequestHandler
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _reply(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status >= 400:
+            # El cuerpo de la petición puede no haberse leído: no reutilizar la conexión
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        header = self.headers.get("Authorization", "")
+        return hmac.compare_digest(header.encode(), f"Bearer {self.token}".encode())
+
+    def _check_origin(self) -> None:
+        """Rechaza peticiones lanzadas por otras webs (CSRF) o con un Host ajeno (DNS rebinding)."""
+        host = (self.headers.get("Host") or "").lower()
+        if self.allowed_hosts is not None and host not in self.allowed_hosts:
+            raise ApiError(403, f"Host no admitido: {host}")
+        origin = self.headers.get("Origin")
+        if origin is not None and urlsplit(origin).netloc.lower() != host:
+            raise ApiError(403, f"Origen no admitido: {origin}")
+        if self.headers.get("Sec-Fetch-Site", "none") not in ("none", "same-origin"):
+            raise ApiError(403, "Petición lanzada desde otro sitio")
+
+    def _body(self) -> Dict:
+        # Un formulario de otra web no puede enviar JSON sin preflight CORS (que no se atiende)
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise ApiError(415, "El cuerpo debe enviarse con Content-Type: application/json")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "Cuerpo demasiado grande")
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "El cuerpo no es JSON válido")
+        if not isinstance(data, dict):
+            raise ApiError(400, "El cuerpo debe ser un objeto JSON")
+        return data
+
+    def _dispatch(self, method: str) -> None:
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        service = self.service
+        try:
+            self._check_origin()
+            if not self._authorized():
+                raise ApiError(401, "Token no válido")
+            route = (method, parts.path.rstrip('/') or '/')
+            if route == ("GET", "/status"):
+                payload = service.status()
+            elif route == ("GET", "/history"):
+                payload = service.history(int(query.get("limit", 50)))
+            elif route == ("GET", "/preview"):
+                if not query.get("url"):
+                    raise ApiError(400, "Falta el parámetro url")
+                payload = service.preview(query["url"], query.get("select"), query.get("refresh") == "1")
+            elif route == ("POST", "/enqueue"):
+                body = self._body()
+                if not body.get("url"):
+                    raise ApiError(400, "Falta url")
+                payload = service.enqueue(body["url"], body.get("select"), body.get("ids"))
+                self._reply(202, payload)
+                return
+            elif route == ("GET", "/queue"):
+                if not query.get("batch"):
+                    raise ApiError(400, "Falta el parámetro batch")
+                payload = service.batch_status(query["batch"])
+            else:
+                raise ApiError(404, f"Ruta desconocida: {method} {parts.path}")
+        except ApiError as e:
+            self._reply(e.status, {'error': str(e)})
+            return
+        except ValueError as e:
+            # Expresión de select o parámetro numérico no válidos
+            self._reply(400, {'error': str(e)})
+            return
+        except Exception as e:
+            logger.error(f"Error atendiendo {method} {parts.path}: {e}")
+            self._reply(500, {'error': str(e)})
+            return
+        self._reply(200, payload)
+
+    def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por http.server
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._dispatch("POST")
+
+
+def parse_address(text: str) -> Tuple[str, int]:
+    """'8765' o 'HOST:8765' -> (host, puerto); por defecto solo localhost."""
+    host, _, port = text.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Dirección no válida para --serve: '{text}' (usa PUERTO o HOST:PUERTO)")
+    return host or "127.0.0.1", int(port)
+
+
+def make_server(service: CatluxService, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                token: Optional[str] = None) -> ThreadingHTTPServer:
+    """Servidor HTTP (sin arrancar) que atiende la API del servicio."""
+
+    class Handler(_ApiHandler):
+        pass
+
+    Handler.service = service
+    Handler.token = token
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    if host not in ("", "0.0.0.0", "::"):
+        port = httpd.server_address[1]
+        names = LOOPBACK_HOSTS if host in LOOPBACK_HOSTS else (host,)
+        Handler.allowed_hosts = {f"[{name}]:{port}" if ":" in name else f"{name}:{port}"
+                                 for name in names}
+    return httpd
+
+
+def run_server(address: str, tracker: DownloadTracker, max_pages: int = 10) -> int:
+    """
+    Arranca el servicio y atiende peticiones hasta Ctrl-C o SIGTERM (--serve).
+
+    Returns:
+        Código de salida
+    """
+    try:
+        host, port = parse_address(address)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    service = CatluxService(tracker, max_pages)
+    if not service.configured:
+        return 1
+    token = os.getenv("CATLUX_SERVE_TOKEN") or None
+    if host not in ("127.0.0.1", "localhost", "::1") and not token:
+        logger.warning("Servicio accesible desde la red sin CATLUX_SERVE_TOKEN: cualquiera puede encolar descargas")
+
+    try:
+        httpd = make_server(service, host, port, token)
+    except OSError as e:
+        print(f"❌ No se pudo escuchar en {host}:{port}: {e}")
+        return 1
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=httpd.shutdown).start())
+
+    service.start_drainer()
+    service.wake.set()  # reanudar lo que quedara en la cola
+    logger.info(f"Servicio escuchando en http://{host}:{port}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
+    logger.info("Servicio detenido")
+    return 0
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Mapa del sitio: árbol real de categorías con número de documentos (--sitemap).
+
+En lugar de ofrecer listas fijas de Klassen, asignaturas y tipos (muchas
+combinaciones no existen y solo se descubre tras un login y un listado
+vacío), se recorre la navegación de /proben/ en paralelo, nivel a nivel:
+
+    schulart / klasse / asignatura / tipo
+    gymnasium/klasse-7/deutsch/schulaufgabe
+
+De cada página se toman los enlaces a subcategorías directas. Las que son
+listados se cuentan con la primera y la última página de la paginación (dos
+peticiones como mucho, sin recorrer el listado); los nodos intermedios suman
+lo de sus hijos.
+
+El resultado se guarda en SITEMAP_FILE y vale SITEMAP_TTL_SECONDS. Lo usan:
+- select_category_interactive(): solo ofrece categorías que existen, con su tamaño
+- preview, --plan y --daemon: avisan antes de listar si una URL no existe en
+  el mapa o si --pages no cubre todo el listado
+
+Uso:
+    python catlux_scrapper.py --sitemap                  # árbol con recuentos
+    python catlux_scrapper.py --sitemap --refresh-sitemap --format csv
+"""
+
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from catlux_scrapper import (
+    LOGIN_URL,
+    get_credentials,
+    login_to_catlux,
+    new_session,
+    get_parse_pool,
+    parse_html,
+    parse_listing,
+    parse_listing_page,
+)
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_VERSION = 1
+SITEMAP_ROOT_URL = urljoin(LOGIN_URL, "/proben/")
+SITEMAP_TTL_SECONDS = 7 * 24 * 3600
+SITEMAP_WORKERS = 8
+SITEMAP_MAX_DEPTH = 4
+LEVEL_NAMES = {1: "Schulart", 2: "Klasse", 3: "Asignatura", 4: "Tipo de Documento"}
+SITEMAP_FIELDS = ('path', 'level', 'name', 'count', 'pages', 'url')
+
+_PAGE_RE = re.compile(r"[?&]p=(\d+)")
+
+
+def _natural_key(name: str) -> list:
+    """klasse-5 < klasse-10 (orden natural)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def _norm_path(path: str) -> str:
+    return path.rstrip("/") + "/"
+
+
+def parse_node_page(content: bytes, page_url: str) -> Tuple[List[str], List[Dict], int]:
+    """
+    Analiza una página del árbol.
+
+    Args:
+        content: HTML de la página
+        page_url: URL de la página (sin ?p=)
+
+    Returns:
+        Tupla (rutas de las subcategorías directas, PDFs de la página,
+        última página de la paginación; 1 si no hay)
+    """
+    soup = parse_html(content)
+    base = urlsplit(page_url)
+    prefix = _norm_path(base.path)
+    children, last_page = set(), 1
+    for link in soup.find_all("a", href=True):
+        target = urlsplit(urljoin(page_url, link["href"]))
+        if target.netloc != base.netloc:
+            continue
+        if _norm_path(target.path) == prefix:
+            match = _PAGE_RE.search("?" + target.query)
+            if match:
+                last_page = max(last_page, int(match.group(1)))
+            continue
+        if target.path.startswith(prefix) and not target.query:
+            rest = target.path[len(prefix):].strip("/")
+            if rest and "/" not in rest and "." not in rest:
+                children.add(prefix + rest + "/")
+    return sorted(children), parse_listing_page(content, page_url), last_page
+
+
+class SiteMap:
+    """Árbol de categorías con recuentos, indexado por ruta ('/proben/gymnasium/')."""
+
+    def __init__(self, root_url: str, nodes: Dict[str, Dict], created: Optional[str] = None):
+        """
+        Args:
+            root_url: URL de la raíz recorrida (normalmente SITEMAP_ROOT_URL)
+            nodes: {ruta: {'level', 'name', 'count', 'pages', 'children'}}
+            created: Fecha ISO del recorrido (por defecto, ahora)
+        """
+        self.root_url = root_url
+        self.root_path = _norm_path(urlsplit(root_url).path)
+        self.nodes = nodes
+        self.created = created or datetime.now().isoformat(timespec='seconds')
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def age_seconds(self) -> float:
+        return (datetime.now() - datetime.fromisoformat(self.created)).total_seconds()
+
+    def is_fresh(self, ttl: float = SITEMAP_TTL_SECONDS) -> bool:
+        return self.age_seconds() <= ttl
+
+    def node(self, url: str) -> Optional[Dict]:
+        """Nodo de una URL de categoría (None si no existe en el mapa)."""
+        return self.nodes.get(_norm_path(urlsplit(url).path))
+
+    def url_for(self, path: str) -> str:
+        return urljoin(self.root_url, path)
+
+    def children(self, path: str, include_empty: bool = False) -> List[Tuple[str, Dict]]:
+        """Subcategorías de path en orden natural (sin las vacías salvo include_empty)."""
+        node = self.nodes.get(path, {})
+        result = [(child, self.nodes[child]) for child in node.get('children', []) if child in self.nodes]
+        if not include_empty:
+            result = [(child, n) for child, n in result if n.get('count')]
+        return sorted(result, key=lambda item: _natural_key(item[1]['name']))
+
+    def records(self):
+        """Nodos en orden de árbol (para --format)."""
+        def walk(path):
+            for child, node in self.children(path, include_empty=True):
+                yield dict(node, path=child, url=self.url_for(child))
+                yield from walk(child)
+        return walk(self.root_path)
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    def save(self, sitemap_file: Path) -> None:
+        """Guarda el mapa (escritura atómica)."""
+        sitemap_file = Path(sitemap_file)
+        sitemap_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = sitemap_file.with_name(f"{sitemap_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': SITEMAP_VERSION, 'root_url': self.root_url, 'created': self.created,
+                       'nodes': self.nodes}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, sitemap_file)
+
+    @classmethod
+    def load(cls, sitemap_file: Path) -> Optional["SiteMap"]:
+        """Mapa guardado, o None si no hay o es de otra versión."""
+        try:
+            with open(sitemap_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error cargando el mapa del sitio: {e}")
+            return None
+        if data.get('version') != SITEMAP_VERSION:
+            return None
+        return cls(data['root_url'], data['nodes'], data['created'])
+
+
+def crawl_site(session: "requests.Session", root_url: str = SITEMAP_ROOT_URL,
+               workers: int = SITEMAP_WORKERS, max_depth: int = SITEMAP_MAX_DEPTH) -> SiteMap:
+    """
+    Recorre el árbol de categorías en paralelo, nivel a nivel.
+
+    Args:
+        session: Sesión autenticada
+        root_url: Raíz del recorrido
+        workers: Peticiones simultáneas
+        max_depth: Niveles por debajo de la raíz
+
+    Returns:
+        SiteMap con recuentos (documentos, no PDFs: examen y solución cuentan uno)
+    """
+    root_path = _norm_path(urlsplit(root_url).path)
+
+    def visit(path: str) -> Tuple[List[str], Optional[int], int]:
+        url = urljoin(root_url, path)
+        try:
+            response = session.get(url, verify=False, timeout=10)
+            response.raise_for_status()
+            pool = get_parse_pool()
+            if pool is None:
+                children, pdfs, last_page = parse_node_page(response.content, url)
+            else:
+                children, pdfs, last_page = pool.submit(parse_node_page, response.content, url).result()
+            docs = {pdf['doc_id'] for pdf in pdfs}
+            if not docs:
+                return children, None, 0
+            count = len(docs)
+            if last_page > 1:
+                last = session.get(f"{url}?p={last_page}", verify=False, timeout=10)
+                last.raise_for_status()
+                tail = {pdf['doc_id'] for pdf in parse_listing(last.content, url)}
+                count = len(docs) * (last_page - 1) + len(tail)
+            return children, count, last_page
+        except Exception as e:
+            logger.warning(f"Mapa del sitio: no se pudo leer {url}: {e}")
+            return [], None, 0
+
+    nodes: Dict[str, Dict] = {root_path: {'level': 0, 'name': "", 'count': None, 'pages': 0, 'children': []}}
+    frontier = [root_path]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for depth in range(0, max_depth + 1):
+            results = list(pool.map(visit, frontier))
+            next_frontier = []
+            for path, (children, count, pages) in zip(frontier, results):
+                node = nodes[path]
+                node.update(count=count, pages=pages)
+                if depth == max_depth:
+                    continue
+                for child in children:
+                    if child not in nodes:
+                        nodes[child] = {'level': depth + 1, 'name': child.rstrip("/").rsplit("/", 1)[-1],
+                                        'count': None, 'pages': 0, 'children': []}
+                        node['children'].append(child)
+                        next_frontier.append(child)
+            logger.debug(f"Mapa del sitio: nivel {depth}, {len(frontier)} páginas")
+            frontier = next_frontier
+            if not frontier:
+                break
+
+    # Los nodos que no son listados suman lo de sus hijos (de abajo arriba)
+    for path in sorted(nodes, key=lambda p: -nodes[p]['level']):
+        node = nodes[path]
+        if node['count'] is None:
+            node['count'] = sum(nodes[child]['count'] or 0 for child in node['children'])
+
+    logger.info(f"Mapa del sitio: {len(nodes) - 1} categorías, {nodes[root_path]['count']} documentos")
+    return SiteMap(root_url, nodes)
+
+
+def load_sitemap(sitemap_file: Path, refresh: bool = False, ttl: float = SITEMAP_TTL_SECONDS,
+                 root_url: str = SITEMAP_ROOT_URL, crawl: bool = True) -> Optional[SiteMap]:
+    """
+    Mapa vigente: el guardado si no ha caducado; si no, lo recorre de nuevo.
+
+    Args:
+        sitemap_file: Archivo del mapa (normalmente SITEMAP_FILE)
+        refresh: Recorrer aunque el guardado esté vigente
+        ttl: Validez del mapa guardado en segundos
+        root_url: Raíz del recorrido
+        crawl: False = no hacer peticiones (solo el mapa guardado y vigente)
+
+    Returns:
+        SiteMap, o None si no hay mapa y no se pudo recorrer. Si el recorrido
+        falla se devuelve el mapa caducado, que sigue siendo mejor que nada.
+    """
+    cached = None if refresh else SiteMap.load(sitemap_file)
+    if cached and cached.is_fresh(ttl):
+        return cached
+    if not crawl:
+        return None
+
+    username, password, cert_path, _ = get_credentials()
+    if not username:
+        return cached
+    session = new_session()
+    try:
+        if not login_to_catlux(session, username, password, cert_path, urljoin(root_url, "/login")):
+            return cached
+        print("🗺️  Actualizando el mapa de categorías del sitio...")
+        sitemap = crawl_site(session, root_url)
+    except Exception as e:
+        logger.warning(f"No se pudo recorrer el mapa del sitio: {e}")
+        return cached
+    finally:
+        session.close()
+    sitemap.save(sitemap_file)
+    return sitemap
+
+
+def check_category(sitemap: Optional[SiteMap], url: str, max_pages: int) -> bool:
+    """
+    Avisa con el mapa guardado antes de listar una categoría.
+
+    Una categoría que no está en el mapa (p.ej. creada después del último
+    recorrido, o un filtro que no se recorre) se lista igualmente.
+
+    Returns:
+        False solo si el mapa la conoce y está vacía (no merece un listado)
+    """
+    if sitemap is None or urlsplit(url).netloc != urlsplit(sitemap.root_url).netloc:
+        return True
+    node = sitemap.node(url)
+    if node is None:
+        logger.warning(f"La categoría no está en el mapa del sitio: {url} "
+                       "(--sitemap --refresh-sitemap para actualizarlo); se lista igualmente")
+        return True
+    if not node.get('count'):
+        logger.warning(f"La categoría está vacía según el mapa del sitio: {url} "
+                       "(--sitemap --refresh-sitemap para actualizarlo)")
+        return False
+    if node.get('pages', 0) > max_pages:
+        logger.warning(f"{url}: ~{node['count']} documentos en {node['pages']} páginas; "
+                       f"--pages {max_pages} solo cubre una parte")
+    else:
+        logger.info(f"{url}: ~{node['count']} documentos en {max(1, node['pages'])} páginas")
+    return True
+
+
+def print_sitemap(sitemap: SiteMap) -> None:
+    """Imprime el árbol con recuentos."""
+    print("\n" + "=" * 80)
+    print(f"🗺️  MAPA DEL SITIO ({sitemap.root_url}, {sitemap.created})")
+    print("=" * 80)
+
+    def walk(path: str, indent: int) -> None:
+        for child, node in sitemap.children(path):
+            pages = f", {node['pages']} pág." if node.get('pages') else ""
+            print(f"{'  ' * indent}{node['name']} ({node['count']} docs{pages})")
+            walk(child, indent + 1)
+
+    walk(sitemap.root_path, 0)
+    print("=" * 80)
+    print(f"Total: {sitemap.nodes[sitemap.root_path]['count']} documentos\n")
+
+
+def select_from_sitemap(sitemap: SiteMap) -> Optional[str]:
+    """
+    Selección interactiva bajando por el mapa (solo categorías con documentos).
+
+    Returns:
+        URL de la categoría elegida, o None si el mapa no tiene categorías
+    """
+    path = sitemap.root_path
+    while True:
+        children = sitemap.children(path)
+        if not children:
+            break
+        level = children[0][1]['level']
+        listing_here = sitemap.nodes[path].get('pages', 0) > 0
+
+        if len(children) == 1 and not listing_here:
+            path = children[0][0]
+            print(f"✓ {LEVEL_NAMES.get(level, 'Categoría')}: {children[0][1]['name']} (única opción)")
+            continue
+
+        print(f"\n📍 Selecciona {LEVEL_NAMES.get(level, 'Categoría')}:")
+        for i, (_, node) in enumerate(children, 1):
+            print(f"  {i}. {node['name']} ({node['count']} docs)")
+        if listing_here:
+            print(f"  0. (Ninguno - ver todo, {sitemap.nodes[path]['count']} docs)")
+
+        while True:
+            choice = input("\nSelección: ").strip()
+            if choice == '0' and listing_here:
+                print("✓ Tipo: sin filtro (verás todos)")
+                return sitemap.url_for(path)
+            if choice.isdigit() and 1 <= int(choice) <= len(children):
+                path, node = children[int(choice) - 1]
+                print(f"✓ {LEVEL_NAMES.get(level, 'Categoría')} seleccionada: {node['name']}")
+                break
+            print("❌ Opción inválida")
+
+    return sitemap.url_for(path) if path != sitemap.root_path else None
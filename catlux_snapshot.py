@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Snapshot del listado para pasar del preview a la descarga sin volver a listar.
+
+Cada preview guarda en SNAPSHOT_DIR el listado tal como se mostró (ordenado por
+REF, así que los números de fila del preview siguen valiendo), con el estado
+local de cada PDF y un hash del contenido. Un proceso posterior con
+--download --from-snapshot lo carga y descarga directamente, sin login previo
+al listado ni paginación.
+
+Formato (compacto: una lista de valores por PDF):
+    {"version": 3, "base_url": "...", "created": "...", "max_pages": 10,
+     "fields": ["name", ...], "rows": [[...], ...], "hash": "sha256..."}
+
+Un snapshot se rechaza si es de otra versión, de otra categoría, si el hash no
+coincide (archivo dañado o editado) o si tiene más de SNAPSHOT_MAX_AGE_SECONDS.
+
+Uso:
+    python catlux_scrapper.py --url "..." --preview
+    python catlux_scrapper.py --url "..." --download --from-snapshot [--select new]
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from catlux_details import DETAIL_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_MAX_AGE_SECONDS = 24 * 3600
+SNAPSHOT_FIELDS = ('name', 'url', 'full_url', 'is_solution', 'doc_id', 'doc_number',
+                   'doc_type', 'doc_title', 'is_local', 'size', 'duplicate_of', 'similarity'
+                   ) + DETAIL_FIELDS
+# Campos que solo tienen algunos PDFs (--details, sondeo, duplicados): si valen None no se restauran
+OPTIONAL_FIELDS = ('size', 'duplicate_of', 'similarity') + DETAIL_FIELDS
+
+
+class SnapshotError(Exception):
+    """El snapshot no existe, está dañado o ya no vale para la categoría."""
+
+
+def snapshot_path(snapshot_dir: Path, base_url: str) -> Path:
+    """Archivo de snapshot de una categoría."""
+    key = hashlib.sha1(base_url.rstrip('/').encode("utf-8")).hexdigest()[:16]
+    return Path(snapshot_dir) / f"{key}.json"
+
+
+def _rows_hash(rows: List[list]) -> str:
+    canonical = json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(snapshot_dir: Path, base_url: str, pdfs: List[Dict], max_pages: int) -> Path:
+    """
+    Guarda el listado del preview (escritura atómica).
+
+    Args:
+        snapshot_dir: Carpeta de snapshots (normalmente SNAPSHOT_DIR)
+        base_url: URL de la categoría
+        pdfs: PDFs en el orden mostrado en el preview
+        max_pages: Páginas que se listaron
+
+    Returns:
+        Ruta del snapshot
+    """
+    rows = [[pdf.get(field) for field in SNAPSHOT_FIELDS] for pdf in pdfs]
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'base_url': base_url,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'max_pages': max_pages,
+        'fields': list(SNAPSHOT_FIELDS),
+        'rows': rows,
+        'hash': _rows_hash(rows),
+    }
+
+    path = snapshot_path(snapshot_dir, base_url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_file, path)
+    logger.info(f"Snapshot del listado guardado ({len(pdfs)} PDFs): {path.name}")
+    return path
+
+
+def latest_snapshot(snapshot_dir: Path) -> Optional[Path]:
+    """Snapshot más reciente (para --from-snapshot sin --url)."""
+    snapshots = sorted(Path(snapshot_dir).glob("*.json"), key=lambda p: p.stat().st_mtime)
+    return snapshots[-1] if snapshots else None
+
+
+def load_snapshot(snapshot_dir: Path, base_url: Optional[str] = None,
+                  max_age: float = SNAPSHOT_MAX_AGE_SECONDS) -> Tuple[str, List[Dict]]:
+    """
+    Carga y valida un snapshot.
+
+    Args:
+        snapshot_dir: Carpeta de snapshots
+        base_url: Categoría esperada (None = el snapshot más reciente)
+        max_age: Antigüedad máxima en segundos
+
+    Returns:
+        Tupla (base_url, PDFs en el orden del preview)
+
+    Raises:
+        SnapshotError: Si no hay snapshot válido para la categoría
+    """
+    path = snapshot_path(snapshot_dir, base_url) if base_url else latest_snapshot(snapshot_dir)
+    if path is None or not path.exists():
+        raise SnapshotError("No hay snapshot de esta categoría; ejecuta antes --preview")
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        raise SnapshotError(f"Snapshot ilegible: {e}")
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot de otra versión ({data.get('version')}); repite --preview")
+    if base_url and data.get('base_url', '').rstrip('/') != base_url.rstrip('/'):
+        raise SnapshotError("El snapshot es de otra categoría; repite --preview")
+    if data.get('hash') != _rows_hash(data.get('rows', [])):
+        raise SnapshotError("El snapshot está dañado o fue modificado; repite --preview")
+
+    age = (datetime.now() - datetime.fromisoformat(data['created'])).total_seconds()
+    if age > max_age:
+        raise SnapshotError(f"El snapshot tiene {age / 3600:.0f} h (máximo {max_age / 3600:.0f} h); "
+                            "repite --preview")
+
+    fields = data['fields']
+    pdfs = [dict(zip(fields, row)) for row in data['rows']]
+    for pdf in pdfs:
+        for field in OPTIONAL_FIELDS:
+            if pdf.get(field) is None:
+                pdf.pop(field, None)
+    return data['base_url'], pdfs
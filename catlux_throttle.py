@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Limitación de ancho de banda para las descargas (--max-rate, --rate-profile).
+
+Un único Throttle (token bucket) se comparte entre todas las descargas en
+curso: cada trozo leído del socket descuenta sus bytes del cubo y, si el cubo
+queda en negativo, quien lo leyó espera lo necesario para devolverlo a cero.
+Así la suma de todas las descargas concurrentes (hilos del daemon, prefetch,
+motor async) no supera la tasa configurada.
+
+Los perfiles horarios cambian la tasa según la hora local, p.ej. limitar de
+día y dejar velocidad completa de noche:
+
+    --max-rate 200k --rate-profile "20:00-07:00=0"     # 0 = sin límite
+    --rate-profile "08:00-18:00=100k,18:00-22:00=500k"
+
+Las tasas aceptan sufijos k y M (múltiplos de 1024, como curl --limit-rate).
+El reloj, la espera y la hora son inyectables para probarlo sin esperar.
+"""
+
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MIN_CHUNK_SIZE = 4 * 1024
+
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*(?:[bB](?:/s)?)?\s*$")
+_WINDOW_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)$")
+
+
+def parse_rate(text: str) -> int:
+    """
+    Convierte "500", "200k" o "1.5M" en bytes por segundo (0 = sin límite).
+
+    Raises:
+        ValueError: Si el texto no es una tasa válida
+    """
+    match = _RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Tasa no válida: '{text}' (usa p.ej. 500k o 2M)")
+    value, unit = float(match.group(1)), match.group(2).lower()
+    return int(value * {'': 1, 'k': 1024, 'm': 1024 * 1024}[unit])
+
+
+def parse_profile(text: str) -> List[Tuple[int, int, int]]:
+    """
+    Convierte "08:00-18:00=100k,20:00-07:00=0" en ventanas (inicio, fin, tasa).
+
+    Inicio y fin van en minutos desde medianoche; una ventana cuyo fin es
+    anterior al inicio cruza la medianoche.
+
+    Raises:
+        ValueError: Si alguna ventana no es válida
+    """
+    windows = []
+    for part in (p for p in text.split(",") if p.strip()):
+        match = _WINDOW_RE.match(part)
+        if not match:
+            raise ValueError(f"Ventana horaria no válida: '{part.strip()}' (usa HH:MM-HH:MM=TASA)")
+        h1, m1, h2, m2 = (int(match.group(i)) for i in range(1, 5))
+        if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59:
+            raise ValueError(f"Hora no válida en '{part.strip()}'")
+        windows.append((h1 * 60 + m1, h2 * 60 + m2, parse_rate(match.group(5))))
+    return windows
+
+
+class Throttle:
+    """Token bucket compartido con tasa dependiente de la hora."""
+
+    def __init__(self, max_rate: int = 0, profile: Optional[List[Tuple[int, int, int]]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 now: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            max_rate: Bytes por segundo fuera de las ventanas del perfil (0 = sin límite)
+            profile: Ventanas de parse_profile() (tienen prioridad sobre max_rate)
+            clock: Reloj monótono en segundos
+            sleep: Función de espera
+            now: Hora local (para el perfil)
+        """
+        self.max_rate = max_rate
+        self.profile = profile or []
+        self.clock = clock
+        self.sleep = sleep
+        self.now = now
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._last = clock()
+        self._rate = None
+
+    def rate(self) -> int:
+        """Tasa vigente ahora mismo (0 = sin límite)."""
+        if self.profile:
+            current = self.now()
+            minute = current.hour * 60 + current.minute
+            for start, end, rate in self.profile:
+                inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+                if inside:
+                    return rate
+        return self.max_rate
+
+    @property
+    def chunk_size(self) -> int:
+        """Tamaño de lectura: trozos pequeños a tasas bajas para no ir a ráfagas."""
+        rate = self.rate()
+        if not rate:
+            return DOWNLOAD_CHUNK_SIZE
+        return max(MIN_CHUNK_SIZE, min(DOWNLOAD_CHUNK_SIZE, rate // 8))
+
+    def reserve(self, n: int) -> float:
+        """
+        Descuenta n bytes del cubo sin esperar.
+
+        Returns:
+            Segundos que el llamador debe esperar antes de seguir
+        """
+        rate = self.rate()
+        with self._lock:
+            now = self.clock()
+            if rate != self._rate:
+                # Cambio de tasa (arranque o perfil): el cubo empieza lleno
+                self._rate = rate
+                self._tokens = float(rate)
+            elif rate:
+                # Capacidad del cubo: un segundo de tráfico
+                self._tokens = min(float(rate), self._tokens + (now - self._last) * rate)
+            self._last = now
+            if not rate:
+                return 0.0
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / rate
+
+    def consume(self, n: int) -> None:
+        """Descuenta n bytes y espera si hace falta (descargas síncronas)."""
+        delay = self.reserve(n)
+        if delay > 0:
+            self.sleep(delay)
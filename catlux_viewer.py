@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Visor paginado del preview para listados grandes.
+
+Con miles de documentos, imprimir la tabla completa inunda la terminal. El
+visor pinta solo la página visible (según la altura de la terminal) y permite
+filtrar, ordenar y marcar documentos por ID antes de descargar:
+
+    Enter / n        página siguiente          p      página anterior
+    g N              ir a la página N          l      lista filtrada en el pager (less)
+    f EXPR           filtrar con la sintaxis de --select (new, type=..., ref>=...)
+    /texto           buscar en título, tipo e ID
+    c                quitar filtros
+    s CAMPO          ordenar por ref, type, title o id ('-ref' = descendente)
+    + IDs / - IDs    marcar / desmarcar (IDs de documento o nombres, separados por comas)
+    +* / -*          marcar / desmarcar todo lo filtrado
+    d                descargar lo marcado          q      volver al menú
+
+Se abre desde ask_download_selection() (opción 3).
+"""
+
+import pydoc
+import shutil
+from typing import Callable, Dict, List, Optional
+
+from catlux_scrapper import (
+    PREVIEW_HEADER,
+    extract_ref_number,
+    format_preview_row,
+    select_by_ids,
+)
+
+SORT_KEYS: Dict[str, Callable[[Dict], object]] = {
+    'ref': extract_ref_number,
+    'type': lambda p: p.get('doc_type', '').lower(),
+    'title': lambda p: p.get('doc_title', '').lower(),
+    'id': lambda p: int(p['doc_id']) if str(p['doc_id']).isdigit() else 0,
+}
+
+
+class PreviewViewer:
+    """Tabla del preview paginada, con filtro, orden y selección por ID."""
+
+    def __init__(self, pdfs: List[Dict], page_size: Optional[int] = None,
+                 input_func: Callable[[str], str] = input, output: Callable[[str], None] = print):
+        """
+        Args:
+            pdfs: PDFs en el orden del preview (los índices devueltos se refieren a esta lista)
+            page_size: Filas por página (por defecto, la altura de la terminal)
+            input_func: Lectura de comandos (inyectable en pruebas)
+            output: Escritura de líneas (inyectable en pruebas)
+        """
+        self.pdfs = pdfs
+        self.page_size = page_size or max(10, shutil.get_terminal_size((165, 30)).lines - 8)
+        self.input = input_func
+        self.output = output
+        self.view: List[int] = list(range(len(pdfs)))
+        self.page = 0
+        self.filters: List[str] = []
+        self.sort = 'ref'
+        self.marked: set = set()
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.view) // self.page_size))
+
+    def refresh(self) -> None:
+        """Recalcula la vista (filtros + orden) y vuelve a la primera página."""
+        import catlux_output
+
+        view = range(len(self.pdfs))
+        for expr in self.filters:
+            if expr.startswith('/'):
+                text = expr[1:].lower()
+                view = [i for i in view if text in self._haystack(self.pdfs[i])]
+            else:
+                predicate = catlux_output.parse_select(expr)
+                view = [i for i in view if predicate(self.pdfs[i])]
+
+        field = self.sort.lstrip('-')
+        key = SORT_KEYS[field]
+        self.view = sorted(view, key=lambda i: key(self.pdfs[i]), reverse=self.sort.startswith('-'))
+        self.page = 0
+
+    @staticmethod
+    def _haystack(pdf: Dict) -> str:
+        return f"{pdf.get('doc_title', '')} {pdf.get('doc_type', '')} {pdf['name']}".lower()
+
+    def visible(self) -> List[int]:
+        """Índices de la página actual (lo único que se pinta)."""
+        start = self.page * self.page_size
+        return self.view[start:start + self.page_size]
+
+    # ------------------------------------------------------------------
+    # Pintado
+    # ------------------------------------------------------------------
+
+    def _row(self, i: int) -> str:
+        mark = "*" if i in self.marked else " "
+        return f"{mark} {format_preview_row(i + 1, self.pdfs[i])}"
+
+    def render(self) -> None:
+        """Pinta la página visible y la barra de estado."""
+        self.output("-" * 167)
+        self.output(f"  {PREVIEW_HEADER}")
+        self.output("-" * 167)
+        for i in self.visible():
+            self.output(self._row(i))
+        self.output("-" * 167)
+        filters = " · ".join(self.filters) or "ninguno"
+        self.output(f"Página {self.page + 1}/{self.pages} · {len(self.view)} filas · "
+                    f"orden: {self.sort} · filtros: {filters} · {len(self.marked)} marcados")
+        self.output("Comandos: Enter/n p g N · f EXPR /texto c · s ref|type|title|id · "
+                    "+IDs -IDs +* -* · l (pager) · d (descargar) · q (volver)")
+
+    def show_in_pager(self) -> None:
+        """Envía la lista filtrada completa al pager del sistema ($PAGER o less)."""
+        lines = [f"  {PREVIEW_HEADER}"] + [self._row(i) for i in self.view]
+        pydoc.pager("\n".join(lines))
+
+    # ------------------------------------------------------------------
+    # Comandos
+    # ------------------------------------------------------------------
+
+    def _mark(self, tokens: str, add: bool) -> None:
+        if tokens.strip() == '*':
+            chosen = self.view
+        else:
+            chosen, unknown = select_by_ids(self.pdfs, tokens.split(','))
+            if unknown:
+                self.output(f"❌ IDs no encontrados: {', '.join(unknown)}")
+        if add:
+            self.marked.update(chosen)
+        else:
+            self.marked.difference_update(chosen)
+
+    def handle(self, command: str) -> Optional[str]:
+        """
+        Ejecuta un comando.
+
+        Returns:
+            "done" (descargar), "quit" (volver) o None (seguir)
+        """
+        command = command.strip()
+        if command in ('', 'n'):
+            self.page = (self.page + 1) % self.pages
+        elif command == 'p':
+            self.page = (self.page - 1) % self.pages
+        elif command.startswith('g ') and command[2:].strip().isdigit():
+            self.page = min(self.pages, max(1, int(command[2:]))) - 1
+        elif command.startswith('f '):
+            self.filters.append(command[2:].strip())
+            try:
+                self.refresh()
+            except ValueError as e:
+                self.filters.pop()
+                self.output(f"❌ {e}")
+        elif command.startswith('/') and len(command) > 1:
+            self.filters.append(command)
+            self.refresh()
+        elif command == 'c':
+            self.filters.clear()
+            self.refresh()
+        elif command.startswith('s ') and command[2:].strip().lstrip('-') in SORT_KEYS:
+            self.sort = command[2:].strip()
+            self.refresh()
+        elif command.startswith('+'):
+            self._mark(command[1:], add=True)
+        elif command.startswith('-'):
+            self._mark(command[1:], add=False)
+        elif command == 'l':
+            self.show_in_pager()
+        elif command == 'd':
+            return "done"
+        elif command == 'q':
+            return "quit"
+        else:
+            self.output("❌ Comando no reconocido")
+        return None
+
+    def run(self) -> Optional[List[int]]:
+        """
+        Bucle interactivo.
+
+        Returns:
+            Índices (0-basados, en el orden del preview) de lo marcado, o None
+            si se vuelve al menú sin descargar
+        """
+        self.refresh()
+        while True:
+            self.render()
+            result = self.handle(self.input("\nVisor> "))
+            if result == "done":
+                return sorted(self.marked)
+            if result == "quit":
+                return None
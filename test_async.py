@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las descargas del motor asíncrono (catlux_async.py) contra benchmarks/standin.py.
+"""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+pytest.importorskip("httpx")
+
+import catlux_async  # noqa: E402
+import catlux_scrapper  # noqa: E402
+from catlux_async import AsyncEngine, download_filtered_pdfs_async, fetch_listing  # noqa: E402
+from catlux_catalog import Catalog  # noqa: E402
+from catlux_queue import JobQueue  # noqa: E402
+from catlux_scrapper import DownloadTracker  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    save_path = tmp_path / "Catlux"
+    save_path.mkdir()
+    monkeypatch.setenv("CATLUX_USERNAME", "test@example.com")
+    monkeypatch.setenv("CATLUX_PASSWORD", "test")
+    monkeypatch.setenv("CATLUX_SAVE_PATH", str(save_path))
+    monkeypatch.delenv("CATLUX_CERT_PATH", raising=False)
+    monkeypatch.setattr(catlux_async, "QUEUE_FILE", tmp_path / "queue.db")
+    monkeypatch.setattr(catlux_scrapper, "CATALOG_FILE", tmp_path / "catalog.json")
+    return tmp_path
+
+
+def test_download_uses_queue_and_catalog(env):
+    with CatluxStandin(n_docs=6, pdf_size=1024, solution_every=3) as standin:
+        url = standin.category_url()
+        pdfs = fetch_listing(url, max_pages=2, concurrency=4)
+        tracker = DownloadTracker(env / "tracker.json")
+        count = download_filtered_pdfs_async(url, tracker=tracker, pdfs=pdfs,
+                                             selected_indices=list(range(len(pdfs))), concurrency=4)
+
+    # 6 documentos y 2 soluciones; las 4 soluciones que faltan no cuentan
+    target = env / "Catlux" / "klasse-7" / "deutsch"
+    assert count == 8 and tracker.get_current_month_downloads() == 8
+    assert len(list(target.glob("*.pdf"))) == 8 and not list(target.glob("*.part"))
+
+    with JobQueue(env / "queue.db") as job_queue:
+        assert job_queue.counts() == {'done': 8, 'failed': 4}
+    missing = [pdf for pdf in pdfs if pdf['is_solution'] and not (target / f"{pdf['name']}.pdf").exists()]
+    probes = Catalog(env / "catalog.json").probes_for(url, missing)
+    assert len(probes) == 4 and not any(probe['ok'] for probe in probes.values())
+
+
+def test_download_drains_pending_jobs_and_retries(env, monkeypatch):
+    calls = []
+    real_write = catlux_scrapper.write_pdf
+
+    def flaky_write(dest, chunks, on_chunk=None):
+        calls.append(dest.name)
+        if len(calls) == 1:
+            raise OSError("disco lleno")
+        real_write(dest, chunks, on_chunk)
+
+    monkeypatch.setattr(catlux_async, "write_pdf", flaky_write)
+
+    with CatluxStandin(n_docs=3, pdf_size=1024) as standin:
+        url = standin.category_url()
+        target = env / "Catlux" / "klasse-7" / "deutsch"
+        pdfs = fetch_listing(url, max_pages=1, concurrency=2)
+        # Trabajos que dejó pendientes un proceso anterior (lo que retoma --resume)
+        with JobQueue(env / "queue.db") as job_queue:
+            job_queue.enqueue(url, target, pdfs)
+
+        # El tracker (file_lock del ledger) nunca bloquea el hilo del event loop
+        tracker = DownloadTracker(env / "tracker.json")
+        threads = set()
+        for name in ("reserve_slot", "release_slot", "record_download"):
+            def spy(*args, _real=getattr(tracker, name)):
+                threads.add(threading.current_thread().name)
+                return _real(*args)
+            monkeypatch.setattr(tracker, name, spy)
+
+        async def run() -> int:
+            async with AsyncEngine(2) as engine:
+                assert await engine.login("test@example.com", "test", standin.root_url() + "login")
+                return await engine.download(env / "queue.db", tracker)
+
+        count = asyncio.run(run())
+
+    assert count == 6 and len(calls) == 7
+    assert len(threads) == 1 and threads.pop().startswith("catlux-async-state")
+    assert sorted(f.name for f in target.iterdir()) == sorted(f"{pdf['name']}.pdf" for pdf in pdfs)
+    with JobQueue(env / "queue.db") as job_queue:
+        assert job_queue.counts() == {'done': 6}
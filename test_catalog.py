@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pruebas del catálogo de disponibilidad (catlux_catalog.py).
+"""
+
+import json
+
+import pytest
+
+from catlux_catalog import Catalog, probe_listing
+from catlux_scrapper import NotAPdfError, check_pdf_content
+
+
+class _Head:
+    def __init__(self, content_type, size=1234):
+        self.status_code = 200
+        self.ok = True
+        self.headers = {'Content-Type': content_type, 'Content-Length': str(size)}
+
+
+class _Session:
+    """Sesión falsa: las soluciones de documentos impares no existen (HTML)."""
+
+    def __init__(self):
+        self.heads = []
+
+    def head(self, url, **kwargs):
+        self.heads.append(url)
+        doc_id = int(url.split('/')[-1].split('?')[0])
+        if url.endswith("pdf_solution") and doc_id % 2:
+            return _Head("text/html; charset=utf-8", 40)
+        return _Head("application/pdf")
+
+
+def _listing(n):
+    pdfs = []
+    for doc_id in range(n):
+        for dl, suffix in (("pdf", ""), ("pdf_solution", "_solution")):
+            pdfs.append({'name': f"{doc_id}{suffix}", 'full_url': f"https://x/probe/{doc_id}?dl={dl}",
+                         'is_solution': bool(suffix), 'doc_id': str(doc_id), 'is_local': False})
+    return pdfs
+
+
+def test_missing_solutions_are_dropped_and_cached(tmp_path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    session = _Session()
+
+    pdfs = probe_listing(session, "https://x/klasse-7/deutsch/", _listing(4), catalog)
+    assert [p['name'] for p in pdfs] == ["0", "0_solution", "1", "2", "2_solution", "3"]
+    assert pdfs[0]['size'] == 1234
+    assert len(session.heads) == 8
+
+    # Mismo listado: nada se vuelve a sondear
+    probe_listing(session, "https://x/klasse-7/deutsch/", _listing(4), catalog)
+    assert len(session.heads) == 8
+
+    # Una subida nueva: solo se sondean sus dos PDFs
+    probe_listing(session, "https://x/klasse-7/deutsch/", _listing(5), catalog)
+    assert len(session.heads) == 10
+
+    # Listado parcial (incremental del daemon): todo sale del catálogo
+    partial = probe_listing(session, "https://x/klasse-7/deutsch/", _listing(5)[6:], catalog)
+    assert len(session.heads) == 10 and [p['name'] for p in partial] == ["3", "4", "4_solution"]
+
+
+def test_probes_expire_and_are_pruned(tmp_path):
+    catalog = Catalog(tmp_path / "catalog.json")
+    session = _Session()
+    probe_listing(session, "https://x/", _listing(2), catalog)
+    probe_listing(session, "https://y/", _listing(1), catalog)
+    assert len(session.heads) == 6
+
+    # Pasado el plazo se vuelven a sondear y lo caducado sale del archivo
+    path = tmp_path / "catalog.json"
+    data = json.loads(path.read_text())
+    for entry in data["listings"].values():
+        for probe in entry["probes"].values():
+            probe['checked'] = "2000-01-01T00:00:00"
+    path.write_text(json.dumps(data))
+    probe_listing(session, "https://x/", _listing(2), catalog)
+    assert len(session.heads) == 10
+    assert list(json.loads(path.read_text())["listings"]) == ["https://x/"]
+
+
+class _Body:
+    def __init__(self, body):
+        self.ok, self.body = True, body
+        self.headers = {'Content-Type': "application/octet-stream", 'Content-Range': "bytes 0-9/5000"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def iter_content(self, size):
+        return iter([self.body])
+
+
+def test_generic_content_type_is_confirmed_by_magic(tmp_path):
+    class Session(_Session):
+        def head(self, url, **kwargs):
+            self.heads.append(url)
+            return _Head("application/octet-stream" if "dl=pdf_solution" not in url else "application/force-download")
+
+        def get(self, url, **kwargs):
+            return _Body(b"%PDF-1.4\n" if url.startswith("https://x/probe/0") else b"<html>nichts")
+
+    pdfs = probe_listing(Session(), "https://x/", _listing(2), Catalog(tmp_path / "c.json"))
+    assert [p['name'] for p in pdfs] == ["0", "0_solution"] and pdfs[0]['size'] == 5000
+
+
+def test_local_files_are_not_probed(tmp_path):
+    pdfs = _listing(2)
+    for pdf in pdfs:
+        pdf['is_local'] = True
+    session = _Session()
+    assert probe_listing(session, "https://x/", pdfs, Catalog(tmp_path / "c.json")) == pdfs
+    assert session.heads == []
+
+
+def test_pdf_magic():
+    check_pdf_content("1", b"%PDF-1.4\n", "application/pdf")
+    with pytest.raises(NotAPdfError):
+        check_pdf_content("1_solution", b"<html>Keine", "text/html")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas del modo daemon (catlux_daemon.py) y del reparto de saldo entre hilos.
+"""
+
+import threading
+from datetime import datetime
+
+import catlux_daemon
+import catlux_scrapper
+from catlux_daemon import CatluxDaemon, next_month_start
+from catlux_scrapper import DownloadTracker
+
+
+def test_next_month_start():
+    assert next_month_start(datetime(2026, 10, 19, 13, 5)) == datetime(2026, 11, 1)
+    assert next_month_start(datetime(2026, 12, 31, 23, 59)) == datetime(2027, 1, 1)
+
+
+def test_parallel_reservations_never_exceed_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(catlux_scrapper, "DOWNLOADS_PER_MONTH", 5)
+    tracker = DownloadTracker(tmp_path / "tracker.json")
+    barrier = threading.Barrier(8)
+    recorded = []
+
+    def worker(i):
+        barrier.wait()
+        while True:
+            reservation = tracker.reserve_slot()
+            if reservation is None:
+                return
+            tracker.record_download(f"{i}-{len(recorded)}", reservation)
+            recorded.append(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(recorded) == 5
+    assert tracker.get_current_month_downloads() == 5
+    assert tracker.reserve_slot() is None
+
+
+def test_failed_cycles_back_off_and_continue(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv("CATLUX_USERNAME", "test@example.com")
+    monkeypatch.setenv("CATLUX_PASSWORD", "test")
+    monkeypatch.setenv("CATLUX_SAVE_PATH", str(tmp_path))
+    monkeypatch.setattr(catlux_daemon, "CATALOG_FILE", tmp_path / "catalog.json")
+    monkeypatch.setattr(catlux_daemon, "ERROR_BACKOFF_SECONDS", 0.01)
+    daemon = CatluxDaemon([], DownloadTracker(tmp_path / "tracker.json"))
+    daemon.queue_file = tmp_path / "queue.db"
+    calls = []
+
+    def check_listings(job_queue):
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("red caída")
+        daemon.stop_event.set()
+        return 0
+
+    monkeypatch.setattr(daemon, "check_listings", check_listings)
+    assert daemon.run() == 0
+    assert len(calls) == 3
+    errors = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 2 and errors[0].exc_info and "0.02 s" in errors[1].getMessage()
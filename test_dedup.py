@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la detección de casi duplicados (catlux_dedup.py).
+"""
+
+import random
+
+import catlux_dedup
+from catlux_dedup import (
+    DuplicateIndex,
+    LshIndex,
+    char_shingles,
+    check_duplicates,
+    find_local_duplicates,
+    meta_signature,
+    minhash,
+    similarity,
+)
+from catlux_output import select_indices
+from catlux_planner import plan_downloads
+
+CATEGORY = "klasse-7/deutsch"
+
+
+def _doc(doc_id, ref, title, doc_type="1. Schulaufgabe", local=()):
+    text = f"{doc_type}#{ref}{title}"[:100]
+    pdfs = []
+    for name, is_solution in ((str(doc_id), False), (f"{doc_id}_solution", True)):
+        pdfs.append({'name': name, 'is_solution': is_solution, 'doc_id': str(doc_id),
+                     'doc_number': f"#{ref}", 'doc_type': doc_type, 'doc_title': title,
+                     'text': text, 'is_local': name in local})
+    return pdfs
+
+
+def test_signature_estimates_jaccard():
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(400)]
+    a = set(rng.sample(words, 200))
+    b = set(list(a)[:150]) | set(rng.sample(words, 50))
+    exact = len(a & b) / len(a | b)
+    assert abs(similarity(minhash(a), minhash(b)) - exact) < 0.15
+    assert similarity(minhash(a), minhash(a)) == 1.0
+
+    # Pocos n-gramas: la densificación rellena las cubetas vacías de forma coherente
+    short = char_shingles("Probe")
+    assert len(minhash(short)) == catlux_dedup.SIGNATURE_BINS
+    assert minhash(set()) is None
+
+
+def test_reupload_is_similar_but_sibling_exam_is_not():
+    original = meta_signature(_doc(1, 3412, "Erörterung: Soll Handy im Unterricht erlaubt sein?")[0])
+    reupload = meta_signature(_doc(2, 3890, "Erörterung: Soll Handy im Unterricht erlaubt sein")[0])
+    sibling = meta_signature(_doc(3, 3413, "Inhaltsangabe: Die Judenbuche, Kapitel 1-3")[0])
+    assert similarity(original, reupload) >= catlux_dedup.DUPLICATE_THRESHOLD
+    assert similarity(original, sibling) < 0.5
+
+
+def test_lsh_only_compares_candidates():
+    index = LshIndex()
+    for i in range(2000):
+        index.add(str(i), minhash(char_shingles(f"Schulaufgabe Nummer {i} Thema {i * 7919}")))
+    probe = minhash(char_shingles("Schulaufgabe Nummer 1234 Thema 9772046"))
+    assert [key for key, _ in index.query(probe)] == ["1234"]
+
+
+def test_preview_flags_duplicates_and_planner_skips_them(tmp_path):
+    index_file = tmp_path / "dedup.json"
+    title = "Erörterung: Soll Handy im Unterricht erlaubt sein?"
+    listing = (_doc(1, 3412, title, local=("1", "1_solution"))
+               + _doc(2, 3890, title + " (neu)")
+               + _doc(3, 3413, "Inhaltsangabe: Die Judenbuche, Kapitel 1-3")
+               + _doc(6, 3414, "Probe Nummer 2: Erörterung und Grammatik")
+               + _doc(7, 3415, "Probe Nummer 1: Erörterung und Grammatik", local=("7",)))
+
+    assert check_duplicates(listing, CATEGORY, index_file) == 2
+    flagged = {pdf['name']: pdf['duplicate_of'] for pdf in listing if pdf.get('duplicate_of')}
+    assert flagged == {"2": "1", "2_solution": "1_solution"}
+    assert [listing[i]['name'] for i in select_indices(listing, "new,nodup")] == [
+        "3", "3_solution", "6", "6_solution", "7_solution"]
+
+    # En una ejecución posterior el documento local ya no hace falta en el listado
+    later = _doc(4, 4001, title)
+    assert check_duplicates(later, CATEGORY, index_file) == 2
+    assert check_duplicates(_doc(5, 4002, title), "klasse-8/deutsch", index_file) == 0
+
+    candidates = [dict(pdf, category=CATEGORY) for pdf in listing if not pdf['is_local']]
+    plan = plan_downloads(candidates, 10, skip_duplicates=True)
+    assert [pdf['name'] for pdf in plan.pdfs] == ["7_solution", "6", "6_solution", "3", "3_solution"]
+    assert plan.skipped[0]['reason'].startswith("posible duplicado de 1 (")
+    assert len(plan_downloads(candidates, 10).pdfs) == 7
+
+
+def test_local_report_groups_by_text_or_metadata(tmp_path, monkeypatch):
+    texts = {"100.pdf": "Aufgabe eins lies den Text und beantworte die Fragen zum Gedicht",
+             "200.pdf": "Aufgabe eins lies den Text und beantworte die Fragen zum Gedicht bitte",
+             "300.pdf": "Rechne die folgenden Brüche aus und kürze so weit wie möglich"}
+    root = tmp_path / "klasse-7" / "deutsch"
+    root.mkdir(parents=True)
+    for name in list(texts) + ["400.pdf", "500.pdf"]:
+        (root / name).write_bytes(b"%PDF-1.4 " + name.encode())
+    monkeypatch.setattr(catlux_dedup, "extract_pdf_text", lambda path: texts.get(path.name))
+
+    index = DuplicateIndex(tmp_path / "dedup.json")
+    title = "Gedichtanalyse: Der Erlkönig"
+    for doc_id in ("400", "500"):
+        pdfs = _doc(doc_id, doc_id, title, local=(doc_id,))
+        index.add_document(pdfs, CATEGORY, meta_signature(pdfs[0]))
+
+    groups = find_local_duplicates(tmp_path, index)
+    assert sorted([r['doc_id'] for r in group] for group in groups) == [["100", "200"], ["400", "500"]]
+    assert {group[0]['basis'] for group in groups} == {"texto", "metadatos"}
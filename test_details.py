@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Pruebas del enriquecimiento con la página de detalle (catlux_details.py).
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+from catlux_details import DetailCache, enrich_details, parse_detail_page  # noqa: E402
+from catlux_output import select_indices  # noqa: E402
+from catlux_scrapper import parse_listing_page  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with CatluxStandin(n_docs=25, page_size=25) as standin:
+        yield standin
+
+
+def _listing(server):
+    return parse_listing_page(server.listing_page(1).encode("utf-8"), server.category_url())
+
+
+def test_parse_definition_lists_and_tables():
+    html = (b"<html><dl><dt>Schuljahr:</dt><dd>2022/23</dd><dt>Fach</dt><dd>Deutsch</dd></dl>"
+            b"<table><tr><th>Seitenanzahl</th><td>3 Seiten</td></tr>"
+            b"<tr><td>Erstellt von</td><td>Frau Meier</td></tr></table></html>")
+    assert parse_detail_page(html) == {'school_year': "2022/23", 'pages': 3, 'author': "Frau Meier"}
+
+
+def test_enrich_caches_and_revalidates(server, tmp_path):
+    cache_file = tmp_path / "details.json"
+    pdfs = _listing(server)
+    with requests.Session() as session:
+        stats = enrich_details(session, server.root_url(), pdfs, DetailCache(cache_file), rate=0)
+        assert stats['fetched'] == 25 and server.counters['detail'] == 25
+        assert all(pdf['school_year'] == "2023/24" and pdf['author'] for pdf in pdfs)
+        assert [pdfs[i]['name'] for i in select_indices(pdfs, "exam,pages<=1")] == ["100000", "100005",
+                                                                                    "100010", "100015", "100020"]
+
+        # Vigente: ninguna petición
+        stats = enrich_details(session, server.root_url(), _listing(server), DetailCache(cache_file))
+        assert stats['cached'] == 25 and server.counters['detail'] == 25
+
+        # Caducada: revalidación condicional (304), y solo lo que cambió se vuelve a parsear
+        fresh = _listing(server)
+        stats = enrich_details(session, server.root_url(), fresh, DetailCache(cache_file), rate=0, ttl=0)
+        assert stats['revalidated'] == 25 and server.counters['detail_304'] == 25
+        assert fresh[0]['pages'] == 1
+
+        server.detail_version = 2
+        stats = enrich_details(session, server.root_url(), _listing(server), DetailCache(cache_file),
+                               rate=0, ttl=0)
+        assert stats['fetched'] == 25 and server.counters['detail'] == 50
+
+
+def test_rate_limit_is_shared_by_workers(server, tmp_path):
+    with requests.Session() as session:
+        start = time.monotonic()
+        enrich_details(session, server.root_url(), _listing(server), DetailCache(tmp_path / "d.json"),
+                       workers=8, rate=10)
+        # 10 peticiones del cubo lleno y 15 más a 10/s
+        assert time.monotonic() - start >= 1.3
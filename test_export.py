@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la exportación a paquetes (catlux_export.py).
+"""
+
+import errno
+import json
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+import catlux_export
+from catlux_export import copy_range, export_bundle, scan_local_pdfs, select_for_export
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "Catlux"
+    for folder, names in {"klasse-7/deutsch": ["119215", "119215_solution", "118065"],
+                          "klasse-8/englisch": ["120001"]}.items():
+        (root / folder).mkdir(parents=True)
+        for i, name in enumerate(names):
+            (root / folder / f"{name}.pdf").write_bytes(b"%PDF-1.4\n" + name.encode() * (1000 * (i + 1)))
+    (root / ".catlux_prefetch").mkdir()
+    (root / ".catlux_prefetch" / "999.pdf").write_bytes(b"%PDF")
+    return root
+
+
+def test_scan_and_select(library):
+    pdfs = scan_local_pdfs(library)
+    assert [p['arcname'] for p in pdfs] == ["klasse-7/deutsch/118065.pdf", "klasse-7/deutsch/119215.pdf",
+                                            "klasse-7/deutsch/119215_solution.pdf",
+                                            "klasse-8/englisch/120001.pdf"]
+
+    dates = {"119215": "2025-10-03T10:00:00", "120001": "2025-09-30T10:00:00"}
+    assert [p['name'] for p in select_for_export(pdfs, dates, since="2025-10")] == ["119215"]
+    assert [p['name'] for p in select_for_export(pdfs, select="id=119215")] == ["119215", "119215_solution"]
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_zip_is_readable_and_has_manifest(library, tmp_path, monkeypatch, fast):
+    if not fast:
+        monkeypatch.setitem(catlux_export._FAST_COPY, 'copy_file_range', False)
+        monkeypatch.setitem(catlux_export._FAST_COPY, 'sendfile', False)
+    pdfs = scan_local_pdfs(library)
+
+    dest = tmp_path / "out" / "alumno.zip"
+    export_bundle(dest, pdfs, {"119215": "2025-10-03T10:00:00"})
+
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+        assert zf.read("klasse-7/deutsch/119215.pdf") == (library / "klasse-7/deutsch/119215.pdf").read_bytes()
+        manifest = json.loads(zf.read(catlux_export.MANIFEST_NAME))
+    assert [f['path'] for f in manifest['files']] == [p['arcname'] for p in pdfs]
+    assert manifest['files'][1]['downloaded'] == "2025-10-03T10:00:00"
+    assert not dest.with_name("alumno.zip.part").exists()
+
+
+def test_zip64_records(library, tmp_path, monkeypatch):
+    # Umbral bajo para recorrer los caminos ZIP64 sin escribir 4 GB
+    monkeypatch.setattr(catlux_export, "ZIP64_LIMIT", 2500)
+    dest = tmp_path / "grande.zip"
+    export_bundle(dest, scan_local_pdfs(library))
+
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 5
+
+
+def test_tar(library, tmp_path):
+    dest = tmp_path / "lote.tar"
+    export_bundle(dest, scan_local_pdfs(library))
+
+    with tarfile.open(dest) as tf:
+        names = tf.getnames()
+        assert tf.extractfile("klasse-8/englisch/120001.pdf").read() == \
+            (library / "klasse-8/englisch/120001.pdf").read_bytes()
+    assert names[-1] == catlux_export.MANIFEST_NAME
+    assert dest.stat().st_size % tarfile.RECORDSIZE == 0
+
+
+def test_copy_range_falls_back_without_pread(tmp_path, monkeypatch):
+    # Como en macOS/Windows: la llamada rápida falla con un errno inesperado y no hay pread
+    def not_a_socket(*args):
+        raise OSError(errno.ENOTSOCK, "Socket operation on non-socket")
+
+    monkeypatch.setitem(catlux_export._FAST_COPY, 'copy_file_range', True)
+    monkeypatch.setitem(catlux_export._FAST_COPY, 'sendfile', True)
+    monkeypatch.setattr(os, "copy_file_range", not_a_socket, raising=False)
+    monkeypatch.setattr(os, "sendfile", not_a_socket, raising=False)
+    monkeypatch.delattr(os, "pread", raising=False)
+    monkeypatch.setattr(catlux_export, "FALLBACK_CHUNK_SIZE", 1000)
+
+    src, dst = tmp_path / "origen.pdf", tmp_path / "copia.pdf"
+    content = b"%PDF-1.4\n" + bytes(range(256)) * 20
+    src.write_bytes(content)
+    with open(src, 'rb') as f, open(dst, 'wb') as g:
+        g.write(b"cabecera")
+        g.flush()
+        copy_range(f.fileno(), g.fileno(), len(content))
+    assert dst.read_bytes() == b"cabecera" + content
+    assert catlux_export._FAST_COPY == {'copy_file_range': False, 'sendfile': False}
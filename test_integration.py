@@ -32,7 +32,7 @@ test_pdfs = [
 
 # Import the function from the main script
 import sys
-sys.path.insert(0, '/home/user/CatluxScrapper')
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 from catlux_scrapper import mark_local_files
 
 # Test mark_local_files
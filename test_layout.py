@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las organizaciones de carpetas y de la migración (catlux_layout.py).
+"""
+
+import pytest
+
+import catlux_scrapper
+from catlux_layout import (
+    LAYOUT_FILE_NAME,
+    Layout,
+    migrate_layout,
+    plan_migration,
+    read_layout_record,
+    resolve_layout,
+)
+from catlux_scrapper import build_download_queue, mark_local_files
+
+CATEGORY = ("klasse-7", "deutsch")
+
+
+def _pdf(name, doc_type="1. Schulaufgabe", **fields):
+    doc_id = name.replace('_solution', '')
+    return dict({'name': name, 'doc_id': doc_id, 'is_solution': name != doc_id,
+                 'doc_type': doc_type}, **fields)
+
+
+def _tree(root, names, subdir=""):
+    folder = root.joinpath(*CATEGORY, subdir)
+    folder.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (folder / f"{name}.pdf").write_bytes(b"%PDF-1.4 " + name.encode())
+    return root.joinpath(*CATEGORY)
+
+
+def test_paths_per_layout():
+    exam = _pdf("119215", school_year="2023/2024")
+    solution = _pdf("119215_solution", uploaded="03.02.2025")
+    assert Layout("flat").relative_path(exam).as_posix() == "119215.pdf"
+    assert Layout("id-prefix").relative_path(solution).as_posix() == "1192/119215_solution.pdf"
+    assert Layout("type-year").relative_path(exam).as_posix() == "1-schulaufgabe/2023/119215.pdf"
+    assert Layout("type-year").relative_path(solution).as_posix() == "1-schulaufgabe/2025/119215_solution.pdf"
+    assert Layout("type-year").relative_path({'name': "7"}).as_posix() == "sonstige/ohne-jahr/7.pdf"
+    with pytest.raises(ValueError):
+        Layout("por-fecha")
+
+
+def test_local_detection_is_layout_agnostic(tmp_path, monkeypatch):
+    save_path = _tree(tmp_path, ["100001"], "1000")
+    _tree(tmp_path, ["100002"])
+    other = tmp_path / "klasse-8" / "deutsch" / "1000"
+    other.mkdir(parents=True)
+    (other / "100003.pdf").write_bytes(b"%PDF-1.4")
+
+    pdfs = [_pdf(n) for n in ("100001", "100002", "100003", "100004", "100004_solution")]
+    mark_local_files(pdfs, save_path, tmp_path)
+    assert [pdf['is_local'] for pdf in pdfs] == [True, True, True, False, False]
+    assert pdfs[0]['local_path'] == save_path / "1000" / "100001.pdf"
+
+    monkeypatch.setattr(catlux_scrapper, "_layout", Layout("id-prefix"))
+    (save_path / "1000" / "100004_solution.pdf").write_bytes(b"%PDF-1.4")
+    queue = build_download_queue(pdfs, [3], save_path, tmp_path)
+    assert [pdf['name'] for pdf in queue] == ["100004"]
+    assert catlux_scrapper.pdf_path(save_path, pdfs[3]) == save_path / "1000" / "100004.pdf"
+
+
+def test_migration_is_parallel_resumable_and_reversible(tmp_path, monkeypatch):
+    names = [f"{100000 + i}" for i in range(250)] + ["100000_solution"]
+    save_path = _tree(tmp_path, names)
+    (tmp_path / "suelto.pdf").write_bytes(b"%PDF-1.4")
+
+    # Interrupción simulada: parte del árbol ya está en la organización nueva
+    (save_path / "1001").mkdir()
+    (save_path / "100100.pdf").rename(save_path / "1001" / "100100.pdf")
+    moves, stats = plan_migration(tmp_path, Layout("id-prefix"))
+    assert len(moves) == len(names) - 1 and stats == {'in_place': 1, 'ignored': 1, 'conflicts': 0}
+
+    stats = migrate_layout(tmp_path, Layout("id-prefix"), workers=4)
+    assert (stats['moved'], stats['in_place'], stats['failed']) == (len(names) - 1, 1, 0)
+    assert sorted(p.name for p in save_path.iterdir()) == ["1000", "1001", "1002"]
+    assert (save_path / "1000" / "100000_solution.pdf").exists()
+    assert read_layout_record(tmp_path)['layout'] == "id-prefix"
+    assert resolve_layout(tmp_path) == Layout("id-prefix")
+    monkeypatch.setenv("CATLUX_LAYOUT", "type-year")
+    assert resolve_layout(tmp_path) == Layout("type-year")
+    assert resolve_layout(tmp_path, "flat") == Layout("flat")
+
+    # Un duplicado en destino no se sobrescribe
+    (save_path / "100000.pdf").write_bytes(b"%PDF-1.4 copia")
+    stats = migrate_layout(tmp_path, Layout("flat"))
+    assert (stats['moved'], stats['conflicts'], stats['dirs_removed']) == (len(names) - 1, 1, 2)
+    assert (save_path / "1000" / "100000.pdf").exists()
+    assert len(list(save_path.glob("*.pdf"))) == len(names)
+    assert not (save_path / "1001").exists()
+    record = read_layout_record(tmp_path)
+    assert record['layout'] == "flat" and 'migrating_to' not in record
+    assert (tmp_path / LAYOUT_FILE_NAME).exists()
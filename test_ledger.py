@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Pruebas del ledger de cuota compartido (catlux_ledger.QuotaLedger).
+"""
+
+import multiprocessing
+import time
+
+import catlux_ledger
+from catlux_ledger import QuotaLedger
+from catlux_scrapper import DownloadTracker
+
+
+def _worker(ledger_file, limit, results):
+    ledger = QuotaLedger(ledger_file)
+    got = 0
+    while True:
+        reservation = ledger.reserve(limit)
+        if reservation is None:
+            break
+        ledger.commit(reservation, f"{multiprocessing.current_process().pid}-{got}.pdf")
+        got += 1
+    results.put(got)
+
+
+def test_processes_never_exceed_limit(tmp_path):
+    ledger_file = tmp_path / "quota.json"
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker, args=(ledger_file, 25, results))
+             for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+
+    assert sum(results.get() for _ in procs) == 25
+    assert QuotaLedger(ledger_file).used_this_month() == 25
+
+
+def test_release_and_expiry_free_slots(tmp_path, monkeypatch):
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    first = ledger.reserve(2)
+    second = ledger.reserve(2)
+    assert ledger.reserve(2) is None
+
+    ledger.release(first)
+    assert ledger.used_this_month() == 1
+
+    monkeypatch.setattr(catlux_ledger, "RESERVATION_TTL_SECONDS", -1)
+    ledger.reserve(2)  # caduca en el acto
+    time.sleep(0.01)
+    assert ledger.used_this_month() == 1
+    ledger.commit(second, "a.pdf")
+    assert ledger.used_this_month() == 1
+
+
+def test_tracker_uses_ledger_for_remaining(tmp_path):
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    other_host = DownloadTracker(tmp_path / "a.json", ledger)
+    this_host = DownloadTracker(tmp_path / "b.json", ledger)
+
+    reservation = other_host.reserve_slot()
+    other_host.record_download("1.pdf", reservation)
+
+    assert this_host.get_current_month_downloads() == 1
+    assert this_host.data["total_all_time"] == 0
+
+
+def test_slow_download_keeps_its_reservation(tmp_path, monkeypatch):
+    monkeypatch.setattr(catlux_ledger, "RESERVATION_TTL_SECONDS", 0.3)
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    other_host = QuotaLedger(tmp_path / "quota.json", owner="otro:1")
+
+    reservation = ledger.reserve(1)
+    time.sleep(1.0)  # más que el TTL: sin renovación el hueco quedaría libre
+    assert other_host.reserve(1) is None
+    ledger.commit(reservation, "lento.pdf")
+    assert other_host.used_this_month() == 1
+
+
+def test_tracker_history_is_imported_once(tmp_path):
+    tracker = DownloadTracker(tmp_path / "tracker.json")
+    for name in ("1.pdf", "2.pdf", "3.pdf"):
+        tracker.record_download(name)
+    tracker.data["downloads"].append({"date": "2001-01-05T10:00:00", "filename": "viejo.pdf"})
+    tracker._save_tracker()
+
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    tracker = DownloadTracker(tmp_path / "tracker.json", ledger)
+    assert ledger.used_this_month() == 3
+    DownloadTracker(tmp_path / "tracker.json", ledger)
+    assert ledger.used_this_month() == 3
+
+    tracker.record_download("4.pdf", tracker.reserve_slot())
+    DownloadTracker(tmp_path / "tracker.json", ledger)
+    assert ledger.used_this_month() == 4 == tracker.get_current_month_downloads()
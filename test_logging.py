@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Pruebas del logging por cola con rotación (catlux_logging.py).
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+
+import pytest
+
+import catlux_logging
+from catlux_logging import DailySizeRotatingFileHandler, JsonFormatter
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    yield root
+    root.handlers[:], level = saved
+    root.setLevel(level)
+
+
+def _record(msg, level=logging.INFO):
+    return logging.LogRecord("catlux_scrapper", level, __file__, 1, msg, None, None)
+
+
+def test_rotates_by_size_and_at_midnight(tmp_path):
+    clock = {'now': datetime(2025, 10, 3, 23, 59)}
+    log_file = tmp_path / "catlux.log"
+    handler = DailySizeRotatingFileHandler(log_file, max_bytes=200, backup_count=2, now=lambda: clock['now'])
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    for i in range(12):
+        handler.emit(_record(f"línea {i:02d} " + "x" * 40))
+    assert (tmp_path / "catlux.log.1").exists() and (tmp_path / "catlux.log.2").exists()
+    assert not (tmp_path / "catlux.log.3").exists()
+
+    clock['now'] = datetime(2025, 10, 4, 0, 1)
+    handler.emit(_record("nuevo día"))
+    handler.close()
+    assert log_file.read_text(encoding='utf-8') == "nuevo día\n"
+
+
+def test_json_formatter_is_one_compact_object_per_line():
+    line = JsonFormatter().format(_record("⬇ 119215.pdf - descargado"))
+    entry = json.loads(line)
+    assert entry['level'] == "INFO" and entry['msg'] == "⬇ 119215.pdf - descargado"
+    assert "\n" not in line and ": " not in line
+
+
+@pytest.mark.parametrize("verbosity, expected", [(0, 8 * 50), (1, 8 * 50 * 2)])
+def test_queue_pipeline_from_many_threads(root_logger, tmp_path, verbosity, expected):
+    log_file = tmp_path / "catlux.log"
+    listener = catlux_logging.configure(log_file, verbosity=verbosity, json_format=True)
+    for handler in listener.handlers:
+        if not isinstance(handler, DailySizeRotatingFileHandler):
+            handler.setLevel(logging.CRITICAL)  # sin ruido en la salida de pytest
+    log = logging.getLogger("catlux_scrapper")
+
+    def worker(n):
+        for i in range(50):
+            log.debug(f"⬇ {n}-{i}.pdf - descargado")
+            log.info(f"Descarga completada {n}-{i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    catlux_logging._stop(listener)
+
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == expected
+    assert all(json.loads(line)['logger'] == "catlux_scrapper" for line in lines)
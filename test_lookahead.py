@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la precarga de listados vecinos (catlux_lookahead.py) contra benchmarks/standin.py.
+"""
+
+import sys
+from concurrent.futures import wait
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import catlux_daemon  # noqa: E402
+import catlux_scrapper  # noqa: E402
+from catlux_cache import ListingCache  # noqa: E402
+from catlux_lookahead import ListingLookahead, likely_next  # noqa: E402
+from catlux_scrapper import DownloadTracker, preview_pdfs  # noqa: E402
+from catlux_sitemap import SiteMap  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+BASE = "https://www.catlux.de/proben/gymnasium/"
+
+
+def test_lru_bound_and_peek():
+    cache = ListingCache(lambda key: [key], max_entries=2)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.put("c", ["c"])
+    assert "b" not in cache and cache.peek("a") == ["a"] and cache.peek("b") is None
+    assert len(cache) == 2 and cache.loads == 2
+
+
+def test_likely_next_ranking(tmp_path):
+    (tmp_path / "klasse-7" / "mathematik").mkdir(parents=True)
+    ranked = likely_next(BASE + "klasse-7/deutsch/", save_base_path=str(tmp_path))
+    assert ranked[:4] == [BASE + "klasse-7/mathematik/", BASE + "klasse-8/deutsch/",
+                          BASE + "klasse-6/deutsch/", BASE + "klasse-7/englisch/"]
+    assert BASE + "klasse-4/deutsch/" not in likely_next(BASE + "klasse-5/deutsch/")
+    # Se conserva el filtro de tipo
+    assert likely_next(BASE + "klasse-7/deutsch/schulaufgabe")[0] == BASE + "klasse-8/deutsch/schulaufgabe"
+    assert likely_next("https://www.catlux.de/login") == []
+
+    # El mapa del sitio da las asignaturas de la klasse y descarta las vacías
+    nodes = {"/proben/gymnasium/klasse-7/": {'name': "Klasse 7", 'count': 30, 'children': [
+        "/proben/gymnasium/klasse-7/deutsch/", "/proben/gymnasium/klasse-7/latein/",
+        "/proben/gymnasium/klasse-7/physik/"]}}
+    for subject, count in (("deutsch", 10), ("latein", 20), ("physik", 0)):
+        nodes[f"/proben/gymnasium/klasse-7/{subject}/"] = {'name': subject, 'count': count}
+    nodes["/proben/gymnasium/klasse-8/deutsch/"] = {'name': "deutsch", 'count': 0}
+    sitemap = SiteMap(BASE, nodes)
+    assert likely_next(BASE + "klasse-7/deutsch/", sitemap) == [BASE + "klasse-6/deutsch/",
+                                                                BASE + "klasse-7/latein/"]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    save_path = tmp_path / "Catlux"
+    save_path.mkdir()
+    monkeypatch.setenv("CATLUX_USERNAME", "test@example.com")
+    monkeypatch.setenv("CATLUX_PASSWORD", "test")
+    monkeypatch.setenv("CATLUX_SAVE_PATH", str(save_path))
+    monkeypatch.delenv("CATLUX_CERT_PATH", raising=False)
+    monkeypatch.setattr(catlux_daemon, "CATALOG_FILE", tmp_path / "catalog.json")
+    monkeypatch.setattr(catlux_scrapper, "CATALOG_FILE", tmp_path / "catalog.json")
+    monkeypatch.setattr(catlux_scrapper, "DEDUP_FILE", tmp_path / "dedup.json")
+    monkeypatch.setattr(catlux_scrapper, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    return tmp_path
+
+
+def test_neighbour_preview_needs_no_listing_or_probes(env):
+    categories = {"/proben/gymnasium/klasse-8/deutsch/": 25, "/proben/gymnasium/klasse-7/englisch/": 5}
+    with CatluxStandin(n_docs=30, page_size=10, pdf_size=1024, solution_every=3,
+                       categories=categories) as standin:
+        url = standin.category_url()
+        neighbour = url.replace("klasse-7", "klasse-8")
+        listings = ListingLookahead(DownloadTracker(env / "tracker.json"), max_pages=5)
+        try:
+            pdfs, _ = preview_pdfs(url, 5, preview_only=True, listings=listings)
+            listings.prefetch_around(url)
+            wait(listings._pending, timeout=10)
+            # klasse-6 no existe: no se guarda y el preview lo pedirá por su cuenta
+            assert neighbour in listings.listings and url.replace("klasse-7", "klasse-6") not in listings.listings
+
+            before = dict(standin.counters)
+            neighbour_pdfs, _ = preview_pdfs(neighbour, 5, preview_only=True, listings=listings)
+            again, _ = preview_pdfs(url, 5, preview_only=True, listings=listings)
+            for key in ("listing", "head", "missing_solution"):
+                assert standin.counters.get(key, 0) == before.get(key, 0), key
+            assert len(neighbour_pdfs) == 25 + 9 and [p['name'] for p in again] == [p['name'] for p in pdfs]
+        finally:
+            listings.close()
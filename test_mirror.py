@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la copia espejo incremental (catlux_mirror.py).
+"""
+
+import os
+import time
+
+import pytest
+
+import catlux_mirror
+from catlux_mirror import MirrorManifest, mirror
+from catlux_scrapper import DownloadTracker
+
+OLD = time.time() - 3600
+
+
+def _write(path, content):
+    """Como una descarga: .part y renombrado."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".part")
+    tmp_path.write_bytes(content)
+    os.utime(tmp_path, (OLD, OLD))
+    os.replace(tmp_path, path)
+
+
+def _age_dirs(root):
+    """Fecha antigua en todas las carpetas: fuera de la ventana RACY_SECONDS."""
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (OLD, OLD))
+
+
+def test_second_run_reuses_unchanged_folders(tmp_path):
+    root, dest = tmp_path / "Catlux", tmp_path / "Backup"
+    for klasse in range(5, 9):
+        for i in range(20):
+            _write(root / f"klasse-{klasse}" / "deutsch" / f"{klasse}000{i:02d}.pdf", b"%PDF-1.4 " * (i + 1))
+    _write(root / ".catlux_staging" / "1.pdf.staged", b"x")
+    _age_dirs(root)
+
+    stats = mirror(root, dest)
+    assert (stats['copied'], stats['failed']) == (80, 0)
+    copied = dest / "klasse-6" / "deutsch" / "600003.pdf"
+    assert copied.read_bytes() == b"%PDF-1.4 " * 4 and copied.stat().st_mtime == pytest.approx(OLD)
+    assert not (dest / ".catlux_staging").exists()
+
+    stats = mirror(root, dest)
+    assert (stats['copied'], stats['dirs_listed'], stats['dirs_reused']) == (0, 0, 9)
+
+    # Nuevo, reescrito y solo tocado: se listan solo esas carpetas
+    _write(root / "klasse-5" / "deutsch" / "599999.pdf", b"%PDF-1.4 nuevo")
+    _write(root / "klasse-6" / "deutsch" / "600001.pdf", b"%PDF-1.4 cambiado")
+    os.utime(root / "klasse-7" / "deutsch" / "700002.pdf", (OLD + 60, OLD + 60))
+    os.utime(root / "klasse-7" / "deutsch", None)
+    stats = mirror(root, dest)
+    assert (stats['copied'], stats['unchanged'], stats['dirs_listed']) == (2, 1, 3)
+    assert (dest / "klasse-6" / "deutsch" / "600001.pdf").read_bytes() == b"%PDF-1.4 cambiado"
+
+
+def test_tracker_history_catches_missed_folders_and_prune(tmp_path):
+    root, dest = tmp_path / "Catlux", tmp_path / "Backup"
+    folder = root / "klasse-7" / "deutsch"
+    _write(folder / "100001.pdf", b"%PDF-1.4 a")
+    _write(folder / "100002.pdf", b"%PDF-1.4 b")
+    _age_dirs(root)
+    tracker = DownloadTracker(tmp_path / "tracker.json")
+    assert mirror(root, dest, tracker)['copied'] == 2
+
+    # Sistema de archivos que no actualizó el mtime de la carpeta
+    _write(folder / "100003.pdf", b"%PDF-1.4 c")
+    _age_dirs(root)
+    tracker.record_download("100003")
+    stats = mirror(root, dest, tracker)
+    assert stats['copied'] == 1 and stats['dirs_listed'] == 3
+    assert MirrorManifest(dest).dirs["klasse-7/deutsch"]['files']["100003.pdf"][2] is not None
+
+    (folder / "100001.pdf").unlink()
+    assert mirror(root, dest)['removed'] == 0
+    assert (dest / "klasse-7" / "deutsch" / "100001.pdf").exists()
+    (folder / "100002.pdf").unlink()
+    (dest / "ajeno.pdf").write_bytes(b"%PDF-1.4")
+    assert mirror(root, dest, prune=True)['removed'] == 2
+    assert not list((dest / "klasse-7" / "deutsch").glob("10000[12].pdf"))
+    assert MirrorManifest(dest).orphans == []
+    assert (dest / "ajeno.pdf").exists()
+
+
+def test_in_place_edits_need_full_scan(tmp_path):
+    root, dest = tmp_path / "Catlux", tmp_path / "Backup"
+    pdf = root / "klasse-7" / "deutsch" / "100001.pdf"
+    _write(pdf, b"%PDF-1.4 a")
+    _age_dirs(root)
+    assert mirror(root, dest)['copied'] == 1
+
+    # Editado en el sitio: cambia el mtime del PDF pero no el de la carpeta
+    with open(pdf, 'r+b') as f:
+        f.seek(9)
+        f.write(b"b")
+    os.utime(pdf, (OLD + 60, OLD + 60))
+    _age_dirs(root)
+    assert mirror(root, dest)['copied'] == 0
+    assert mirror(root, dest, full=True)['copied'] == 1
+    assert (dest / "klasse-7" / "deutsch" / "100001.pdf").read_bytes() == b"%PDF-1.4 b"
+
+    # Pasados FULL_SCAN_DAYS la pasada normal también lo ve
+    with open(pdf, 'r+b') as f:
+        f.seek(9)
+        f.write(b"c")
+    os.utime(pdf, (OLD + 120, OLD + 120))
+    _age_dirs(root)
+    manifest = MirrorManifest(dest)
+    manifest.last_full = "2000-01-01T00:00:00"
+    manifest.save()
+    stats = mirror(root, dest)
+    assert stats['copied'] == 1 and stats['dirs_reused'] == 0
+    assert MirrorManifest(dest).last_full > "2000-01-01T00:00:00"
+    assert mirror(root, dest)['dirs_listed'] == 0
+
+
+def test_restored_and_failed_files_are_never_pruned(tmp_path, monkeypatch):
+    root, dest = tmp_path / "Catlux", tmp_path / "Backup"
+    folder = root / "klasse-7" / "deutsch"
+    _write(folder / "1.pdf", b"%PDF-1.4 a")
+    _write(folder / "2.pdf", b"%PDF-1.4 b")
+    _age_dirs(root)
+    assert mirror(root, dest)['copied'] == 2
+
+    # Borrado y restaurado (misma fecha y contenido) antes del --prune
+    saved = (folder / "1.pdf").read_bytes()
+    (folder / "1.pdf").unlink()
+    mirror(root, dest)
+    assert MirrorManifest(dest).orphans == ["klasse-7/deutsch/1.pdf"]
+    _write(folder / "1.pdf", saved)
+    mirror(root, dest)
+    assert MirrorManifest(dest).orphans == []
+
+    # Una copia fallida no cuenta como desaparecida y se reintenta
+    _write(folder / "2.pdf", b"%PDF-1.4 b2")
+    real_copy = catlux_mirror.copy_file
+
+    def failing_copy(source, target, mtime_ns):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(catlux_mirror, "copy_file", failing_copy)
+    assert mirror(root, dest, prune=True)['failed'] == 1
+    assert (dest / "klasse-7" / "deutsch" / "1.pdf").exists()
+    assert (dest / "klasse-7" / "deutsch" / "2.pdf").read_bytes() == b"%PDF-1.4 b"
+    assert MirrorManifest(dest).orphans == []
+
+    monkeypatch.setattr(catlux_mirror, "copy_file", real_copy)
+    assert mirror(root, dest, prune=True)['copied'] == 1
+    assert (dest / "klasse-7" / "deutsch" / "2.pdf").read_bytes() == b"%PDF-1.4 b2"
+
+    # Aunque el manifiesto diga lo contrario, lo que sigue en el origen no se borra
+    manifest = MirrorManifest(dest)
+    manifest.orphans = ["klasse-7/deutsch/1.pdf"]
+    manifest.save()
+    assert mirror(root, dest, prune=True)['removed'] == 0
+    assert (dest / "klasse-7" / "deutsch" / "1.pdf").exists()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Pruebas de --optimize (catlux_optimize.py) con un backend de prueba.
+
+pikepdf y qpdf son opcionales; aquí el backend "recorta" el relleno de los
+PDFs mínimos para comprobar el reemplazo atómico, el registro y el resumen.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import catlux_optimize
+from catlux_optimize import OptimizeRecord, optimize_file, optimize_tree
+from test_pdfinfo import classic_pdf
+
+OLD = time.time() - 3600
+
+
+def _pdf(padding: int) -> bytes:
+    return b"%PDF-1.4\n" + b" " * padding + b"\n%%EOF\n"
+
+
+def _fake_backend(source, dest):
+    data = source.read_bytes()
+    if b"roto" in data:
+        raise catlux_optimize.OptimizeError("PDF dañado")
+    dest.write_bytes(data.replace(b" " * 100, b""))
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setitem(catlux_optimize._BACKENDS, "prueba", _fake_backend)
+    root = tmp_path / "Catlux" / "klasse-7" / "deutsch"
+    root.mkdir(parents=True)
+    files = {"100001.pdf": _pdf(5000), "100002.pdf": _pdf(50), "100003.pdf": _pdf(10) + b"roto"}
+    for name, content in files.items():
+        (root / name).write_bytes(content)
+        os.utime(root / name, (OLD, OLD))
+    return tmp_path / "Catlux"
+
+
+def test_replaces_only_when_smaller(tree):
+    path = tree / "klasse-7" / "deutsch" / "100001.pdf"
+    result = optimize_file(str(path), "prueba")
+    assert result['status'] == "optimized" and result['after'] < result['before']
+    assert path.read_bytes().startswith(b"%PDF") and path.stat().st_mtime == pytest.approx(OLD)
+    assert optimize_file(str(path), "prueba")['status'] == "kept"
+    assert not list(path.parent.glob("*.part"))
+
+
+def test_unreadable_result_of_readable_source_is_rejected(tmp_path, monkeypatch):
+    def broken_backend(source, dest):
+        dest.write_bytes(b"%PDF-1.4\n" + b"\x00" * 50)
+
+    monkeypatch.setitem(catlux_optimize._BACKENDS, "prueba", broken_backend)
+    path = tmp_path / "100001.pdf"
+    original = classic_pdf(pages=3) + b" " * 1000
+    path.write_bytes(original)
+    result = optimize_file(str(path), "prueba")
+    assert result['status'] == "failed" and result['error'].startswith("el resultado no se puede leer")
+    assert path.read_bytes() == original and not list(tmp_path.glob("*.part"))
+
+
+def test_tree_report_and_record(tree, tmp_path):
+    record = OptimizeRecord(tmp_path / "optimize.json")
+    with ThreadPoolExecutor(2) as pool:
+        summary = optimize_tree(tree, record, "prueba", pool=pool)
+    assert (summary['optimized'], summary['kept'], summary['failed'], summary['skipped']) == (1, 1, 1, 0)
+    assert summary['before'] - summary['after'] == 5000
+    assert summary['errors'][0][1] == "PDF dañado"
+
+    # Los revisados (también el dañado) no se vuelven a abrir mientras no cambien
+    record = OptimizeRecord(tmp_path / "optimize.json")
+    with ThreadPoolExecutor(2) as pool:
+        assert optimize_tree(tree, record, "prueba", pool=pool)['skipped'] == 3
+    changed = tree / "klasse-7" / "deutsch" / "100002.pdf"
+    changed.write_bytes(_pdf(300))
+    with ThreadPoolExecutor(2) as pool:
+        summary = optimize_tree(tree, record, "prueba", pool=pool)
+    assert (summary['skipped'], summary['optimized']) == (2, 1)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la salida para máquinas y de --select (catlux_output.py).
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from catlux_output import RecordWriter, parse_select, select_indices, write_preview
+
+
+def _pdfs():
+    return [
+        {'name': "1", 'doc_id': "1", 'doc_number': "#3399", 'doc_type': "1. Schulaufgabe",
+         'is_solution': False, 'is_local': True},
+        {'name': "1_solution", 'doc_id': "1", 'doc_number': "#3399", 'doc_type': "1. Schulaufgabe",
+         'is_solution': True, 'is_local': False},
+        {'name': "2", 'doc_id': "2", 'doc_number': "#3400", 'doc_type': "Extemporale",
+         'is_solution': False, 'is_local': False},
+        {'name': "3", 'doc_id': "3", 'doc_number': "#3500", 'doc_type': "2. Schulaufgabe",
+         'is_solution': False, 'is_local': False},
+    ]
+
+
+def test_select_terms():
+    pdfs = _pdfs()
+    assert select_indices(pdfs, "new") == [1, 2, 3]
+    assert select_indices(pdfs, "type=schulaufgabe") == [0, 1, 3]
+    assert select_indices(pdfs, "ref>=3400") == [2, 3]
+    assert select_indices(pdfs, "new, exam, type=Schulaufgabe") == [3]
+    assert select_indices(pdfs, "id=1,solution") == [1]
+    assert select_indices(pdfs, "all") == [0, 1, 2, 3]
+
+    with pytest.raises(ValueError):
+        parse_select("ref~3400")
+
+
+def test_json_and_csv_previews():
+    out = io.StringIO()
+    write_preview(_pdfs(), "json", selected=[2], stream=out)
+    rows = json.loads(out.getvalue())
+    assert [r['index'] for r in rows] == [1, 2, 3, 4]
+    assert [r['selected'] for r in rows] == [False, False, True, False]
+    assert rows[0]['ref'] == 3399
+
+    out = io.StringIO()
+    write_preview(_pdfs(), "csv", stream=out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(rows) == 4
+    assert rows[1]['name'] == "1_solution"
+
+
+def test_jsonl_streams_each_row():
+    out = io.StringIO()
+    writer = RecordWriter("jsonl", ('a',), out)
+    writer.write({'a': 1})
+    assert out.getvalue() == '{"a": 1}\n'
+    writer.close()
+
+    out = io.StringIO()
+    with RecordWriter("json", ('a',), out):
+        pass
+    assert json.loads(out.getvalue()) == []
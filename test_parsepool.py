@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Pruebas del parsing de listados en otros procesos (catlux_parsepool.py).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import catlux_scrapper  # noqa: E402
+from catlux_parsepool import ParsePool  # noqa: E402
+from catlux_scrapper import parse_listing, parse_listing_page  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+URL = "https://www.catlux.de/proben/gymnasium/klasse-7/deutsch/"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ParsePool(2) as parse_pool:
+        yield parse_pool
+
+
+def test_pages_come_back_in_order(pool):
+    pages = CatluxStandin(n_docs=230, page_size=20).listing_pages()
+    expected = [parse_listing_page(page, URL) for page in pages]
+    assert list(pool.map_pages(pages, URL)) == expected
+    assert [r['doc_id'] for r in pool.parse(pages[-1], URL)][::2] == [str(100220 + i) for i in range(10)]
+
+
+def test_parse_listing_uses_active_pool(pool, monkeypatch):
+    page = CatluxStandin(n_docs=5).listing_pages()[0]
+    calls = []
+    monkeypatch.setattr(pool, "parse", lambda *args: calls.append(args) or ParsePool.parse(pool, *args))
+    monkeypatch.setattr(catlux_scrapper, "_parse_pool", pool)
+    assert parse_listing(page, URL) == parse_listing_page(page, URL)
+    assert len(calls) == 1
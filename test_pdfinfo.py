@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pruebas del lector de metadatos por mmap y su caché (catlux_pdfinfo.py).
+"""
+
+import os
+import zlib
+
+import pytest
+
+from catlux_pdfinfo import PdfInfoCache, PdfInfoError, booklet_summary, read_pdf_info
+
+
+def _objects(pages, info):
+    kids = " ".join(f"{3 + i} 0 R" for i in range(pages))
+    objs = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+            2: f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()}
+    for i in range(pages):
+        objs[3 + i] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>"
+    objs[3 + pages] = info
+    return objs
+
+
+def classic_pdf(pages=3, info=b"<< /Title (Probe \\(Nr. 1\\)) /Producer <FEFF00D6006C> >>"):
+    """PDF con tabla xref clásica."""
+    objs = _objects(pages, info)
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for num, body in objs.items():
+        offsets[num] = len(out)
+        out += f"{num} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for num in sorted(objs):
+        out += f"{offsets[num]:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R /Info {max(objs)} 0 R >>\n".encode()
+    out += f"startxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def xref_stream_pdf(pages=5):
+    """PDF 1.5: objetos en un object stream y xref stream con predictor PNG."""
+    objs = _objects(pages, b"<< /Title (Komprimiert) >>")
+    info_num = max(objs)
+    stm_num, xref_num = info_num + 1, info_num + 2
+
+    # Todos los objetos excepto el catálogo van dentro del object stream
+    packed = [n for n in sorted(objs) if n != 1]
+    header, body = [], bytearray()
+    for n in packed:
+        header.append(f"{n} {len(body)}")
+        body += objs[n] + b" "
+    header_bytes = " ".join(header).encode() + b" "
+    stm_data = zlib.compress(header_bytes + body)
+
+    out = bytearray(b"%PDF-1.5\n")
+    offsets = {1: len(out)}
+    out += b"1 0 obj\n" + objs[1] + b"\nendobj\n"
+    offsets[stm_num] = len(out)
+    out += (f"{stm_num} 0 obj\n<< /Type /ObjStm /N {len(packed)} /First {len(header_bytes)} "
+            f"/Length {len(stm_data)} /Filter /FlateDecode >>\nstream\n").encode()
+    out += stm_data + b"\nendstream\nendobj\n"
+    offsets[xref_num] = len(out)
+
+    rows = [bytes([0, 0, 0, 0])]
+    for num in range(1, xref_num + 1):
+        if num in offsets:
+            rows.append(bytes([1]) + offsets[num].to_bytes(2, 'big') + b"\x00")
+        else:
+            rows.append(bytes([2]) + stm_num.to_bytes(2, 'big') + bytes([packed.index(num)]))
+    # Predictor PNG "Up" en cada fila
+    raw, prev = bytearray(), bytes(4)
+    for row in rows:
+        raw += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, prev))
+        prev = row
+    xref_data = zlib.compress(bytes(raw))
+    out += (f"{xref_num} 0 obj\n<< /Type /XRef /Size {xref_num + 1} /W [1 2 1] /Root 1 0 R "
+            f"/Info {info_num} 0 R /Filter /FlateDecode /DecodeParms << /Columns 4 /Predictor 12 >> "
+            f"/Length {len(xref_data)} >>\nstream\n").encode()
+    out += xref_data + b"\nendstream\nendobj\n"
+    out += f"startxref\n{offsets[xref_num]}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def incremental_update(pdf: bytes, new_pages: int) -> bytes:
+    """Añade una actualización incremental que cambia /Count del árbol de páginas."""
+    prev = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+    out = bytearray(pdf)
+    offset = len(out)
+    out += f"2 0 obj\n<< /Type /Pages /Kids [] /Count {new_pages} >>\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n2 1\n{offset:010d} 00000 n \ntrailer\n<< /Size 9 /Root 1 0 R /Prev {prev} >>\n".encode()
+    out += f"startxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def test_classic_xref(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(classic_pdf())
+    assert read_pdf_info(path) == {'pages': 3, 'title': "Probe (Nr. 1)", 'producer': "Öl"}
+
+
+def test_xref_stream_with_object_stream(tmp_path):
+    path = tmp_path / "b.pdf"
+    path.write_bytes(xref_stream_pdf(pages=5))
+    assert read_pdf_info(path) == {'pages': 5, 'title': "Komprimiert", 'producer': None}
+
+
+def test_incremental_update_wins_and_info_comes_from_prev(tmp_path):
+    path = tmp_path / "c.pdf"
+    path.write_bytes(incremental_update(classic_pdf(pages=3), 7))
+    info = read_pdf_info(path)
+    assert info['pages'] == 7 and info['title'] == "Probe (Nr. 1)"
+
+
+def test_broken_xref_falls_back_and_html_is_rejected(tmp_path):
+    broken = tmp_path / "d.pdf"
+    broken.write_bytes(classic_pdf(pages=4).replace(b"startxref\n", b"startxref\n9"))
+    assert read_pdf_info(broken)['pages'] == 4
+
+    html = tmp_path / "e.pdf"
+    html.write_bytes(b"<!DOCTYPE html><html>keine Loesung</html>")
+    with pytest.raises(PdfInfoError):
+        read_pdf_info(html)
+
+
+def test_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    root = tmp_path / "Catlux" / "klasse-7"
+    root.mkdir(parents=True)
+    for i in range(3):
+        (root / f"{i}.pdf").write_bytes(classic_pdf(pages=i + 1))
+    (root / "kaputt.pdf").write_bytes(b"nada")
+    cache_file = tmp_path / "cache.json"
+
+    first = PdfInfoCache(cache_file)
+    records = first.scan(root)
+    assert first.misses == 4 and [r['pages'] for r in records] == [1, 2, 3, None]
+    assert booklet_summary(records) == {'files': 4, 'unreadable': 1, 'pages': 6, 'odd': 2,
+                                        'padded_pages': 8, 'sheets': 4}
+
+    # Un archivo modificado se vuelve a leer; los demás salen de la caché
+    changed = root / "2.pdf"
+    changed.write_bytes(classic_pdf(pages=9))
+    os.utime(changed, ns=(1, 1))
+    second = PdfInfoCache(cache_file)
+    records = second.scan(root)
+    assert (second.hits, second.misses) == (3, 1)
+    assert records[2]['pages'] == 9
+    assert len(second.entries) == 4
+
+
+def test_scan_keeps_entries_of_sibling_prefix_folders(tmp_path):
+    base = tmp_path / "Catlux"
+    for folder in ("klasse-1", "klasse-10"):
+        (base / folder).mkdir(parents=True)
+        (base / folder / "1.pdf").write_bytes(classic_pdf())
+    cache_file = tmp_path / "cache.json"
+
+    PdfInfoCache(cache_file).scan(base / "klasse-10")
+    (base / "klasse-1" / "1.pdf").unlink()
+    cache = PdfInfoCache(cache_file)
+    cache.scan(base / "klasse-1")
+    assert [e['path'] for e in cache.entries.values()] == [str(base / "klasse-10" / "1.pdf")]
+
+    again = PdfInfoCache(cache_file)
+    again.scan(base / "klasse-10")
+    assert (again.hits, again.misses) == (1, 0)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Pruebas del planificador de descargas (catlux_planner.plan_downloads).
+"""
+
+from catlux_planner import doc_type_rank, plan_downloads
+
+
+def _pair(doc_id, ref, doc_type="1. Schulaufgabe", category="klasse-7/deutsch", solution=True):
+    exam = {'name': str(doc_id), 'is_solution': False, 'doc_id': str(doc_id),
+            'doc_number': f"#{ref}", 'doc_type': doc_type, 'category': category}
+    pdfs = [exam]
+    if solution:
+        pdfs.append(dict(exam, name=f"{doc_id}_solution", is_solution=True))
+    return pdfs
+
+
+def test_pairs_are_never_split():
+    candidates = _pair(1, 300) + _pair(2, 200) + _pair(3, 100, solution=False)
+    plan = plan_downloads(candidates, 3)
+
+    # El segundo par no cabe: se salta y entra el examen suelto
+    assert [p['name'] for p in plan.pdfs] == ["1", "1_solution", "3"]
+    assert plan.cost == 3
+    assert [u['doc_id'] for u in plan.skipped] == ["2"]
+
+
+def test_preferred_type_then_newest():
+    candidates = (_pair(1, 500, "Extemporale") + _pair(2, 100, "2. Schulaufgabe")
+                  + _pair(3, 200, "1. Schulaufgabe"))
+    plan = plan_downloads(candidates, 4)
+
+    assert [u['doc_id'] for u in plan.selected] == ["3", "2"]
+    assert doc_type_rank("Extemporale") > doc_type_rank("Schulaufgabe")
+
+
+def test_subjects_take_turns():
+    candidates = (_pair(1, 300) + _pair(2, 200) + _pair(3, 100)
+                  + _pair(4, 50, category="klasse-7/englisch"))
+    plan = plan_downloads(candidates, 4)
+
+    assert [u['doc_id'] for u in plan.selected] == ["1", "4"]
+
+
+def test_no_quota_plans_nothing():
+    plan = plan_downloads(_pair(1, 300), 0)
+    assert plan.pdfs == []
+    assert plan.skipped[0]['reason'] == "sin saldo"
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la precarga especulativa (catlux_prefetch.py) contra benchmarks/standin.py.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+pytest.importorskip("requests")
+
+import catlux_scrapper  # noqa: E402
+from catlux_prefetch import STAGING_DIR_NAME, Prefetcher  # noqa: E402
+from catlux_scrapper import DownloadTracker, PDFManager, login_to_catlux, new_session  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    with CatluxStandin(n_docs=4, pdf_size=1024) as server:
+        yield server
+
+
+def _session(standin):
+    session = new_session()
+    assert login_to_catlux(session, "test", "test", None, standin.root_url() + "login")
+    return session
+
+
+def _listing(standin):
+    session = _session(standin)
+    try:
+        return PDFManager(session).fetch_pdfs(standin.category_url(), 2)
+    finally:
+        session.close()
+
+
+def test_prefetch_respects_quota_and_counts_only_promoted(standin, tmp_path, monkeypatch):
+    monkeypatch.setattr(catlux_scrapper, "DOWNLOADS_PER_MONTH", 5)
+    tracker = DownloadTracker(tmp_path / "tracker.json")
+    pdfs = _listing(standin)
+    pdfs[0]['is_local'] = True
+
+    prefetcher = Prefetcher(tracker, tmp_path)
+    # 7 nuevos pero solo 5 de saldo
+    assert prefetcher.start(_session(standin), pdfs) == 5
+    assert standin.counters.get('pdf', 0) <= 5
+
+    dest = tmp_path / "out" / f"{pdfs[1]['name']}.pdf"
+    dest.parent.mkdir()
+    assert prefetcher.promote(pdfs[1], dest) and dest.read_bytes().startswith(b"%PDF")
+    assert prefetcher.promote(pdfs[1], dest) is False  # ya promovido
+    assert prefetcher.promote(pdfs[7], dest) is False  # fuera del saldo: descarga normal
+    # Precargar no registra nada: es el llamador quien cuenta lo promovido
+    assert tracker.get_current_month_downloads() == 0
+
+    # Al cerrar se cancela lo que no empezó y se borra lo descargado
+    prefetcher.close()
+    assert 1 <= standin.counters['pdf'] <= 5 and prefetcher.promoted == 1
+    assert not (tmp_path / STAGING_DIR_NAME).exists()
+    assert [f.name for f in (tmp_path / "out").iterdir()] == [dest.name]
+
+
+def test_close_keeps_other_processes_staging(standin, tmp_path):
+    tracker = DownloadTracker(tmp_path / "tracker.json")
+    pdfs = _listing(standin)
+    other = tmp_path / STAGING_DIR_NAME / "99999-otro"
+    other.mkdir(parents=True)
+    (other / "1.pdf.staged").write_bytes(b"%PDF")
+
+    prefetcher = Prefetcher(tracker, tmp_path)
+    prefetcher.start(_session(standin), pdfs)
+    assert prefetcher.staging_dir.parent == tmp_path / STAGING_DIR_NAME
+    prefetcher.close()
+
+    assert list((tmp_path / STAGING_DIR_NAME).iterdir()) == [other]
+    assert (other / "1.pdf.staged").exists()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la cola persistente de descargas (catlux_queue.JobQueue).
+"""
+
+import time
+from pathlib import Path
+
+import catlux_queue
+from catlux_queue import JobQueue
+
+
+def _pdf(name):
+    return {'name': name, 'full_url': f"https://www.catlux.de/probe/{name}?dl=pdf",
+            'is_solution': name.endswith('_solution'), 'doc_id': name.split('_')[0]}
+
+
+def test_claim_is_exclusive_and_ordered(tmp_path):
+    with JobQueue(tmp_path / "q.db") as q1, JobQueue(tmp_path / "q.db") as q2:
+        batch = q1.enqueue("https://x/klasse-7/deutsch/", tmp_path, [_pdf("1"), _pdf("1_solution")])
+
+        first = q1.claim("host:1", batch)
+        second = q2.claim("host:2", batch)
+        assert first['pdf']['name'] == "1"
+        assert second['pdf']['name'] == "1_solution"
+        assert q1.claim("host:1", batch) is None
+        assert second['dest'] == tmp_path / "1_solution.pdf"
+
+
+def test_fail_retries_then_gives_up(tmp_path):
+    with JobQueue(tmp_path / "q.db") as q:
+        q.enqueue("https://x/", tmp_path, [_pdf("1")])
+        for _ in range(catlux_queue.MAX_ATTEMPTS - 1):
+            job = q.claim("h:1")
+            assert q.fail(job['id'], "timeout") is True
+        job = q.claim("h:1")
+        assert q.fail(job['id'], "timeout") is False
+        assert q.claim("h:1") is None
+        assert q.counts() == {'failed': 1}
+
+
+def test_stale_jobs_are_recovered(tmp_path, monkeypatch):
+    with JobQueue(tmp_path / "q.db") as q:
+        q.enqueue("https://x/", tmp_path, [_pdf("1")])
+        assert q.claim("otherhost:123") is not None
+        assert q.claim("h:1") is None  # todavía en curso por otro host
+
+        monkeypatch.setattr(catlux_queue, "STALE_AFTER_SECONDS", -1)
+        recovered = q.claim("h:1")
+        assert recovered['pdf']['name'] == "1"
+
+
+def test_reenqueue_does_not_duplicate(tmp_path):
+    with JobQueue(tmp_path / "q.db") as q:
+        q.enqueue("https://x/", tmp_path, [_pdf("1")])
+        job = q.claim("h:1")
+        q.complete(job['id'])
+        batch = q.enqueue("https://x/", Path(tmp_path), [_pdf("1")])
+        assert q.counts() == {'pending': 1}
+        assert q.claim("h:1", batch)['pdf']['name'] == "1"
+
+
+def test_heartbeat_keeps_slow_jobs_and_old_done_jobs_are_purged(tmp_path, monkeypatch):
+    monkeypatch.setattr(catlux_queue, "STALE_AFTER_SECONDS", 0.2)
+    with JobQueue(tmp_path / "q.db") as q:
+        q.enqueue("https://x/", tmp_path, [_pdf("1"), _pdf("2")])
+        slow = q.claim("otherhost:123")
+        for _ in range(3):
+            time.sleep(0.1)
+            q.touch(slow['id'])
+        # Sigue en curso: no se vuelve a reclamar
+        assert q.claim("h:1")['pdf']['name'] == "2"
+        assert q.claim("h:1") is None
+
+        q.complete(slow['id'])
+        assert q.purge_done(older_than=3600) == 0
+        assert q.purge_done() == 1
+        assert q.counts() == {'in_progress': 1}
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Pruebas del servicio HTTP (catlux_server.py) contra benchmarks/standin.py.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import catlux_daemon  # noqa: E402
+import catlux_server  # noqa: E402
+from catlux_cache import ListingCache  # noqa: E402
+from catlux_scrapper import DownloadTracker  # noqa: E402
+from catlux_server import CatluxService, make_server  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+
+def test_listing_cache_coalesces_and_expires():
+    now = [0.0]
+    release = threading.Event()
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        release.wait(5)
+        return [key]
+
+    cache = ListingCache(loader, ttl=60, clock=lambda: now[0])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a"))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["a"] and results == [["a"]] * 6
+    assert cache.get("a") == ["a"] and cache.loads == 1
+    now[0] = 61
+    cache.get("a")
+    cache.get("a", refresh=True)
+    assert cache.loads == 3
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    save_path = tmp_path / "Catlux"
+    save_path.mkdir()
+    monkeypatch.setenv("CATLUX_USERNAME", "test@example.com")
+    monkeypatch.setenv("CATLUX_PASSWORD", "test")
+    monkeypatch.setenv("CATLUX_SAVE_PATH", str(save_path))
+    monkeypatch.delenv("CATLUX_CERT_PATH", raising=False)
+    monkeypatch.setattr(catlux_daemon, "CATALOG_FILE", tmp_path / "catalog.json")
+    monkeypatch.setattr(catlux_server, "DEDUP_FILE", tmp_path / "dedup.json")
+
+    with CatluxStandin(n_docs=30, page_size=10, pdf_size=1024) as standin:
+        service = CatluxService(DownloadTracker(tmp_path / "tracker.json"), max_pages=5,
+                                sites=[standin.root_url()])
+        service.daemon.queue_file = tmp_path / "queue.db"
+        httpd = make_server(service, port=0, token="secreto")
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        service.start_drainer()
+        host, port = httpd.server_address[:2]
+        session = requests.Session()
+        session.headers["Authorization"] = "Bearer secreto"
+        yield standin, service, session, f"http://{host}:{port}"
+        httpd.shutdown()
+        httpd.server_close()
+        service.stop()
+        session.close()
+
+
+def test_concurrent_previews_share_one_listing_fetch(api):
+    standin, service, session, base = api
+    url = standin.category_url()
+
+    assert requests.get(f"{base}/status").status_code == 401
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(
+        session.get(f"{base}/preview", params={'url': url, 'select': "ref>=0"})))
+        for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [r.status_code for r in responses] == [200] * 8
+    payload = responses[0].json()
+    assert payload['count'] > 30 and all(pdf['selected'] for pdf in payload['pdfs'])
+    assert standin.counters['login_post'] == 1 and service.listings.loads == 1
+
+    # Las 8 peticiones costaron lo mismo que un solo listado
+    one_listing = standin.counters['listing']
+    session.get(f"{base}/preview", params={'url': url, 'refresh': "1"})
+    assert standin.counters['listing'] == 2 * one_listing
+
+    assert session.get(f"{base}/preview").status_code == 400
+    assert session.get(f"{base}/nada").status_code == 404
+
+
+def test_enqueue_is_drained_in_background(api):
+    standin, service, session, base = api
+    url = standin.category_url()
+
+    r = session.post(f"{base}/enqueue", json={'url': url, 'ids': ["100000", "100001"]})
+    assert r.status_code == 202
+    batch, queued = r.json()['batch'], r.json()['queued']
+    assert queued >= 2
+
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        jobs = session.get(f"{base}/queue", params={'batch': batch}).json()['jobs']
+        if jobs.get('done') == queued:
+            break
+        time.sleep(0.1)
+    assert jobs.get('done') == queued
+
+    status = session.get(f"{base}/status").json()
+    assert status['downloads_this_month'] == queued
+    assert len(session.get(f"{base}/history", params={'limit': 1}).json()['downloads']) == 1
+
+    # Lo descargado aparece ya como local en el siguiente preview
+    pdfs = session.get(f"{base}/preview", params={'url': url}).json()['pdfs']
+    assert {pdf['name'] for pdf in pdfs if pdf['is_local']} >= {"100000", "100001"}
+
+
+def test_reenqueue_from_stale_listing_does_not_download_twice(api):
+    standin, service, session, base = api
+    url = standin.category_url()
+    stale = [dict(pdf) for pdf in service.listing(url)]
+
+    r = session.post(f"{base}/enqueue", json={'url': url, 'ids': ["100000"]})
+    batch, queued = r.json()['batch'], r.json()['queued']
+    deadline = time.time() + 10
+    while time.time() < deadline and session.get(
+            f"{base}/queue", params={'batch': batch}).json()['jobs'].get('done') != queued:
+        time.sleep(0.1)
+    # Cada trabajo terminado invalida el listado de su categoría
+    assert url not in service.listings
+
+    # Listado en memoria anterior a la descarga: no se vuelve a encolar
+    service.listings.put(url, stale)
+    r = session.post(f"{base}/enqueue", json={'url': url, 'ids': ["100000"]})
+    assert r.json()['queued'] == 0
+    assert service.tracker.get_current_month_downloads() == queued
+
+
+def test_rejects_foreign_sites_paths_and_cross_site_requests(api):
+    standin, service, session, base = api
+    url = standin.category_url()
+
+    # Las credenciales solo van al sitio configurado
+    for bad in ("https://atacante.example/proben/gymnasium/klasse-7/deutsch/",
+                url.replace("klasse-7/deutsch/", "klasse-7/../../../tmp/"),
+                url.replace("deutsch/", "../"),
+                url.replace("klasse-7/", ""),
+                url + "?p=2"):
+        r = session.get(f"{base}/preview", params={'url': bad})
+        assert r.status_code == 400, bad
+        r = session.post(f"{base}/enqueue", json={'url': bad, 'ids': ["100000"]})
+        assert r.status_code == 400, bad
+    assert standin.counters.get('login_post', 0) == 0
+
+    # Formulario de otra web: sin JSON no se acepta
+    r = session.post(f"{base}/enqueue", data='{"url": "%s"}' % url,
+                     headers={'Content-Type': "text/plain"})
+    assert r.status_code == 415
+
+    for headers in ({'Origin': "https://atacante.example"}, {'Sec-Fetch-Site': "cross-site"},
+                    {'Host': "atacante.example:8765"}):
+        assert session.get(f"{base}/status", headers=headers).status_code == 403, headers
+    host = base.split("//")[1]
+    assert session.get(f"{base}/status", headers={'Origin': f"http://{host}"}).status_code == 200
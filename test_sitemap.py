@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Pruebas del mapa del sitio (catlux_sitemap.py) contra benchmarks/standin.py.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+from catlux_sitemap import SiteMap, check_category, crawl_site, select_from_sitemap  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+DEUTSCH = "/proben/gymnasium/klasse-7/deutsch/"
+
+
+@pytest.fixture(scope="module")
+def server():
+    categories = {
+        DEUTSCH + "schulaufgabe/": 12,
+        "/proben/gymnasium/klasse-10/englisch/": 5,
+        "/proben/realschule/klasse-5/mathematik/": 0,
+    }
+    with CatluxStandin(n_docs=45, page_size=20, category_path=DEUTSCH, categories=categories) as standin:
+        yield standin
+
+
+@pytest.fixture(scope="module")
+def sitemap(server):
+    with requests.Session() as session:
+        return crawl_site(session, server.root_url() + "proben/", workers=4)
+
+
+def test_crawl_finds_tree_and_counts(server, sitemap):
+    deutsch = sitemap.node(server.root_url() + DEUTSCH.lstrip("/"))
+    assert (deutsch['count'], deutsch['pages']) == (45, 3)
+    assert sitemap.nodes[DEUTSCH + "schulaufgabe/"]['count'] == 12
+    assert sitemap.nodes["/proben/gymnasium/"]['count'] == 50
+    assert sitemap.nodes["/proben/realschule/"]['count'] == 0
+
+    # Orden natural y sin ramas vacías
+    assert [n['name'] for _, n in sitemap.children("/proben/gymnasium/")] == ["klasse-7", "klasse-10"]
+    assert [n['name'] for _, n in sitemap.children("/proben/")] == ["gymnasium"]
+
+
+def test_roundtrip_and_ttl(sitemap, tmp_path):
+    path = tmp_path / "sitemap.json"
+    sitemap.save(path)
+    loaded = SiteMap.load(path)
+    assert loaded.nodes == sitemap.nodes and loaded.is_fresh()
+
+    loaded.created = "2000-01-01T00:00:00"
+    assert not loaded.is_fresh()
+
+
+def test_interactive_selection_only_offers_existing(server, sitemap, monkeypatch):
+    answers = iter(["1", "0"])  # klasse-7, luego "ver todo" en deutsch
+    monkeypatch.setattr("builtins.input", lambda _: next(answers))
+    assert select_from_sitemap(sitemap) == server.root_url() + DEUTSCH.lstrip("/")
+
+
+def test_check_category(server, sitemap):
+    assert check_category(sitemap, server.root_url() + DEUTSCH.lstrip("/"), 10)
+    assert not check_category(sitemap, server.root_url() + "proben/realschule/klasse-5/mathematik/", 10)
+    # Fuera del mapa (categoría nueva o mapa desactualizado): se lista igualmente
+    assert check_category(sitemap, server.root_url() + "proben/gymnasium/klasse-7/latein/", 10)
+    assert check_category(None, "https://www.catlux.de/proben/x/", 10)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Pruebas del snapshot de listado (catlux_snapshot.py).
+"""
+
+import json
+
+import pytest
+
+import catlux_output
+from catlux_snapshot import SnapshotError, load_snapshot, save_snapshot
+
+URL = "https://www.catlux.de/proben/gymnasium/klasse-7/deutsch/"
+
+
+def _pdfs():
+    return [{'name': "1", 'url': "probe/1?dl=pdf", 'full_url': "https://x/probe/1?dl=pdf",
+             'is_solution': False, 'doc_id': "1", 'doc_number': "#3400", 'doc_type': "Extemporale",
+             'doc_title': "Ä", 'is_local': True, 'local_path': "no/se/guarda.pdf", 'size': 10},
+            {'name': "1_solution", 'url': "probe/1?dl=pdf_solution",
+             'full_url': "https://x/probe/1?dl=pdf_solution", 'is_solution': True, 'doc_id': "1",
+             'doc_number': "#3400", 'doc_type': "Extemporale", 'doc_title': "Ä", 'is_local': False}]
+
+
+def test_roundtrip_keeps_order_and_flags(tmp_path):
+    save_snapshot(tmp_path, URL, _pdfs(), 10)
+
+    base_url, pdfs = load_snapshot(tmp_path, URL.rstrip('/'))
+    assert base_url == URL
+    assert [p['name'] for p in pdfs] == ["1", "1_solution"]
+    assert [p['is_local'] for p in pdfs] == [True, False]
+    assert pdfs[0]['size'] == 10 and 'size' not in pdfs[1]
+    assert 'local_path' not in pdfs[0]
+
+    # Sin URL: el más reciente
+    assert load_snapshot(tmp_path)[0] == URL
+
+
+def test_stale_or_tampered_snapshots_are_rejected(tmp_path):
+    path = save_snapshot(tmp_path, URL, _pdfs(), 10)
+
+    with pytest.raises(SnapshotError):
+        load_snapshot(tmp_path, URL + "aufsatz")
+    with pytest.raises(SnapshotError):
+        load_snapshot(tmp_path, URL, max_age=-1)
+
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['rows'][0][0] = "2"
+    path.write_text(json.dumps(data), encoding='utf-8')
+    with pytest.raises(SnapshotError):
+        load_snapshot(tmp_path, URL)
+
+
+def test_duplicate_flags_survive_for_nodup(tmp_path):
+    pdfs = _pdfs()
+    pdfs[1].update(duplicate_of="2_solution.pdf", similarity=0.93)
+    save_snapshot(tmp_path, URL, pdfs, 10)
+
+    _, loaded = load_snapshot(tmp_path, URL)
+    assert loaded[1]['duplicate_of'] == "2_solution.pdf" and loaded[1]['similarity'] == 0.93
+    assert 'duplicate_of' not in loaded[0]
+    assert catlux_output.select_indices(loaded, "new") == [1]
+    assert catlux_output.select_indices(loaded, "new,nodup") == []
+
+
+def test_detail_fields_survive_for_select(tmp_path):
+    pdfs = _pdfs()
+    pdfs[0].update(school_year="2023/2024", pages=3, author="Frau M.", uploaded="03.02.2025")
+    save_snapshot(tmp_path, URL, pdfs, 10)
+
+    _, loaded = load_snapshot(tmp_path, URL)
+    assert {k: loaded[0][k] for k in ('school_year', 'pages', 'author', 'uploaded')} == \
+        {'school_year': "2023/2024", 'pages': 3, 'author': "Frau M.", 'uploaded': "03.02.2025"}
+    assert 'pages' not in loaded[1]
+    assert catlux_output.select_indices(loaded, "year=2023") == [0]
+    assert catlux_output.select_indices(loaded, "pages<=4") == [0]
+
+    from catlux_layout import known_metadata
+    assert known_metadata(tmp_path)["1"]['school_year'] == "2023/2024"
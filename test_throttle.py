@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la limitación de ancho de banda (catlux_throttle.py) con reloj falso
+contra el servidor local de benchmarks/standin.py.
+"""
+
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import catlux_scrapper  # noqa: E402
+from catlux_scrapper import fetch_pdf  # noqa: E402
+from catlux_throttle import Throttle, parse_profile, parse_rate  # noqa: E402
+from standin import CatluxStandin  # noqa: E402
+
+PDF_SIZE = 100_000
+
+
+class FakeClock:
+    """Reloj que solo avanza cuando alguien 'duerme' (si advance=True)."""
+
+    def __init__(self, advance=True):
+        self.now = 0.0
+        self.advance = advance
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            if self.advance:
+                self.now += seconds
+
+
+@pytest.fixture
+def server():
+    with CatluxStandin(n_docs=4, pdf_size=PDF_SIZE) as standin:
+        yield standin
+
+
+@pytest.fixture
+def throttled():
+    def install(throttle):
+        catlux_scrapper.set_download_throttle(throttle)
+        return throttle
+    yield install
+    catlux_scrapper.set_download_throttle(None)
+
+
+def _pdf(server, index):
+    doc_id = server.doc_id(index)
+    return {'name': doc_id, 'full_url': f"{server.root_url()}probe/{doc_id}?dl=pdf"}
+
+
+def test_parse_rate_and_profile():
+    assert parse_rate("500") == 500
+    assert parse_rate("200k") == 200 * 1024
+    assert parse_rate("1.5M") == 1536 * 1024
+    assert parse_profile("08:00-18:00=100k, 20:00-07:00=0") == [(480, 1080, 102400), (1200, 420, 0)]
+    with pytest.raises(ValueError):
+        parse_rate("rápido")
+    with pytest.raises(ValueError):
+        parse_profile("25:00-07:00=0")
+
+
+def test_single_download_takes_size_over_rate(server, throttled, tmp_path):
+    clock = FakeClock()
+    throttle = throttled(Throttle(20_000, clock=clock, sleep=clock.sleep))
+
+    with requests.Session() as session:
+        for i in range(2):
+            fetch_pdf(session, _pdf(server, i), tmp_path / f"{i}.pdf")
+
+    assert (tmp_path / "1.pdf").stat().st_size == PDF_SIZE
+    # El cubo arranca lleno (un segundo de tráfico); el resto va a la tasa fijada
+    assert clock.now == pytest.approx((2 * PDF_SIZE - throttle.rate()) / throttle.rate())
+    assert max(clock.sleeps) <= throttle.chunk_size / throttle.rate() + 1e-9
+
+
+def test_concurrent_downloads_share_one_bucket(server, throttled, tmp_path):
+    # Reloj parado: sin recarga, la última espera refleja todo lo leído por los 4 hilos
+    clock = FakeClock(advance=False)
+    throttled(Throttle(50_000, clock=clock, sleep=clock.sleep))
+
+    with requests.Session() as session:
+        threads = [threading.Thread(target=fetch_pdf, args=(session, _pdf(server, i), tmp_path / f"{i}.pdf"))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(list(tmp_path.glob("*.pdf"))) == 4
+    assert max(clock.sleeps) == pytest.approx((4 * PDF_SIZE - 50_000) / 50_000)
+
+
+def test_profile_throttles_by_day_only(server, throttled, tmp_path):
+    clock = FakeClock()
+    hour = {'value': 12}
+    throttle = throttled(Throttle(0, parse_profile("08:00-18:00=25k"), clock=clock, sleep=clock.sleep,
+                                  now=lambda: datetime(2024, 5, 6, hour['value'], 30)))
+
+    with requests.Session() as session:
+        fetch_pdf(session, _pdf(server, 0), tmp_path / "dia.pdf")
+        day_time = clock.now
+        hour['value'] = 23
+        assert throttle.rate() == 0
+        fetch_pdf(session, _pdf(server, 1), tmp_path / "noche.pdf")
+
+    assert day_time == pytest.approx((PDF_SIZE - 25 * 1024) / (25 * 1024))
+    assert clock.now == day_time
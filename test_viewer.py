@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Pruebas del preview escalable (preview_stats, select_by_ids y catlux_viewer).
+"""
+
+from catlux_scrapper import preview_stats, select_by_ids
+from catlux_viewer import PreviewViewer
+
+
+def _pdfs(n):
+    pdfs = []
+    for k in range(n):
+        doc_id = str(100000 + k)
+        for suffix in ("", "_solution"):
+            pdfs.append({'name': doc_id + suffix, 'doc_id': doc_id, 'doc_number': f"#{k:04}",
+                         'doc_type': "Extemporale" if k % 3 else "1. Schulaufgabe",
+                         'doc_title': f"Probe {k}", 'is_solution': bool(suffix),
+                         'is_local': k < 2})
+    return pdfs
+
+
+def test_stats_single_pass():
+    assert preview_stats(_pdfs(5)) == {'total': 10, 'exams': 5, 'solutions': 5, 'local': 4, 'new': 6}
+
+
+def test_select_by_ids():
+    pdfs = _pdfs(3)
+    assert select_by_ids(pdfs, ["100001"]) == ([2, 3], [])
+    assert select_by_ids(pdfs, ["100002_solution", "#999"]) == ([5], ["999"])
+
+
+def test_viewer_renders_only_visible_page_and_selects_by_id():
+    lines = []
+    commands = iter(["f type=schulaufgabe", "s -ref", "+*", "-100000", "n", "d"])
+    viewer = PreviewViewer(_pdfs(1000), page_size=15,
+                           input_func=lambda _: next(commands), output=lines.append)
+
+    indices = viewer.run()
+
+    # Filas de datos pintadas: como mucho una página por render
+    rows = [line for line in lines if line[:1] in ("*", " ") and " | " in line]
+    assert len(rows) <= 15 * 7
+    assert viewer.pages == -(-668 // 15)
+
+    # Schulaufgaben (k % 3 == 0) menos el documento 100000
+    assert len(indices) == 2 * 334 - 2
+    assert all(viewer.pdfs[i]['doc_type'] == "1. Schulaufgabe" for i in indices)
+    assert 0 not in indices and 1 not in indices
+
+
+def test_viewer_quit_returns_none():
+    viewer = PreviewViewer(_pdfs(3), page_size=5, input_func=lambda _: "q", output=lambda _: None)
+    assert viewer.run() is None